@@ -1,12 +1,16 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from typing import Any, AsyncIterator, Dict, Optional
 import os
 import logging
 
 # 导入查询监控工具
 from app.utils.query_monitor import setup_sqlalchemy_monitoring
+from app.utils.sqlite_profile import is_sqlite_profile_enabled, setup_sqlite_profile
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -16,10 +20,59 @@ logger = logging.getLogger(__name__)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'yueen.db')}")
 
+# 异步驱动：未配置 ASYNC_DATABASE_URL 时由 DATABASE_URL 推导
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+# 已支持异步的驱动（URL 中已指定时原样使用）
+ASYNC_CAPABLE_DRIVERS = {"aiosqlite", "asyncpg", "psycopg", "aiomysql", "asyncmy"}
+
+
+def get_async_database_url(url: str) -> str:
+    """将同步数据库URL转换为对应异步驱动的URL（如 sqlite:// → sqlite+aiosqlite://，mysql+pymysql:// → mysql+aiomysql://）"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() in ASYNC_CAPABLE_DRIVERS or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def is_sqlite_file(url: str) -> bool:
+    """是否为 SQLite 文件数据库（内存数据库除外）"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def get_pool_options(url: str) -> Dict[str, Any]:
+    """
+    连接池配置（DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE / DB_POOL_PRE_PING）
+
+    内存 SQLite 使用单连接池，不适用连接池大小配置。
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and not is_sqlite_file(url):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # 定期回收连接，避免使用被数据库或中间代理关闭的空闲连接
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        # 取出连接前检查连接是否可用
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+
 # 创建数据库引擎
 # SQLite需要check_same_thread=False以支持多线程
 connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **get_pool_options(DATABASE_URL))
+if is_sqlite_file(DATABASE_URL) and is_sqlite_profile_enabled():
+    setup_sqlite_profile(engine)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", get_async_database_url(DATABASE_URL))
 
 # 设置查询监控
 setup_sqlalchemy_monitoring(engine)
@@ -28,6 +81,96 @@ logger.info("数据库查询监控已启用")
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎与会话工厂（延迟创建，未使用异步接口时不需要安装异步驱动）
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+# SQLite 写引擎与会话工厂（其他数据库与读写共用同一引擎）
+_async_write_engine: Optional[AsyncEngine] = None
+_async_write_session_factory: Optional[async_sessionmaker] = None
+
+
+def create_async_db_engine(url: str = None, writer: bool = False) -> AsyncEngine:
+    """
+    创建异步数据库引擎（与同步引擎使用相同的连接池配置，并启用查询监控）
+
+    SQLite 文件数据库启用生产模式配置（WAL 等）；writer=True 时只保留一个写连接，
+    并发写请求在连接池中排队（最长等待 DB_WRITE_TIMEOUT 秒），依次执行，不再争用数据库写锁。
+
+    Args:
+        url: 异步数据库URL，None 使用 ASYNC_DATABASE_URL
+        writer: 是否为 SQLite 写引擎
+    """
+    url = url or ASYNC_DATABASE_URL
+    pool_options = get_pool_options(url)
+    if pool_options:
+        # aiosqlite 默认不使用连接池（NullPool），显式指定以复用连接并限制连接数
+        pool_options["poolclass"] = AsyncAdaptedQueuePool
+        if writer:
+            pool_options.update(pool_size=1, max_overflow=0, pool_timeout=float(os.getenv("DB_WRITE_TIMEOUT", "30")))
+    async_engine = create_async_engine(url, **pool_options)
+    if is_sqlite_file(url) and is_sqlite_profile_enabled():
+        setup_sqlite_profile(async_engine.sync_engine, writer=writer)
+    setup_sqlalchemy_monitoring(async_engine.sync_engine)
+    return async_engine
+
+
+def _create_session_factory(bind: AsyncEngine) -> async_sessionmaker:
+    """
+    创建异步会话工厂
+
+    expire_on_commit=False：提交后仍可读取对象属性（异步会话中不能隐式加载过期属性）
+    """
+    return async_sessionmaker(bind=bind, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """获取异步数据库引擎（单例，SQLite 时用于读取）"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+        logger.info(f"异步数据库引擎已创建: {_async_engine.url.render_as_string(hide_password=True)}")
+    return _async_engine
+
+
+def get_async_write_engine() -> AsyncEngine:
+    """获取异步写引擎：SQLite 文件数据库为单连接写引擎，其他数据库与 get_async_engine 相同"""
+    global _async_write_engine
+    if not is_sqlite_file(ASYNC_DATABASE_URL):
+        return get_async_engine()
+    if _async_write_engine is None:
+        _async_write_engine = create_async_db_engine(writer=True)
+        logger.info("SQLite 写引擎已创建（单连接，写请求排队执行）")
+    return _async_write_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """获取异步会话工厂"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = _create_session_factory(get_async_engine())
+    return _async_session_factory
+
+
+def get_async_write_session_factory() -> async_sessionmaker:
+    """获取异步写会话工厂"""
+    global _async_write_session_factory
+    if _async_write_session_factory is None:
+        _async_write_session_factory = _create_session_factory(get_async_write_engine())
+    return _async_write_session_factory
+
+
+async def dispose_async_engine() -> None:
+    """关闭异步引擎的连接池（应用关闭时调用）"""
+    global _async_engine, _async_session_factory, _async_write_engine, _async_write_session_factory
+    if _async_write_engine is not None:
+        await _async_write_engine.dispose()
+        _async_write_engine = None
+        _async_write_session_factory = None
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
 # 创建基类，所有模型都继承自此
 Base = declarative_base()
 
@@ -46,6 +189,25 @@ def get_db():
     finally:
         db.close()
 
+async def aget_db() -> AsyncIterator[AsyncSession]:
+    """
+    异步数据库会话依赖项（查询不阻塞事件循环）
+    使用方法：
+    @app.get("/items")
+    async def read_items(db: AsyncSession = Depends(aget_db)):
+        return (await db.execute(select(Item))).scalars().all()
+    """
+    async with get_async_session_factory()() as db:
+        yield db
+
+async def aget_write_db() -> AsyncIterator[AsyncSession]:
+    """
+    异步写会话依赖项（修改数据的路由使用）
+    SQLite 时所有写会话共用一个连接，按请求顺序排队执行；其他数据库与 aget_db 相同
+    """
+    async with get_async_write_session_factory()() as db:
+        yield db
+
 # 初始化数据库（创建所有表）
 def init_db():
     """
@@ -41,12 +41,49 @@ async def root():
         "status": "running"
     }
 
+@app.on_event("startup")
+async def recover_generation_jobs():
+    """恢复上次进程退出时中断的文档生成任务"""
+    from app.services.job_queue import get_job_queue
+    get_job_queue().recover()
+
+@app.on_event("startup")
+async def warm_up_templates():
+    """预加载全部文档模板（优先读取共享字节码缓存），避免首个生成请求承担模板编译耗时"""
+    from app.services.document_generator import document_generator
+    from fastapi.concurrency import run_in_threadpool
+    await run_in_threadpool(document_generator.warm_up_templates)
+
+@app.on_event("shutdown")
+async def close_ai_clients():
+    """关闭 AI 服务的长连接客户端"""
+    from app.services.ai_service import get_ai_service
+    await get_ai_service().aclose()
+
+@app.on_event("shutdown")
+async def close_async_database():
+    """关闭异步数据库引擎的连接池"""
+    from app.database import dispose_async_engine
+    await dispose_async_engine()
+
+@app.on_event("shutdown")
+async def close_llm_router():
+    """关闭 LLM 路由各供应商的连接"""
+    from app.services.llm_router import get_llm_router
+    await get_llm_router().aclose()
+
+@app.on_event("shutdown")
+async def stop_generation_jobs():
+    """停止文档生成任务工作线程（未开始的任务在下次启动时恢复）"""
+    from app.services.job_queue import get_job_queue
+    get_job_queue().shutdown()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 # 引入路由模块
-from app.routes import auth, projects, documents, comments, ai_generate, performance, error_monitoring, admin, enterprise, debug, templates, document_generation, docs
+from app.routes import auth, projects, documents, comments, ai_generate, performance, error_monitoring, admin, enterprise, debug, templates, document_generation, docs, jobs, search
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(projects.router, prefix="/api")
@@ -60,6 +97,8 @@ app.include_router(enterprise.router, prefix="/api")
 app.include_router(debug.router, prefix="/api")
 app.include_router(templates.router, prefix="/api")
 app.include_router(document_generation.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 app.include_router(docs.router)
 
 # 导出路由（需要安装 reportlab, python-docx, beautifulsoup4）
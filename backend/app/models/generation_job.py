@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+class GenerationJob(Base):
+    """文档生成后台任务数据模型"""
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    enterprise_id = Column(Integer, nullable=True, index=True)  # 企业ID（直接提交企业数据时为空）
+    job_type = Column(String(50), nullable=False)  # enterprise_docs, docs_all
+    idempotency_key = Column(String(64), nullable=False, unique=True)  # 任务类型 + 用户 + 企业ID + 数据哈希
+    data_hash = Column(String(64), nullable=False)  # 企业数据哈希
+    status = Column(String(20), default="pending", nullable=False, index=True)  # pending, running, succeeded, failed
+    payload = Column(JSON, nullable=True)  # 任务输入（用于重启后恢复执行）
+    progress = Column(JSON, nullable=True)  # 进度：{"stage", "total", "completed", "sections": {section_key: status}}
+    result = Column(JSON, nullable=True)  # 任务结果
+    error = Column(Text, nullable=True)  # 失败原因
+    attempts = Column(Integer, default=0, nullable=False)  # 执行次数
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 复合索引定义
+    __table_args__ = (
+        Index('idx_job_user_created', 'user_id', 'created_at'),  # 用于用户任务按时间排序
+        Index('idx_job_status_updated', 'status', 'updated_at'),  # 用于恢复中断的任务
+    )
+
+    def __repr__(self):
+        return f"<GenerationJob {self.id} {self.status}>"
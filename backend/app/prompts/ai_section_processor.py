@@ -3,59 +3,154 @@ AI Section处理器
 负责处理AI Section的模板渲染和LLM调用
 """
 
-import json
 import logging
 import re
-from typing import Dict, List, Optional, Any, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any, Tuple
+import asyncio
 import time
 import uuid
+from functools import lru_cache
+
+from ..services.single_flight import llm_call_flight, make_flight_key
+from ..services.llm_router import get_llm_router
+from .prompt_compactor import COMPACTION_LEVELS, compact_json, truncate_text
 
 logger = logging.getLogger(__name__)
 
-def render_user_template(template_str: str, enterprise_data: dict) -> str:
+# user_template 中的 {xxx.yyy} 占位符
+PLACEHOLDER_PATTERN = re.compile(r'\{([^}]+)\}')
+
+# 企业数据中缺少占位符对应的值时的替换内容
+MISSING_VALUE_TEXT = "（企业未提供相关信息）"
+
+
+class CompiledTemplate:
+    """
+    预编译的 user_template
+
+    模板按占位符切分为片段列表：偶数位置为原文，奇数位置为拆分好的数据路径。
+    渲染时逐个取值后一次 join，不再每次执行正则匹配与逐个 str.replace。
+    """
+
+    __slots__ = ("source", "segments", "variables")
+
+    def __init__(self, template_str: str):
+        self.source = template_str
+        parts = PLACEHOLDER_PATTERN.split(template_str)
+        self.segments: Tuple[Any, ...] = tuple(
+            part if index % 2 == 0 else tuple(part.split('.'))
+            for index, part in enumerate(parts)
+        )
+        # 去重后的占位符路径（保持出现顺序）
+        self.variables: Tuple[str, ...] = tuple(dict.fromkeys(parts[1::2]))
+
+    def render(self, enterprise_data: dict, value_cache: Optional[Dict[Tuple[str, ...], str]] = None,
+               level: int = 0) -> str:
+        """
+        使用企业数据渲染模板
+
+        Args:
+            enterprise_data: 企业数据字典
+            value_cache: 已格式化的占位符值；同一份企业数据渲染多个段落时传入同一个字典，
+                         各段落共用的路径（如危险化学品列表）只格式化一次（须与 level 对应）
+            level: 压缩级别（见 prompt_compactor.COMPACTION_LEVELS）
+
+        Returns:
+            渲染后的字符串
+        """
+        segments = self.segments
+        output = list(segments)
+        # 同一占位符出现多次时只取值、格式化一次
+        rendered = value_cache if value_cache is not None else {}
+        for index in range(1, len(segments), 2):
+            keys = segments[index]
+            value_str = rendered.get(keys)
+            if value_str is None:
+                value_str = rendered[keys] = _format_value(_get_value_by_keys(enterprise_data, keys), level)
+            output[index] = value_str
+        return "".join(output)
+
+
+@lru_cache(maxsize=256)
+def compile_user_template(template_str: str) -> CompiledTemplate:
+    """
+    编译 user_template（按模板内容缓存编译结果）
+
+    Args:
+        template_str: 包含占位符的模板字符串
+
+    Returns:
+        编译后的模板
+    """
+    return CompiledTemplate(template_str)
+
+
+def _get_value_by_keys(data: Any, keys: Tuple[str, ...]) -> Any:
+    """按拆分好的路径取值，找不到返回 None"""
+    current = data
+    for key in keys:
+        if isinstance(current, dict) and key in current:
+            current = current[key]
+        else:
+            return None
+    return current
+
+
+def _format_value(value: Any, level: int = 0) -> str:
+    """将占位符的值转换为提示词文本（字典输出紧凑 JSON，压缩级别越高保留的内容越少）"""
+    if value is None:
+        # 值不存在，替换为默认提示
+        return MISSING_VALUE_TEXT
+    if isinstance(value, list):
+        # 列表类型，转换为摘要字符串
+        return summarize_list(value, level)
+    if isinstance(value, dict):
+        # 字典类型，转换为紧凑JSON字符串
+        return compact_json(value, level)
+    # 其他类型，直接转换为字符串
+    return truncate_text(str(value), level)
+
+
+def render_compiled_template(compiled: CompiledTemplate, enterprise_data: dict,
+                             value_cache: Optional[Dict[Tuple[str, ...], str]] = None,
+                             level: int = 0) -> str:
+    """
+    渲染预编译的模板（失败时返回原始模板）
+
+    Args:
+        compiled: 编译后的模板
+        enterprise_data: 企业数据字典
+        value_cache: 同一份企业数据共用的已格式化占位符值
+        level: 压缩级别
+
+    Returns:
+        渲染后的字符串
+    """
+    try:
+        return compiled.render(enterprise_data, value_cache, level)
+    except Exception as e:
+        logger.error(f"渲染用户模板失败: {str(e)}")
+        return compiled.source  # 返回原始模板
+
+
+def render_user_template(template_str: str, enterprise_data: dict, level: int = 0) -> str:
     """
     将user_template中的{xxx.yyy}占位符替换为enterprise_data中的实际值
     
     Args:
         template_str: 包含占位符的模板字符串
         enterprise_data: 企业数据字典
+        level: 压缩级别
         
     Returns:
         渲染后的字符串
     """
     try:
-        # 使用正则表达式查找所有占位符
-        pattern = r'\{([^}]+)\}'
-        placeholders = re.findall(pattern, template_str)
-        
-        rendered_str = template_str
-        
-        # 替换每个占位符
-        for placeholder in placeholders:
-            value = get_value_by_path(enterprise_data, placeholder)
-            if value is not None:
-                # 处理不同类型的值
-                if isinstance(value, list):
-                    # 列表类型，转换为字符串
-                    value_str = summarize_list(value)
-                elif isinstance(value, dict):
-                    # 字典类型，转换为JSON字符串
-                    value_str = json.dumps(value, ensure_ascii=False)
-                else:
-                    # 其他类型，直接转换为字符串
-                    value_str = str(value)
-                
-                # 替换占位符
-                rendered_str = rendered_str.replace(f'{{{placeholder}}}', value_str)
-            else:
-                # 值不存在，替换为空字符串或默认提示
-                rendered_str = rendered_str.replace(f'{{{placeholder}}}', "（企业未提供相关信息）")
-        
-        return rendered_str
-        
+        compiled = compile_user_template(template_str)
     except Exception as e:
-        logger.error(f"渲染用户模板失败: {str(e)}")
+        logger.error(f"编译用户模板失败: {str(e)}")
         return template_str  # 返回原始模板
+    return render_compiled_template(compiled, enterprise_data, level=level)
 
 def get_value_by_path(data: dict, path: str) -> Any:
     """
@@ -84,12 +179,22 @@ def get_value_by_path(data: dict, path: str) -> Any:
         logger.error(f"获取路径值失败: {path}, 错误: {str(e)}")
         return None
 
-def summarize_list(value: List[Any]) -> str:
+def _summarize_item(item: Any, level: int = 0) -> str:
+    """列表项的摘要：字典取名称字段（name、product_name、chemical_name 或其他 *_name），没有名称时输出紧凑JSON"""
+    if isinstance(item, dict):
+        name = item.get('name', '') or item.get('product_name', '') or item.get('chemical_name', '')
+        if not name:
+            name = next((value for key, value in item.items() if key.endswith('_name') and value), '')
+        return truncate_text(str(name), level) if name else compact_json(item, level)
+    return truncate_text(str(item), level)
+
+def summarize_list(value: List[Any], level: int = 0) -> str:
     """
     将列表转换为摘要字符串
     
     Args:
         value: 列表值
+        level: 压缩级别（最高级别只列出第一项）
         
     Returns:
         摘要字符串
@@ -98,28 +203,12 @@ def summarize_list(value: List[Any]) -> str:
         if not value:
             return "无"
         
-        if len(value) <= 3:
-            # 如果列表项不多，全部列出
-            items = []
-            for item in value:
-                if isinstance(item, dict):
-                    # 如果是字典，尝试获取name字段
-                    name = item.get('name', '') or item.get('product_name', '') or item.get('chemical_name', '') or str(item)
-                    items.append(name)
-                else:
-                    items.append(str(item))
+        # 列表项不多时全部列出，较多时只显示前几项并注明总数
+        limit = min(3, COMPACTION_LEVELS[level]["max_items"])
+        items = [_summarize_item(item, level) for item in value[:limit]]
+        if len(value) <= limit:
             return "、".join(items)
-        else:
-            # 如果列表项较多，只显示前几项
-            items = []
-            for i, item in enumerate(value[:3]):
-                if isinstance(item, dict):
-                    name = item.get('name', '') or item.get('product_name', '') or item.get('chemical_name', '') or str(item)
-                    items.append(name)
-                else:
-                    items.append(str(item))
-            
-            return f"{'、'.join(items)}等{len(value)}项"
+        return f"{'、'.join(items)}等{len(value)}项"
             
     except Exception as e:
         logger.error(f"列表摘要生成失败: {str(e)}")
@@ -127,7 +216,9 @@ def summarize_list(value: List[Any]) -> str:
 
 def call_llm(model: str, system: str, user: str, user_id: Optional[str] = None) -> str:
     """
-    调用大语言模型生成内容（Mock实现）
+    调用大语言模型生成内容
+    
+    模型已配置LLM供应商时通过 LLM 路由调用（失败时切换供应商），否则使用Mock实现
     
     Args:
         model: 模型名称
@@ -138,13 +229,25 @@ def call_llm(model: str, system: str, user: str, user_id: Optional[str] = None)
     Returns:
         生成的文本内容
     """
+    # 相同模型与提示词的并发调用（如多个用户同时生成同一企业的文档）只执行一次
+    key = make_flight_key(model, system, user)
+    return llm_call_flight.do(key, lambda: _call_llm_once(model, system, user, user_id))
+
+def _call_llm_once(model: str, system: str, user: str, user_id: Optional[str] = None) -> str:
+    """执行一次大语言模型调用"""
     try:
         # 记录调用信息
         call_id = str(uuid.uuid4())
         logger.info(f"LLM调用开始 - ID: {call_id}, 模型: {model}, 用户ID: {user_id}")
         
+        router = get_llm_router()
+        if router.has_provider(model):
+            # 全部供应商失败时抛出 LLMRouterError，返回失败标记而不是模拟内容
+            content = router.complete(model, system, user)
+            logger.info(f"LLM调用完成 - ID: {call_id}, 生成长度: {len(content)}")
+            return content
+        
         # Mock实现 - 模拟AI生成内容
-        # 在实际应用中，这里应该调用真实的AI服务
         mock_content = generate_mock_content(system, user)
         
         # 模拟处理时间
@@ -158,6 +261,43 @@ def call_llm(model: str, system: str, user: str, user_id: Optional[str] = None)
         logger.error(f"LLM调用失败: {str(e)}")
         return f"[AI生成失败] {str(e)}"
 
+async def astream_llm(model: str, system: str, user: str, user_id: Optional[str] = None, chunk_size: int = 16) -> AsyncIterator[str]:
+    """
+    流式调用大语言模型生成内容（与 call_llm 对应，未配置LLM供应商的模型使用Mock实现）
+    
+    Args:
+        model: 模型名称
+        system: 系统提示词
+        user: 用户提示词
+        user_id: 用户ID（用于使用量统计）
+        chunk_size: 每个片段的字符数
+        
+    Yields:
+        生成的文本片段
+    """
+    call_id = str(uuid.uuid4())
+    logger.info(f"LLM流式调用开始 - ID: {call_id}, 模型: {model}, 用户ID: {user_id}")
+    
+    router = get_llm_router()
+    if router.has_provider(model):
+        length = 0
+        async for chunk in router.astream(model, system, user):
+            length += len(chunk)
+            yield chunk
+        logger.info(f"LLM流式调用完成 - ID: {call_id}, 生成长度: {length}")
+        return
+    
+    # Mock实现 - 将模拟内容按片段逐步返回，总耗时与 call_llm 相同
+    mock_content = generate_mock_content(system, user)
+    chunks = [mock_content[i:i + chunk_size] for i in range(0, len(mock_content), chunk_size)]
+    delay = 0.5 / max(len(chunks), 1)
+    
+    for chunk in chunks:
+        await asyncio.sleep(delay)
+        yield chunk
+    
+    logger.info(f"LLM流式调用完成 - ID: {call_id}, 生成长度: {len(mock_content)}")
+
 def generate_mock_content(system: str, user: str) -> str:
     """
     生成Mock内容
@@ -169,6 +309,15 @@ def generate_mock_content(system: str, user: str) -> str:
     Returns:
         Mock生成的内容
     """
+    # 合规修订补丁：问题句直接删去（不给出改写），缺少的内容各用第一个关键词补一句
+    # （补丁提示词中含有段落原文，需先于按段落关键词的分支判断）
+    if "合规修订" in system:
+        keywords = [line.rsplit("：", 1)[1].split("、")[0] for line in user.splitlines()
+                    if line.startswith("- ") and "：" in line]
+        if not keywords:
+            return ""
+        return "[补充] 本段内容同时涉及" + "、".join(keywords) + "等方面的要求。"
+    
     # 根据系统提示词和用户提示词生成mock内容
     if "企业概况" in system or "企业概况" in user:
         return "该企业成立于2005年，是一家专业从事化工产品生产的企业。公司占地面积约50亩，建筑面积约20000平方米，总投资约5000万元，其中环保投资约500万元。主要产品包括有机溶剂、化工中间体等，年产量约10000吨。企业实行三班制生产，每班8小时，全年生产时间约330天。"
@@ -243,6 +392,18 @@ def generate_mock_content(system: str, user: str) -> str:
         # 默认mock内容
         return f"根据提供的信息，该企业在相关方面表现良好，符合相关法规要求。建议继续加强管理，持续改进，确保环境安全。"
 
+def collapse_blank_lines(content: str) -> str:
+    """
+    将多个连续空行替换为单个空行
+    
+    Args:
+        content: 文本内容
+        
+    Returns:
+        处理后的内容
+    """
+    return re.sub(r'\n\s*\n\s*\n', '\n\n', content)
+
 def postprocess_ai_output(content: str) -> str:
     """
     后处理AI输出内容
@@ -258,7 +419,7 @@ def postprocess_ai_output(content: str) -> str:
         content = content.strip()
         
         # 替换多个连续空行为单个空行
-        content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)
+        content = collapse_blank_lines(content)
         
         # 确保标点符号后有空格（中文不需要）
         # content = re.sub(r'([。！？；])([^\s])', r'\1\2', content)
@@ -267,4 +428,121 @@ def postprocess_ai_output(content: str) -> str:
         
     except Exception as e:
         logger.error(f"后处理AI输出失败: {str(e)}")
-        return content
\ No newline at end of file
+        return content
+
+
+class IncrementalOutputProcessor:
+    """
+    流式AI输出的增量后处理器
+    
+    对逐段到达的文本应用与整段处理相同的清理规则（如 collapse_blank_lines、
+    TemplateValidator.sanitize_fragment）。尚未闭合的标签、可能构成事件处理器的尾部
+    以及末尾空白会被暂存，直到后续内容到达后再判断，保证所有输出片段拼接后
+    与对完整文本执行 strip + 清理的结果一致。
+    """
+    
+    # 未闭合的 <script>/<iframe> 块
+    _OPEN_BLOCK_PATTERN = re.compile(r'<(script|iframe)\b', re.IGNORECASE)
+    # 可能是事件处理器（on\w+\s*=\s*"..."）前缀的尾部
+    _HANDLER_PREFIX_PATTERN = re.compile(
+        r'o(?:n(?:\w+(?:\s*(?:=\s*(?:["\'][^"\']*)?)?)?)?)?$',
+        re.IGNORECASE
+    )
+    
+    def __init__(self, processors: Optional[List[Callable[[str], str]]] = None):
+        """
+        初始化增量处理器
+        
+        Args:
+            processors: 按顺序应用于每个稳定片段的处理函数，处理函数不应去除首尾空白
+        """
+        self.processors = processors or []
+        self._pending = ""
+        self._trailing_space = ""
+        self._emitted = False
+        self._parts: List[str] = []
+    
+    def _stable_length(self, text: str) -> int:
+        """计算可以安全输出的前缀长度"""
+        hold = len(text)
+        
+        # 未闭合的标签
+        last_open = text.rfind('<')
+        if last_open != -1 and text.find('>', last_open) == -1:
+            hold = min(hold, last_open)
+        
+        # 未闭合的 script/iframe 块
+        for match in self._OPEN_BLOCK_PATTERN.finditer(text):
+            closing = re.search(rf'</{match.group(1)}>', text[match.end():], re.IGNORECASE)
+            if closing is None:
+                hold = min(hold, match.start())
+                break
+        
+        # 可能的事件处理器前缀
+        handler_match = self._HANDLER_PREFIX_PATTERN.search(text[:hold])
+        if handler_match:
+            hold = handler_match.start()
+        
+        # 末尾空白（可能属于连续空行或需要在结尾去除）
+        while hold > 0 and text[hold - 1].isspace():
+            hold -= 1
+        
+        return hold
+    
+    def _apply(self, text: str) -> str:
+        """对稳定片段应用所有处理函数"""
+        for processor in self.processors:
+            text = processor(text)
+        return text
+    
+    def _emit(self, output: str) -> str:
+        """输出已处理文本，开头空白直接丢弃，末尾空白暂存到下一次有内容的输出"""
+        if not self._emitted:
+            output = output.lstrip()
+        body = output.rstrip()
+        if not body:
+            if self._emitted:
+                self._trailing_space += output
+            return ""
+        
+        output, self._trailing_space = self._trailing_space + body, output[len(body):]
+        self._emitted = True
+        self._parts.append(output)
+        return output
+    
+    def feed(self, chunk: str) -> str:
+        """
+        输入新到达的文本片段
+        
+        Args:
+            chunk: 新到达的文本
+            
+        Returns:
+            可以立即输出的已处理文本（可能为空字符串）
+        """
+        if not chunk:
+            return ""
+        
+        self._pending += chunk
+        stable = self._stable_length(self._pending)
+        if stable == 0:
+            return ""
+        
+        ready, self._pending = self._pending[:stable], self._pending[stable:]
+        return self._emit(self._apply(ready))
+    
+    def flush(self) -> str:
+        """
+        结束输入，输出剩余内容（末尾空白被丢弃）
+        
+        Returns:
+            剩余的已处理文本
+        """
+        remaining, self._pending = self._pending, ""
+        output = self._emit(self._apply(remaining)) if remaining else ""
+        self._trailing_space = ""
+        return output
+    
+    def get_text(self) -> str:
+        """获取目前已输出的完整文本"""
+        return "".join(self._parts)
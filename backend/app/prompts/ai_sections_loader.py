@@ -7,7 +7,7 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
-import re
+from .ai_section_processor import CompiledTemplate, compile_user_template
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,9 @@ class AISectionsLoader:
         
         self._sections_config: Optional[Dict[str, Any]] = None
         self._last_modified: Optional[float] = None
+        # 预编译的 user_template 与段落依赖的数据路径（随配置文件 mtime 一同失效）
+        self._compiled_templates: Dict[str, CompiledTemplate] = {}
+        self._section_dependencies: Dict[str, frozenset] = {}
         
         logger.info(f"AI Section配置加载器初始化完成，配置文件路径: {self.config_path}")
     
@@ -64,7 +67,16 @@ class AISectionsLoader:
                 logger.error(f"配置文件格式验证失败: {errors}")
                 return {}
             
-            # 缓存配置
+            # 缓存配置，并预编译各 section 的 user_template
+            self._compiled_templates = {
+                section_key: compile_user_template(section_config.get("user_template", ""))
+                for section_key, section_config in config["sections"].items()
+            }
+            self._section_dependencies = {
+                section_key: frozenset(self._compiled_templates[section_key].variables)
+                | frozenset(section_config.get("fields", []))
+                for section_key, section_config in config["sections"].items()
+            }
             self._sections_config = config
             self._last_modified = current_modified
             
@@ -223,6 +235,38 @@ class AISectionsLoader:
         
         return document_sections
     
+    def get_compiled_templates(self) -> Dict[str, CompiledTemplate]:
+        """
+        获取所有section预编译的user_template（配置文件修改后自动重新编译）
+        
+        Returns:
+            section键名到编译后模板的映射
+        """
+        self.load_config()
+        return self._compiled_templates
+    
+    def get_compiled_template(self, section_key: str) -> Optional[CompiledTemplate]:
+        """
+        获取指定section预编译的user_template
+        
+        Args:
+            section_key: section键名
+            
+        Returns:
+            编译后的模板，如果不存在返回None
+        """
+        return self.get_compiled_templates().get(section_key)
+    
+    def get_section_dependencies(self) -> Dict[str, frozenset]:
+        """
+        获取各section依赖的企业数据路径（user_template 中的占位符与 fields 声明的字段）
+        
+        Returns:
+            section键名到数据路径集合的映射
+        """
+        self.load_config()
+        return self._section_dependencies
+    
     def get_section_keys(self) -> List[str]:
         """
         获取所有section键名
@@ -269,10 +313,8 @@ class AISectionsLoader:
         Returns:
             变量名列表
         """
-        # 使用正则表达式提取 {variable} 格式的变量
-        pattern = r'\{([^}]+)\}'
-        variables = re.findall(pattern, template_str)
-        return list(set(variables))  # 去重
+        # 编译结果中已记录去重后的 {variable} 变量
+        return list(compile_user_template(template_str).variables)
     
     def validate_template_variables(self, section_key: str, enterprise_data: Dict[str, Any]) -> Tuple[bool, List[str]]:
         """
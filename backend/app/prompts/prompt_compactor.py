@@ -0,0 +1,229 @@
+"""
+提示词压缩
+按段落声明的数据路径投影企业数据、以紧凑 JSON 输出（去掉空值与缩进）、对长列表做摘要，
+并按模型的 token 预算逐级压缩，超出预算时截断用户提示词
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from ..utils.text_stats import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 压缩级别：列表最多保留的项数、字符串最多保留的字符数（None 表示不限制）
+# 0 级为默认输出，超出 token 预算时依次尝试更高级别
+COMPACTION_LEVELS: Tuple[Dict[str, Optional[int]], ...] = (
+    {"max_items": 10, "max_chars": None},
+    {"max_items": 5, "max_chars": 200},
+    {"max_items": 3, "max_chars": 80},
+    {"max_items": 1, "max_chars": 30},
+)
+
+# 各模型提示词（system + user）的 token 预算：上下文长度减去生成内容预留的 max_tokens
+MODEL_TOKEN_BUDGETS: Dict[str, int] = {
+    "xunfei_spark_v4": 6000,
+    "gpt-4": 6000,
+    "gpt-3.5-turbo": 2000,
+}
+DEFAULT_TOKEN_BUDGET = 6000
+
+# 截断提示词时追加的说明
+TRUNCATED_TEXT = "\n（企业数据过长，以下内容已省略）"
+
+
+def get_token_budget(model: str) -> int:
+    """
+    获取模型的提示词 token 预算（AI_PROMPT_TOKEN_BUDGET 配置时统一使用该值）
+
+    Args:
+        model: 模型名称
+
+    Returns:
+        token 预算
+    """
+    configured = os.getenv("AI_PROMPT_TOKEN_BUDGET")
+    if configured:
+        return int(configured)
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, tuple, dict)) and not value)
+
+
+def compact_value(value: Any, max_items: Optional[int] = None, max_chars: Optional[int] = None) -> Any:
+    """
+    压缩数据：去掉空值，长列表只保留前 max_items 项并注明总数，长字符串截断
+
+    Args:
+        value: 企业数据中的值
+        max_items: 列表最多保留的项数
+        max_chars: 字符串最多保留的字符数
+
+    Returns:
+        压缩后的值
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item = compact_value(item, max_items, max_chars)
+            if not _is_empty(item):
+                result[key] = item
+        return result
+    if isinstance(value, (list, tuple)):
+        kept = value if max_items is None else value[:max_items]
+        items = [item for item in (compact_value(item, max_items, max_chars) for item in kept) if not _is_empty(item)]
+        if len(value) > len(kept):
+            items.append(f"等{len(value)}项")
+        return items
+    if isinstance(value, str) and max_chars is not None and len(value) > max_chars:
+        return value[:max_chars] + "…"
+    return value
+
+
+def compact_json(value: Any, level: int = 0) -> str:
+    """
+    按压缩级别输出紧凑 JSON（无缩进、无多余空格）
+
+    Args:
+        value: 企业数据中的值
+        level: 压缩级别（COMPACTION_LEVELS 的下标）
+
+    Returns:
+        JSON 字符串
+    """
+    return json.dumps(compact_value(value, **COMPACTION_LEVELS[level]), ensure_ascii=False, separators=(",", ":"))
+
+
+def truncate_text(value: str, level: int = 0) -> str:
+    """按压缩级别截断长字符串"""
+    max_chars = COMPACTION_LEVELS[level]["max_chars"]
+    if max_chars is not None and len(value) > max_chars:
+        return value[:max_chars] + "…"
+    return value
+
+
+def project_fields(data: Any, paths: Iterable[str]) -> Dict[str, Any]:
+    """
+    按数据路径投影：只保留 paths 中声明的字段，保持原有的嵌套结构
+
+    Args:
+        data: 企业数据
+        paths: 数据路径，如 "basic_info.address"
+
+    Returns:
+        投影后的数据（路径不存在时跳过）
+    """
+    projected: Dict[str, Any] = {}
+    kept: set = set()
+    # 先处理较短的路径；上级路径已整体保留时跳过其下级路径
+    for path in sorted(set(paths), key=lambda item: item.count(".")):
+        keys = path.split(".")
+        if any(".".join(keys[:depth]) in kept for depth in range(1, len(keys))):
+            continue
+        current = data
+        for key in keys:
+            if not (isinstance(current, dict) and key in current):
+                break
+            current = current[key]
+        else:
+            target = projected
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = current
+            kept.add(path)
+    return projected
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    将文本截断到 max_tokens 以内（按行保留，保留的部分后追加省略说明）
+
+    Args:
+        text: 文本
+        max_tokens: 最多保留的 token 数
+
+    Returns:
+        截断后的文本
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(TRUNCATED_TEXT)
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept) + TRUNCATED_TEXT
+
+
+def fit_prompt(render: Callable[[int], str], budget: int, reserved_tokens: int = 0) -> Dict[str, Any]:
+    """
+    在 token 预算内渲染提示词：从 0 级开始逐级提高压缩级别，最高级别仍超出时截断
+
+    Args:
+        render: 按压缩级别渲染提示词的函数
+        budget: 提示词 token 预算
+        reserved_tokens: 预算中已被其他部分（如 system prompt）占用的 token 数
+
+    Returns:
+        {"prompt", "tokens", "level", "truncated"}
+    """
+    available = max(budget - reserved_tokens, 0)
+    for level in range(len(COMPACTION_LEVELS)):
+        prompt = render(level)
+        tokens = estimate_tokens(prompt)
+        if tokens <= available:
+            return {"prompt": prompt, "tokens": tokens, "level": level, "truncated": False}
+
+    logger.warning(f"提示词在最高压缩级别下仍超出预算: {tokens} > {available} tokens，已截断")
+    prompt = truncate_to_tokens(prompt, available)
+    return {"prompt": prompt, "tokens": estimate_tokens(prompt), "level": level, "truncated": True}
+
+
+class PromptBudgetStats:
+    """
+    提示词 token 统计（线程安全）
+
+    按段落累计渲染次数、用户提示词 token 数、需要提高压缩级别与被截断的次数。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections: Dict[str, Dict[str, int]] = {}
+
+    def record(self, section_key: str, tokens: int, level: int, truncated: bool) -> None:
+        """记录一次提示词渲染"""
+        with self._lock:
+            stats = self._sections.setdefault(section_key, {
+                "renders": 0, "tokens": 0, "max_tokens": 0, "compacted": 0, "truncated": 0
+            })
+            stats["renders"] += 1
+            stats["tokens"] += tokens
+            stats["max_tokens"] = max(stats["max_tokens"], tokens)
+            stats["compacted"] += int(level > 0)
+            stats["truncated"] += int(truncated)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各段落的统计（含平均 token 数）"""
+        with self._lock:
+            return {
+                section_key: dict(stats, avg_tokens=round(stats["tokens"] / stats["renders"], 1))
+                for section_key, stats in self._sections.items()
+            }
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._sections.clear()
+
+
+# 全局实例
+prompt_budget_stats = PromptBudgetStats()
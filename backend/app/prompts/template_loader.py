@@ -8,11 +8,11 @@ import os
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 import yaml
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from jinja2.sandbox import SandboxedEnvironment
 from jinja2.exceptions import TemplateNotFound, TemplateSyntaxError
 import logging
 
+from ..utils.jinja_cache import create_template_environment
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,13 +39,8 @@ class TemplateLoader:
         # 加载注册表
         self.registry = self._load_registry()
 
-        # 初始化 Jinja2 环境（使用沙箱模式）
-        self.jinja_env = SandboxedEnvironment(
-            loader=FileSystemLoader(str(self.templates_dir)),
-            autoescape=select_autoescape(['html', 'xml']),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
+        # 初始化 Jinja2 环境（使用沙箱模式，与其他环境共用字节码缓存）
+        self.jinja_env = create_template_environment(self.templates_dir)
 
         # 添加自定义过滤器
         self.jinja_env.filters['tojson'] = self._tojson_filter
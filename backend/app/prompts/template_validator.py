@@ -180,15 +180,15 @@ class TemplateValidator:
 
         return False, f"章节 ID '{section_id}' 不存在于模板中"
 
-    def sanitize_output(self, text: str) -> str:
+    def sanitize_fragment(self, text: str) -> str:
         """
-        清理输出文本
+        清理输出片段（不去除首尾空白，可用于流式输出的分段清理）
 
         Args:
-            text: 原始文本
+            text: 原始文本片段
 
         Returns:
-            清理后的文本
+            清理后的文本片段
         """
         if not text:
             return ""
@@ -202,7 +202,22 @@ class TemplateValidator:
         # 移除潜在的事件处理器
         text = re.sub(r'\s*on\w+\s*=\s*["\'][^"\']*["\']', '', text, flags=re.IGNORECASE)
 
-        return text.strip()
+        return text
+
+    def sanitize_output(self, text: str) -> str:
+        """
+        清理输出文本
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            清理后的文本
+        """
+        if not text:
+            return ""
+
+        return self.sanitize_fragment(text).strip()
 
     def validate_rate_limit(
         self,
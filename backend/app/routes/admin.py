@@ -5,7 +5,7 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, case, func, select
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field, EmailStr
 import logging
@@ -420,27 +420,37 @@ async def get_user_stats(
         用户统计信息
     """
     try:
-        # 总用户数
-        total_users = db.query(User).count()
-        
-        # 活跃用户数
-        active_users = db.query(User).filter(User.is_active == True).count()
-        
-        # 已验证用户数
-        verified_users = db.query(User).filter(User.is_verified == True).count()
-        
-        # 管理员用户数
-        admin_users = db.query(User).filter(User.role == UserRole.ADMIN).count()
-        
-        # 版主用户数
-        moderator_users = db.query(User).filter(User.role == UserRole.MODERATOR).count()
-        
-        # 普通用户数
-        regular_users = db.query(User).filter(User.role == UserRole.USER).count()
-        
-        # 本月新用户数
+        # 一条聚合查询统计全部指标（有角色字段时按角色分组）
         current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_users_this_month = db.query(User).filter(User.created_at >= current_month_start).count()
+        role_column = getattr(User, "role", None)
+        aggregates = [
+            func.count(User.id),
+            func.sum(case((User.is_active == True, 1), else_=0)),
+            func.sum(case((User.is_verified == True, 1), else_=0)),
+            func.sum(case((User.created_at >= current_month_start, 1), else_=0))
+        ]
+        if role_column is not None:
+            rows = db.execute(select(role_column, *aggregates).group_by(role_column)).all()
+        else:
+            # role 字段暂时注释，所有用户按普通用户统计（与 User.is_admin 一致）
+            rows = [(UserRole.USER, *db.execute(select(*aggregates)).one())]
+        
+        role_counts: Dict[Any, int] = {}
+        total_users = active_users = verified_users = new_users_this_month = 0
+        for role, count, active, verified, new_users in rows:
+            role_counts[role] = role_counts.get(role, 0) + count
+            total_users += count
+            active_users += active or 0
+            verified_users += verified or 0
+            new_users_this_month += new_users or 0
+        
+        # 角色字段可能存储枚举或字符串
+        def role_count(role: UserRole) -> int:
+            return role_counts.get(role, 0) + role_counts.get(role.value, 0)
+        
+        admin_users = role_count(UserRole.ADMIN)
+        moderator_users = role_count(UserRole.MODERATOR)
+        regular_users = role_count(UserRole.USER)
         
         stats = UserStats(
             total_users=total_users,
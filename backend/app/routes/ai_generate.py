@@ -19,6 +19,9 @@ from ..prompts.template_loader import TemplateLoader
 from ..prompts.template_validator import TemplateValidator
 from ..services.cache_service import get_cache_service
 from ..services.ai_service import get_ai_service
+from ..services.single_flight import acoalesce_across_workers, ai_generation_flight, llm_call_flight
+from ..prompts.ai_section_processor import IncrementalOutputProcessor
+from ..utils.sse import format_sse_event, sse_response
 
 logger = logging.getLogger(__name__)
 
@@ -175,6 +178,82 @@ async def get_template_schema(
         )
 
 
+def _prepare_generation(request: GenerationRequest) -> Dict[str, Any]:
+    """
+    校验生成请求并准备生成上下文（普通生成与流式生成共用）
+
+    Args:
+        request: 生成请求
+
+    Returns:
+        生成上下文；校验失败时包含 error 字段，命中缓存时包含 cached_content 字段
+    """
+    # 1. 验证输入数据
+    template_info = template_loader.get_template_info(request.template_id)
+    if not template_info:
+        return {"error": f"模板 '{request.template_id}' 不存在或未启用"}
+
+    # 获取必填字段
+    required_fields = template_info.get("required_fields", [])
+    is_valid, errors = validator.validate_template_data(request.data, required_fields)
+    if not is_valid:
+        return {"error": f"数据验证失败: {'; '.join(errors)}"}
+
+    # 2. 验证章节 ID
+    template_schema = template_loader.load_template_schema(request.template_id)
+    is_valid_section, section_error = validator.validate_section_id(
+        request.section_id,
+        template_schema
+    )
+    if not is_valid_section:
+        return {"error": section_error}
+
+    # 获取章节标题
+    section_title = None
+    for section in template_schema.get("sections", []):
+        if section["id"] == request.section_id:
+            section_title = section["title"]
+            break
+
+    context = {
+        "section_title": section_title,
+        "cache_key": None,
+        "cache_ttl": None,
+        "cached_content": None
+    }
+
+    # 3. 检查缓存
+    cache_config = template_loader.get_cache_config(request.template_id)
+    if cache_config.get("enabled", False):
+        context["cache_key"] = _generate_cache_key(
+            request.template_id,
+            request.section_id,
+            request.data
+        )
+        context["cache_ttl"] = cache_config.get("ttl", 3600)
+
+        # 使用新的缓存服务
+        cached_item = cache_service.get(context["cache_key"])
+        if cached_item:
+            logger.info(f"从缓存返回结果: {context['cache_key']}")
+            context["cached_content"] = cached_item["content"]
+            return context
+
+    # 4. 渲染 Prompt
+    prompt = template_loader.render_prompt(
+        request.template_id,
+        request.section_id,
+        {**request.data, "section_title": section_title}
+    )
+
+    if not prompt:
+        return {"error": "Prompt 渲染失败"}
+
+    context["prompt"] = prompt
+    context["ai_config"] = template_loader.get_ai_config(request.template_id)
+    return context
+
+
 @router.post("/generate", response_model=GenerationResponse)
 async def generate_content(
     request: GenerationRequest,
@@ -197,84 +276,50 @@ async def generate_content(
                 detail="请求过于频繁，请稍后再试"
             )
 
-        # 2. 验证输入数据
-        template_info = template_loader.get_template_info(request.template_id)
-        if not template_info:
+        # 2. 校验请求、检查缓存、渲染 Prompt
+        context = _prepare_generation(request)
+        if context.get("error"):
             return GenerationResponse(
                 success=False,
-                error=f"模板 '{request.template_id}' 不存在或未启用"
+                error=context["error"]
             )
 
-        # 获取必填字段
-        required_fields = template_info.get("required_fields", [])
-        is_valid, errors = validator.validate_template_data(request.data, required_fields)
-        if not is_valid:
+        section_title = context["section_title"]
+        if context["cached_content"] is not None:
             return GenerationResponse(
-                success=False,
-                error=f"数据验证失败: {'; '.join(errors)}"
+                success=True,
+                content=context["cached_content"],
+                section_title=section_title,
+                cached=True
             )
 
-        # 3. 验证章节 ID
-        template_schema = template_loader.load_template_schema(request.template_id)
-        is_valid_section, section_error = validator.validate_section_id(
-            request.section_id,
-            template_schema
-        )
-        if not is_valid_section:
-            return GenerationResponse(
-                success=False,
-                error=section_error
-            )
-
-        # 获取章节标题
-        section_title = None
-        for section in template_schema.get("sections", []):
-            if section["id"] == request.section_id:
-                section_title = section["title"]
-                break
-
-        # 4. 检查缓存
-        cache_config = template_loader.get_cache_config(request.template_id)
-        cache_key = None
-        if cache_config.get("enabled", False):
-            cache_key = _generate_cache_key(
-                request.template_id,
-                request.section_id,
-                request.data
+        # 3. 调用 AI 生成（异步调用，带重试机制和使用量统计），清理输出并缓存结果
+        async def produce() -> str:
+            generated_content = await ai_service.agenerate(
+                context["prompt"],
+                context["ai_config"],
+                user_id=str(current_user.id)
             )
-
-            # 使用新的缓存服务
-            cached_item = cache_service.get(cache_key)
-            if cached_item:
-                logger.info(f"从缓存返回结果: {cache_key}")
-                return GenerationResponse(
-                    success=True,
-                    content=cached_item["content"],
-                    section_title=section_title,
-                    cached=True
+            content = validator.sanitize_output(generated_content)
+            if context["cache_key"]:
+                cache_service.set(
+                    context["cache_key"],
+                    {"content": content},
+                    context["cache_ttl"]
                 )
+            return content
 
-        # 5. 渲染 Prompt
-        prompt = template_loader.render_prompt(
-            request.template_id,
-            request.section_id,
-            {**request.data, "section_title": section_title}
-        )
-
-        if not prompt:
-            return GenerationResponse(
-                success=False,
-                error="Prompt 渲染失败"
-            )
-
-        # 6. 调用 AI 生成（带重试机制和使用量统计）
-        ai_config = template_loader.get_ai_config(request.template_id)
         try:
-            generated_content = ai_service.generate(
-                prompt,
-                ai_config,
-                user_id=str(current_user.id)
-            )
+            if context["cache_key"]:
+                # 多个工作进程同时收到相同请求时，只有获得锁的进程调用模型，其余进程读取其缓存结果
+                cleaned_content = await acoalesce_across_workers(
+                    cache_service,
+                    context["cache_key"],
+                    produce,
+                    lambda: (cache_service.get(context["cache_key"]) or {}).get("content")
+                )
+            else:
+                cleaned_content = await produce()
         except Exception as e:
             logger.error(f"AI 生成失败: {e}")
             return GenerationResponse(
@@ -282,18 +327,6 @@ async def generate_content(
                 error=f"AI 生成失败: {str(e)}"
             )
 
-        # 7. 清理输出
-        cleaned_content = validator.sanitize_output(generated_content)
-
-        # 8. 缓存结果
-        if cache_key and cache_config.get("enabled", False):
-            ttl = cache_config.get("ttl", 3600)
-            cache_service.set(
-                cache_key,
-                {"content": cleaned_content},
-                ttl
-            )
-
         logger.info(
             f"用户 {current_user.id} 成功生成内容: "
             f"模板={request.template_id}, 章节={request.section_id}"
@@ -316,6 +349,98 @@ async def generate_content(
         )
 
 
+@router.post("/generate/stream")
+async def generate_content_stream(
+    request: GenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式生成 AI 内容（Server-Sent Events）
+
+    事件类型：
+    - token: {"content": 已清理的增量文本}
+    - done: {"content": 完整文本, "section_title": 章节标题, "cached": 是否命中缓存}
+    - error: {"error": 错误信息}
+
+    Args:
+        request: 生成请求
+
+    Returns:
+        text/event-stream 响应
+    """
+    # 限流检查
+    if not _check_rate_limit(current_user.id, max_requests=10, window_minutes=1):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="请求过于频繁，请稍后再试"
+        )
+
+    async def event_stream():
+        # 校验请求、检查缓存、渲染 Prompt（模板、Schema 或缓存出错时以 error 事件返回）
+        try:
+            context = _prepare_generation(request)
+        except Exception as e:
+            logger.error(f"生成内容失败: {e}", exc_info=True)
+            yield format_sse_event("error", {"error": f"生成失败: {str(e)}"})
+            return
+
+        if context.get("error"):
+            yield format_sse_event("error", {"error": context["error"]})
+            return
+
+        section_title = context["section_title"]
+        if context["cached_content"] is not None:
+            yield format_sse_event("token", {"content": context["cached_content"]})
+            yield format_sse_event("done", {
+                "content": context["cached_content"],
+                "section_title": section_title,
+                "cached": True
+            })
+            return
+
+        # 增量清理输出，与 sanitize_output 的整段结果一致
+        processor = IncrementalOutputProcessor([validator.sanitize_fragment])
+        try:
+            async for delta in ai_service.astream(
+                context["prompt"],
+                context["ai_config"],
+                user_id=str(current_user.id)
+            ):
+                cleaned = processor.feed(delta)
+                if cleaned:
+                    yield format_sse_event("token", {"content": cleaned})
+
+            cleaned = processor.flush()
+            if cleaned:
+                yield format_sse_event("token", {"content": cleaned})
+        except Exception as e:
+            logger.error(f"AI 流式生成失败: {e}", exc_info=True)
+            yield format_sse_event("error", {"error": f"AI 生成失败: {str(e)}"})
+            return
+
+        content = processor.get_text()
+
+        # 流结束后缓存完整结果
+        if context["cache_key"]:
+            cache_service.set(
+                context["cache_key"],
+                {"content": content},
+                context["cache_ttl"]
+            )
+
+        logger.info(
+            f"用户 {current_user.id} 成功流式生成内容: "
+            f"模板={request.template_id}, 章节={request.section_id}"
+        )
+        yield format_sse_event("done", {
+            "content": content,
+            "section_title": section_title,
+            "cached": False
+        })
+
+    return sse_response(event_stream())
+
+
 @router.delete("/cache")
 async def clear_cache(
     current_user: User = Depends(get_current_admin_user)
@@ -347,7 +472,11 @@ async def get_cache_stats(
     stats = cache_service.get_stats()
     return {
         "success": True,
-        "stats": stats
+        "stats": stats,
+        "single_flight": {
+            "ai_generate": ai_generation_flight.get_stats(),
+            "call_llm": llm_call_flight.get_stats()
+        }
     }
 
 
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select
 from typing import List
-from app.database import get_db
+from app.database import aget_db, aget_write_db
 from app.models.user import User
 from app.models.document import Document
 from app.models.comment import Comment
@@ -25,7 +27,7 @@ router = APIRouter(prefix="/documents", tags=["评论管理"])
 async def get_comments(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_db)
 ):
     """
     获取文档的所有评论
@@ -34,12 +36,12 @@ async def get_comments(
     - 返回评论列表，包含回复（树形结构）
     """
     # 验证文档是否存在且用户有权访问
-    document = db.query(Document).options(
+    document = (await db.execute(select(Document).options(
         joinedload(Document.user)  # 预加载关联的用户
-    ).filter(
+    ).where(
         Document.id == document_id,
         Document.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not document:
         raise HTTPException(
@@ -48,20 +50,20 @@ async def get_comments(
         )
 
     # 获取所有根评论（没有父评论的评论），使用eager loading避免N+1问题
-    root_comments = db.query(Comment).options(
+    root_comments = (await db.execute(select(Comment).options(
         joinedload(Comment.user)  # 预加载关联的用户
-    ).filter(
+    ).where(
         Comment.document_id == document_id,
         Comment.parent_id == None
-    ).order_by(Comment.created_at.desc()).all()
+    ).order_by(Comment.created_at.desc()))).scalars().all()
 
     # 获取所有回复，使用eager loading避免N+1问题
-    all_replies = db.query(Comment).options(
+    all_replies = (await db.execute(select(Comment).options(
         joinedload(Comment.user)  # 预加载关联的用户
-    ).filter(
+    ).where(
         Comment.document_id == document_id,
         Comment.parent_id != None
-    ).order_by(Comment.created_at.asc()).all()
+    ).order_by(Comment.created_at.asc()))).scalars().all()
 
     # 构建评论树
     comments_with_replies = []
@@ -89,7 +91,7 @@ async def create_comment(
     document_id: int,
     comment_data: CommentCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     创建评论或批注
@@ -102,12 +104,12 @@ async def create_comment(
     - **parent_id**: 回复的父评论ID（可选）
     """
     # 验证文档是否存在且用户有权访问
-    document = db.query(Document).options(
+    document = (await db.execute(select(Document).options(
         joinedload(Document.user)  # 预加载关联的用户
-    ).filter(
+    ).where(
         Document.id == document_id,
         Document.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not document:
         raise HTTPException(
@@ -117,12 +119,12 @@ async def create_comment(
 
     # 如果是回复，验证父评论是否存在
     if comment_data.parent_id:
-        parent_comment = db.query(Comment).options(
+        parent_comment = (await db.execute(select(Comment).options(
             joinedload(Comment.user)  # 预加载关联的用户
-        ).filter(
+        ).where(
             Comment.id == comment_data.parent_id,
             Comment.document_id == document_id
-        ).first()
+        ))).scalars().first()
         if not parent_comment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -142,10 +144,10 @@ async def create_comment(
 
     try:
         db.add(new_comment)
-        db.commit()
-        db.refresh(new_comment)
+        await db.commit()
+        await db.refresh(new_comment)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"评论创建失败：{str(e)}"
@@ -158,7 +160,7 @@ async def update_comment(
     comment_id: int,
     comment_data: CommentUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     更新评论内容
@@ -167,13 +169,13 @@ async def update_comment(
     - **content**: 新的评论内容
     """
     # 查找评论
-    comment = db.query(Comment).options(
+    comment = (await db.execute(select(Comment).options(
         joinedload(Comment.user),      # 预加载关联的用户
         joinedload(Comment.document)   # 预加载关联的文档
-    ).filter(
+    ).where(
         Comment.id == comment_id,
         Comment.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not comment:
         raise HTTPException(
@@ -185,10 +187,10 @@ async def update_comment(
     comment.content = comment_data.content
 
     try:
-        db.commit()
-        db.refresh(comment)
+        await db.commit()
+        await db.refresh(comment)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"评论更新失败：{str(e)}"
@@ -200,7 +202,7 @@ async def update_comment(
 async def delete_comment(
     comment_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     删除评论
@@ -209,13 +211,13 @@ async def delete_comment(
     - 删除评论时，会同时删除所有回复
     """
     # 查找评论
-    comment = db.query(Comment).options(
+    comment = (await db.execute(select(Comment).options(
         joinedload(Comment.user),      # 预加载关联的用户
         joinedload(Comment.document)   # 预加载关联的文档
-    ).filter(
+    ).where(
         Comment.id == comment_id,
         Comment.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not comment:
         raise HTTPException(
@@ -224,14 +226,14 @@ async def delete_comment(
         )
 
     # 删除所有回复
-    db.query(Comment).filter(Comment.parent_id == comment_id).delete()
+    await db.execute(delete(Comment).where(Comment.parent_id == comment_id))
 
     # 删除评论
     try:
-        db.delete(comment)
-        db.commit()
+        await db.delete(comment)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"评论删除失败：{str(e)}"
@@ -4,14 +4,25 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from fastapi.concurrency import iterate_in_threadpool
 from typing import Dict, Any, Optional
+import time
 
 from ..database import get_db
 from ..utils.auth import get_current_user
 from ..models.user import User
 from ..services.document_generator import document_generator
 from ..prompts.ai_sections_loader import ai_sections_loader
+from ..utils.sse import format_sse_event, sse_response
+from ..utils.text_stats import StreamingWordCounter
+from ..services.job_queue import get_job_queue
+from ..services.incremental_generation import make_incremental_key
+from ..services.section_cache import section_cache
+from ..services.compliance_repair import retry_cost_tracker
+from ..prompts.prompt_compactor import prompt_budget_stats
+from ..schemas.job import GenerationJobResponse
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -19,6 +30,13 @@ router = APIRouter(
     tags=["文档生成"]
 )
 
+# 单个文档生成支持的文档类型及标题
+DOCUMENT_TITLES = {
+    "risk_assessment": "环境风险评估报告",
+    "emergency_plan": "突发环境事件应急预案",
+    "resource_report": "应急资源调查报告"
+}
+
 class DocumentGenerationRequest(BaseModel):
     """文档生成请求模型"""
     enterprise_data: Dict[str, Any]
@@ -33,6 +51,62 @@ class SectionGenerationRequest(BaseModel):
     section_key: str
     enterprise_data: Dict[str, Any]
 
+def _build_all_documents_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """将 generate_all_documents 的结果构建为响应数据"""
+    if result["success"]:
+        word_counts = result.get("word_counts", {})
+        return {
+            "success": True,
+            "message": "所有文档生成成功",
+            "data": {
+                "risk_report": {
+                    "title": "环境风险评估报告",
+                    "content": result["risk_report"],
+                    "word_count": word_counts.get("risk_report", 0)
+                },
+                "emergency_plan": {
+                    "title": "突发环境事件应急预案",
+                    "content": result["emergency_plan"],
+                    "word_count": word_counts.get("emergency_plan", 0)
+                },
+                "resource_report": {
+                    "title": "应急资源调查报告",
+                    "content": result["resource_report"],
+                    "word_count": word_counts.get("resource_report", 0)
+                },
+                "ai_sections_used": result["ai_sections_used"],
+                "ai_sections_reused": result.get("ai_sections_reused", []),
+                "render_timings": result.get("render_timings")
+            }
+        }
+    else:
+        return {
+            "success": False,
+            "message": "文档生成失败",
+            "errors": result["errors"],
+            "data": None
+        }
+
+
+def _incremental_key(user_id: int, enterprise_data: Dict[str, Any]) -> str:
+    """增量生成范围：请求数据带有企业ID时按企业区分，否则按用户区分"""
+    enterprise_id = enterprise_data.get("enterprise_id")
+    return make_incremental_key(user_id, enterprise_id if isinstance(enterprise_id, int) else None)
+
+
+def _run_all_documents_job(payload: Dict[str, Any], progress_callback) -> Dict[str, Any]:
+    """后台任务：生成所有文档"""
+    result = document_generator.generate_all_documents(
+        payload["enterprise_data"],
+        user_id=payload.get("user_id"),
+        progress_callback=progress_callback,
+        incremental_key=payload.get("incremental_key")
+    )
+    return _build_all_documents_response(result)
+
+
+get_job_queue().register_handler("docs_all", _run_all_documents_job)
+
 @router.post("/generate_all", response_model=Dict[str, Any])
 async def generate_all_documents(
     request: DocumentGenerationRequest,
@@ -51,42 +125,15 @@ async def generate_all_documents(
         包含三个文档内容的响应
     """
     try:
-        # 调用文档生成器
-        result = document_generator.generate_all_documents(
-            request.enterprise_data, 
-            user_id=str(current_user.id)
+        # 调用文档生成器（在线程池中执行，避免阻塞事件循环）
+        result = await run_in_threadpool(
+            document_generator.generate_all_documents,
+            request.enterprise_data,
+            user_id=str(current_user.id),
+            incremental_key=_incremental_key(current_user.id, request.enterprise_data)
         )
         
-        if result["success"]:
-            return {
-                "success": True,
-                "message": "所有文档生成成功",
-                "data": {
-                    "risk_report": {
-                        "title": "环境风险评估报告",
-                        "content": result["risk_report"],
-                        "word_count": len(result["risk_report"]) if result["risk_report"] else 0
-                    },
-                    "emergency_plan": {
-                        "title": "突发环境事件应急预案",
-                        "content": result["emergency_plan"],
-                        "word_count": len(result["emergency_plan"]) if result["emergency_plan"] else 0
-                    },
-                    "resource_report": {
-                        "title": "应急资源调查报告",
-                        "content": result["resource_report"],
-                        "word_count": len(result["resource_report"]) if result["resource_report"] else 0
-                    },
-                    "ai_sections_used": result["ai_sections_used"]
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "message": "文档生成失败",
-                "errors": result["errors"],
-                "data": None
-            }
+        return _build_all_documents_response(result)
             
     except Exception as e:
         raise HTTPException(
@@ -94,6 +141,45 @@ async def generate_all_documents(
             detail=f"生成文档时发生错误: {str(e)}"
         )
 
+@router.post("/generate_all/jobs", response_model=GenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_generate_all_job(
+    request: DocumentGenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    提交生成所有文档的后台任务
+    
+    相同企业数据重复提交时返回同一个任务；通过 /api/jobs/{job_id} 轮询进度，
+    /api/jobs/{job_id}/result 获取结果。
+    
+    Args:
+        request: 包含企业数据的请求体
+        current_user: 当前用户
+        
+    Returns:
+        任务状态
+    """
+    try:
+        enterprise_id = request.enterprise_data.get("enterprise_id")
+        return await run_in_threadpool(
+            get_job_queue().submit,
+            "docs_all",
+            current_user.id,
+            {
+                "enterprise_data": request.enterprise_data,
+                "user_id": str(current_user.id),
+                "incremental_key": _incremental_key(current_user.id, request.enterprise_data)
+            },
+            enterprise_id=enterprise_id if isinstance(enterprise_id, int) else None,
+            data=request.enterprise_data,
+            section_keys=list(ai_sections_loader.get_enabled_sections().keys())
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"提交文档生成任务时发生错误: {str(e)}"
+        )
+
 @router.post("/generate_document", response_model=Dict[str, Any])
 async def generate_single_document(
     request: SingleDocumentRequest,
@@ -113,36 +199,30 @@ async def generate_single_document(
     """
     try:
         # 验证文档类型
-        valid_types = ["risk_assessment", "emergency_plan", "resource_report"]
+        valid_types = list(DOCUMENT_TITLES)
         if request.document_type not in valid_types:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"不支持的文档类型: {request.document_type}，支持的类型: {valid_types}"
             )
         
-        # 调用文档生成器
-        result = document_generator.generate_single_document(
+        # 调用文档生成器（在线程池中执行，避免阻塞事件循环）
+        result = await run_in_threadpool(
+            document_generator.generate_single_document,
             request.document_type,
             request.enterprise_data,
             user_id=str(current_user.id)
         )
         
         if result["success"]:
-            # 根据文档类型确定标题
-            title_map = {
-                "risk_assessment": "环境风险评估报告",
-                "emergency_plan": "突发环境事件应急预案",
-                "resource_report": "应急资源调查报告"
-            }
-            
             return {
                 "success": True,
-                "message": f"{title_map[request.document_type]}生成成功",
+                "message": f"{DOCUMENT_TITLES[request.document_type]}生成成功",
                 "data": {
                     "document_type": request.document_type,
-                    "title": title_map[request.document_type],
+                    "title": DOCUMENT_TITLES[request.document_type],
                     "content": result["content"],
-                    "word_count": len(result["content"]) if result["content"] else 0,
+                    "word_count": result["word_count"],
                     "ai_sections_used": result["ai_sections_used"]
                 }
             }
@@ -162,6 +242,80 @@ async def generate_single_document(
             detail=f"生成文档时发生错误: {str(e)}"
         )
 
+@router.post("/generate_document/stream")
+async def generate_single_document_stream(
+    request: SingleDocumentRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式生成单个文档（Server-Sent Events）
+    
+    AI段落生成完成后逐段渲染文档并立即发送，服务端不拼接完整文档，字数在发送过程中统计。
+    
+    事件类型：
+    - meta: {"document_type": 文档类型, "title": 标题, "ai_sections_used": AI段落列表}
+    - chunk: {"content": HTML片段}
+    - done: {"document_type": 文档类型, "word_count": 字数, "render_ms": 渲染耗时}
+    - error: {"error": 错误信息, "errors": 错误列表}
+    
+    Args:
+        request: 包含文档类型和企业数据的请求体
+        current_user: 当前用户
+        
+    Returns:
+        text/event-stream 响应
+    """
+    async def event_stream():
+        if request.document_type not in DOCUMENT_TITLES:
+            yield format_sse_event("error", {
+                "error": f"不支持的文档类型: {request.document_type}，支持的类型: {list(DOCUMENT_TITLES)}"
+            })
+            return
+        
+        try:
+            prepared = await run_in_threadpool(
+                document_generator.prepare_single_document,
+                request.document_type,
+                request.enterprise_data,
+                user_id=str(current_user.id)
+            )
+        except Exception as e:
+            yield format_sse_event("error", {"error": f"生成文档时发生错误: {str(e)}"})
+            return
+        
+        if not prepared["success"]:
+            yield format_sse_event("error", {
+                "error": f"{request.document_type}文档生成失败",
+                "errors": prepared["errors"]
+            })
+            return
+        
+        yield format_sse_event("meta", {
+            "document_type": request.document_type,
+            "title": DOCUMENT_TITLES[request.document_type],
+            "ai_sections_used": prepared["ai_sections_used"]
+        })
+        
+        counter = StreamingWordCounter()
+        started = time.perf_counter()
+        try:
+            # 模板渲染在线程池中逐段进行，每得到一个片段立即发送
+            chunks = document_generator.stream_document(prepared["template_path"], prepared["template_data"])
+            async for chunk in iterate_in_threadpool(chunks):
+                counter.feed(chunk)
+                yield format_sse_event("chunk", {"content": chunk})
+        except Exception as e:
+            yield format_sse_event("error", {"error": f"渲染文档时发生错误: {str(e)}"})
+            return
+        
+        yield format_sse_event("done", {
+            "document_type": request.document_type,
+            "word_count": counter.finish(),
+            "render_ms": round((time.perf_counter() - started) * 1000, 2)
+        })
+    
+    return sse_response(event_stream())
+
 @router.post("/generate_section", response_model=Dict[str, Any])
 async def generate_single_section(
     request: SectionGenerationRequest,
@@ -180,8 +334,9 @@ async def generate_single_section(
         包含单个AI段落内容的响应
     """
     try:
-        # 调用文档生成器
-        result = document_generator.generate_single_section(
+        # 调用文档生成器（在线程池中执行，避免阻塞事件循环）
+        result = await run_in_threadpool(
+            document_generator.generate_single_section,
             request.section_key,
             request.enterprise_data,
             user_id=str(current_user.id)
@@ -215,6 +370,49 @@ async def generate_single_section(
             detail=f"生成AI段落时发生错误: {str(e)}"
         )
 
+@router.post("/generate_section/stream")
+async def generate_single_section_stream(
+    request: SectionGenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式生成单个AI段落（Server-Sent Events）
+    
+    事件类型：
+    - token: {"content": 增量文本}
+    - done: {"section_key": 段落键名, "content": 完整文本, "word_count": 字数}
+    - error: {"error": 错误信息}
+    
+    Args:
+        request: 包含段落键名和企业数据的请求体
+        current_user: 当前用户
+        
+    Returns:
+        text/event-stream 响应
+    """
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in document_generator.astream_single_section(
+                request.section_key,
+                request.enterprise_data,
+                user_id=str(current_user.id)
+            ):
+                parts.append(chunk)
+                yield format_sse_event("token", {"content": chunk})
+        except Exception as e:
+            yield format_sse_event("error", {"error": f"生成AI段落时发生错误: {str(e)}"})
+            return
+        
+        content = "".join(parts)
+        yield format_sse_event("done", {
+            "section_key": request.section_key,
+            "content": content,
+            "word_count": len(content)
+        })
+    
+    return sse_response(event_stream())
+
 @router.get("/sections", response_model=Dict[str, Any])
 async def get_ai_sections(
     db: Session = Depends(get_db),
@@ -311,4 +509,62 @@ async def get_ai_section(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取AI段落配置时发生错误: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_section_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取AI段落结果缓存统计信息
+    
+    Args:
+        current_user: 当前用户
+        
+    Returns:
+        缓存条目数、命中率及各段落的命中/未命中次数
+    """
+    return {
+        "success": True,
+        "stats": section_cache.get_stats()
+    }
+
+
+@router.get("/compliance/retry_stats", response_model=Dict[str, Any])
+async def get_compliance_retry_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取合规重试开销统计
+    
+    Args:
+        current_user: 当前用户
+        
+    Returns:
+        各段落按调用方式（generate/patch/regenerate）统计的调用次数、token 数与耗时
+    """
+    return {
+        "success": True,
+        "stats": retry_cost_tracker.get_stats()
+    }
+
+
+@router.get("/prompts/token_stats", response_model=Dict[str, Any])
+async def get_prompt_token_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取提示词 token 统计
+    
+    Args:
+        current_user: 当前用户
+        
+    Returns:
+        各段落用户提示词的 token 数、压缩与截断次数，以及各段落每次 LLM 调用的 token 数与耗时
+    """
+    return {
+        "success": True,
+        "prompts": prompt_budget_stats.get_stats(),
+        "calls": retry_cost_tracker.get_stats()
+    }
@@ -4,9 +4,11 @@
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
 from app.services.document_generator import document_generator
+from app.services.incremental_generation import make_incremental_key
 from app.utils.auth import get_current_user
 from app.models.user import User
 import logging
@@ -326,8 +328,13 @@ async def generate_all_documents(
         # 记录请求
         logger.info(f"用户 {current_user.id} 请求生成文档")
         
-        # 调用文档生成服务
-        result = document_generator.generate_all_documents(request.enterprise_data)
+        # 调用文档生成服务（在线程池中执行，避免阻塞事件循环）
+        # 只重新生成依赖数据相对该用户上次生成发生变化的AI段落
+        result = await run_in_threadpool(
+            document_generator.generate_all_documents,
+            request.enterprise_data,
+            incremental_key=make_incremental_key(current_user.id)
+        )
         
         # 记录结果
         if result["success"]:
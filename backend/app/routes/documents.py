@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query, File, UploadFile
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from typing import Optional
-from app.database import get_db
+from app.database import aget_db, aget_write_db
 from app.models.user import User
 from app.models.document import Document
 from app.models.project import Project
@@ -16,8 +17,12 @@ from app.schemas.document import (
     MessageResponse
 )
 from app.utils.auth import get_current_user
+from app.services.count_service import TOTAL_MODE_PATTERN, count_service
+from app.services.search_index import search_index
 from app.utils.file_validator import validate_uploaded_file, scan_file_security, FileValidationError
-from app.utils.pagination import PaginationParams, optimize_offset_pagination, search_optimized_pagination
+from app.utils.pagination import (
+    PaginationParams, InvalidCursorError, apaginate, build_search_condition, pagination_fields
+)
 import math
 import os
 import uuid
@@ -37,37 +42,42 @@ async def get_documents(
     search: Optional[str] = Query(None, max_length=100, description="搜索关键词"),
     project_id: Optional[int] = Query(None, description="按项目ID过滤"),
     is_template: Optional[int] = Query(None, description="过滤模板"),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor）"),
+    total_mode: Optional[str] = Query(None, pattern=TOTAL_MODE_PATTERN, description="总数统计方式：exact / cached / none"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_db)
 ):
     """
-    获取当前用户的文档列表（分页）
+    获取当前用户的文档列表（分页，按更新时间倒序）
 
     - **page**: 页码（从1开始）
     - **page_size**: 每页显示数量（1-100）
-    - **search**: 可选的搜索关键词（在标题中搜索）
+    - **search**: 可选的搜索关键词（全文检索标题与正文；相关度排序与摘要见 /search）
     - **project_id**: 可选的项目ID过滤
     - **is_template**: 可选的模板过滤（0: 普通文档, 1: 模板）
+    - **cursor**: 可选的游标，传入时忽略 page，按游标取下一页且不统计总数
+    - **total_mode**: 总数统计方式（exact: 每次统计, cached: 缓存的总数, none: 不返回总数），
+      默认偏移分页为 exact、游标分页为 none（cached 的总数可能短暂过期，只用于展示）
     """
     # 构建基础查询，使用eager loading避免N+1问题
-    query = db.query(Document).options(
+    query = select(Document).options(
         joinedload(Document.project),  # 预加载关联的项目
         joinedload(Document.user)      # 预加载关联的用户
-    ).filter(Document.user_id == current_user.id)
+    ).where(Document.user_id == current_user.id)
 
     # 项目过滤
     if project_id is not None:
         # 验证项目是否属于当前用户
-        project = db.query(Project).filter(
+        project = (await db.execute(select(Project).where(
             Project.id == project_id,
             Project.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         if not project:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="项目不存在或无权访问"
             )
-        query = query.filter(Document.project_id == project_id)
+        query = query.where(Document.project_id == project_id)
 
     # 模板过滤
     if is_template is not None:
@@ -76,39 +86,38 @@ async def get_documents(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="is_template 必须是 0 或 1"
             )
-        query = query.filter(Document.is_template == is_template)
+        query = query.where(Document.is_template == is_template)
 
-    # 创建分页参数
-    pagination = PaginationParams(page=page, page_size=page_size)
-    
-    # 使用优化的分页查询
+    # 搜索过滤：使用全文索引检索标题与正文，索引不可用时按标题模糊匹配
     if search:
-        # 搜索优化的分页
-        result = search_optimized_pagination(
-            query=query,
-            search_term=search,
-            search_fields=['title'],
-            pagination=pagination,
-            db=db
+        matching_ids = await search_index.amatching_ids(db, "documents", search)
+        if matching_ids is not None:
+            query = query.where(Document.id.in_(matching_ids))
+        else:
+            query = query.where(build_search_condition(Document, search, ['title']))
+
+    # 排序键与 idx_user_updated 一致，id 保证顺序唯一
+    sort_keys = [Document.updated_at.desc(), Document.id.desc()]
+    pagination = PaginationParams(page=page, page_size=page_size, cursor=cursor)
+    try:
+        result = await apaginate(query, sort_keys, pagination, db,
+                                 total_mode=total_mode, count_scope=("documents", current_user.id))
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    else:
-        # 普通优化的分页
-        query = query.order_by(Document.updated_at.desc())
-        result = optimize_offset_pagination(query, pagination, db)
 
     return DocumentListResponse(
         documents=[DocumentResponse.model_validate(d) for d in result.items],
-        total=result.total,
-        page=result.page,
-        page_size=result.page_size,
-        total_pages=result.total_pages
+        **pagination_fields(result, pagination.page_size)
     )
 
 @router.post("/", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
 async def create_document(
     document_data: DocumentCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     创建新文档
@@ -122,10 +131,10 @@ async def create_document(
     """
     # 如果指定了项目，验证项目是否属于当前用户
     if document_data.project_id is not None:
-        project = db.query(Project).filter(
+        project = (await db.execute(select(Project).where(
             Project.id == document_data.project_id,
             Project.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         if not project:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -145,14 +154,15 @@ async def create_document(
 
     try:
         db.add(new_document)
-        db.commit()
-        db.refresh(new_document)
+        await db.commit()
+        await db.refresh(new_document)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文档创建失败：{str(e)}"
         )
+    await count_service.ainvalidate("documents", current_user.id)
 
     return DocumentResponse.model_validate(new_document)
 
@@ -160,21 +170,21 @@ async def create_document(
 async def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_db)
 ):
     """
     获取单个文档详情
 
     - **document_id**: 文档ID
     """
-    document = db.query(Document).options(
+    document = (await db.execute(select(Document).options(
         joinedload(Document.project),  # 预加载关联的项目
         joinedload(Document.user),     # 预加载关联的用户
-        joinedload(Document.comments)  # 预加载关联的评论
-    ).filter(
+        selectinload(Document.comments)  # 预加载关联的评论
+    ).where(
         Document.id == document_id,
         Document.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not document:
         raise HTTPException(
@@ -189,7 +199,7 @@ async def update_document(
     document_id: int,
     document_data: DocumentUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     更新文档信息
@@ -203,13 +213,13 @@ async def update_document(
     - **metadata**: 元数据（可选）
     """
     # 查找文档
-    document = db.query(Document).options(
+    document = (await db.execute(select(Document).options(
         joinedload(Document.project),  # 预加载关联的项目
         joinedload(Document.user)      # 预加载关联的用户
-    ).filter(
+    ).where(
         Document.id == document_id,
         Document.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not document:
         raise HTTPException(
@@ -225,10 +235,10 @@ async def update_document(
 
     # 如果更新了项目ID，验证项目是否属于当前用户
     if 'project_id' in update_data and update_data['project_id'] is not None:
-        project = db.query(Project).filter(
+        project = (await db.execute(select(Project).where(
             Project.id == update_data['project_id'],
             Project.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         if not project:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -243,14 +253,17 @@ async def update_document(
         document.version += 1
 
     try:
-        db.commit()
-        db.refresh(document)
+        await db.commit()
+        await db.refresh(document)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文档更新失败：{str(e)}"
         )
+    # 只有影响列表过滤条件的字段变化时才需要重新统计
+    if update_data.keys() & {"title", "project_id", "is_template"}:
+        await count_service.ainvalidate("documents", current_user.id)
 
     return DocumentResponse.model_validate(document)
 
@@ -259,7 +272,7 @@ async def autosave_document(
     document_id: int,
     autosave_data: DocumentAutoSave,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     自动保存文档内容
@@ -269,13 +282,13 @@ async def autosave_document(
     - **version**: 当前版本号（用于乐观锁）
     """
     # 查找文档
-    document = db.query(Document).options(
+    document = (await db.execute(select(Document).options(
         joinedload(Document.project),  # 预加载关联的项目
         joinedload(Document.user)      # 预加载关联的用户
-    ).filter(
+    ).where(
         Document.id == document_id,
         Document.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not document:
         raise HTTPException(
@@ -295,9 +308,9 @@ async def autosave_document(
     document.version += 1
 
     try:
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"自动保存失败：{str(e)}"
@@ -312,7 +325,7 @@ async def autosave_document(
 async def delete_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     删除文档
@@ -320,13 +333,13 @@ async def delete_document(
     - **document_id**: 文档ID
     """
     # 查找文档
-    document = db.query(Document).options(
+    document = (await db.execute(select(Document).options(
         joinedload(Document.project),  # 预加载关联的项目
         joinedload(Document.user)      # 预加载关联的用户
-    ).filter(
+    ).where(
         Document.id == document_id,
         Document.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not document:
         raise HTTPException(
@@ -335,14 +348,15 @@ async def delete_document(
         )
 
     try:
-        db.delete(document)
-        db.commit()
+        await db.delete(document)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文档删除失败：{str(e)}"
         )
+    await count_service.ainvalidate("documents", current_user.id)
 
     return MessageResponse(
         message="文档删除成功",
@@ -355,7 +369,7 @@ async def create_from_template(
     title: str = Query(..., description="新文档标题"),
     project_id: Optional[int] = Query(None, description="所属项目ID"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     从模板创建文档
@@ -365,14 +379,14 @@ async def create_from_template(
     - **project_id**: 所属项目ID（可选）
     """
     # 查找模板
-    template = db.query(Document).options(
+    template = (await db.execute(select(Document).options(
         joinedload(Document.project),  # 预加载关联的项目
         joinedload(Document.user)      # 预加载关联的用户
-    ).filter(
+    ).where(
         Document.id == template_id,
         Document.user_id == current_user.id,
         Document.is_template == 1
-    ).first()
+    ))).scalars().first()
 
     if not template:
         raise HTTPException(
@@ -382,10 +396,10 @@ async def create_from_template(
 
     # 如果指定了项目，验证项目是否属于当前用户
     if project_id is not None:
-        project = db.query(Project).filter(
+        project = (await db.execute(select(Project).where(
             Project.id == project_id,
             Project.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         if not project:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -405,14 +419,15 @@ async def create_from_template(
 
     try:
         db.add(new_document)
-        db.commit()
-        db.refresh(new_document)
+        await db.commit()
+        await db.refresh(new_document)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"从模板创建文档失败：{str(e)}"
         )
+    await count_service.ainvalidate("documents", current_user.id)
 
     return DocumentResponse.model_validate(new_document)
 
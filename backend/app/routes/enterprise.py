@@ -3,13 +3,15 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, desc, select
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import json
 
-from app.database import get_db
+from app.database import get_db, aget_db, aget_write_db
 from app.models.enterprise import EnterpriseInfo
 from app.models.user import User
 from app.schemas.enterprise import (
@@ -40,9 +42,16 @@ from app.schemas.enterprise import (
     EnterpriseDataRequest, DocumentGenerationResponse, DocumentData
 )
 from app.utils.auth import get_current_user
-from app.utils.pagination import get_pagination_params, paginate_query
+from app.utils.pagination import PaginationParams, InvalidCursorError, apaginate, pagination_fields
 from app.utils.error_handler import handle_error, ErrorCategory
+from app.utils.text_stats import count_words
 from app.services.document_generator import document_generator
+from app.services.job_queue import get_job_queue
+from app.services.count_service import TOTAL_MODE_PATTERN, count_service
+from app.services.search_index import search_index
+from app.services.incremental_generation import make_incremental_key
+from app.schemas.job import GenerationJobResponse
+from app.prompts.ai_sections_loader import ai_sections_loader
 
 router = APIRouter(prefix="/enterprise", tags=["企业信息"])
 
@@ -540,7 +549,7 @@ def convert_enterprise_to_response(enterprise: EnterpriseInfo) -> EnterpriseInfo
 @router.post("/info", response_model=EnterpriseInfoResponse, status_code=status.HTTP_201_CREATED)
 async def create_enterprise_info(
     enterprise_data: EnterpriseInfoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(aget_write_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -556,9 +565,9 @@ async def create_enterprise_info(
     
     try:
         # 检查用户是否已有企业信息（可选限制）
-        existing_info = db.query(EnterpriseInfo).filter(
+        existing_info = (await db.execute(select(EnterpriseInfo).where(
             EnterpriseInfo.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         # 如果需要限制每个用户只能有一条企业信息，可以取消下面的注释
         # if existing_info:
@@ -806,8 +815,9 @@ async def create_enterprise_info(
         )
         
         db.add(db_enterprise)
-        db.commit()
-        db.refresh(db_enterprise)
+        await db.commit()
+        await db.refresh(db_enterprise)
+        await count_service.ainvalidate("enterprise_infos", current_user.id)
         
         return convert_enterprise_to_response(db_enterprise)
         
@@ -830,44 +840,52 @@ async def get_enterprise_infos(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor）"),
+    total_mode: Optional[str] = Query(None, pattern=TOTAL_MODE_PATTERN, description="总数统计方式：exact / cached / none"),
+    db: AsyncSession = Depends(aget_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    获取当前用户的企业信息列表
+    获取当前用户的企业信息列表（按创建时间倒序）
+
+    传入 cursor 时忽略 page，按游标取下一页；total_mode 为总数统计方式（exact / cached / none），
+    默认偏移分页为 exact、游标分页为 none（cached 的总数可能短暂过期，只用于展示）
     """
     try:
         # 构建查询
-        query = db.query(EnterpriseInfo).filter(EnterpriseInfo.user_id == current_user.id)
+        query = select(EnterpriseInfo).where(EnterpriseInfo.user_id == current_user.id)
         
-        # 搜索过滤
+        # 搜索过滤：使用全文索引检索名称、地址、行业、简介等字段，索引不可用时模糊匹配名称、地址与行业
         if search:
-            query = query.filter(
-                or_(
-                    EnterpriseInfo.enterprise_name.contains(search),
-                    EnterpriseInfo.address.contains(search),
-                    EnterpriseInfo.industry.contains(search)
+            matching_ids = await search_index.amatching_ids(db, "enterprise_infos", search)
+            if matching_ids is not None:
+                query = query.where(EnterpriseInfo.id.in_(matching_ids))
+            else:
+                query = query.where(
+                    or_(
+                        EnterpriseInfo.enterprise_name.contains(search),
+                        EnterpriseInfo.detailed_address.contains(search),
+                        EnterpriseInfo.industry.contains(search)
+                    )
                 )
-            )
-        
-        # 按创建时间倒序排列
-        query = query.order_by(desc(EnterpriseInfo.created_at))
         
-        # 分页
-        pagination = get_pagination_params(page, page_size)
-        paginated_query = paginate_query(query, pagination)
-        
-        enterprise_infos = paginated_query.all()
-        total = query.count()
+        # 按创建时间倒序排列：created_at 由数据库生成且与自增 id 同序（SQLite 中只精确到秒，
+        # 与绑定参数的文本格式也不同，不适合作为游标值），因此按 id 倒序，游标只需主键
+        sort_keys = [desc(EnterpriseInfo.id)]
+        pagination = PaginationParams(page=page, page_size=page_size, cursor=cursor)
+        result = await apaginate(query, sort_keys, pagination, db,
+                                 total_mode=total_mode, count_scope=("enterprise_infos", current_user.id))
         
         return EnterpriseInfoList(
-            enterprise_infos=[convert_enterprise_to_response(info) for info in enterprise_infos],
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=(total + page_size - 1) // page_size
+            enterprise_infos=[convert_enterprise_to_response(info) for info in result.items],
+            **pagination_fields(result, pagination.page_size)
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         error_info = handle_error(
             e,
@@ -883,16 +901,16 @@ async def get_enterprise_infos(
 @router.get("/info/{info_id}", response_model=EnterpriseInfoResponse)
 async def get_enterprise_info(
     info_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(aget_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取特定企业信息
     """
     try:
-        enterprise = db.query(EnterpriseInfo).filter(
+        enterprise = (await db.execute(select(EnterpriseInfo).where(
             and_(EnterpriseInfo.id == info_id, EnterpriseInfo.user_id == current_user.id)
-        ).first()
+        ))).scalars().first()
         
         if not enterprise:
             raise HTTPException(
@@ -920,16 +938,16 @@ async def get_enterprise_info(
 async def update_enterprise_info(
     info_id: int,
     enterprise_data: EnterpriseInfoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(aget_write_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     更新企业信息
     """
     try:
-        enterprise = db.query(EnterpriseInfo).filter(
+        enterprise = (await db.execute(select(EnterpriseInfo).where(
             and_(EnterpriseInfo.id == info_id, EnterpriseInfo.user_id == current_user.id)
-        ).first()
+        ))).scalars().first()
         
         if not enterprise:
             raise HTTPException(
@@ -1182,8 +1200,10 @@ async def update_enterprise_info(
         if enterprise_data.project_id is not None:
             enterprise.project_id = enterprise_data.project_id
         
-        db.commit()
-        db.refresh(enterprise)
+        await db.commit()
+        await db.refresh(enterprise)
+        # 企业名称、地址、行业可能变化，搜索结果的总数需要重新统计
+        await count_service.ainvalidate("enterprise_infos", current_user.id)
         
         return convert_enterprise_to_response(enterprise)
         
@@ -1204,16 +1224,16 @@ async def update_enterprise_info(
 @router.delete("/info/{info_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_enterprise_info(
     info_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(aget_write_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     删除企业信息
     """
     try:
-        enterprise = db.query(EnterpriseInfo).filter(
+        enterprise = (await db.execute(select(EnterpriseInfo).where(
             and_(EnterpriseInfo.id == info_id, EnterpriseInfo.user_id == current_user.id)
-        ).first()
+        ))).scalars().first()
         
         if not enterprise:
             raise HTTPException(
@@ -1221,8 +1241,9 @@ async def delete_enterprise_info(
                 detail="企业信息不存在"
             )
         
-        db.delete(enterprise)
-        db.commit()
+        await db.delete(enterprise)
+        await db.commit()
+        await count_service.ainvalidate("enterprise_infos", current_user.id)
         
         return None
         
@@ -1397,26 +1418,114 @@ def convert_enterprise_to_emergency_plan_format(enterprise: EnterpriseInfo, addi
     return data
 
 
-def count_words(html_content: str) -> int:
+def _collect_additional_data(request: EnterpriseDataRequest) -> Dict[str, Any]:
+    """合并请求中的表单数据，作为企业数据的补充"""
+    additional_data = request.additional_data or {}
+    if request.basic_info:
+        additional_data["basic_info"] = request.basic_info
+    if request.production_process:
+        additional_data["production_process"] = request.production_process
+    if request.environment_info:
+        additional_data["environment_info"] = request.environment_info
+    if request.compliance_info:
+        additional_data["compliance_info"] = request.compliance_info
+    if request.emergency_resources:
+        additional_data["emergency_resources"] = request.emergency_resources
+    return additional_data
+
+
+def _get_user_enterprise(db: Session, enterprise_id: int, user_id: int) -> EnterpriseInfo:
+    """查询当前用户的企业信息，不存在时返回404"""
+    enterprise = db.query(EnterpriseInfo).filter(
+        and_(EnterpriseInfo.id == enterprise_id, EnterpriseInfo.user_id == user_id)
+    ).first()
+    
+    if not enterprise:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="企业信息不存在"
+        )
+    return enterprise
+
+
+def _word_count(generation_result: Dict[str, Any], word_counts: Dict[str, int], key: str) -> int:
+    """获取文档字数（优先使用渲染时的统计结果）"""
+    if key in word_counts:
+        return word_counts[key]
+    return count_words(generation_result[key])
+
+
+def build_generation_response(generation_result: Dict[str, Any], enterprise_info: Dict[str, Any]) -> DocumentGenerationResponse:
     """
-    统计HTML内容的字数
+    将文档生成结果构建为前端tab结构的响应
     
     Args:
-        html_content: HTML字符串
+        generation_result: generate_all_documents 的返回结果
+        enterprise_info: 企业信息（id、name）
     
     Returns:
-        字数统计
+        文档生成响应
     """
-    # 简单的HTML标签移除和字数统计
-    import re
-    # 移除HTML标签
-    text = re.sub(r'<[^>]+>', '', html_content)
-    # 移除多余的空白字符
-    text = re.sub(r'\s+', ' ', text).strip()
-    # 统计中文字符和单词
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-    english_words = len(re.findall(r'\b[a-zA-Z]+\b', text))
-    return chinese_chars + english_words
+    if not generation_result["success"]:
+        return DocumentGenerationResponse(
+            success=False,
+            message="文档生成失败",
+            errors=generation_result["errors"]
+        )
+    
+    # 构建响应数据，支持前端tab结构（字数已在渲染线程中统计）
+    word_counts = generation_result.get("word_counts") or {}
+    tabs = []
+    
+    # 风险评估报告
+    if generation_result["risk_report"]:
+        tabs.append({
+            "id": "risk_report",
+            "title": "环境风险评估报告",
+            "content": generation_result["risk_report"],
+            "word_count": _word_count(generation_result, word_counts, "risk_report")
+        })
+    
+    # 突发环境事件应急预案
+    if generation_result["emergency_plan"]:
+        tabs.append({
+            "id": "emergency_plan",
+            "title": "突发环境事件应急预案",
+            "content": generation_result["emergency_plan"],
+            "word_count": _word_count(generation_result, word_counts, "emergency_plan")
+        })
+    
+    # 应急资源调查报告
+    if generation_result["resource_report"]:
+        tabs.append({
+            "id": "resource_report",
+            "title": "应急资源调查报告",
+            "content": generation_result["resource_report"],
+            "word_count": _word_count(generation_result, word_counts, "resource_report")
+        })
+    
+    return DocumentGenerationResponse(
+        success=True,
+        message="文档生成成功",
+        data={
+            "tabs": tabs,
+            "enterprise_info": dict(enterprise_info, generated_at=datetime.now().isoformat()),
+            "render_timings": generation_result.get("render_timings")
+        }
+    )
+
+
+def _run_enterprise_docs_job(payload: Dict[str, Any], progress_callback) -> Dict[str, Any]:
+    """后台任务：生成企业的全部文档"""
+    generation_result = document_generator.generate_all_documents(
+        payload["enterprise_data"],
+        progress_callback=progress_callback,
+        incremental_key=payload.get("incremental_key")
+    )
+    return build_generation_response(generation_result, payload["enterprise_info"]).model_dump()
+
+
+get_job_queue().register_handler("enterprise_docs", _run_enterprise_docs_job)
 
 
 @router.post("/{enterprise_id}/generate-docs", response_model=DocumentGenerationResponse)
@@ -1440,85 +1549,22 @@ async def generate_enterprise_docs(
     """
     try:
         # 查询企业信息
-        enterprise = db.query(EnterpriseInfo).filter(
-            and_(EnterpriseInfo.id == enterprise_id, EnterpriseInfo.user_id == current_user.id)
-        ).first()
-        
-        if not enterprise:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="企业信息不存在"
-            )
+        enterprise = _get_user_enterprise(db, enterprise_id, current_user.id)
         
         # 将企业信息转换为emergency_plan.json格式
-        additional_data = request.additional_data or {}
-        if request.basic_info:
-            additional_data["basic_info"] = request.basic_info
-        if request.production_process:
-            additional_data["production_process"] = request.production_process
-        if request.environment_info:
-            additional_data["environment_info"] = request.environment_info
-        if request.compliance_info:
-            additional_data["compliance_info"] = request.compliance_info
-        if request.emergency_resources:
-            additional_data["emergency_resources"] = request.emergency_resources
-        
-        enterprise_data = convert_enterprise_to_emergency_plan_format(enterprise, additional_data)
-        
-        # 使用文档生成服务生成三个文档
-        generation_result = document_generator.generate_all_documents(enterprise_data)
-        
-        if not generation_result["success"]:
-            return DocumentGenerationResponse(
-                success=False,
-                message="文档生成失败",
-                errors=generation_result["errors"]
-            )
-        
-        # 构建响应数据，支持前端tab结构
-        tabs = []
-        
-        # 风险评估报告
-        if generation_result["risk_report"]:
-            tabs.append({
-                "id": "risk_report",
-                "title": "环境风险评估报告",
-                "content": generation_result["risk_report"],
-                "word_count": count_words(generation_result["risk_report"])
-            })
-        
-        # 突发环境事件应急预案
-        if generation_result["emergency_plan"]:
-            tabs.append({
-                "id": "emergency_plan",
-                "title": "突发环境事件应急预案",
-                "content": generation_result["emergency_plan"],
-                "word_count": count_words(generation_result["emergency_plan"])
-            })
-        
-        # 应急资源调查报告
-        if generation_result["resource_report"]:
-            tabs.append({
-                "id": "resource_report",
-                "title": "应急资源调查报告",
-                "content": generation_result["resource_report"],
-                "word_count": count_words(generation_result["resource_report"])
-            })
-        
-        # 构建企业信息
-        enterprise_info = {
-            "id": enterprise.id,
-            "name": enterprise.enterprise_name,
-            "generated_at": datetime.now().isoformat()
-        }
+        enterprise_data = convert_enterprise_to_emergency_plan_format(enterprise, _collect_additional_data(request))
+        
+        # 使用文档生成服务生成三个文档（在线程池中执行，避免阻塞事件循环）
+        # 只重新生成依赖数据相对上次生成发生变化的AI段落
+        generation_result = await run_in_threadpool(
+            document_generator.generate_all_documents,
+            enterprise_data,
+            incremental_key=make_incremental_key(current_user.id, enterprise.id)
+        )
         
-        return DocumentGenerationResponse(
-            success=True,
-            message="文档生成成功",
-            data={
-                "tabs": tabs,
-                "enterprise_info": enterprise_info
-            }
+        return build_generation_response(
+            generation_result,
+            {"id": enterprise.id, "name": enterprise.enterprise_name}
         )
         
     except HTTPException:
@@ -1532,4 +1578,58 @@ async def generate_enterprise_docs(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_info.user_message
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/{enterprise_id}/generate-docs/jobs", response_model=GenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_enterprise_docs_job(
+    enterprise_id: int,
+    request: EnterpriseDataRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    提交企业文档生成后台任务
+    
+    相同企业与相同数据重复提交时返回同一个任务；通过 /api/jobs/{job_id} 轮询进度，
+    /api/jobs/{job_id}/result 获取结果。
+    
+    Args:
+        enterprise_id: 企业ID
+        request: 包含企业表单数据的请求体
+        db: 数据库会话
+        current_user: 当前用户
+    
+    Returns:
+        任务状态
+    """
+    try:
+        enterprise = _get_user_enterprise(db, enterprise_id, current_user.id)
+        enterprise_data = convert_enterprise_to_emergency_plan_format(enterprise, _collect_additional_data(request))
+        
+        return await run_in_threadpool(
+            get_job_queue().submit,
+            "enterprise_docs",
+            current_user.id,
+            {
+                "enterprise_data": enterprise_data,
+                "enterprise_info": {"id": enterprise.id, "name": enterprise.enterprise_name},
+                "incremental_key": make_incremental_key(current_user.id, enterprise.id)
+            },
+            enterprise_id=enterprise.id,
+            data=enterprise_data,
+            section_keys=list(ai_sections_loader.get_enabled_sections().keys())
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_info = handle_error(
+            e,
+            context={"user_id": current_user.id, "enterprise_id": enterprise_id, "operation": "submit_enterprise_docs_job"},
+            user_message="提交文档生成任务失败"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_info.user_message
+        )
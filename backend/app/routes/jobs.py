@@ -0,0 +1,59 @@
+"""
+文档生成后台任务API路由
+提供任务状态轮询与结果获取
+"""
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
+
+from app.models.user import User
+from app.schemas.job import GenerationJobResponse, GenerationJobResultResponse
+from app.services.job_queue import get_job_queue, JOB_SUCCEEDED, JOB_FAILED
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/jobs", tags=["生成任务"])
+
+
+async def _get_user_job(job_id: str, current_user: User):
+    """查询当前用户的任务，不存在时返回404"""
+    job = await run_in_threadpool(get_job_queue().get_job, job_id, current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    return job
+
+
+@router.get("/{job_id}", response_model=GenerationJobResponse)
+async def get_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    查询生成任务状态与进度
+
+    - **job_id**: 任务ID
+    - 返回任务状态、各AI段落进度
+    """
+    return await _get_user_job(job_id, current_user)
+
+
+@router.get("/{job_id}/result", response_model=GenerationJobResultResponse)
+async def get_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取生成任务结果
+
+    - **job_id**: 任务ID
+    - 任务未结束时返回409
+    """
+    job = await _get_user_job(job_id, current_user)
+    if job.status not in (JOB_SUCCEEDED, JOB_FAILED):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"任务尚未完成，当前状态: {job.status}"
+        )
+    return job
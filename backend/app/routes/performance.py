@@ -191,4 +191,50 @@ async def get_database_health(
             "health_score": 0,
             "issues": [f"数据库连接错误: {str(e)}"],
             "database_connected": False
-        }
\ No newline at end of file
+        }
+@router.get("/templates", response_model=Dict[str, Any])
+async def get_template_warm_up_report(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取启动时的模板预热报告（各模板加载耗时、是否来自字节码缓存）
+    
+    需要管理员权限
+    """
+    if not require_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+    
+    from app.services.document_generator import document_generator
+    from app.utils.jinja_cache import get_bytecode_cache
+    
+    bytecode_cache = get_bytecode_cache()
+    return {
+        "warm_up": document_generator.warm_up_report,
+        "bytecode_cache": bytecode_cache.get_stats() if bytecode_cache else None,
+        "status": "success"
+    }
+
+@router.get("/llm_providers", response_model=Dict[str, Any])
+async def get_llm_provider_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取 LLM 路由各供应商的状态（健康状态、延迟 EWMA、并发数、失败次数）
+    
+    需要管理员权限
+    """
+    if not require_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+    
+    from app.services.llm_router import get_llm_router
+    
+    return {
+        "providers": get_llm_router().get_stats(),
+        "status": "success"
+    }
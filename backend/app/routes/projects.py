@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, func, select
 from typing import Optional
-from app.database import get_db
+from app.database import aget_db, aget_write_db
 from app.models.user import User
 from app.models.project import Project
 from app.models.document import Document
@@ -14,7 +15,10 @@ from app.schemas.project import (
     MessageResponse
 )
 from app.utils.auth import get_current_user
-from app.utils.pagination import PaginationParams, optimize_offset_pagination, search_optimized_pagination
+from app.services.count_service import TOTAL_MODE_PATTERN, count_service
+from app.utils.pagination import (
+    PaginationParams, InvalidCursorError, apaginate, build_search_condition, pagination_fields
+)
 import math
 import logging
 
@@ -29,21 +33,26 @@ async def get_projects(
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词（标题/描述）"),
     status: Optional[str] = Query(None, description="项目状态过滤"),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor）"),
+    total_mode: Optional[str] = Query(None, pattern=TOTAL_MODE_PATTERN, description="总数统计方式：exact / cached / none"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_db)
 ):
     """
-    获取当前用户的项目列表（分页）
+    获取当前用户的项目列表（分页，按创建时间倒序）
 
     - **page**: 页码（从1开始）
     - **page_size**: 每页显示数量（1-100）
     - **search**: 可选的搜索关键词（在标题和描述中搜索）
     - **status**: 可选的状态过滤（active/completed/archived）
+    - **cursor**: 可选的游标，传入时忽略 page，按游标取下一页且不统计总数
+    - **total_mode**: 总数统计方式（exact: 每次统计, cached: 缓存的总数, none: 不返回总数），
+      默认偏移分页为 exact、游标分页为 none（cached 的总数可能短暂过期，只用于展示）
     """
     # 构建基础查询，使用eager loading避免N+1问题
-    query = db.query(Project).options(
-        joinedload(Project.documents)  # 预加载关联的文档
-    ).filter(Project.user_id == current_user.id)
+    query = select(Project).options(
+        selectinload(Project.documents)  # 预加载关联的文档
+    ).where(Project.user_id == current_user.id)
 
     # 状态过滤
     if status:
@@ -53,39 +62,32 @@ async def get_projects(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"无效的状态值。允许的值：{', '.join(allowed_statuses)}"
             )
-        query = query.filter(Project.status == status)
+        query = query.where(Project.status == status)
 
-    # 创建分页参数
-    pagination = PaginationParams(page=page, page_size=page_size)
-    
-    # 使用优化的分页查询
+    # 搜索过滤
     if search:
-        # 搜索优化的分页
-        result = search_optimized_pagination(
-            query=query,
-            search_term=search,
-            search_fields=['title', 'description'],
-            pagination=pagination,
-            db=db
-        )
-    else:
-        # 普通优化的分页
-        query = query.order_by(Project.created_at.desc())
-        result = optimize_offset_pagination(query, pagination, db)
+        query = query.where(build_search_condition(Project, search, ['title', 'description']))
+
+    # 排序键与 idx_user_created 一致，id 保证顺序唯一
+    sort_keys = [Project.created_at.desc(), Project.id.desc()]
+    pagination = PaginationParams(page=page, page_size=page_size, cursor=cursor)
+    try:
+        result = await apaginate(query, sort_keys, pagination, db,
+                                 total_mode=total_mode, count_scope=("projects", current_user.id))
+    except InvalidCursorError as e:
+        # 参数 status 覆盖了 fastapi.status，这里直接使用状态码
+        raise HTTPException(status_code=400, detail=str(e))
 
     return ProjectListResponse(
         projects=[ProjectResponse.model_validate(p) for p in result.items],
-        total=result.total,
-        page=result.page,
-        page_size=result.page_size,
-        total_pages=result.total_pages
+        **pagination_fields(result, pagination.page_size)
     )
 
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_data: ProjectCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     创建新项目
@@ -104,14 +106,15 @@ async def create_project(
 
     try:
         db.add(new_project)
-        db.commit()
-        db.refresh(new_project)
+        await db.commit()
+        await db.refresh(new_project)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"项目创建失败：{str(e)}"
         )
+    await count_service.ainvalidate("projects", current_user.id)
 
     return ProjectResponse.model_validate(new_project)
 
@@ -119,19 +122,19 @@ async def create_project(
 async def get_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_db)
 ):
     """
     获取单个项目详情
 
     - **project_id**: 项目ID
     """
-    project = db.query(Project).options(
-        joinedload(Project.documents)  # 预加载关联的文档
-    ).filter(
+    project = (await db.execute(select(Project).options(
+        selectinload(Project.documents)  # 预加载关联的文档
+    ).where(
         Project.id == project_id,
         Project.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not project:
         raise HTTPException(
@@ -146,7 +149,7 @@ async def update_project(
     project_id: int,
     project_data: ProjectUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     更新项目信息
@@ -157,12 +160,12 @@ async def update_project(
     - **status**: 项目状态（可选）
     """
     # 查找项目
-    project = db.query(Project).options(
-        joinedload(Project.documents)  # 预加载关联的文档
-    ).filter(
+    project = (await db.execute(select(Project).options(
+        selectinload(Project.documents)  # 预加载关联的文档
+    ).where(
         Project.id == project_id,
         Project.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not project:
         raise HTTPException(
@@ -183,14 +186,15 @@ async def update_project(
         setattr(project, field, value)
 
     try:
-        db.commit()
-        db.refresh(project)
+        await db.commit()
+        await db.refresh(project)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"项目更新失败：{str(e)}"
         )
+    await count_service.ainvalidate("projects", current_user.id)
 
     return ProjectResponse.model_validate(project)
 
@@ -198,7 +202,7 @@ async def update_project(
 async def delete_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(aget_write_db)
 ):
     """
     删除项目
@@ -206,12 +210,12 @@ async def delete_project(
     - **project_id**: 项目ID
     """
     # 查找项目
-    project = db.query(Project).options(
-        joinedload(Project.documents)  # 预加载关联的文档
-    ).filter(
+    project = (await db.execute(select(Project).options(
+        selectinload(Project.documents)  # 预加载关联的文档
+    ).where(
         Project.id == project_id,
         Project.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not project:
         raise HTTPException(
@@ -220,14 +224,16 @@ async def delete_project(
         )
 
     try:
-        db.delete(project)
-        db.commit()
+        await db.delete(project)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"项目删除失败：{str(e)}"
         )
+    # 项目下的文档与企业信息随项目级联删除
+    await count_service.ainvalidate(("projects", "documents", "enterprise_infos"), current_user.id)
 
     return MessageResponse(
         message="项目删除成功",
@@ -0,0 +1,99 @@
+"""
+全文检索API路由
+在当前用户的文档与企业信息中检索，按相关度排序并返回摘要
+"""
+
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import aget_db
+from app.models.document import Document
+from app.models.enterprise import EnterpriseInfo
+from app.models.user import User
+from app.schemas.search import SearchHit, SearchResponse
+from app.services.search_index import INDEX_KINDS, make_snippet, query_terms, search_index
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/search", tags=["全文检索"])
+
+# 结果类型对应的模型
+_KIND_MODELS = {
+    "documents": Document,
+    "enterprise_infos": EnterpriseInfo,
+}
+
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="查询词（空格分隔多个词，需同时包含）"),
+    scope: str = Query("all", pattern="^(all|documents|enterprise_infos)$", description="检索范围"),
+    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+    offset: int = Query(0, ge=0, le=1000, description="跳过数量"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(aget_db)
+):
+    """
+    全文检索当前用户的文档（标题、正文）与企业信息（名称、地址、行业、简介等）
+
+    - **q**: 查询词，中文按二元组匹配，多个词之间为“且”关系
+    - **scope**: all / documents / enterprise_infos
+    - **limit** / **offset**: 分页
+
+    score 为结果在其类型内的相关度分数（越小越相关），各类型的索引分别统计词频，
+    分数只在同一类型内可比较；rank 为结果在其类型内的名次。检索全部类型时按名次合并，
+    名次相同时按相对于该类型第一名的分数排序
+    """
+    kinds = list(_KIND_MODELS) if scope == "all" else [scope]
+
+    # 每类多取一条判断是否有下一页；检索全部类型时各取前 offset + limit 条合并后再分页
+    hits = []
+    for kind_index, kind in enumerate(kinds):
+        kind_limit, kind_offset = (limit + 1, offset) if len(kinds) == 1 else (offset + limit + 1, 0)
+        ranked = await search_index.asearch(db, kind, current_user.id, q, kind_limit, kind_offset)
+        if ranked is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="全文检索不可用"
+            )
+        top_score = ranked[0][1] if ranked else 0.0
+        for position, (ref_id, score) in enumerate(ranked):
+            # 相对分数：该类型第一名为 1，越小越不相关（第一名总在本次结果中，翻页时不变）
+            relative = score / top_score if top_score else 1.0
+            rank = kind_offset + position + 1
+            hits.append(((rank, -relative, kind_index), kind, ref_id, score, rank))
+    hits.sort(key=lambda hit: hit[0])
+    if len(kinds) > 1:
+        hits = hits[offset:]
+    has_next = len(hits) > limit
+    hits = hits[:limit]
+
+    # 读取命中记录，生成摘要
+    terms = query_terms(q)
+    records = {}
+    for kind, model in _KIND_MODELS.items():
+        ids = [ref_id for _, hit_kind, ref_id, _, _ in hits if hit_kind == kind]
+        if ids:
+            rows = (await db.execute(select(model).where(
+                model.id.in_(ids),
+                model.user_id == current_user.id
+            ))).scalars().all()
+            records.update({(kind, row.id): row for row in rows})
+
+    results = []
+    for _, kind, ref_id, score, rank in hits:
+        record = records.get((kind, ref_id))
+        if record is None:
+            continue
+        title, body = INDEX_KINDS[kind]["extract"](record)
+        results.append(SearchHit(
+            kind=kind,
+            id=ref_id,
+            title=title,
+            snippet=make_snippet(body, terms),
+            score=score,
+            rank=rank,
+            updated_at=record.updated_at
+        ))
+
+    return SearchResponse(query=q, results=results, has_next=has_next)
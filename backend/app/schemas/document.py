@@ -81,10 +81,14 @@ class DocumentResponse(DocumentBase):
 class DocumentListResponse(BaseModel):
     """文档列表响应（分页）"""
     documents: List[DocumentResponse]
-    total: int
-    page: int
+    # 游标分页（传入 cursor）时 page 为空；total_mode=none（游标分页默认）时 total / total_pages 为空
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    # 下一页游标（没有下一页时为空）
+    next_cursor: Optional[str] = None
+    has_next: bool = False
 
 class DocumentAutoSave(BaseModel):
     """自动保存请求"""
@@ -1004,10 +1004,14 @@ class EnterpriseInfoUpdate(BaseModel):
 class EnterpriseInfoList(BaseModel):
     """企业信息列表响应模式"""
     enterprise_infos: List[EnterpriseInfoResponse]
-    total: int
-    page: int
+    # 游标分页（传入 cursor）时 page 为空；total_mode=none（游标分页默认）时 total / total_pages 为空
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    # 下一页游标（没有下一页时为空）
+    next_cursor: Optional[str] = None
+    has_next: bool = False
 
 
 class EnterpriseDataRequest(BaseModel):
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class GenerationJobResponse(BaseModel):
+    """生成任务状态响应"""
+    id: str
+    job_type: str
+    status: str = Field(..., description="任务状态：pending/running/succeeded/failed")
+    enterprise_id: Optional[int] = None
+    data_hash: str
+    progress: Optional[Dict[str, Any]] = Field(None, description="进度：阶段、段落总数、已完成数及各段落状态")
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+class GenerationJobResultResponse(BaseModel):
+    """生成任务结果响应"""
+    id: str
+    status: str
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+    model_config = {
+        "from_attributes": True
+    }
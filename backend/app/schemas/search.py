@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class SearchHit(BaseModel):
+    """全文检索结果"""
+    kind: str = Field(..., description="结果类型：documents / enterprise_infos")
+    id: int
+    title: str
+    snippet: str = Field(..., description="包含查询词的摘要，查询词以 <mark> 标记")
+    score: float = Field(..., description="类型内的相关度分数（越小越相关，不同类型之间不可比较）")
+    rank: int = Field(..., description="类型内的相关度名次（从1开始）")
+    updated_at: Optional[datetime] = None
+
+class SearchResponse(BaseModel):
+    """全文检索响应"""
+    query: str
+    results: List[SearchHit]
+    has_next: bool = False
@@ -1,16 +1,203 @@
 """
 AI输出合规性检查器
 用于验证AI生成的段落是否符合专家评审要求
+
+每个段落的规则（must_cover、avoid、requirements 及通用的绝对化词语）在首次检查时编译为
+检查项列表，检查时文本只转换一次小写，不再对每个关键词重复转换。
 """
 
 import json
 import re
 import os
 import logging
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any
 
 logger = logging.getLogger(__name__)
 
+# 规则项到检查关键词的映射（未列出的规则项以自身作为关键词）
+CHECK_KEYWORDS: Dict[str, List[str]] = {
+    "scenario_liquid_leak": ["泄漏", "液体", "溢流", "渗漏"],
+    "scenario_gas_leak": ["气体", "挥发", "泄漏", "扩散"],
+    "scenario_fire": ["火灾", "燃烧", "爆炸", "灭火"],
+    "basic_company_info": ["企业", "公司", "规模", "产品"],
+    "sensitive_point_location": ["位置", "方位", "距离", "敏感点"],
+    "direction_distance": ["方位", "距离", "方向", "米"],
+    "dominant_wind_direction": ["风向", "主导风向", "风"],
+    "monitoring_plan_water_info": ["水体", "河流", "监测", "点位"],
+    "process_consistent_with_incident_scenarios": ["工艺", "流程", "事故", "场景"],
+    "management_system_existence": ["制度", "管理", "体系", "建立"],
+    "water_impact_corresponds_to_sensitive_points": ["水体", "影响", "敏感点"],
+    "gas_diffusion_mention_dominant_wind": ["气体", "扩散", "风向"],
+    "hazardous_waste_risk": ["危废", "危险废物", "风险"],
+    "reference_hj941_2018": ["HJ941", "标准", "依据"],
+    "continuous_improvement": ["持续", "改进", "提升"],
+    "specific_operable_actions": ["具体", "措施", "行动", "操作"],
+    "real_enterprise_work_situation": ["企业", "实际", "现状", "工作"],
+    "layout_rationality": ["布局", "布置", "合理", "功能"],
+    "measures_consistent_with_resources": ["措施", "资源", "一致", "匹配"],
+    "complete_process_response": ["报警", "研判", "处置", "报告"],
+    "team_capability_gaps": ["队伍", "能力", "不足", "差距"],
+    "equipment_gaps": ["装备", "设备", "不足", "差距"],
+    "training_gaps": ["培训", "知识", "不足", "差距"],
+    "drill_gaps": ["演练", "不足", "差距", "频次"],
+    "overall_evaluation": ["总体", "评价", "结论"],
+    "gaps": ["差距", "不足", "问题"],
+    "recommendations": ["建议", "措施", "改进"],
+    "data_review": ["资料", "审核", "查阅"],
+    "site_verification": ["现场", "核查", "查看", "实地"],
+    "absolute_language": ["绝对", "完全", "肯定", "一定"],
+    "emergency_organization": ["应急组织", "指挥部", "队伍"],
+    "response_measures": ["应急措施", "处置", "响应"],
+    "fabricated_terrain_data": ["海拔", "坐标", "高程"],
+    "specific_yearly_values": ["年降雨量", "年均", "毫米/年"],
+    "fabricated_equipment_or_process": ["虚构", "编造", "假设"],
+    "evaluate_perfection_level": ["完善", "不足", "良好"],
+    "provide_numerical_values": ["分贝", "dB", "毫克"],
+    "provide_decibel_values": ["分贝", "dB"],
+    "commitment_engineering_projects": ["投资", "建设", "工程"],
+    "investment_plans": ["投资", "资金", "预算"],
+    "generic_content": ["八股", "模板", "通用"],
+    "insufficient_drawings": ["图纸", "图件", "缺失"],
+    "reference_hydrology_field": ["水文", "水体", "河流"],
+    "mention_equipment_materials": ["物资", "设备", "装备"],
+    "follow_flow_structure": ["流程", "步骤", "程序"]
+}
+
+# 绝对化词语（所有段落通用）
+ABSOLUTE_WORDS = ("绝对不会", "完全不会", "绝对安全", "完全满足", "绝对不会造成影响")
+
+
+class RequirementRule(NamedTuple):
+    """特殊要求：文本中需出现 any_of 中的任一关键词（区分大小写）"""
+    any_of: Tuple[str, ...]
+    message: str
+    level: str = "issues"  # issues / warnings
+    when: Tuple[str, ...] = ()  # 非空时仅在文本包含其中任一关键词时检查
+
+
+# 特殊要求：(段落键名, 要求) -> 规则
+REQUIREMENT_RULES: Dict[Tuple[str, str], RequirementRule] = {
+    ("risk_management_conclusion", "reference_hj941_2018"): RequirementRule(
+        ("HJ941-2018", "HJ941"), "风险管理结论必须引用HJ941-2018标准"),
+    ("hydrology_description", "if_river_mentioned_upstream_downstream"): RequirementRule(
+        ("上游", "下游"), "水文描述中提到河流时必须说明上下游方向", when=("河",)),
+    ("incident_response_card", "scenario_liquid_leak"): RequirementRule(
+        ("泄漏", "液体"), "应急处置卡必须包含液体泄漏场景"),
+    ("incident_response_card", "scenario_gas_leak"): RequirementRule(
+        ("气体", "挥发"), "应急处置卡必须包含气体泄漏场景"),
+    ("incident_response_card", "scenario_fire"): RequirementRule(
+        ("火灾", "燃烧"), "应急处置卡必须包含火灾场景"),
+    ("water_environment_impact", "reference_hydrology_field"): RequirementRule(
+        ("水体", "河流", "地表水"), "建议在水环境影响分析中引用水文信息", level="warnings"),
+    ("air_environment_impact", "mention_dominant_wind"): RequirementRule(
+        ("风向", "主导风向"), "大气环境影响分析必须提到主导风向"),
+    ("solid_waste_impact", "reference_hazardous_waste_field"): RequirementRule(
+        ("危废", "危险废物"), "固体废物影响分析必须引用危险废物信息"),
+    ("risk_prevention_measures", "mention_equipment_materials"): RequirementRule(
+        ("物资", "设备", "装备"), "风险防范措施必须提到应急物资或设备"),
+    ("emergency_response_measures", "follow_flow_structure"): RequirementRule(
+        ("报警", "研判", "处置", "报告", "疏散", "警戒"), "建议应急响应措施按照流程化结构编写", level="warnings"),
+    ("investigation_process", "data_review"): RequirementRule(
+        ("资料", "审核"), "调查过程必须体现资料审核"),
+    ("investigation_process", "site_verification"): RequirementRule(
+        ("现场", "核查", "查看"), "调查过程必须体现现场查验"),
+    ("short_term_plan", "can_write_inspection_system_update"): RequirementRule(
+        ("巡检", "制度", "更新"), "短期计划可包含巡检、制度更新等内容", level="warnings"),
+}
+
+
+def _contains_any(text: str, keywords: Tuple[str, ...]) -> bool:
+    """文本是否包含任一关键词"""
+    for keyword in keywords:
+        if keyword in text:
+            return True
+    return False
+
+
+class CompiledSectionRules:
+    """
+    单个段落编译后的合规规则
+
+    规则项在编译时展开为按原有顺序排列的检查项（关键词已转换为小写、特殊要求已查表），
+    检查时文本只转换一次小写，各检查项找到任一关键词即停止查找。
+    must_cover / avoid 关键词不区分大小写，特殊要求与绝对化词语区分大小写（与原有检查一致）。
+    """
+
+    __slots__ = ("checks",)
+
+    def __init__(self, section_key: str, rules: Dict[str, Any]):
+        # 检查项：(关键词, 是否不区分大小写, 出现时为问题, 消息, 级别, 前置关键词, 原始关键词)
+        self.checks: List[Tuple[Tuple[str, ...], bool, bool, str, str, Tuple[str, ...], Tuple[str, ...]]] = []
+
+        for item in rules.get("must_cover", []):
+            original = tuple(CHECK_KEYWORDS.get(item, [item]))
+            keywords = tuple(dict.fromkeys(keyword.lower() for keyword in original))
+            self.checks.append((keywords, True, False, f"缺少必须覆盖的内容: {item}", "issues", (), original))
+
+        for item in rules.get("avoid", []):
+            original = tuple(CHECK_KEYWORDS.get(item, [item]))
+            keywords = tuple(dict.fromkeys(keyword.lower() for keyword in original))
+            self.checks.append((keywords, True, True, f"包含应避免的内容: {item}", "issues", (), original))
+
+        for requirement in rules.get("requirements", []):
+            rule = REQUIREMENT_RULES.get((section_key, requirement))
+            if rule is not None:
+                self.checks.append((rule.any_of, False, False, rule.message, rule.level, rule.when, rule.any_of))
+
+        for word in ABSOLUTE_WORDS:
+            self.checks.append(((word,), False, True, f"使用了绝对化词语: {word}", "issues", (), (word,)))
+
+    def evaluate(self, text: str, result: Dict[str, Any]) -> None:
+        """
+        检查文本，将问题与警告按规则顺序写入 result
+
+        Args:
+            text: 待检查文本
+            result: check_ai_output 的结果字典
+        """
+        lowered = text.lower()
+        for keywords, case_insensitive, fail_when_present, message, level, when, _ in self.checks:
+            if when and not _contains_any(text, when):
+                continue
+            if _contains_any(lowered if case_insensitive else text, keywords) == fail_when_present:
+                result[level].append(message)
+
+    def violations(self, text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        列出未通过的检查项（只含问题，不含警告），供定向修复使用
+
+        Args:
+            text: 待检查文本
+
+        Returns:
+            {"missing": [{"message", "keywords"}], "flagged": [{"message", "phrases"}]}；
+            missing 为缺少的内容及可用关键词，flagged 为应避免的内容及其在原文中的写法
+        """
+        lowered = text.lower()
+        missing: List[Dict[str, Any]] = []
+        flagged: List[Dict[str, Any]] = []
+        for keywords, case_insensitive, fail_when_present, message, level, when, original in self.checks:
+            if level != "issues" or (when and not _contains_any(text, when)):
+                continue
+            haystack = lowered if case_insensitive else text
+            if not fail_when_present:
+                if not _contains_any(haystack, keywords):
+                    missing.append({"message": message, "keywords": list(original)})
+                continue
+            phrases = []
+            for keyword in keywords:
+                position = haystack.find(keyword)
+                while position != -1:
+                    # 不区分大小写的关键词取原文中的写法
+                    phrase = text[position:position + len(keyword)]
+                    if phrase not in phrases:
+                        phrases.append(phrase)
+                    position = haystack.find(keyword, position + 1)
+            if phrases:
+                flagged.append({"message": message, "phrases": phrases})
+        return {"missing": missing, "flagged": flagged}
+
+
 class AIComplianceChecker:
     """AI输出合规性检查器"""
     
@@ -25,8 +212,30 @@ class AIComplianceChecker:
         with open(compliance_matrix_path, 'r', encoding='utf-8') as f:
             self.compliance_matrix = json.load(f)
         
+        # 编译后的段落规则（首次检查该段落时编译）
+        self._compiled_rules: Dict[str, CompiledSectionRules] = {}
+        
         logger.info(f"合规检查器初始化完成，已加载 {len(self.compliance_matrix)} 个段落的合规规则")
     
+    def get_compiled_rules(self, section_key: str) -> Optional[CompiledSectionRules]:
+        """
+        获取段落编译后的合规规则
+        
+        Args:
+            section_key: AI段落键名
+            
+        Returns:
+            编译后的规则，该段落没有合规规则时返回 None
+        """
+        compiled = self._compiled_rules.get(section_key)
+        if compiled is None:
+            rules = self.compliance_matrix.get(section_key)
+            if rules is None:
+                return None
+            compiled = CompiledSectionRules(section_key, rules)
+            self._compiled_rules[section_key] = compiled
+        return compiled
+    
     def check_ai_output(self, section_key: str, text: str) -> Dict[str, Any]:
         """
         检查AI输出是否符合合规要求
@@ -47,23 +256,13 @@ class AIComplianceChecker:
         }
         
         # 如果该段落没有合规规则，直接返回通过
-        if section_key not in self.compliance_matrix:
+        compiled = self.get_compiled_rules(section_key)
+        if compiled is None:
             result["warnings"].append(f"段落 {section_key} 没有对应的合规规则")
             return result
         
-        rules = self.compliance_matrix[section_key]
-        
-        # 检查必须覆盖的内容
-        if "must_cover" in rules:
-            self._check_must_cover(text, rules["must_cover"], result)
-        
-        # 检查必须避免的内容
-        if "avoid" in rules:
-            self._check_avoid(text, rules["avoid"], result)
-        
-        # 检查特殊要求
-        if "requirements" in rules:
-            self._check_requirements(section_key, text, rules["requirements"], result)
+        # 必须覆盖、必须避免、特殊要求与绝对化词语
+        compiled.evaluate(text, result)
         
         # 通用检查
         self._check_general_compliance(text, result)
@@ -75,161 +274,37 @@ class AIComplianceChecker:
         
         return result
     
-    def _check_must_cover(self, text: str, must_cover_items: List[str], result: Dict):
-        """检查必须覆盖的内容"""
-        for item in must_cover_items:
-            # 将规则项转换为检查关键词
-            keywords = self._get_check_keywords(item)
-            
-            # 检查是否包含至少一个关键词
-            found = False
-            for keyword in keywords:
-                if keyword.lower() in text.lower():
-                    found = True
-                    break
-            
-            if not found:
-                result["issues"].append(f"缺少必须覆盖的内容: {item}")
-    
-    def _check_avoid(self, text: str, avoid_items: List[str], result: Dict):
-        """检查必须避免的内容"""
-        for item in avoid_items:
-            # 将规则项转换为检查关键词
-            keywords = self._get_check_keywords(item)
-            
-            # 检查是否包含关键词
-            for keyword in keywords:
-                if keyword.lower() in text.lower():
-                    result["issues"].append(f"包含应避免的内容: {item}")
-                    break
-    
-    def _check_requirements(self, section_key: str, text: str, requirements: List[str], result: Dict):
-        """检查特殊要求"""
-        for requirement in requirements:
-            if section_key == "risk_management_conclusion" and requirement == "reference_hj941_2018":
-                if "HJ941-2018" not in text and "HJ941" not in text:
-                    result["issues"].append("风险管理结论必须引用HJ941-2018标准")
-            
-            elif section_key == "hydrology_description" and requirement == "if_river_mentioned_upstream_downstream":
-                if "河" in text and ("上游" not in text and "下游" not in text):
-                    result["issues"].append("水文描述中提到河流时必须说明上下游方向")
-            
-            elif section_key == "incident_response_card" and requirement == "scenario_liquid_leak":
-                if "泄漏" not in text and "液体" not in text:
-                    result["issues"].append("应急处置卡必须包含液体泄漏场景")
-            
-            elif section_key == "incident_response_card" and requirement == "scenario_gas_leak":
-                if "气体" not in text and "挥发" not in text:
-                    result["issues"].append("应急处置卡必须包含气体泄漏场景")
-            
-            elif section_key == "incident_response_card" and requirement == "scenario_fire":
-                if "火灾" not in text and "燃烧" not in text:
-                    result["issues"].append("应急处置卡必须包含火灾场景")
-            
-            elif section_key == "water_environment_impact" and requirement == "reference_hydrology_field":
-                # 检查是否引用了水文字段相关内容
-                if "水体" not in text and "河流" not in text and "地表水" not in text:
-                    result["warnings"].append("建议在水环境影响分析中引用水文信息")
-            
-            elif section_key == "air_environment_impact" and requirement == "mention_dominant_wind":
-                if "风向" not in text and "主导风向" not in text:
-                    result["issues"].append("大气环境影响分析必须提到主导风向")
-            
-            elif section_key == "solid_waste_impact" and requirement == "reference_hazardous_waste_field":
-                if "危废" not in text and "危险废物" not in text:
-                    result["issues"].append("固体废物影响分析必须引用危险废物信息")
-            
-            elif section_key == "risk_prevention_measures" and requirement == "mention_equipment_materials":
-                if "物资" not in text and "设备" not in text and "装备" not in text:
-                    result["issues"].append("风险防范措施必须提到应急物资或设备")
-            
-            elif section_key == "emergency_response_measures" and requirement == "follow_flow_structure":
-                # 检查是否有流程化结构
-                flow_indicators = ["报警", "研判", "处置", "报告", "疏散", "警戒"]
-                found_flow = any(indicator in text for indicator in flow_indicators)
-                if not found_flow:
-                    result["warnings"].append("建议应急响应措施按照流程化结构编写")
-            
-            elif section_key == "investigation_process" and requirement == "data_review":
-                if "资料" not in text and "审核" not in text:
-                    result["issues"].append("调查过程必须体现资料审核")
-            
-            elif section_key == "investigation_process" and requirement == "site_verification":
-                if "现场" not in text and "核查" not in text and "查看" not in text:
-                    result["issues"].append("调查过程必须体现现场查验")
+    def get_violations(self, section_key: str, text: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        获取段落未通过的合规问题明细（缺少的内容与应避免的原文词语）
+        
+        Args:
+            section_key: AI段落键名
+            text: AI生成的文本内容
             
-            elif section_key == "short_term_plan" and requirement == "can_write_inspection_system_update":
-                if "巡检" not in text and "制度" not in text and "更新" not in text:
-                    result["warnings"].append("短期计划可包含巡检、制度更新等内容")
+        Returns:
+            {"missing": [...], "flagged": [...]}，该段落没有合规规则时均为空
+        """
+        compiled = self.get_compiled_rules(section_key)
+        if compiled is None:
+            return {"missing": [], "flagged": []}
+        return compiled.violations(text)
     
     def _check_general_compliance(self, text: str, result: Dict):
-        """通用合规性检查"""
-        # 检查绝对化词语
-        absolute_words = ["绝对不会", "完全不会", "绝对安全", "完全满足", "绝对不会造成影响"]
-        for word in absolute_words:
-            if word in text:
-                result["issues"].append(f"使用了绝对化词语: {word}")
-        
+        """通用合规性检查（绝对化词语已编入段落规则）"""
         # 检查是否过于简短
         if len(text) < 50:
             result["warnings"].append("内容过于简短，可能不够详细")
         
         # 检查是否只有标题没有内容
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        lines = [line for line in text.split('\n') if line.strip()]
         if len(lines) < 3:
             result["warnings"].append("内容结构过于简单，建议增加更多细节")
     
-    def _get_check_keywords(self, rule_item: str) -> List[str]:
+    @staticmethod
+    def _get_check_keywords(rule_item: str) -> List[str]:
         """根据规则项生成检查关键词"""
-        keyword_map = {
-            "scenario_liquid_leak": ["泄漏", "液体", "溢流", "渗漏"],
-            "scenario_gas_leak": ["气体", "挥发", "泄漏", "扩散"],
-            "scenario_fire": ["火灾", "燃烧", "爆炸", "灭火"],
-            "basic_company_info": ["企业", "公司", "规模", "产品"],
-            "sensitive_point_location": ["位置", "方位", "距离", "敏感点"],
-            "direction_distance": ["方位", "距离", "方向", "米"],
-            "dominant_wind_direction": ["风向", "主导风向", "风"],
-            "monitoring_plan_water_info": ["水体", "河流", "监测", "点位"],
-            "process_consistent_with_incident_scenarios": ["工艺", "流程", "事故", "场景"],
-            "management_system_existence": ["制度", "管理", "体系", "建立"],
-            "water_impact_corresponds_to_sensitive_points": ["水体", "影响", "敏感点"],
-            "gas_diffusion_mention_dominant_wind": ["气体", "扩散", "风向"],
-            "hazardous_waste_risk": ["危废", "危险废物", "风险"],
-            "reference_hj941_2018": ["HJ941", "标准", "依据"],
-            "continuous_improvement": ["持续", "改进", "提升"],
-            "specific_operable_actions": ["具体", "措施", "行动", "操作"],
-            "real_enterprise_work_situation": ["企业", "实际", "现状", "工作"],
-            "layout_rationality": ["布局", "布置", "合理", "功能"],
-            "measures_consistent_with_resources": ["措施", "资源", "一致", "匹配"],
-            "complete_process_response": ["报警", "研判", "处置", "报告"],
-            "team_capability_gaps": ["队伍", "能力", "不足", "差距"],
-            "equipment_gaps": ["装备", "设备", "不足", "差距"],
-            "training_gaps": ["培训", "知识", "不足", "差距"],
-            "drill_gaps": ["演练", "不足", "差距", "频次"],
-            "overall_evaluation": ["总体", "评价", "结论"],
-            "gaps": ["差距", "不足", "问题"],
-            "recommendations": ["建议", "措施", "改进"],
-            "data_review": ["资料", "审核", "查阅"],
-            "site_verification": ["现场", "核查", "查看", "实地"],
-            "absolute_language": ["绝对", "完全", "肯定", "一定"],
-            "emergency_organization": ["应急组织", "指挥部", "队伍"],
-            "response_measures": ["应急措施", "处置", "响应"],
-            "fabricated_terrain_data": ["海拔", "坐标", "高程"],
-            "specific_yearly_values": ["年降雨量", "年均", "毫米/年"],
-            "fabricated_equipment_or_process": ["虚构", "编造", "假设"],
-            "evaluate_perfection_level": ["完善", "不足", "良好"],
-            "provide_numerical_values": ["分贝", "dB", "毫克"],
-            "provide_decibel_values": ["分贝", "dB"],
-            "commitment_engineering_projects": ["投资", "建设", "工程"],
-            "investment_plans": ["投资", "资金", "预算"],
-            "generic_content": ["八股", "模板", "通用"],
-            "insufficient_drawings": ["图纸", "图件", "缺失"],
-            "reference_hydrology_field": ["水文", "水体", "河流"],
-            "mention_equipment_materials": ["物资", "设备", "装备"],
-            "follow_flow_structure": ["流程", "步骤", "程序"]
-        }
-        
-        return keyword_map.get(rule_item, [rule_item])
+        return CHECK_KEYWORDS.get(rule_item, [rule_item])
     
     def check_multiple_sections(self, sections_data: Dict[str, str]) -> Dict[str, Any]:
         """
@@ -5,10 +5,16 @@ AI 服务 - 支持多种 AI 模型和重试机制，包含使用量统计和限
 import os
 import time
 import json
-from typing import Dict, Optional, Tuple
+import random
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from datetime import datetime, date
 import logging
 
+from .single_flight import ai_generation_flight, make_flight_key
+from ..utils.async_clients import LoopBoundClients
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +32,17 @@ class AIService:
         self.user_daily_limit = int(os.getenv("AI_USER_DAILY_LIMIT", "10"))
         self.request_timeout = int(os.getenv("AI_REQUEST_TIMEOUT", "30"))
         self.max_retries = int(os.getenv("AI_MAX_RETRIES", "3"))
+        self.max_backoff = float(os.getenv("AI_MAX_BACKOFF", "30"))
+        
+        # 连接池配置（长连接复用，避免每次调用重新建立 TLS 连接）
+        self.max_connections = int(os.getenv("AI_MAX_CONNECTIONS", "50"))
+        self.max_keepalive_connections = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.keepalive_expiry = float(os.getenv("AI_KEEPALIVE_EXPIRY", "60"))
+        
+        # 长期复用的客户端（延迟创建）
+        self._client = None
+        self._async_clients = LoopBoundClients(self._create_async_client, lambda client: client.close())
+        self._client_lock = threading.Lock()
         
         # 使用量统计（内存存储，生产环境应使用Redis或数据库）
         self._usage_stats = {
@@ -105,6 +122,131 @@ class AIService:
         
         return True
 
+    def _build_http_limits(self):
+        """构建 httpx 连接池限制"""
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _get_client(self):
+        """获取长期复用的同步 OpenAI 客户端（线程安全，延迟创建）"""
+        if self._client is not None:
+            return self._client
+
+        try:
+            import httpx
+            from openai import OpenAI
+        except ImportError:
+            raise ImportError("请安装 openai 包: pip install openai")
+
+        with self._client_lock:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    timeout=self.request_timeout,
+                    max_retries=0,  # 重试由本服务统一控制
+                    http_client=httpx.Client(limits=self._build_http_limits())
+                )
+        return self._client
+
+    def _get_async_client(self):
+        """
+        获取当前事件循环长期复用的异步 OpenAI 客户端
+
+        httpx 连接池绑定在创建它的事件循环上，每个事件循环（如测试中多次 asyncio.run）使用各自的客户端。
+        """
+        return self._async_clients.get()
+
+    def _create_async_client(self):
+        """创建异步 OpenAI 客户端"""
+        try:
+            import httpx
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise ImportError("请安装 openai 包: pip install openai")
+
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.request_timeout,
+            max_retries=0,  # 重试由本服务统一控制
+            http_client=httpx.AsyncClient(limits=self._build_http_limits())
+        )
+
+    async def aclose(self):
+        """关闭长期复用的客户端连接（应用关闭时调用）"""
+        await self._async_clients.aclose()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _build_completion_kwargs(self, prompt: str, config: Dict) -> Dict[str, Any]:
+        """构建 chat.completions.create 参数"""
+        return {
+            "model": config.get("model", self.default_model),
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": config.get("temperature", 0.7),
+            "max_tokens": config.get("max_tokens", 2000)
+        }
+
+    def _extract_content(self, response) -> str:
+        """从响应中提取生成文本"""
+        content = response.choices[0].message.content
+        if not content:
+            raise ValueError("API 返回空内容")
+
+        logger.info(f"AI 生成成功，返回 {len(content)} 字符")
+        return content
+
+    def _get_retry_delay(self, error: Exception, attempt: int, max_retries: int) -> float:
+        """
+        根据错误类型计算重试等待时间（指数退避 + 抖动）
+
+        Args:
+            error: 本次调用的异常
+            attempt: 当前尝试序号（从 0 开始）
+            max_retries: 最大重试次数
+
+        Returns:
+            等待秒数
+
+        Raises:
+            ValueError: 认证失败等不可重试的错误
+        """
+        error_msg = str(error).lower()
+
+        # 根据错误类型进行不同处理
+        if "rate_limit" in error_msg or "too many requests" in error_msg:
+            logger.warning(f"API 速率限制 (尝试 {attempt + 1}/{max_retries}): {error}")
+            # 优先遵循服务端返回的 Retry-After
+            retry_after = None
+            response = getattr(error, "response", None)
+            if response is not None:
+                try:
+                    retry_after = float(response.headers.get("retry-after"))
+                except (TypeError, ValueError):
+                    retry_after = None
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+            base_delay = 4.0
+        elif "timeout" in error_msg:
+            logger.warning(f"API 超时 (尝试 {attempt + 1}/{max_retries}): {error}")
+            base_delay = 1.0
+        elif "authentication" in error_msg or "unauthorized" in error_msg:
+            logger.error(f"API 认证失败: {error}")
+            raise ValueError("API 密钥无效或已过期")
+        else:
+            logger.warning(f"API 调用失败 (尝试 {attempt + 1}/{max_retries}): {error}")
+            base_delay = 1.0
+
+        # 指数退避，并加入抖动避免多个请求同时重试
+        delay = min(base_delay * (2 ** attempt), self.max_backoff)
+        return delay * (0.5 + random.random() * 0.5)
+
     def _call_openai_with_retry(
         self,
         prompt: str,
@@ -112,7 +254,7 @@ class AIService:
         max_retries: Optional[int] = None
     ) -> str:
         """
-        调用 OpenAI API（带重试机制）
+        调用 OpenAI API（带重试机制，同步版本，供工作线程使用）
 
         Args:
             prompt: Prompt 文本
@@ -127,17 +269,8 @@ class AIService:
         """
         if not self._validate_api_key():
             raise ValueError("无效的 OpenAI API 密钥")
-        
-        try:
-            from openai import OpenAI
-        except ImportError:
-            raise ImportError("请安装 openai 包: pip install openai")
 
-        client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url,
-            timeout=self.request_timeout
-        )
+        client = self._get_client()
 
         max_retries = max_retries or self.max_retries
         last_error = None
@@ -145,48 +278,138 @@ class AIService:
         for attempt in range(max_retries):
             try:
                 logger.info(f"调用 OpenAI API (尝试 {attempt + 1}/{max_retries})")
+                response = client.chat.completions.create(**self._build_completion_kwargs(prompt, config))
+                return self._extract_content(response)
 
-                response = client.chat.completions.create(
-                    model=config.get("model", self.default_model),
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=config.get("temperature", 0.7),
-                    max_tokens=config.get("max_tokens", 2000)
-                )
+            except Exception as e:
+                last_error = e
+                wait_time = self._get_retry_delay(e, attempt, max_retries)
 
-                content = response.choices[0].message.content
-                if not content:
-                    raise ValueError("API 返回空内容")
-                
-                logger.info(f"AI 生成成功，返回 {len(content)} 字符")
-                return content
+                # 如果不是最后一次尝试，等待后重试
+                if attempt < max_retries - 1:
+                    logger.info(f"等待 {wait_time:.2f} 秒后重试...")
+                    time.sleep(wait_time)
+
+        # 所有重试都失败
+        logger.error(f"AI 生成失败，已重试 {max_retries} 次: {last_error}")
+        raise Exception(f"AI 生成失败: {last_error}")
+
+    async def _acall_openai_with_retry(
+        self,
+        prompt: str,
+        config: Dict,
+        max_retries: Optional[int] = None
+    ) -> str:
+        """
+        调用 OpenAI API（带重试机制，异步版本）
+
+        退避等待使用 asyncio.sleep，不会阻塞事件循环。
+
+        Args:
+            prompt: Prompt 文本
+            config: AI 配置
+            max_retries: 最大重试次数（None 使用默认值）
+
+        Returns:
+            生成的文本
+
+        Raises:
+            Exception: 所有重试失败后抛出异常
+        """
+        if not self._validate_api_key():
+            raise ValueError("无效的 OpenAI API 密钥")
+
+        client = self._get_async_client()
+
+        max_retries = max_retries or self.max_retries
+        last_error = None
+
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"异步调用 OpenAI API (尝试 {attempt + 1}/{max_retries})")
+                response = await client.chat.completions.create(**self._build_completion_kwargs(prompt, config))
+                return self._extract_content(response)
 
             except Exception as e:
                 last_error = e
-                error_msg = str(e)
-                
-                # 根据错误类型进行不同处理
-                if "rate_limit" in error_msg.lower() or "too many requests" in error_msg.lower():
-                    logger.warning(f"API 速率限制 (尝试 {attempt + 1}/{max_retries}): {e}")
-                    wait_time = 60  # 速率限制时等待更长时间
-                elif "timeout" in error_msg.lower():
-                    logger.warning(f"API 超时 (尝试 {attempt + 1}/{max_retries}): {e}")
-                    wait_time = 5
-                elif "authentication" in error_msg.lower() or "unauthorized" in error_msg.lower():
-                    logger.error(f"API 认证失败: {e}")
-                    raise ValueError("API 密钥无效或已过期")
-                else:
-                    logger.warning(f"API 调用失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                    wait_time = 2 ** attempt  # 指数退避：2, 4, 8 秒
+                wait_time = self._get_retry_delay(e, attempt, max_retries)
 
                 # 如果不是最后一次尝试，等待后重试
                 if attempt < max_retries - 1:
-                    logger.info(f"等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
+                    logger.info(f"等待 {wait_time:.2f} 秒后重试...")
+                    await asyncio.sleep(wait_time)
 
         # 所有重试都失败
         logger.error(f"AI 生成失败，已重试 {max_retries} 次: {last_error}")
         raise Exception(f"AI 生成失败: {last_error}")
 
+    async def _astream_openai_with_retry(
+        self,
+        prompt: str,
+        config: Dict,
+        max_retries: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式调用 OpenAI API（stream=True）
+
+        只在收到第一个 token 之前重试；开始输出后发生的错误直接抛出，避免重复内容。
+
+        Args:
+            prompt: Prompt 文本
+            config: AI 配置
+            max_retries: 最大重试次数（None 使用默认值）
+
+        Yields:
+            生成的文本片段
+        """
+        if not self._validate_api_key():
+            raise ValueError("无效的 OpenAI API 密钥")
+
+        client = self._get_async_client()
+
+        max_retries = max_retries or self.max_retries
+        last_error = None
+
+        for attempt in range(max_retries):
+            started = False
+            try:
+                logger.info(f"流式调用 OpenAI API (尝试 {attempt + 1}/{max_retries})")
+                stream = await client.chat.completions.create(
+                    stream=True,
+                    **self._build_completion_kwargs(prompt, config)
+                )
+                total_length = 0
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        started = True
+                        total_length += len(delta)
+                        yield delta
+
+                if not started:
+                    raise ValueError("API 返回空内容")
+
+                logger.info(f"AI 流式生成成功，返回 {total_length} 字符")
+                return
+
+            except Exception as e:
+                if started:
+                    logger.error(f"AI 流式生成中断: {e}")
+                    raise
+                last_error = e
+                wait_time = self._get_retry_delay(e, attempt, max_retries)
+
+                # 如果不是最后一次尝试，等待后重试
+                if attempt < max_retries - 1:
+                    logger.info(f"等待 {wait_time:.2f} 秒后重试...")
+                    await asyncio.sleep(wait_time)
+
+        # 所有重试都失败
+        logger.error(f"AI 流式生成失败，已重试 {max_retries} 次: {last_error}")
+        raise Exception(f"AI 生成失败: {last_error}")
+
     def _mock_generate(self, prompt: str, config: Dict) -> str:
         """
         模拟 AI 生成（用于测试和无 API Key 时）
@@ -254,6 +477,23 @@ AI_MODEL=gpt-4  # 可选
 {prompt[:300]}...
 """
 
+    def _should_use_mock(self, use_mock: Optional[bool], user_id: Optional[str]) -> bool:
+        """判断是否使用模拟生成（无 API Key 或超过使用限制时降级）"""
+        # 自动判断是否使用模拟
+        if use_mock is None:
+            use_mock = not self.api_key
+        
+        # 检查使用量限制（仅对真实API调用）
+        if not use_mock:
+            allowed, reason = self._check_usage_limits(user_id)
+            if not allowed:
+                logger.warning(f"AI 生成被拒绝: {reason}")
+                # 如果超过限制，降级到模拟生成
+                logger.info("超过使用限制，降级到模拟生成")
+                use_mock = True
+        
+        return use_mock
+
     def generate(
         self,
         prompt: str,
@@ -273,19 +513,20 @@ AI_MODEL=gpt-4  # 可选
         Returns:
             生成的文本
         """
-        # 自动判断是否使用模拟
-        if use_mock is None:
-            use_mock = not self.api_key
-        
-        # 检查使用量限制（仅对真实API调用）
-        if not use_mock:
-            allowed, reason = self._check_usage_limits(user_id)
-            if not allowed:
-                logger.warning(f"AI 生成被拒绝: {reason}")
-                # 如果超过限制，降级到模拟生成
-                logger.info("超过使用限制，降级到模拟生成")
-                use_mock = True
-        
+        use_mock = self._should_use_mock(use_mock, user_id)
+        # 相同 Prompt 与配置的并发请求只调用一次模型
+        return ai_generation_flight.do(
+            self._flight_key(prompt, config, use_mock),
+            lambda: self._generate_once(prompt, config, user_id, use_mock)
+        )
+
+    @staticmethod
+    def _flight_key(prompt: str, config: Dict, use_mock: bool) -> str:
+        """请求合并键（不含用户ID：不同用户的相同请求同样合并）"""
+        return make_flight_key(prompt, json.dumps(config, sort_keys=True, ensure_ascii=False, default=str), use_mock)
+
+    def _generate_once(self, prompt: str, config: Dict, user_id: Optional[str], use_mock: bool) -> str:
+        """执行一次生成（真实API失败时降级到模拟生成）"""
         try:
             if use_mock:
                 result = self._mock_generate(prompt, config)
@@ -305,6 +546,98 @@ AI_MODEL=gpt-4  # 可选
             else:
                 raise
 
+    async def agenerate(
+        self,
+        prompt: str,
+        config: Dict,
+        user_id: Optional[str] = None,
+        use_mock: Optional[bool] = None
+    ) -> str:
+        """
+        异步生成 AI 内容（供 async 路由使用，不阻塞事件循环）
+
+        Args:
+            prompt: Prompt 文本
+            config: AI 配置
+            user_id: 用户ID（用于使用量统计）
+            use_mock: 是否使用模拟生成（None 表示自动判断）
+
+        Returns:
+            生成的文本
+        """
+        use_mock = self._should_use_mock(use_mock, user_id)
+        # 相同 Prompt 与配置的并发请求共享同一次模型调用
+        return await ai_generation_flight.ado(
+            self._flight_key(prompt, config, use_mock),
+            lambda: self._agenerate_once(prompt, config, user_id, use_mock)
+        )
+
+    async def _agenerate_once(self, prompt: str, config: Dict, user_id: Optional[str], use_mock: bool) -> str:
+        """异步执行一次生成（真实API失败时降级到模拟生成）"""
+        try:
+            if use_mock:
+                result = self._mock_generate(prompt, config)
+            else:
+                result = await self._acall_openai_with_retry(prompt, config)
+                # 只有真实API调用才记录使用量
+                self._record_usage(user_id)
+
+            return result
+
+        except Exception as e:
+            logger.error(f"AI 生成失败: {e}")
+            # 如果真实API失败，尝试降级到模拟生成
+            if not use_mock:
+                logger.info("真实API失败，降级到模拟生成")
+                return self._mock_generate(prompt, config)
+            else:
+                raise
+
+    async def astream(
+        self,
+        prompt: str,
+        config: Dict,
+        user_id: Optional[str] = None,
+        use_mock: Optional[bool] = None,
+        chunk_size: int = 16
+    ) -> AsyncIterator[str]:
+        """
+        流式生成 AI 内容（逐段返回 token）
+
+        真实 API 在输出第一个 token 前失败时降级到模拟生成；模拟生成按 chunk_size 分段返回。
+
+        Args:
+            prompt: Prompt 文本
+            config: AI 配置
+            user_id: 用户ID（用于使用量统计）
+            use_mock: 是否使用模拟生成（None 表示自动判断）
+            chunk_size: 模拟生成时每段的字符数
+
+        Yields:
+            生成的文本片段
+        """
+        use_mock = self._should_use_mock(use_mock, user_id)
+
+        if not use_mock:
+            started = False
+            try:
+                async for delta in self._astream_openai_with_retry(prompt, config):
+                    started = True
+                    yield delta
+                # 只有真实API调用才记录使用量
+                self._record_usage(user_id)
+                return
+            except Exception as e:
+                logger.error(f"AI 流式生成失败: {e}")
+                if started:
+                    raise
+                logger.info("真实API失败，降级到模拟生成")
+
+        content = self._mock_generate(prompt, config)
+        for i in range(0, len(content), chunk_size):
+            yield content[i:i + chunk_size]
+            await asyncio.sleep(0)
+
     def is_available(self) -> bool:
         """检查 AI 服务是否可用"""
         return self.api_key is not None and self._validate_api_key()
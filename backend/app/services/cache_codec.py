@@ -0,0 +1,171 @@
+"""
+缓存编解码器
+负责缓存值的序列化（json / orjson / msgpack）与按大小阈值压缩（zlib / zstd）
+
+编码格式：版本字节 + 标志字节 + 数据
+- 标志字节低 4 位为序列化方式，0x10 位表示数据经过压缩，0x20 位表示使用 zstd 压缩
+- 旧版本写入的纯 JSON 文本（首字节不是版本字节）仍可解码，便于平滑迁移
+"""
+
+import os
+import json
+import zlib
+import logging
+from typing import Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 编码格式版本（变更编码格式时递增，旧版本数据按版本分支解码）
+CODEC_VERSION = 1
+
+# 序列化方式
+SERIALIZER_JSON = 0
+SERIALIZER_ORJSON = 1
+SERIALIZER_MSGPACK = 2
+
+# 标志位
+FLAG_COMPRESSED = 0x10
+FLAG_ZSTD = 0x20
+
+SERIALIZER_NAMES = {
+    "json": SERIALIZER_JSON,
+    "orjson": SERIALIZER_ORJSON,
+    "msgpack": SERIALIZER_MSGPACK
+}
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+
+class CacheCodec:
+    """缓存编解码器"""
+
+    def __init__(self, serializer: Optional[str] = None, compression: Optional[str] = None,
+                 compress_threshold: Optional[int] = None, compress_level: Optional[int] = None):
+        """
+        初始化编解码器
+
+        Args:
+            serializer: 序列化方式（json/orjson/msgpack），None 使用 CACHE_CODEC，
+                        依赖未安装时降级为 json
+            compression: 压缩方式（zlib/zstd/none），None 使用 CACHE_COMPRESSION
+            compress_threshold: 超过该字节数才压缩，None 使用 CACHE_COMPRESS_THRESHOLD
+            compress_level: 压缩级别，None 使用 CACHE_COMPRESS_LEVEL
+        """
+        serializer = (serializer or os.getenv("CACHE_CODEC", "orjson")).lower()
+        if serializer == "orjson" and orjson is None:
+            logger.warning("未安装 orjson，缓存序列化降级为 json")
+            serializer = "json"
+        if serializer == "msgpack" and msgpack is None:
+            logger.warning("未安装 msgpack，缓存序列化降级为 json")
+            serializer = "json"
+        if serializer not in SERIALIZER_NAMES:
+            raise ValueError(f"不支持的缓存序列化方式: {serializer}")
+
+        compression = (compression or os.getenv("CACHE_COMPRESSION", "zlib")).lower()
+        if compression == "zstd" and zstandard is None:
+            logger.warning("未安装 zstandard，缓存压缩降级为 zlib")
+            compression = "zlib"
+        if compression not in ("zlib", "zstd", "none"):
+            raise ValueError(f"不支持的缓存压缩方式: {compression}")
+
+        self.serializer = serializer
+        self.serializer_id = SERIALIZER_NAMES[serializer]
+        self.compression = compression
+        self.compress_threshold = compress_threshold if compress_threshold is not None else int(os.getenv("CACHE_COMPRESS_THRESHOLD", "4096"))
+        self.compress_level = compress_level if compress_level is not None else int(os.getenv("CACHE_COMPRESS_LEVEL", "6" if compression == "zlib" else "3"))
+
+        self._zstd_compressor = zstandard.ZstdCompressor(level=self.compress_level) if compression == "zstd" else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def _dumps(self, value: Any) -> tuple:
+        """序列化，返回（序列化方式, 字节）"""
+        if self.serializer_id == SERIALIZER_ORJSON:
+            try:
+                return SERIALIZER_ORJSON, orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # orjson 不支持的类型（如超大整数）回退到标准库
+                pass
+        elif self.serializer_id == SERIALIZER_MSGPACK:
+            try:
+                return SERIALIZER_MSGPACK, msgpack.packb(value, use_bin_type=True)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return SERIALIZER_JSON, json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def _loads(serializer_id: int, payload: bytes) -> Any:
+        """反序列化"""
+        if serializer_id == SERIALIZER_ORJSON:
+            return orjson.loads(payload) if orjson is not None else json.loads(payload)
+        if serializer_id == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("缓存数据使用 msgpack 编码，但未安装 msgpack")
+            return msgpack.unpackb(payload, raw=False)
+        return json.loads(payload)
+
+    def encode(self, value: Any) -> bytes:
+        """
+        编码缓存值
+
+        Args:
+            value: 可序列化的值
+
+        Returns:
+            编码后的字节
+        """
+        serializer_id, payload = self._dumps(value)
+        flags = serializer_id
+
+        if self.compression != "none" and len(payload) >= self.compress_threshold:
+            if self._zstd_compressor is not None:
+                compressed = self._zstd_compressor.compress(payload)
+                compressed_flags = flags | FLAG_COMPRESSED | FLAG_ZSTD
+            else:
+                compressed = zlib.compress(payload, self.compress_level)
+                compressed_flags = flags | FLAG_COMPRESSED
+            # 压缩无收益时保留原始数据
+            if len(compressed) < len(payload):
+                payload, flags = compressed, compressed_flags
+
+        return bytes((CODEC_VERSION, flags)) + payload
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """
+        解码缓存值（兼容旧版本写入的纯 JSON 文本）
+
+        Args:
+            data: 编码后的字节或旧版 JSON 文本
+
+        Returns:
+            原始值
+        """
+        if isinstance(data, str):
+            return json.loads(data)
+
+        if not data or data[0] != CODEC_VERSION:
+            return json.loads(data)
+
+        flags = data[1]
+        payload = data[2:]
+        if flags & FLAG_COMPRESSED:
+            if flags & FLAG_ZSTD:
+                if self._zstd_decompressor is None:
+                    raise ValueError("缓存数据使用 zstd 压缩，但未安装 zstandard")
+                payload = self._zstd_decompressor.decompress(payload)
+            else:
+                payload = zlib.decompress(payload)
+
+        return self._loads(flags & 0x0F, payload)
@@ -4,11 +4,15 @@
 
 import json
 import os
+import time
+import heapq
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Union
 import logging
 
+from .cache_codec import CacheCodec
 from ..utils.error_handler import (
     ErrorCategory, ErrorSeverity, handle_error, with_error_handling,
     CircuitBreaker, RetryPolicy, fallback_handler
@@ -16,17 +20,29 @@ from ..utils.error_handler import (
 
 logger = logging.getLogger(__name__)
 
+# 后端存储的缓存值（CacheCodec 编码后的字节；兼容旧版 JSON 文本）
+CacheValue = Union[str, bytes]
+
+
+# 释放锁脚本：仅当锁仍由当前持有者持有时删除
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
 
 class CacheBackend(ABC):
     """缓存后端抽象基类"""
 
     @abstractmethod
-    def get(self, key: str) -> Optional[str]:
+    def get(self, key: str) -> Optional[CacheValue]:
         """获取缓存"""
         pass
 
     @abstractmethod
-    def set(self, key: str, value: str, ttl: int = 3600) -> bool:
+    def set(self, key: str, value: CacheValue, ttl: int = 3600) -> bool:
         """设置缓存"""
         pass
 
@@ -45,56 +61,220 @@ class CacheBackend(ABC):
         """检查键是否存在"""
         pass
 
+    def get_many(self, keys: List[str]) -> Dict[str, CacheValue]:
+        """批量获取缓存（默认逐个读取），只返回命中的键"""
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set_many(self, items: Dict[str, CacheValue], ttl: int = 3600) -> bool:
+        """批量设置缓存（默认逐个写入）"""
+        success = True
+        for key, value in items.items():
+            success = self.set(key, value, ttl) and success
+        return success
+
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """
+        获取跨进程锁（默认不支持，返回 None；进程内缓存无需跨进程协调）
+
+        Args:
+            key: 锁键
+            token: 持有者标识（释放时校验）
+            ttl_ms: 锁自动过期毫秒数（持有者崩溃时不会永久占用）
+
+        Returns:
+            True 获取成功，False 已被其他持有者占用，None 后端不支持
+        """
+        return None
+
+    def release_lock(self, key: str, token: str) -> bool:
+        """释放跨进程锁（仅持有者可释放）"""
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取后端统计信息"""
+        return {}
+
 
 class MemoryCacheBackend(CacheBackend):
-    """内存缓存后端（降级方案）"""
+    """
+    内存缓存后端（降级方案）
 
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        logger.info("使用内存缓存后端")
+    有界 LRU：超过最大条目数或最大字节数时淘汰最久未使用的条目（OrderedDict，O(1)）。
+    过期时间使用单调时钟，并记录在最小堆中，写入时按堆顶批量清理已过期的键（均摊 O(log n)）。
+    """
 
-    def get(self, key: str) -> Optional[str]:
-        """获取缓存"""
-        if key not in self._cache:
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        初始化内存缓存
+
+        Args:
+            max_entries: 最大条目数，None 使用 CACHE_MAX_ENTRIES
+            max_bytes: 最大总字节数，None 使用 CACHE_MAX_BYTES
+        """
+        self.max_entries = max_entries or int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self.max_bytes = max_bytes or int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+        # key -> (value, 过期时刻, 字节数)，按访问顺序排列（末尾为最近使用）
+        self._cache: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        # (过期时刻, key) 最小堆；键被覆盖或删除后堆中的旧记录在弹出时忽略
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "evictions": 0,
+            "expirations": 0,
+            "rejected": 0
+        }
+        logger.info(f"使用内存缓存后端（最大条目数: {self.max_entries}, 最大字节数: {self.max_bytes}）")
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        """计算值的字节数"""
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        return len(value.encode("utf-8"))
+
+    def _remove(self, key: str):
+        """删除条目并更新字节统计（调用方需持有锁）"""
+        _, _, size = self._cache.pop(key)
+        self._total_bytes -= size
+
+    def _sweep_expired(self, now: float):
+        """按堆顶清理已过期的键（调用方需持有锁）"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            item = self._cache.get(key)
+            # 仅当堆记录与当前条目一致时才删除（键可能已被覆盖）
+            if item is not None and item[1] == expires_at:
+                self._remove(key)
+                self._stats["expirations"] += 1
+
+        # 被覆盖/删除的键在堆中残留过多时重建堆，保证堆大小与条目数同阶
+        if len(heap) > 2 * len(self._cache) + 64:
+            self._expiry_heap = [(item[1], key) for key, item in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _get_live(self, key: str, now: float) -> Optional[Tuple[Any, float, int]]:
+        """获取未过期的条目（调用方需持有锁）"""
+        item = self._cache.get(key)
+        if item is None:
             return None
-
-        item = self._cache[key]
-        # 检查是否过期
-        if datetime.now() > item["expires_at"]:
-            del self._cache[key]
+        if now >= item[1]:
+            self._remove(key)
+            self._stats["expirations"] += 1
             return None
+        return item
 
-        return item["value"]
+    def get(self, key: str) -> Optional[CacheValue]:
+        """获取缓存"""
+        with self._lock:
+            item = self._get_live(key, time.monotonic())
+            if item is None:
+                return None
+            self._cache.move_to_end(key)
+            return item[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, CacheValue]:
+        """批量获取缓存（一次加锁完成）"""
+        result = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                item = self._get_live(key, now)
+                if item is not None:
+                    self._cache.move_to_end(key)
+                    result[key] = item[0]
+        return result
+
+    def _put(self, key: str, value: Any, size: int, expires_at: float):
+        """写入条目并按容量淘汰（调用方需持有锁）"""
+        if key in self._cache:
+            self._remove(key)
+        self._cache[key] = (value, expires_at, size)
+        self._total_bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+
+        # 超出容量时淘汰最久未使用的条目
+        while len(self._cache) > self.max_entries or self._total_bytes > self.max_bytes:
+            oldest_key = next(iter(self._cache))
+            self._remove(oldest_key)
+            self._stats["evictions"] += 1
+
+    def _check_size(self, key: str, value: Any) -> Optional[int]:
+        """计算值的字节数，超过总容量时返回 None"""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            with self._lock:
+                self._stats["rejected"] += 1
+            logger.warning(f"缓存值过大，未写入内存缓存: {key}（{size} 字节）")
+            return None
+        return size
 
-    def set(self, key: str, value: str, ttl: int = 3600) -> bool:
+    def set(self, key: str, value: CacheValue, ttl: int = 3600) -> bool:
         """设置缓存"""
-        self._cache[key] = {
-            "value": value,
-            "expires_at": datetime.now() + timedelta(seconds=ttl)
-        }
+        size = self._check_size(key, value)
+        if size is None:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            self._sweep_expired(now)
+            self._put(key, value, size, now + ttl)
         return True
 
+    def set_many(self, items: Dict[str, CacheValue], ttl: int = 3600) -> bool:
+        """批量设置缓存（一次加锁完成）"""
+        sized = {}
+        for key, value in items.items():
+            size = self._check_size(key, value)
+            if size is not None:
+                sized[key] = (value, size)
+
+        now = time.monotonic()
+        with self._lock:
+            self._sweep_expired(now)
+            for key, (value, size) in sized.items():
+                self._put(key, value, size, now + ttl)
+        return len(sized) == len(items)
+
     def delete(self, key: str) -> bool:
         """删除缓存"""
-        if key in self._cache:
-            del self._cache[key]
-            return True
-        return False
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+                return True
+            return False
 
     def clear(self) -> bool:
         """清除所有缓存"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._expiry_heap.clear()
+            self._total_bytes = 0
         return True
 
     def exists(self, key: str) -> bool:
         """检查键是否存在"""
-        if key not in self._cache:
-            return False
-        # 检查是否过期
-        if datetime.now() > self._cache[key]["expires_at"]:
-            del self._cache[key]
-            return False
-        return True
+        with self._lock:
+            return self._get_live(key, time.monotonic()) is not None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取内存缓存统计信息"""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._cache),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                **self._stats
+            }
 
 
 class RedisCacheBackend(CacheBackend):
@@ -103,9 +283,10 @@ class RedisCacheBackend(CacheBackend):
     def __init__(self, redis_url: str):
         try:
             import redis
+            # 缓存值由 CacheCodec 编码为字节，读取时不做文本解码
             self.client = redis.from_url(
                 redis_url,
-                decode_responses=True,
+                decode_responses=False,
                 socket_connect_timeout=2,
                 socket_timeout=2
             )
@@ -125,7 +306,7 @@ class RedisCacheBackend(CacheBackend):
         circuit_breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=30),
         retry_policy=RetryPolicy(max_attempts=2, base_delay=0.5)
     )
-    def get(self, key: str) -> Optional[str]:
+    def get(self, key: str) -> Optional[CacheValue]:
         """获取缓存"""
         try:
             return self.client.get(key)
@@ -142,7 +323,7 @@ class RedisCacheBackend(CacheBackend):
         circuit_breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=30),
         retry_policy=RetryPolicy(max_attempts=2, base_delay=0.5)
     )
-    def set(self, key: str, value: str, ttl: int = 3600) -> bool:
+    def set(self, key: str, value: CacheValue, ttl: int = 3600) -> bool:
         """设置缓存"""
         try:
             self.client.setex(key, ttl, value)
@@ -204,12 +385,198 @@ class RedisCacheBackend(CacheBackend):
             logger.error(f"Redis EXISTS 失败: {error_info.to_dict()}")
             return False
 
+    @with_error_handling(
+        circuit_breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=30),
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0.5)
+    )
+    def get_many(self, keys: List[str]) -> Dict[str, CacheValue]:
+        """批量获取缓存（MGET，一次网络往返）"""
+        if not keys:
+            return {}
+        try:
+            values = self.client.mget(keys)
+            return {key: value for key, value in zip(keys, values) if value is not None}
+        except Exception as e:
+            error_info = handle_error(
+                e,
+                context={"keys": len(keys), "operation": "redis_mget"},
+                user_message="缓存批量读取失败"
+            )
+            logger.error(f"Redis MGET 失败: {error_info.to_dict()}")
+            return {}
+
+    @with_error_handling(
+        circuit_breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=30),
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0.5)
+    )
+    def set_many(self, items: Dict[str, CacheValue], ttl: int = 3600) -> bool:
+        """批量设置缓存（pipeline 中执行 SETEX，一次网络往返）"""
+        if not items:
+            return True
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, ttl, value)
+            pipe.execute()
+            return True
+        except Exception as e:
+            error_info = handle_error(
+                e,
+                context={"keys": len(items), "ttl": ttl, "operation": "redis_pipeline_set"},
+                user_message="缓存批量写入失败"
+            )
+            logger.error(f"Redis 批量 SET 失败: {error_info.to_dict()}")
+            return False
+
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """获取跨进程锁（SET NX PX），Redis 不可用时返回 None"""
+        try:
+            return bool(self.client.set(key, token, nx=True, px=ttl_ms))
+        except Exception as e:
+            logger.warning(f"Redis 获取锁失败: {str(e)}")
+            return None
+
+    def release_lock(self, key: str, token: str) -> bool:
+        """释放跨进程锁（Lua 脚本比较持有者标识后删除，避免误删他人的锁）"""
+        try:
+            return bool(self.client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
+        except Exception as e:
+            logger.warning(f"Redis 释放锁失败: {str(e)}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取后端统计信息"""
+        return {"backend": "redis"}
+
+
+class TieredCacheBackend(CacheBackend):
+    """
+    两级缓存后端：进程内 L1（小容量 LRU）+ L2（Redis）
+
+    读取时先查 L1，未命中再读 L2 并回填 L1；写入同时写 L2 与 L1；删除和清空同时作用于两级。
+    其他进程的 L1 不会收到失效通知，L1 过期时间较短（CACHE_L1_TTL），以限制跨进程的过期读。
+    """
+
+    def __init__(self, l1: CacheBackend, l2: CacheBackend, l1_ttl: Optional[int] = None):
+        """
+        初始化两级缓存
+
+        Args:
+            l1: 进程内缓存后端
+            l2: 共享缓存后端（Redis）
+            l1_ttl: L1 条目最长存活秒数，None 使用 CACHE_L1_TTL
+        """
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl or int(os.getenv("CACHE_L1_TTL", "60"))
+        self._lock = threading.Lock()
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0
+        }
+        logger.info(f"使用两级缓存后端（L1 过期时间: {self.l1_ttl}秒）")
+
+    def _count(self, name: str):
+        """统计计数"""
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        """获取缓存（L1 未命中时读取 L2 并回填 L1）"""
+        value = self.l1.get(key)
+        if value is not None:
+            self._count("l1_hits")
+            return value
+
+        value = self.l2.get(key)
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._count("l2_hits")
+        self.l1.set(key, value, self.l1_ttl)
+        return value
+
+    def get_many(self, keys: List[str]) -> Dict[str, CacheValue]:
+        """批量获取缓存（L1 未命中的键一次性从 L2 读取并回填 L1）"""
+        result = self.l1.get_many(keys)
+        missing = [key for key in keys if key not in result]
+
+        l2_values = self.l2.get_many(missing) if missing else {}
+        if l2_values:
+            self.l1.set_many(l2_values, self.l1_ttl)
+            result.update(l2_values)
+
+        with self._lock:
+            self._stats["l1_hits"] += len(keys) - len(missing)
+            self._stats["l2_hits"] += len(l2_values)
+            self._stats["misses"] += len(missing) - len(l2_values)
+        return result
+
+    def set_many(self, items: Dict[str, CacheValue], ttl: int = 3600) -> bool:
+        """批量设置缓存（先写 L2，成功后写 L1）"""
+        success = self.l2.set_many(items, ttl)
+        if success:
+            self.l1.set_many(items, min(ttl, self.l1_ttl))
+        else:
+            for key in items:
+                self.l1.delete(key)
+        return success
+
+    def set(self, key: str, value: CacheValue, ttl: int = 3600) -> bool:
+        """设置缓存（先写 L2，成功后写 L1）"""
+        success = self.l2.set(key, value, ttl)
+        if success:
+            self.l1.set(key, value, min(ttl, self.l1_ttl))
+        else:
+            # L2 写入失败时不保留可能过期的 L1 值
+            self.l1.delete(key)
+        return success
+
+    def delete(self, key: str) -> bool:
+        """删除缓存（两级同时删除）"""
+        self.l1.delete(key)
+        return self.l2.delete(key)
+
+    def clear(self) -> bool:
+        """清除所有缓存（两级同时清除）"""
+        self.l1.clear()
+        return self.l2.clear()
+
+    def exists(self, key: str) -> bool:
+        """检查键是否存在"""
+        return self.l1.exists(key) or self.l2.exists(key)
+
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """获取跨进程锁（由 L2 提供）"""
+        return self.l2.acquire_lock(key, token, ttl_ms)
+
+    def release_lock(self, key: str, token: str) -> bool:
+        """释放跨进程锁（由 L2 提供）"""
+        return self.l2.release_lock(key, token)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取两级缓存统计信息（含各级命中次数）"""
+        with self._lock:
+            stats = dict(self._stats)
+        total_requests = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        l1_hit_rate = (stats["l1_hits"] / total_requests * 100) if total_requests > 0 else 0
+        return {
+            "backend": "tiered",
+            **stats,
+            "l1_hit_rate": f"{l1_hit_rate:.2f}%",
+            "l1": self.l1.get_stats(),
+            "l2": self.l2.get_stats()
+        }
+
 
 class CacheService:
     """缓存服务 - 统一接口"""
 
-    def __init__(self, backend: CacheBackend):
+    def __init__(self, backend: CacheBackend, codec: Optional[CacheCodec] = None):
         self.backend = backend
+        self.codec = codec or CacheCodec()
         self._stats = {
             "hits": 0,
             "misses": 0,
@@ -217,6 +584,14 @@ class CacheService:
             "errors": 0
         }
 
+    def _serialize(self, value: Any) -> bytes:
+        """序列化缓存值（按 CacheCodec 配置编码与压缩）"""
+        return self.codec.encode(value)
+
+    def _deserialize(self, data: Any) -> Any:
+        """反序列化缓存值（兼容旧版 JSON 文本）"""
+        return self.codec.decode(data)
+
     @with_error_handling(
         fallback_service="cache_memory_fallback"
     )
@@ -226,7 +601,7 @@ class CacheService:
             data = self.backend.get(key)
             if data:
                 self._stats["hits"] += 1
-                return json.loads(data)
+                return self._deserialize(data)
             else:
                 self._stats["misses"] += 1
                 return None
@@ -246,7 +621,7 @@ class CacheService:
     def set(self, key: str, value: Dict, ttl: int = 3600) -> bool:
         """设置缓存（自动序列化为 JSON）"""
         try:
-            data = json.dumps(value, ensure_ascii=False)
+            data = self._serialize(value)
             success = self.backend.set(key, data, ttl)
             if success:
                 self._stats["sets"] += 1
@@ -261,6 +636,73 @@ class CacheService:
             logger.error(f"缓存设置失败: {error_info.to_dict()}")
             return False
 
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        批量获取缓存（Redis 使用 MGET，内存缓存一次加锁完成）
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            命中的键到反序列化值的映射（未命中的键不包含在结果中）
+        """
+        if not keys:
+            return {}
+        try:
+            raw = self.backend.get_many(keys)
+        except Exception as e:
+            self._stats["errors"] += 1
+            error_info = handle_error(
+                e,
+                context={"keys": len(keys), "operation": "cache_get_many"},
+                user_message="缓存服务暂时不可用"
+            )
+            logger.error(f"缓存批量获取失败: {error_info.to_dict()}")
+            raw = {}
+
+        result = {}
+        for key, data in raw.items():
+            if not data:
+                continue
+            try:
+                result[key] = self._deserialize(data)
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"缓存反序列化失败: {key}, 错误: {str(e)}")
+
+        self._stats["hits"] += len(result)
+        self._stats["misses"] += len(keys) - len(result)
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: int = 3600) -> bool:
+        """
+        批量设置缓存（Redis 使用 pipeline，内存缓存一次加锁完成）
+
+        Args:
+            items: 缓存键到值的映射
+            ttl: 过期时间（秒）
+
+        Returns:
+            是否全部写入成功
+        """
+        if not items:
+            return True
+        try:
+            data = {key: self._serialize(value) for key, value in items.items()}
+            success = self.backend.set_many(data, ttl)
+            if success:
+                self._stats["sets"] += len(data)
+            return success
+        except Exception as e:
+            self._stats["errors"] += 1
+            error_info = handle_error(
+                e,
+                context={"keys": len(items), "ttl": ttl, "operation": "cache_set_many"},
+                user_message="缓存写入失败"
+            )
+            logger.error(f"缓存批量设置失败: {error_info.to_dict()}")
+            return False
+
     def delete(self, key: str) -> bool:
         """删除缓存"""
         return self.backend.delete(key)
@@ -273,6 +715,14 @@ class CacheService:
         """检查键是否存在"""
         return self.backend.exists(key)
 
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """获取跨进程锁（后端不支持时返回 None）"""
+        return self.backend.acquire_lock(key, token, ttl_ms)
+
+    def release_lock(self, key: str, token: str) -> bool:
+        """释放跨进程锁"""
+        return self.backend.release_lock(key, token)
+
     def get_stats(self) -> Dict:
         """获取缓存统计信息"""
         total_requests = self._stats["hits"] + self._stats["misses"]
@@ -281,7 +731,13 @@ class CacheService:
         return {
             **self._stats,
             "total_requests": total_requests,
-            "hit_rate": f"{hit_rate:.2f}%"
+            "hit_rate": f"{hit_rate:.2f}%",
+            "codec": {
+                "serializer": self.codec.serializer,
+                "compression": self.codec.compression,
+                "compress_threshold": self.codec.compress_threshold
+            },
+            "backend": self.backend.get_stats()
         }
 
 
@@ -304,6 +760,13 @@ def get_cache_service() -> CacheService:
     if redis_url:
         try:
             backend = RedisCacheBackend(redis_url)
+            if os.getenv("CACHE_L1_ENABLED", "true").lower() == "true":
+                # 在 Redis 前加一层进程内 L1，热点键无需网络往返
+                l1 = MemoryCacheBackend(
+                    max_entries=int(os.getenv("CACHE_L1_MAX_ENTRIES", "1000")),
+                    max_bytes=int(os.getenv("CACHE_L1_MAX_BYTES", str(16 * 1024 * 1024)))
+                )
+                backend = TieredCacheBackend(l1, backend)
             _cache_service = CacheService(backend)
             logger.info("缓存服务已启动，使用 Redis 后端")
             return _cache_service
@@ -0,0 +1,242 @@
+"""
+合规定向修复
+段落未通过合规检查时，只把缺少的必须覆盖内容和命中的应避免词语所在句子作为简短的补丁提示词发给模型，
+再把模型返回的改写句与补充内容合并回原文，代替整段重新生成；同时按段落统计每次调用的 token 与耗时
+"""
+
+import os
+import re
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from .ai_compliance_checker import ai_compliance_checker
+from ..utils.text_stats import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 修复方式：patch（定向修复，失败后再整段重新生成）或 regenerate（始终整段重新生成）
+REPAIR_MODES = ("patch", "regenerate")
+
+# 句子（以句末标点结尾，换行处也视为句子边界）
+_SENTENCE_PATTERN = re.compile(r'[^。！？；\n]+[。！？；]?')
+# 补丁输出中的改写句与补充内容
+_REWRITE_LINE_PATTERN = re.compile(r'^\[(\d+)\]\s*(.*)$')
+_SUPPLEMENT_LINE_PATTERN = re.compile(r'^\[补充\]\s*(.*)$')
+
+PATCH_SYSTEM_PROMPT = (
+    "你是突发环境事件应急预案的合规修订助手。"
+    "只针对列出的合规问题输出修订内容，不要重写或复述全文，不要输出任何解释。"
+)
+
+
+def get_repair_mode() -> str:
+    """读取合规修复方式（AI_COMPLIANCE_REPAIR_MODE），无效值按 patch 处理"""
+    mode = os.getenv("AI_COMPLIANCE_REPAIR_MODE", "patch").lower()
+    return mode if mode in REPAIR_MODES else "patch"
+
+
+def build_repair_plan(section_key: str, text: str) -> Dict[str, Any]:
+    """
+    根据合规问题明细生成修复计划
+
+    Args:
+        section_key: AI段落键名
+        text: 未通过合规检查的段落内容
+
+    Returns:
+        {"section_key", "missing", "flagged", "sentences"}；sentences 为需改写的句子
+        （编号、在原文中的位置、句子内容及命中的词语）
+    """
+    violations = ai_compliance_checker.get_violations(section_key, text)
+    phrases = [phrase for item in violations["flagged"] for phrase in item["phrases"]]
+
+    sentences: List[Dict[str, Any]] = []
+    if phrases:
+        for match in _SENTENCE_PATTERN.finditer(text):
+            sentence = match.group()
+            hits = [phrase for phrase in phrases if phrase in sentence]
+            if hits:
+                sentences.append({
+                    "index": len(sentences) + 1,
+                    "start": match.start(),
+                    "end": match.end(),
+                    "text": sentence,
+                    "phrases": hits
+                })
+
+    return {
+        "section_key": section_key,
+        "missing": violations["missing"],
+        "flagged": violations["flagged"],
+        "sentences": sentences
+    }
+
+
+def can_patch(plan: Dict[str, Any]) -> bool:
+    """修复计划中是否有可定向修复的内容"""
+    return bool(plan["missing"] or plan["sentences"])
+
+
+def build_patch_prompt(plan: Dict[str, Any]) -> Dict[str, str]:
+    """
+    生成补丁提示词（只包含问题句子与缺少的内容，不含原始提示词和全文）
+
+    Args:
+        plan: build_repair_plan 返回的修复计划
+
+    Returns:
+        {"system": 系统提示词, "user": 用户提示词}
+    """
+    lines = ["以下段落内容未通过合规检查，请只针对列出的问题给出修订。"]
+
+    if plan["sentences"]:
+        lines.append("需改写的句子（删除或替换括号中应避免的词语，保持原意）：")
+        for sentence in plan["sentences"]:
+            lines.append(f"[{sentence['index']}] {sentence['text'].strip()}（应避免：{'、'.join(sentence['phrases'])}）")
+
+    if plan["missing"]:
+        lines.append("需补充的内容（写成一到两句话，每项至少包含一个所列关键词）：")
+        for item in plan["missing"]:
+            lines.append(f"- {item['message']}：{'、'.join(item['keywords'])}")
+
+    lines.append("输出格式：每个改写句单独一行，以对应编号开头，如“[1] 改写后的句子”；"
+                 "补充内容单独一行，以“[补充]”开头。")
+    return {"system": PATCH_SYSTEM_PROMPT, "user": "\n".join(lines)}
+
+
+def merge_patch(text: str, plan: Dict[str, Any], patch_output: str) -> str:
+    """
+    将补丁输出合并回原文
+
+    改写句替换原句；模型未给出改写的问题句直接删除；补充内容追加为新的一段。
+
+    Args:
+        text: 原段落内容
+        plan: 修复计划
+        patch_output: 模型返回的补丁内容
+
+    Returns:
+        合并后的段落内容
+    """
+    rewrites: Dict[int, str] = {}
+    supplements: List[str] = []
+    for line in patch_output.splitlines():
+        line = line.strip()
+        rewrite = _REWRITE_LINE_PATTERN.match(line)
+        if rewrite:
+            rewrites[int(rewrite.group(1))] = rewrite.group(2).strip()
+            continue
+        supplement = _SUPPLEMENT_LINE_PATTERN.match(line)
+        if supplement and supplement.group(1).strip():
+            supplements.append(supplement.group(1).strip())
+
+    # 从后往前替换，前面句子的位置不受影响
+    merged = text
+    for sentence in reversed(plan["sentences"]):
+        replacement = rewrites.get(sentence["index"], "")
+        merged = merged[:sentence["start"]] + replacement + merged[sentence["end"]:]
+
+    if supplements:
+        merged = merged.rstrip() + "\n\n" + "".join(supplements)
+    return merged
+
+
+class RetryCostTracker:
+    """
+    LLM 调用开销统计（线程安全）
+
+    按段落和调用方式（generate：首次生成；patch：定向修复；regenerate：整段重新生成）
+    累计调用次数、提示词/生成内容 token 数、耗时与通过次数（未做合规检查的调用计为通过）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def record(self, section_key: str, mode: str, prompt_tokens: int, completion_tokens: int,
+               latency_ms: float, passed: bool) -> None:
+        """
+        记录一次 LLM 调用
+
+        Args:
+            section_key: AI段落键名
+            mode: 调用方式（generate/patch/regenerate）
+            prompt_tokens: 提示词 token 数
+            completion_tokens: 生成内容 token 数
+            latency_ms: 耗时（毫秒）
+            passed: 本次结果是否通过合规检查
+        """
+        with self._lock:
+            stats = self._sections.setdefault(section_key, {}).setdefault(mode, {
+                "calls": 0, "passed": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0
+            })
+            stats["calls"] += 1
+            stats["passed"] += int(passed)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["latency_ms"] += latency_ms
+
+    def get_section_stats(self, section_key: str) -> Dict[str, Dict[str, Any]]:
+        """获取单个段落各调用方式的统计"""
+        with self._lock:
+            return {mode: self._summarize(stats) for mode, stats in self._sections.get(section_key, {}).items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取全部统计
+
+        Returns:
+            {"sections": {段落: {方式: 统计}}, "totals": {方式: 统计}, "retry_tokens": 重试消耗的 token 总数}
+        """
+        with self._lock:
+            sections = {
+                section_key: {mode: self._summarize(stats) for mode, stats in modes.items()}
+                for section_key, modes in self._sections.items()
+            }
+            totals: Dict[str, Dict[str, float]] = {}
+            for modes in self._sections.values():
+                for mode, stats in modes.items():
+                    total = totals.setdefault(mode, dict.fromkeys(stats, 0))
+                    for name, value in stats.items():
+                        total[name] += value
+
+        totals = {mode: self._summarize(stats) for mode, stats in totals.items()}
+        retry_tokens = sum(
+            totals[mode]["prompt_tokens"] + totals[mode]["completion_tokens"]
+            for mode in ("patch", "regenerate") if mode in totals
+        )
+        return {"sections": sections, "totals": totals, "retry_tokens": retry_tokens}
+
+    def reset(self, section_key: Optional[str] = None) -> None:
+        """清空统计，指定段落时只清空该段落"""
+        with self._lock:
+            if section_key is None:
+                self._sections.clear()
+            else:
+                self._sections.pop(section_key, None)
+
+    @staticmethod
+    def _summarize(stats: Dict[str, float]) -> Dict[str, Any]:
+        calls = stats["calls"] or 1
+        return {
+            "calls": stats["calls"],
+            "passed": stats["passed"],
+            "prompt_tokens": stats["prompt_tokens"],
+            "completion_tokens": stats["completion_tokens"],
+            "latency_ms": round(stats["latency_ms"], 2),
+            "avg_tokens": round((stats["prompt_tokens"] + stats["completion_tokens"]) / calls, 1),
+            "avg_latency_ms": round(stats["latency_ms"] / calls, 2)
+        }
+
+
+def count_call_tokens(system: str, user: str, output: str) -> Dict[str, int]:
+    """估算一次调用的提示词与生成内容 token 数"""
+    return {
+        "prompt_tokens": estimate_tokens(system) + estimate_tokens(user),
+        "completion_tokens": estimate_tokens(output)
+    }
+
+
+# 全局实例
+retry_cost_tracker = RetryCostTracker()
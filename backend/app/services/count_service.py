@@ -0,0 +1,121 @@
+"""
+列表总数服务
+按用户与过滤条件缓存列表接口的总数（COUNT 结果）。每个用户每个列表有一个版本号，
+新增/删除/修改记录后更换版本号，该用户该列表所有过滤条件的缓存总数随之失效，
+翻页时不再每次对整个过滤结果执行 COUNT
+"""
+
+import os
+import time
+import hashlib
+import logging
+from typing import Optional, Sequence, Tuple, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.cache_service import CacheService, get_cache_service
+from app.utils.pagination import acount_query, count_statement
+
+logger = logging.getLogger(__name__)
+
+# 缓存总数的最长存活秒数（未配置 Redis 时各工作进程的缓存互不失效，以此为上限）
+COUNT_CACHE_TTL = int(os.getenv("COUNT_CACHE_TTL", "300"))
+
+# 列表接口 total_mode 参数：exact 每次执行 COUNT，cached 使用缓存的总数（可能短暂过期，只用于展示），none 不返回总数
+TOTAL_MODES = ("exact", "cached", "none")
+TOTAL_MODE_PATTERN = "^(exact|cached|none)$"
+
+
+class CountService:
+    """
+    列表总数缓存
+
+    缓存的总数与统计时的版本号一起保存，读取时用一次批量读取（Redis 为 MGET）同时取回版本号与总数，
+    版本号一致才使用。缓存读写在线程池中执行，Redis 的网络调用不阻塞事件循环。
+    """
+
+    def __init__(self, cache: Optional[CacheService] = None, ttl: int = COUNT_CACHE_TTL):
+        self._cache = cache
+        self.ttl = ttl
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def cache(self) -> CacheService:
+        if self._cache is None:
+            self._cache = get_cache_service()
+        return self._cache
+
+    @staticmethod
+    def _version_key(scope: str, user_id: int) -> str:
+        return f"count_version:{scope}:{user_id}"
+
+    def cache_key(self, stmt: Select, scope: str, user_id: int) -> str:
+        """总数缓存键：列表名、用户与过滤条件（SQL 与参数）摘要"""
+        # 编译 COUNT 语句而不是原查询，不包含关联加载，编译开销小得多
+        compiled = count_statement(stmt).compile()
+        digest = hashlib.sha1(
+            f"{compiled}|{sorted((k, repr(v)) for k, v in compiled.params.items())}".encode("utf-8")
+        ).hexdigest()
+        return f"count:{scope}:{user_id}:{digest}"
+
+    def lookup(self, key: str, scope: str, user_id: int) -> Tuple[Optional[int], int]:
+        """
+        一次批量读取版本号与缓存的总数
+
+        Returns:
+            (当前版本下缓存的总数，没有或已失效时为 None, 当前版本号)
+        """
+        version_key = self._version_key(scope, user_id)
+        values = self.cache.get_many([version_key, key])
+        version = (values.get(version_key) or {}).get("v", 0)
+        cached = values.get(key)
+        if cached is not None and cached.get("v") == version:
+            return cached["total"], version
+        return None, version
+
+    async def acount(self, stmt: Select, db: AsyncSession, scope: str, user_id: int) -> int:
+        """
+        获取查询结果总数，优先使用缓存
+
+        Args:
+            stmt: 列表查询语句（带过滤条件）
+            scope: 列表名（如 documents / projects / enterprise_infos）
+            user_id: 列表所属用户
+        """
+        key = self.cache_key(stmt, scope, user_id)
+        total, version = await run_in_threadpool(self.lookup, key, scope, user_id)
+        if total is not None:
+            self._stats["hits"] += 1
+            return total
+
+        self._stats["misses"] += 1
+        total = await acount_query(stmt, db)
+        # 统计期间发生失效时版本号已变化，写入的旧版本总数不会被使用
+        await run_in_threadpool(self.cache.set, key, {"total": total, "v": version}, self.ttl)
+        return total
+
+    def invalidate(self, scope: Union[str, Sequence[str]], user_id: int) -> None:
+        """
+        用户的列表记录发生变化（在事务提交后调用），使该列表所有缓存总数失效
+
+        Args:
+            scope: 列表名，或多个列表名（一次批量写入）
+        """
+        scopes = [scope] if isinstance(scope, str) else list(scope)
+        version = {"v": time.time_ns()}
+        # 版本号存活时间不短于总数缓存，避免版本号过期后回到旧版本读到过期总数
+        self.cache.set_many({self._version_key(name, user_id): version for name in scopes}, ttl=self.ttl * 2)
+        self._stats["invalidations"] += len(scopes)
+
+    async def ainvalidate(self, scope: Union[str, Sequence[str]], user_id: int) -> None:
+        """invalidate 的异步版本（在线程池中写缓存，不阻塞事件循环）"""
+        await run_in_threadpool(self.invalidate, scope, user_id)
+
+    def get_stats(self):
+        return dict(self._stats)
+
+
+# 全局总数服务实例
+count_service = CountService()
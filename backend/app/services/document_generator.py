@@ -5,22 +5,189 @@
 
 import json
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+import time
+import threading
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from types import MappingProxyType
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Any
 from .ai_service import get_ai_service
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, select_autoescape, Template, TemplateNotFound, TemplateSyntaxError
-from jinja2.sandbox import SandboxedEnvironment
+from jinja2 import Template, TemplateNotFound, TemplateSyntaxError
 import os
 import yaml
 
 # 导入AI Section相关模块
 from ..prompts.ai_sections_loader import ai_sections_loader
-from ..prompts.ai_section_processor import render_user_template, call_llm, postprocess_ai_output
+from ..prompts.ai_section_processor import (
+    render_user_template, render_compiled_template, CompiledTemplate, call_llm, astream_llm,
+    postprocess_ai_output, collapse_blank_lines, IncrementalOutputProcessor
+)
+from ..prompts.prompt_compactor import (
+    compact_json, project_fields, fit_prompt, get_token_budget, prompt_budget_stats
+)
 from .ai_compliance_checker import ai_compliance_checker
+from .compliance_repair import (
+    build_repair_plan, build_patch_prompt, merge_patch, can_patch, count_call_tokens,
+    get_repair_mode, retry_cost_tracker
+)
+from .section_cache import FAILED_CONTENT_PREFIX, section_cache
+from .incremental_generation import section_snapshots, plan_section_reuse
+from ..utils.text_stats import count_words, estimate_tokens
+from ..utils.jinja_cache import create_template_environment, get_bytecode_cache
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# _build_section_prompt 中嵌入的企业数据块
+SECTION_PROMPT_DATA_ROOTS = ("basic_info", "basic_info.address", "production_process", "environment_info", "emergency_resources")
+
+# 模板字段默认值（模块级只读映射，各次渲染共用，不再每次调用重新构建）
+TEMPLATE_DEFAULTS: Mapping[str, Any] = MappingProxyType({
+    "plan_version": "1",
+    "assessment_date": "2023年1月",
+    "investigation_date": "2023年1月",
+    "publish_date": "2023年1月1日",
+    "implement_date": "2023年1月1日",
+    "record_number": "",
+    "record_date": "",
+    "organization_code": "",
+    "legal_representative": "",
+    "legal_phone": "",
+    "contact_person": "",
+    "contact_phone": "",
+    "fax": "/",
+    "email": "",
+    "address": "",
+    "risk_level": "L",
+    "plan_signer": "",
+    "submit_time": "",
+    "commander_name": "",
+    "emergency_phone": "",
+    "regional_plan_name": "XX区突发环境事件应急预案",
+    "longitude": "xxx",
+    "latitude": "xxx",
+    "terrain_description": "",
+    "weather_description": "",
+    "hydrology_description": "",
+    "location_description": "",
+    "enterprise_overview": "",
+    "environmental_work": "",
+    "construction_layout": "",
+    "production_process_description": "",
+    "safety_management_description": "",
+    "water_environment_impact": "",
+    "air_environment_impact": "",
+    "noise_environment_impact": "",
+    "solid_waste_impact": "",
+    "risk_management_conclusion": "",
+    "long_term_plan": "",
+    "medium_term_plan": "",
+    "short_term_plan": "",
+    "final_risk_level": "",
+    "q_value": "",
+    "water_q_value": "",
+    "has_violations": False,
+    "investigation_baseline_date": "2023年",
+    "investigation_start_date": "2023年1月1日",
+    "investigation_end_date": "2023年1月31日",
+    "investigation_leader": "",
+    "investigation_contact": "",
+    "investigation_process": "",
+    "resource_types": "",
+    "has_external_support": False,
+    "external_support_count": 0,
+    "investigation_reviewed": False,
+    "investigation_archived": False,
+    "update_mechanism": False,
+    "resource_match": "满足",
+    "gap_analysis_1": "",
+    "gap_analysis_2": "",
+    "gap_analysis_3": "",
+    "gap_analysis_4": "",
+    "conclusion": "",
+    "main_responsible_person": "",
+    "env_responsible_person": "",
+    "incident_type": "",
+    "incident_description": "",
+    "incident_consequence_analysis": "",
+    "emergency_materials_for_incident": "",
+    "incident_response_measures": "",
+    "incident_response_precautions": "",
+    "internal_emergency_contacts": "",
+    "fire_police": "119",
+    "env_bureau": "",
+    "surrounding_units": "",
+    "incident_name": "",
+    "incident_time": "",
+    "incident_unit": "",
+    "incident_category": "",
+    "incident_location": "",
+    "incident_reporter": "",
+    "incident_briefing": "",
+    "incident_receiver": "",
+    "incident_info_transfer_method": "",
+    "incident_preliminary_cause": "",
+    "incident_taken_measures": "",
+    "has_casualties": "",
+    "casualties_details": "",
+    "info_report_leader": "",
+    "report_time": "",
+    "report_method": "",
+    "report_content": "",
+    "leader_instructions": "",
+    "is_plan_activated": "",
+    "response_level": "",
+    "is_external_help_requested": "",
+    "rescue_departments": "",
+    "used_emergency_materials": "",
+    "main_emergency_measures": "",
+    "emergency_result": "",
+    "form_filler": "",
+    "start_order_signer": "",
+    "start_order_time": "",
+    "start_order_messenger": "",
+    "start_order_transmit_time": "",
+    "end_order_signer": "",
+    "end_order_time": "",
+    "end_order_messenger": "",
+    "end_order_transmit_time": "",
+    "drill_time": "",
+    "drill_participants": "",
+    "drill_content": "",
+    "drill_preparation": "",
+    "drill_other": "",
+    "drill_planner": "",
+    "drill_approver": "",
+    "drill_plan_date": "",
+    "drill_recorder": "",
+    "drill_record_date": "",
+    "drill_reviewer": "",
+    "drill_review_date": "",
+    "change_reason": "",
+    "change_applying_unit": "",
+    "emergency_response_card_content": ""
+})
+
+# 风险等级映射
+RISK_LEVEL_CODES: Mapping[str, str] = MappingProxyType({"一般": "L", "较大": "M", "重大": "H"})
+
+# 能源消耗字段：（字段名, 类型, 单位）
+ENERGY_FIELDS: Tuple[Tuple[str, str, str], ...] = (
+    ("water_consumption", "水", "吨/年"),
+    ("electricity_consumption", "电", "千瓦时/年"),
+    ("natural_gas", "天然气", "立方米/年"),
+    ("other_energy", "其他能源", ""),
+)
+
+# V1版本模板（保持向后兼容，启动时与注册表中的V2模板一起预热）
+LEGACY_TEMPLATES = (
+    "template_risk_plan.jinja2",
+    "template_emergency_plan.jinja2",
+    "template_resource_investigation.jinja2"
+)
+
 class DocumentGenerator:
     """文档生成器类"""
     
@@ -30,13 +197,8 @@ class DocumentGenerator:
         current_dir = Path(__file__).parent.parent
         self.templates_dir = current_dir / "prompts" / "templates"
         
-        # 初始化 Jinja2 环境（使用沙箱模式）
-        self.jinja_env = SandboxedEnvironment(
-            loader=FileSystemLoader(str(self.templates_dir)),
-            autoescape=select_autoescape(['html', 'xml']),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
+        # 初始化 Jinja2 环境（使用沙箱模式，与其他环境共用字节码缓存）
+        self.jinja_env = create_template_environment(self.templates_dir)
         
         # 添加自定义过滤器
         self.jinja_env.filters['tojson'] = self._tojson_filter
@@ -44,9 +206,24 @@ class DocumentGenerator:
         # 缓存已加载的模板
         self._template_cache: Dict[str, Template] = {}
         
+        # 最近一次模板预热报告
+        self.warm_up_report: Optional[Dict[str, Any]] = None
+        
         # 加载模板注册表
         self._load_template_registry()
         
+        # AI段落并发生成配置
+        self.section_concurrency = int(os.getenv("AI_SECTION_CONCURRENCY", "4"))
+        self.section_timeout = float(os.getenv("AI_SECTION_TIMEOUT", "120"))
+        
+        # 文档并发渲染配置（1 表示串行）
+        self.render_workers = int(os.getenv("DOCUMENT_RENDER_WORKERS", "4"))
+        self._render_executor: Optional[ThreadPoolExecutor] = None
+        self._render_executor_lock = threading.Lock()
+        
+        # 流式渲染时每个片段的最小字符数
+        self.stream_chunk_size = int(os.getenv("DOCUMENT_STREAM_CHUNK_SIZE", "8192"))
+        
         logger.info(f"文档生成器初始化完成，模板目录: {self.templates_dir}")
     
     def _tojson_filter(self, value, indent=2):
@@ -235,7 +412,71 @@ class DocumentGenerator:
         except Exception as e:
             logger.error(f"加载模板失败: {template_name}, 错误: {str(e)}")
             return None
-    
+
+    def get_registered_template_paths(self) -> List[str]:
+        """
+        获取需要预热的模板路径（注册表中启用的V2模板及V1模板）
+
+        Returns:
+            模板路径列表
+        """
+        paths = [
+            template_info["template_path"]
+            for template_info in self.template_registry.get("templates", {}).values()
+            if template_info.get("enabled", True) and template_info.get("template_path")
+        ]
+        paths.extend(LEGACY_TEMPLATES)
+        return list(dict.fromkeys(paths))
+
+    def warm_up_templates(self) -> Dict[str, Any]:
+        """
+        预加载全部注册模板，使首个生成请求不再承担模板解析编译的耗时
+
+        已有字节码缓存（其他工作进程或上次启动写入）时直接加载编译结果，否则编译并写入缓存。
+
+        Returns:
+            预热报告 {"templates": {路径: {"load_ms", "source"}}, "total_ms", "loaded", "failed",
+            "from_bytecode", "compiled", "bytecode_cache"}；source 为 bytecode / compiled / memory / failed
+        """
+        bytecode_cache = get_bytecode_cache()
+        templates: Dict[str, Dict[str, Any]] = {}
+        start = time.perf_counter()
+
+        for template_path in self.get_registered_template_paths():
+            cached = template_path in self._template_cache
+            hits_before = bytecode_cache.hits if bytecode_cache else 0
+            load_start = time.perf_counter()
+            template = self.load_template(template_path)
+            load_ms = round((time.perf_counter() - load_start) * 1000, 2)
+
+            if template is None:
+                source = "failed"
+            elif cached:
+                source = "memory"
+            elif bytecode_cache and bytecode_cache.hits > hits_before:
+                source = "bytecode"
+            else:
+                source = "compiled"
+            templates[template_path] = {"load_ms": load_ms, "source": source}
+
+        sources = [info["source"] for info in templates.values()]
+        report = {
+            "templates": templates,
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+            "loaded": len(sources) - sources.count("failed"),
+            "failed": sources.count("failed"),
+            "from_bytecode": sources.count("bytecode"),
+            "compiled": sources.count("compiled"),
+            "bytecode_cache": bytecode_cache.get_stats() if bytecode_cache else None
+        }
+        self.warm_up_report = report
+
+        logger.info(
+            f"模板预热完成: 加载 {report['loaded']} 个（字节码缓存 {report['from_bytecode']} 个，"
+            f"重新编译 {report['compiled']} 个），失败 {report['failed']} 个，耗时 {report['total_ms']}ms"
+        )
+        return report
+
     def render_jinja(self, template_name: str, data: dict) -> Optional[str]:
         """
         渲染单个模板
@@ -254,7 +495,7 @@ class DocumentGenerator:
                 return None
             
             # 渲染模板
-            rendered_html = template.render(**data)
+            rendered_html = template.render(data)
             
             logger.info(f"成功渲染模板: {template_name}")
             return rendered_html
@@ -263,274 +504,170 @@ class DocumentGenerator:
             logger.error(f"渲染模板失败: {template_name}, 错误: {str(e)}")
             return None
     
-    def _prepare_template_data(self, enterprise_data: dict) -> dict:
+    def _get_render_executor(self) -> ThreadPoolExecutor:
+        """获取文档渲染线程池（延迟创建，进程内共享）"""
+        with self._render_executor_lock:
+            if self._render_executor is None:
+                self._render_executor = ThreadPoolExecutor(
+                    max_workers=self.render_workers,
+                    thread_name_prefix="doc-render"
+                )
+            return self._render_executor
+    
+    def _render_and_count(self, template_name: str, data: dict) -> Tuple[Optional[str], int, Dict[str, float]]:
+        """渲染单个文档并统计字数，返回（内容, 字数, 耗时）"""
+        started = time.perf_counter()
+        content = self.render_jinja(template_name, data)
+        rendered_at = time.perf_counter()
+        word_count = count_words(content) if content else 0
+        finished = time.perf_counter()
+        return content, word_count, {
+            "render_ms": round((rendered_at - started) * 1000, 2),
+            "word_count_ms": round((finished - rendered_at) * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2)
+        }
+    
+    def render_documents(self, render_jobs: Dict[str, Tuple[str, str]], template_data: dict) -> Tuple[Dict[str, Tuple[Optional[str], int]], Dict[str, Any]]:
+        """
+        并发渲染多个文档并统计字数
+        
+        各文档共用同一份模板数据（模板渲染不修改数据）。
+        
+        Args:
+            render_jobs: 结果键名到（模板路径, 文档名称）的映射
+            template_data: 预先准备好的模板数据
+            
+        Returns:
+            (结果键名到（内容, 字数）的映射, 各文档耗时与总耗时（毫秒）)
+        """
+        started = time.perf_counter()
+        rendered: Dict[str, Tuple[Optional[str], int]] = {}
+        timings: Dict[str, Any] = {"documents": {}}
+        
+        if len(render_jobs) <= 1 or self.render_workers <= 1:
+            results = {
+                result_key: self._render_and_count(template_path, template_data)
+                for result_key, (template_path, _) in render_jobs.items()
+            }
+        else:
+            executor = self._get_render_executor()
+            futures = {
+                result_key: executor.submit(self._render_and_count, template_path, template_data)
+                for result_key, (template_path, _) in render_jobs.items()
+            }
+            results = {result_key: future.result() for result_key, future in futures.items()}
+        
+        for result_key, (content, word_count, doc_timings) in results.items():
+            rendered[result_key] = (content, word_count)
+            timings["documents"][result_key] = doc_timings
+        
+        timings["wall_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"文档渲染完成: {len(render_jobs)} 个文档，耗时 {timings['wall_ms']}ms")
+        return rendered, timings
+    
+    def _prepare_template_data(self, enterprise_data: dict) -> ChainMap:
         """
         准备模板数据，处理一些通用字段和默认值
         
+        不复制企业数据：返回按「派生字段 → 企业数据 → 默认值」顺序查找的 ChainMap，
+        派生字段（地址、联系人、环境受体、能源消耗等）每次请求只计算一次，由各文档模板共用。
+        写入（如 ai_sections）只落在派生字段层，不会修改企业数据和默认值。
+        
         Args:
             enterprise_data: 企业原始数据
             
         Returns:
             处理后的模板数据
         """
-        # 创建数据副本，避免修改原始数据
-        data = enterprise_data.copy()
-        
-        # 设置默认值
-        defaults = {
-            "plan_version": "1",
-            "assessment_date": "2023年1月",
-            "investigation_date": "2023年1月",
-            "publish_date": "2023年1月1日",
-            "implement_date": "2023年1月1日",
-            "compile_unit": data.get("basic_info", {}).get("company_name", ""),
-            "record_number": "",
-            "record_date": "",
-            "organization_code": "",
-            "legal_representative": "",
-            "legal_phone": "",
-            "contact_person": "",
-            "contact_phone": "",
-            "fax": "/",
-            "email": "",
-            "address": "",
-            "risk_level": "L",
-            "plan_signer": "",
-            "submit_time": "",
-            "commander_name": "",
-            "emergency_phone": "",
-            "regional_plan_name": "XX区突发环境事件应急预案",
-            "longitude": "xxx",
-            "latitude": "xxx",
-            "terrain_description": "",
-            "weather_description": "",
-            "hydrology_description": "",
-            "location_description": "",
-            "enterprise_overview": "",
-            "environmental_work": "",
-            "construction_layout": "",
-            "production_process_description": "",
-            "safety_management_description": "",
-            "water_environment_impact": "",
-            "air_environment_impact": "",
-            "noise_environment_impact": "",
-            "solid_waste_impact": "",
-            "risk_management_conclusion": "",
-            "long_term_plan": "",
-            "medium_term_plan": "",
-            "short_term_plan": "",
-            "final_risk_level": "",
-            "q_value": "",
-            "water_q_value": "",
-            "has_violations": False,
-            "investigation_baseline_date": "2023年",
-            "investigation_start_date": "2023年1月1日",
-            "investigation_end_date": "2023年1月31日",
-            "investigation_leader": "",
-            "investigation_contact": "",
-            "investigation_process": "",
-            "resource_types": "",
-            "has_external_support": False,
-            "external_support_count": 0,
-            "investigation_reviewed": False,
-            "investigation_archived": False,
-            "update_mechanism": False,
-            "resource_match": "满足",
-            "gap_analysis_1": "",
-            "gap_analysis_2": "",
-            "gap_analysis_3": "",
-            "gap_analysis_4": "",
-            "conclusion": "",
-            "main_responsible_person": "",
-            "env_responsible_person": "",
-            "incident_type": "",
-            "incident_description": "",
-            "incident_consequence_analysis": "",
-            "emergency_materials_for_incident": "",
-            "incident_response_measures": "",
-            "incident_response_precautions": "",
-            "internal_emergency_contacts": "",
-            "fire_police": "119",
-            "env_bureau": "",
-            "surrounding_units": "",
-            "incident_name": "",
-            "incident_time": "",
-            "incident_unit": "",
-            "incident_category": "",
-            "incident_location": "",
-            "incident_reporter": "",
-            "incident_briefing": "",
-            "incident_receiver": "",
-            "incident_info_transfer_method": "",
-            "incident_preliminary_cause": "",
-            "incident_taken_measures": "",
-            "has_casualties": "",
-            "casualties_details": "",
-            "info_report_leader": "",
-            "report_time": "",
-            "report_method": "",
-            "report_content": "",
-            "leader_instructions": "",
-            "is_plan_activated": "",
-            "response_level": "",
-            "is_external_help_requested": "",
-            "rescue_departments": "",
-            "used_emergency_materials": "",
-            "main_emergency_measures": "",
-            "emergency_result": "",
-            "form_filler": "",
-            "start_order_signer": "",
-            "start_order_time": "",
-            "start_order_messenger": "",
-            "start_order_transmit_time": "",
-            "end_order_signer": "",
-            "end_order_time": "",
-            "end_order_messenger": "",
-            "end_order_transmit_time": "",
-            "drill_time": "",
-            "drill_participants": "",
-            "drill_content": "",
-            "drill_preparation": "",
-            "drill_other": "",
-            "drill_planner": "",
-            "drill_approver": "",
-            "drill_plan_date": "",
-            "drill_recorder": "",
-            "drill_record_date": "",
-            "drill_reviewer": "",
-            "drill_review_date": "",
-            "change_reason": "",
-            "change_applying_unit": "",
-            "emergency_response_card_content": ""
-        }
+        derived: Dict[str, Any] = {}
+        basic_info = enterprise_data.get("basic_info", {})
+        emergency_resources = enterprise_data.get("emergency_resources", {})
+        production_process = enterprise_data.get("production_process", {})
         
-        # 合并默认值
-        for key, value in defaults.items():
-            if key not in data:
-                data[key] = value
+        if "compile_unit" not in enterprise_data:
+            derived["compile_unit"] = basic_info.get("company_name", "")
         
         # 处理企业名称
-        if "basic_info" in data and "company_name" in data["basic_info"]:
-            data["enterprise_name"] = data["basic_info"]["company_name"]
-        else:
-            data["enterprise_name"] = "企业名称"
+        derived["enterprise_name"] = basic_info.get("company_name", "企业名称")
         
         # 处理地址
-        if "basic_info" in data and "address" in data["basic_info"]:
-            address = data["basic_info"]["address"]
-            if isinstance(address, dict):
-                # 组合地址各部分
-                address_parts = []
-                if "province" in address and address["province"]:
-                    address_parts.append(address["province"])
-                if "city" in address and address["city"]:
-                    address_parts.append(address["city"])
-                if "district" in address and address["district"]:
-                    address_parts.append(address["district"])
-                if "detail" in address and address["detail"]:
-                    address_parts.append(address["detail"])
-                data["address"] = "".join(address_parts)
-                
-                # 提取经纬度
-                if "longitude" in address:
-                    data["longitude"] = address["longitude"]
-                if "latitude" in address:
-                    data["latitude"] = address["latitude"]
+        address = basic_info.get("address")
+        if isinstance(address, dict):
+            # 组合地址各部分
+            derived["address"] = "".join(
+                address[part] for part in ("province", "city", "district", "detail") if address.get(part)
+            )
+            
+            # 提取经纬度
+            if "longitude" in address:
+                derived["longitude"] = address["longitude"]
+            if "latitude" in address:
+                derived["latitude"] = address["latitude"]
         
         # 处理联系人信息
-        if "basic_info" in data and "contacts" in data["basic_info"]:
-            contacts = data["basic_info"]["contacts"]
-            if isinstance(contacts, dict):
-                # 法定代表人
-                if "legal_person" in contacts and isinstance(contacts["legal_person"], dict):
-                    legal_person = contacts["legal_person"]
-                    if "name" in legal_person:
-                        data["legal_representative"] = legal_person["name"]
-                    if "mobile" in legal_person:
-                        data["legal_phone"] = legal_person["mobile"]
-                
-                # 环保负责人
-                if "environmental_manager" in contacts and isinstance(contacts["environmental_manager"], dict):
-                    env_manager = contacts["environmental_manager"]
-                    if "name" in env_manager:
-                        data["env_responsible_person"] = env_manager["name"]
-                
-                # 应急联系人
-                if "emergency_contact" in contacts and isinstance(contacts["emergency_contact"], dict):
-                    emergency_contact = contacts["emergency_contact"]
-                    if "name" in emergency_contact:
-                        data["contact_person"] = emergency_contact["name"]
-                    if "mobile" in emergency_contact:
-                        data["contact_phone"] = emergency_contact["mobile"]
-                
-                # 办公电话和邮箱
-                if "office_phone" in contacts:
-                    data["emergency_phone"] = contacts["office_phone"]
-                if "email" in contacts:
-                    data["email"] = contacts["email"]
+        contacts = basic_info.get("contacts")
+        if isinstance(contacts, dict):
+            # 法定代表人
+            legal_person = contacts.get("legal_person")
+            if isinstance(legal_person, dict):
+                if "name" in legal_person:
+                    derived["legal_representative"] = legal_person["name"]
+                if "mobile" in legal_person:
+                    derived["legal_phone"] = legal_person["mobile"]
+            
+            # 环保负责人
+            env_manager = contacts.get("environmental_manager")
+            if isinstance(env_manager, dict) and "name" in env_manager:
+                derived["env_responsible_person"] = env_manager["name"]
+            
+            # 应急联系人
+            emergency_contact = contacts.get("emergency_contact")
+            if isinstance(emergency_contact, dict):
+                if "name" in emergency_contact:
+                    derived["contact_person"] = emergency_contact["name"]
+                if "mobile" in emergency_contact:
+                    derived["contact_phone"] = emergency_contact["mobile"]
+            
+            # 办公电话和邮箱
+            if "office_phone" in contacts:
+                derived["emergency_phone"] = contacts["office_phone"]
+            if "email" in contacts:
+                derived["email"] = contacts["email"]
         
         # 处理风险等级
-        if "basic_info" in data and "risk_level" in data["basic_info"]:
-            risk_level = data["basic_info"]["risk_level"]
-            if risk_level == "一般":
-                data["risk_level"] = "L"
-            elif risk_level == "较大":
-                data["risk_level"] = "M"
-            elif risk_level == "重大":
-                data["risk_level"] = "H"
-            else:
-                data["risk_level"] = "L"
+        if "risk_level" in basic_info:
+            derived["risk_level"] = RISK_LEVEL_CODES.get(basic_info["risk_level"], "L")
         
-        # 处理内部联系人列表
-        if "emergency_resources" in data and "contact_list_internal" in data["emergency_resources"]:
-            data["internal_contacts"] = data["emergency_resources"]["contact_list_internal"]
-        else:
-            data["internal_contacts"] = []
-        
-        # 处理外部联系人列表
-        if "emergency_resources" in data and "contact_list_external" in data["emergency_resources"]:
-            data["external_contacts"] = data["emergency_resources"]["contact_list_external"]
-        else:
-            data["external_contacts"] = []
-        
-        # 处理应急物资
-        if "emergency_resources" in data and "emergency_materials" in data["emergency_resources"]:
-            data["emergency_materials"] = data["emergency_resources"]["emergency_materials"]
-        else:
-            data["emergency_materials"] = []
+        # 应急资源与生产工艺中的列表直接引用，不复制
+        derived["internal_contacts"] = emergency_resources.get("contact_list_internal", [])
+        derived["external_contacts"] = emergency_resources.get("contact_list_external", [])
+        derived["emergency_materials"] = emergency_resources.get("emergency_materials", [])
+        derived["emergency_drills"] = emergency_resources.get("emergency_drills", [])
+        derived["products"] = production_process.get("products", [])
+        derived["raw_materials"] = production_process.get("raw_materials", [])
+        derived["hazardous_chemicals"] = production_process.get("hazardous_chemicals", [])
+        derived["hazardous_waste"] = production_process.get("hazardous_waste", [])
         
         # 处理应急队伍
-        if "emergency_resources" in data and "emergency_team" in data["emergency_resources"]:
-            emergency_team = data["emergency_resources"]["emergency_team"]
-            
-            # 构建应急队伍列表
+        if "emergency_team" in emergency_resources:
             emergency_teams = []
+            if not isinstance(contacts, dict):
+                contacts = {}
             
-            # 总指挥
-            if "basic_info" in data and "contacts" in data["basic_info"] and "legal_person" in data["basic_info"]["contacts"]:
-                legal_person = data["basic_info"]["contacts"]["legal_person"]
-                if isinstance(legal_person, dict):
-                    emergency_teams.append({
-                        "organization": "应急指挥部",
-                        "department": "总指挥",
-                        "leader": legal_person.get("name", ""),
-                        "contact": legal_person.get("mobile", "")
-                    })
-            
-            # 副总指挥
-            if "basic_info" in data and "contacts" in data["basic_info"] and "environmental_manager" in data["basic_info"]["contacts"]:
-                env_manager = data["basic_info"]["contacts"]["environmental_manager"]
-                if isinstance(env_manager, dict):
+            # 总指挥、副总指挥
+            for contact_key, department in (("legal_person", "总指挥"), ("environmental_manager", "副总指挥")):
+                person = contacts.get(contact_key)
+                if isinstance(person, dict):
                     emergency_teams.append({
                         "organization": "应急指挥部",
-                        "department": "副总指挥",
-                        "leader": env_manager.get("name", ""),
-                        "contact": env_manager.get("mobile", "")
+                        "department": department,
+                        "leader": person.get("name", ""),
+                        "contact": person.get("mobile", "")
                     })
             
             # 添加其他内部联系人到应急队伍
-            if "internal_contacts" in data and isinstance(data["internal_contacts"], list):
-                for contact in data["internal_contacts"]:
+            if isinstance(derived["internal_contacts"], list):
+                for contact in derived["internal_contacts"]:
                     if isinstance(contact, dict):
                         emergency_teams.append({
                             "organization": contact.get("department", ""),
@@ -539,99 +676,33 @@ class DocumentGenerator:
                             "contact": contact.get("mobile", "")
                         })
             
-            data["emergency_teams"] = emergency_teams
-        
-        # 处理产品信息
-        if "production_process" in data and "products" in data["production_process"]:
-            data["products"] = data["production_process"]["products"]
-        else:
-            data["products"] = []
-        
-        # 处理原材料信息
-        if "production_process" in data and "raw_materials" in data["production_process"]:
-            data["raw_materials"] = data["production_process"]["raw_materials"]
-        else:
-            data["raw_materials"] = []
-        
-        # 处理危险化学品信息
-        if "production_process" in data and "hazardous_chemicals" in data["production_process"]:
-            data["hazardous_chemicals"] = data["production_process"]["hazardous_chemicals"]
-        else:
-            data["hazardous_chemicals"] = []
-        
-        # 处理危险废物信息
-        if "production_process" in data and "hazardous_waste" in data["production_process"]:
-            data["hazardous_waste"] = data["production_process"]["hazardous_waste"]
-        else:
-            data["hazardous_waste"] = []
+            derived["emergency_teams"] = emergency_teams
         
-        # 处理环境受体信息
-        if "environment_info" in data and "nearby_receivers" in data["environment_info"]:
-            nearby_receivers = data["environment_info"]["nearby_receivers"]
-            
-            # 分离水环境和大气环境受体
-            water_receptors = []
-            air_receptors = []
-            
-            for receptor in nearby_receivers:
-                if isinstance(receptor, dict):
-                    receptor_type = receptor.get("receiver_type", "")
-                    if "水" in receptor_type:
-                        water_receptors.append(receptor)
-                    else:
-                        air_receptors.append(receptor)
-            
-            data["water_receptors"] = water_receptors
-            data["air_receptors"] = air_receptors
-        else:
-            data["water_receptors"] = []
-            data["air_receptors"] = []
+        # 处理环境受体信息：分离水环境和大气环境受体
+        water_receptors = []
+        air_receptors = []
+        for receptor in enterprise_data.get("environment_info", {}).get("nearby_receivers", ()):
+            if isinstance(receptor, dict):
+                if "水" in receptor.get("receiver_type", ""):
+                    water_receptors.append(receptor)
+                else:
+                    air_receptors.append(receptor)
+        derived["water_receptors"] = water_receptors
+        derived["air_receptors"] = air_receptors
         
         # 处理能源消耗信息
-        if "production_process" in data and "energy" in data["production_process"]:
-            energy = data["production_process"]["energy"]
+        if "energy" in production_process:
+            energy = production_process["energy"]
             if isinstance(energy, dict):
-                energy_consumption = []
-                
-                if "water_consumption" in energy:
-                    energy_consumption.append({
-                        "type": "水",
-                        "unit": "吨/年",
-                        "annual_consumption": energy["water_consumption"]
-                    })
-                
-                if "electricity_consumption" in energy:
-                    energy_consumption.append({
-                        "type": "电",
-                        "unit": "千瓦时/年",
-                        "annual_consumption": energy["electricity_consumption"]
-                    })
-                
-                if "natural_gas" in energy:
-                    energy_consumption.append({
-                        "type": "天然气",
-                        "unit": "立方米/年",
-                        "annual_consumption": energy["natural_gas"]
-                    })
-                
-                if "other_energy" in energy:
-                    energy_consumption.append({
-                        "type": "其他能源",
-                        "unit": "",
-                        "annual_consumption": energy["other_energy"]
-                    })
-                
-                data["energy_consumption"] = energy_consumption
+                derived["energy_consumption"] = [
+                    {"type": energy_type, "unit": unit, "annual_consumption": energy[field]}
+                    for field, energy_type, unit in ENERGY_FIELDS
+                    if field in energy
+                ]
         else:
-            data["energy_consumption"] = []
+            derived["energy_consumption"] = []
         
-        # 处理应急演练信息
-        if "emergency_resources" in data and "emergency_drills" in data["emergency_resources"]:
-            data["emergency_drills"] = data["emergency_resources"]["emergency_drills"]
-        else:
-            data["emergency_drills"] = []
-        
-        return data
+        return ChainMap(derived, enterprise_data, TEMPLATE_DEFAULTS)
     
     def generate_ai_section(self, section_name: str, enterprise_data: dict, user_id: Optional[str] = None) -> str:
         """
@@ -649,9 +720,6 @@ class DocumentGenerator:
             # 获取AI服务实例
             ai_service = get_ai_service()
             
-            # 构建提示词（这里使用简单的提示词，后续可以优化）
-            prompt = self._build_section_prompt(section_name, enterprise_data)
-            
             # AI配置
             config = {
                 "model": "gpt-4",
@@ -659,6 +727,14 @@ class DocumentGenerator:
                 "max_tokens": 2000
             }
             
+            # 构建提示词，超出模型 token 预算时逐级压缩企业数据
+            fitted = fit_prompt(
+                lambda level: self._build_section_prompt(section_name, enterprise_data, level),
+                get_token_budget(config["model"])
+            )
+            prompt_budget_stats.record(section_name, fitted["tokens"], fitted["level"], fitted["truncated"])
+            prompt = fitted["prompt"]
+            
             # 调用AI生成内容
             content = ai_service.generate(prompt, config, user_id)
             
@@ -670,13 +746,14 @@ class DocumentGenerator:
             # 返回错误提示内容
             return f"[AI生成失败: {section_name}] {str(e)}"
     
-    def _build_section_prompt(self, section_name: str, enterprise_data: dict) -> str:
+    def _build_section_prompt(self, section_name: str, enterprise_data: dict, level: int = 0) -> str:
         """
         构建章节提示词
         
         Args:
             section_name: 章节名称
             enterprise_data: 企业数据
+            level: 企业数据的压缩级别
             
         Returns:
             构建好的提示词
@@ -684,6 +761,12 @@ class DocumentGenerator:
         # 获取企业名称
         enterprise_name = enterprise_data.get("basic_info", {}).get("company_name", "企业名称")
         
+        # 各数据块只按章节声明的字段投影并压缩一次
+        data_blocks = {
+            root: self._section_data_block(section_name, enterprise_data, root, level)
+            for root in SECTION_PROMPT_DATA_ROOTS
+        }
+        
         # 根据章节名称构建不同的提示词
         prompts = {
             "enterprise_overview": f"""
@@ -696,7 +779,7 @@ class DocumentGenerator:
             - 工作制度
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
             
             要求：
             1. 内容专业、准确
@@ -712,7 +795,7 @@ class DocumentGenerator:
             - 经纬度坐标
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}).get("address", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info.address"]}
             
             要求：
             1. 内容专业、准确
@@ -728,7 +811,7 @@ class DocumentGenerator:
             - 对环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
             
             要求：
             1. 内容专业、准确
@@ -744,7 +827,7 @@ class DocumentGenerator:
             - 对环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
             
             要求：
             1. 内容专业、准确
@@ -760,7 +843,7 @@ class DocumentGenerator:
             - 对环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
             
             要求：
             1. 内容专业、准确
@@ -776,7 +859,7 @@ class DocumentGenerator:
             - 环境影响因素
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("production_process", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["production_process"]}
             
             要求：
             1. 内容专业、准确
@@ -792,8 +875,8 @@ class DocumentGenerator:
             - 相关措施和制度
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("emergency_resources", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
+            {data_blocks["emergency_resources"]}
             
             要求：
             1. 内容专业、准确
@@ -809,8 +892,8 @@ class DocumentGenerator:
             - 对水环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("production_process", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("environment_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["production_process"]}
+            {data_blocks["environment_info"]}
             
             要求：
             1. 内容专业、准确
@@ -826,8 +909,8 @@ class DocumentGenerator:
             - 对大气环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("production_process", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("environment_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["production_process"]}
+            {data_blocks["environment_info"]}
             
             要求：
             1. 内容专业、准确
@@ -843,8 +926,8 @@ class DocumentGenerator:
             - 对声环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("production_process", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("environment_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["production_process"]}
+            {data_blocks["environment_info"]}
             
             要求：
             1. 内容专业、准确
@@ -860,8 +943,8 @@ class DocumentGenerator:
             - 对环境的影响
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("production_process", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("environment_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["production_process"]}
+            {data_blocks["environment_info"]}
             
             要求：
             1. 内容专业、准确
@@ -877,8 +960,8 @@ class DocumentGenerator:
             - 风险防控能力评估
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("emergency_resources", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
+            {data_blocks["emergency_resources"]}
             
             要求：
             1. 内容专业、准确
@@ -894,7 +977,7 @@ class DocumentGenerator:
             - 预期效果
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
             
             要求：
             1. 内容专业、准确
@@ -910,8 +993,8 @@ class DocumentGenerator:
             - 预期效果
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("emergency_resources", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
+            {data_blocks["emergency_resources"]}
             
             要求：
             1. 内容专业、准确
@@ -927,8 +1010,8 @@ class DocumentGenerator:
             - 预期效果
             
             请根据以下企业信息生成：
-            {json.dumps(enterprise_data.get("basic_info", {}), ensure_ascii=False, indent=2)}
-            {json.dumps(enterprise_data.get("emergency_resources", {}), ensure_ascii=False, indent=2)}
+            {data_blocks["basic_info"]}
+            {data_blocks["emergency_resources"]}
             
             要求：
             1. 内容专业、准确
@@ -941,20 +1024,304 @@ class DocumentGenerator:
         # 返回对应的提示词，如果没有找到则返回通用提示词
         return prompts.get(section_name, f"请为'{enterprise_name}'生成'{section_name}'章节的内容，要求专业、准确、简洁。")
     
-    def build_ai_sections(self, enterprise_data: dict, user_id: Optional[str] = None, document_type: Optional[str] = None, enable_compliance_check: bool = True, max_retries: int = 2) -> dict:
+    def _section_data_block(self, section_name: str, enterprise_data: dict, root: str, level: int = 0) -> str:
+        """
+        构建章节提示词中的企业数据块
+        
+        段落配置声明了 root 下的数据路径时只保留这些字段，否则保留 root 下的全部数据；
+        结果输出为紧凑 JSON。
+        
+        Args:
+            section_name: 章节名称
+            enterprise_data: 企业数据
+            root: 数据块路径，如 "basic_info" 或 "basic_info.address"
+            level: 压缩级别
+            
+        Returns:
+            紧凑 JSON 字符串
+        """
+        keys = root.split(".")
+        declared = [
+            path for path in ai_sections_loader.get_section_dependencies().get(section_name, ())
+            if path == root or path.startswith(root + ".")
+        ]
+        data = project_fields(enterprise_data, declared) if declared else enterprise_data
+        for key in keys:
+            data = data.get(key, {}) if isinstance(data, dict) else {}
+        return compact_json(data, level)
+    
+    def _render_user_prompt(self, section_key: str, section_config: dict, enterprise_data: dict,
+                            compiled_templates: Optional[Dict[str, CompiledTemplate]] = None,
+                            value_cache: Optional[dict] = None) -> str:
+        """
+        使用配置加载时预编译的模板渲染段落的user template
+        
+        提示词（含 system prompt）超出模型的 token 预算时逐级提高压缩级别重新渲染，
+        最高级别仍超出时截断。
+        
+        Args:
+            section_key: AI段落键名
+            section_config: 段落配置
+            enterprise_data: 整个企业数据
+            compiled_templates: 预编译模板映射，None 时从配置加载器获取
+            value_cache: 同一份企业数据渲染多个段落时共用的已格式化占位符值（仅用于 0 级）
+            
+        Returns:
+            渲染后的用户提示词
+        """
+        user_template = section_config.get("user_template", "")
+        if compiled_templates is None:
+            compiled_templates = ai_sections_loader.get_compiled_templates()
+        compiled = compiled_templates.get(section_key)
+        
+        def render(level: int) -> str:
+            if compiled is None or compiled.source != user_template:
+                # 调用方传入了与配置文件不同的段落配置
+                return render_user_template(user_template, enterprise_data, level)
+            return render_compiled_template(compiled, enterprise_data, value_cache if level == 0 else None, level)
+        
+        fitted = fit_prompt(
+            render,
+            get_token_budget(section_config.get("model", "xunfei_spark_v4")),
+            estimate_tokens(section_config.get("system_prompt", ""))
+        )
+        prompt_budget_stats.record(section_key, fitted["tokens"], fitted["level"], fitted["truncated"])
+        if fitted["level"]:
+            logger.info(f"AI段落 {section_key} 提示词超出预算，使用压缩级别 {fitted['level']}")
+        return fitted["prompt"]
+    
+    def _section_cache_key(self, section_key: str, section_config: dict, system_prompt: str, user_prompt: str, variant: str) -> str:
+        """
+        构建AI段落结果的缓存键（提示词、模型与段落配置版本均相同时命中）
+        
+        Args:
+            section_key: AI段落键名
+            section_config: 段落配置
+            system_prompt: 系统提示词
+            user_prompt: 渲染后的用户提示词
+            variant: 生成方式（checked：经过合规检查；raw：单次生成）
+            
+        Returns:
+            缓存键
+        """
+        return section_cache.make_key(
+            section_key,
+            section_config.get("model", "xunfei_spark_v4"),
+            system_prompt,
+            user_prompt,
+            section_config.get("version"),
+            variant
+        )
+    
+    def _generate_section_with_compliance(self, section_key: str, section_config: dict, enterprise_data: dict, user_id: Optional[str] = None, enable_compliance_check: bool = True, max_retries: int = 2, user_prompt: Optional[str] = None, cache_key: Optional[str] = None) -> str:
+        """
+        生成单个AI段落（含合规检查重试循环）
+        
+        Args:
+            section_key: AI段落键名
+            section_config: 段落配置
+            enterprise_data: 整个企业数据
+            user_id: 用户ID（用于使用量统计）
+            enable_compliance_check: 是否启用合规检查
+            max_retries: 最大重试次数
+            user_prompt: 已渲染的用户提示词，None 时在此渲染
+            cache_key: 缓存键；传入时表示调用方已查过缓存，此处不再查询
+            
+        Returns:
+            处理后的段落内容
+        """
+        # 获取system prompt并渲染user template
+        system_prompt = section_config.get("system_prompt", "")
+        if user_prompt is None:
+            user_prompt = self._render_user_prompt(section_key, section_config, enterprise_data)
+        
+        # 输入未变化时直接复用缓存结果
+        if cache_key is None:
+            cache_key = self._section_cache_key(
+                section_key, section_config, system_prompt, user_prompt,
+                "checked" if enable_compliance_check else "raw"
+            )
+            cached_content = section_cache.get(section_key, cache_key)
+            if cached_content is not None:
+                logger.info(f"AI段落命中缓存: {section_key}")
+                return cached_content
+        
+        # 每次 LLM 调用都计入 max_retries；未通过时优先发送定向补丁提示词，
+        # 补丁仍未通过再整段重新生成（REPAIR_MODE=regenerate 时始终整段重新生成）
+        model = section_config.get("model", "xunfei_spark_v4")
+        repair_mode = get_repair_mode() if enable_compliance_check else "regenerate"
+        retry_count = 0
+        processed_content = ""
+        compliance_passed = False
+        next_mode = "generate"
+        repair_plan: Optional[Dict[str, Any]] = None
+        issues: List[str] = []
+        
+        while retry_count < max_retries and not compliance_passed:
+            retry_count += 1
+            mode = next_mode
+            started = time.perf_counter()
+            
+            if mode == "patch":
+                patch_prompt = build_patch_prompt(repair_plan)
+                call_system, call_user = patch_prompt["system"], patch_prompt["user"]
+                output = call_llm(model, call_system, call_user, user_id)
+                if output.startswith(FAILED_CONTENT_PREFIX):
+                    # 补丁调用失败：保留原内容，不把错误提示合并进段落
+                    candidate = processed_content
+                else:
+                    candidate = postprocess_ai_output(merge_patch(processed_content, repair_plan, output))
+            else:
+                call_system, call_user = system_prompt, user_prompt
+                output = call_llm(model, call_system, call_user, user_id)
+                candidate = postprocess_ai_output(output)
+            latency_ms = (time.perf_counter() - started) * 1000
+            
+            # 如果启用合规检查，则进行验证
+            if enable_compliance_check:
+                compliance_result = ai_compliance_checker.check_ai_output(section_key, candidate)
+                compliance_passed = compliance_result["passed"]
+                # 补丁未改善时保留原内容
+                if mode != "patch" or compliance_passed or len(compliance_result["issues"]) < len(issues):
+                    processed_content = candidate
+                    issues = compliance_result["issues"]
+                
+                if not compliance_passed:
+                    logger.warning(f"AI段落 {section_key} 第 {retry_count} 次生成（{mode}）未通过合规检查")
+                    logger.warning(f"合规问题: {compliance_result['issues']}")
+                    
+                    if retry_count < max_retries:
+                        repair_plan = None
+                        # 生成失败的占位内容没有可保留的部分，不做补丁修复，直接整段重新生成
+                        if (repair_mode == "patch" and mode != "patch" and processed_content
+                                and not processed_content.startswith(FAILED_CONTENT_PREFIX)):
+                            repair_plan = build_repair_plan(section_key, processed_content)
+                        if repair_plan is not None and can_patch(repair_plan):
+                            next_mode = "patch"
+                        else:
+                            # 调整system prompt加入合规要求后整段重新生成
+                            system_prompt += f"\n\n请注意，上次生成的内容存在以下合规问题：{', '.join(issues)}。请在本次生成中修正这些问题。"
+                            next_mode = "regenerate"
+                else:
+                    logger.info(f"AI段落 {section_key} 通过合规检查（{mode}）")
+            else:
+                # 如果不启用合规检查，直接通过
+                processed_content = candidate
+                compliance_passed = True
+            
+            # 记录每次调用的 token 数与耗时
+            retry_cost_tracker.record(
+                section_key, mode, latency_ms=latency_ms, passed=compliance_passed,
+                **count_call_tokens(call_system, call_user, output)
+            )
+        
+        # 仅缓存通过合规检查的结果，未通过的段落下次仍重新生成
+        if compliance_passed:
+            section_cache.set(section_key, cache_key, processed_content)
+        
+        logger.info(f"成功生成AI段落: {section_key}, 重试次数: {retry_count}")
+        return processed_content
+    
+    def _run_sections_concurrently(self, tasks: Dict[str, Callable[[], str]], max_concurrency: Optional[int] = None, section_timeout: Optional[float] = None, progress_callback: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
+        """
+        有界并发执行段落生成任务
+        
+        每个段落的超时从其实际开始执行时计时；超时或失败的段落以错误提示占位，
+        结果按 tasks 的原始顺序合并，与串行生成的顺序一致。
+        
+        Args:
+            tasks: 段落键名到生成函数的映射（有序）
+            max_concurrency: 最大并发数，None 使用 AI_SECTION_CONCURRENCY
+            section_timeout: 单个段落超时秒数，None 使用 AI_SECTION_TIMEOUT
+            progress_callback: 段落结束回调 (section_key, status)，status 为 succeeded/failed
+            
+        Returns:
+            段落键名到内容的映射（顺序与 tasks 一致）
+        """
+        if not tasks:
+            return {}
+        
+        max_concurrency = max(1, min(max_concurrency or self.section_concurrency, len(tasks)))
+        section_timeout = section_timeout or self.section_timeout
+        
+        results: Dict[str, str] = {}
+        started_at: Dict[str, float] = {}
+        
+        def run(section_key: str, task: Callable[[], str]) -> str:
+            started_at[section_key] = time.monotonic()
+            return task()
+        
+        def report(section_key: str, status: str):
+            # 回调异常不影响段落生成
+            if progress_callback is None:
+                return
+            try:
+                progress_callback(section_key, status)
+            except Exception as e:
+                logger.warning(f"段落进度回调失败: {section_key}, 错误: {str(e)}")
+        
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ai-section")
+        try:
+            futures = {executor.submit(run, key, task): key for key, task in tasks.items()}
+            pending = set(futures)
+            
+            while pending:
+                # 等待到最早的段落超时时刻，或任一段落完成
+                now = time.monotonic()
+                deadlines = [
+                    started_at[futures[f]] + section_timeout - now
+                    for f in pending if futures[f] in started_at
+                ]
+                wait_timeout = max(0.0, min(deadlines)) if deadlines else section_timeout
+                done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    section_key = futures[future]
+                    try:
+                        results[section_key] = future.result()
+                        report(section_key, "succeeded")
+                    except Exception as e:
+                        logger.error(f"生成AI段落失败: {section_key}, 错误: {str(e)}")
+                        results[section_key] = f"[AI生成失败: {section_key}] {str(e)}"
+                        report(section_key, "failed")
+                
+                # 标记已超时的段落（线程无法强制终止，其结果将被丢弃）
+                now = time.monotonic()
+                for future in list(pending):
+                    section_key = futures[future]
+                    if section_key in started_at and now - started_at[section_key] >= section_timeout:
+                        logger.error(f"生成AI段落超时: {section_key}, 超时时间: {section_timeout}秒")
+                        results[section_key] = f"[AI生成失败: {section_key}] 生成超时（{section_timeout}秒）"
+                        pending.discard(future)
+                        report(section_key, "failed")
+        finally:
+            # 不等待已超时的线程，未开始的任务直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # 按原始顺序合并结果
+        return {key: results.get(key, "") for key in tasks}
+    
+    def build_ai_sections(self, enterprise_data: dict, user_id: Optional[str] = None, document_type: Optional[str] = None, enable_compliance_check: bool = True, max_retries: int = 2, max_concurrency: Optional[int] = None, section_timeout: Optional[float] = None, progress_callback: Optional[Callable[[str, str], None]] = None, reuse_sections: Optional[Dict[str, str]] = None) -> dict:
         """
         构建AI段落（使用配置文件）
         
+        各段落在线程池中并发生成，总耗时约等于最慢段落的耗时。
+        
         Args:
             enterprise_data: 整个企业数据
             user_id: 用户ID（用于使用量统计）
             document_type: 文档类型，可选，用于过滤特定文档的sections
             enable_compliance_check: 是否启用合规检查
             max_retries: 最大重试次数
+            max_concurrency: 最大并发数，None 使用 AI_SECTION_CONCURRENCY（1 表示串行）
+            section_timeout: 单个段落超时秒数，None 使用 AI_SECTION_TIMEOUT
+            progress_callback: 段落结束回调 (section_key, status)
+            reuse_sections: 直接复用的段落内容（增量生成时输入未变化的段落），不再渲染与调用LLM
             
         Returns:
             包含所有AI段落的字典
         """
+        reuse_sections = reuse_sections or {}
         try:
             # 加载AI Section配置
             sections_config = ai_sections_loader.load_config()
@@ -965,71 +1332,101 @@ class DocumentGenerator:
             else:
                 sections_to_process = ai_sections_loader.get_enabled_sections()
             
-            ai_sections = {}
-            
-            # 生成每个段落
+            # 渲染各段落提示词并计算缓存键，一次批量查询缓存
+            compiled_templates = ai_sections_loader.get_compiled_templates()
+            value_cache: dict = {}
+            prompts: Dict[str, Tuple[str, str]] = {}
             for section_key, section_config in sections_to_process.items():
-                try:
-                    # 检查section是否启用
-                    if not section_config.get("enabled", True):
-                        ai_sections[section_key] = ""
-                        continue
-                    
-                    # 获取system prompt和user template
-                    system_prompt = section_config.get("system_prompt", "")
-                    user_template = section_config.get("user_template", "")
-                    
-                    # 渲染user template
-                    user_prompt = render_user_template(user_template, enterprise_data)
-                    
-                    # 初始化重试计数器
-                    retry_count = 0
-                    processed_content = ""
-                    compliance_passed = False
-                    
-                    # 重试循环，直到通过合规检查或达到最大重试次数
-                    while retry_count < max_retries and not compliance_passed:
-                        retry_count += 1
-                        
-                        # 调用LLM生成内容
-                        model = section_config.get("model", "xunfei_spark_v4")
-                        generated_content = call_llm(model, system_prompt, user_prompt, user_id)
-                        
-                        # 后处理AI输出
-                        processed_content = postprocess_ai_output(generated_content)
-                        
-                        # 如果启用合规检查，则进行验证
-                        if enable_compliance_check:
-                            compliance_result = ai_compliance_checker.check_ai_output(section_key, processed_content)
-                            compliance_passed = compliance_result["passed"]
-                            
-                            if not compliance_passed:
-                                logger.warning(f"AI段落 {section_key} 第 {retry_count} 次生成未通过合规检查")
-                                logger.warning(f"合规问题: {compliance_result['issues']}")
-                                
-                                # 如果不是最后一次重试，调整system prompt加入合规要求
-                                if retry_count < max_retries:
-                                    system_prompt += f"\n\n请注意，上次生成的内容存在以下合规问题：{', '.join(compliance_result['issues'])}。请在本次生成中修正这些问题。"
-                            else:
-                                logger.info(f"AI段落 {section_key} 通过合规检查")
-                        else:
-                            # 如果不启用合规检查，直接通过
-                            compliance_passed = True
-                    
-                    ai_sections[section_key] = processed_content
-                    logger.info(f"成功生成AI段落: {section_key}, 重试次数: {retry_count}")
-                    
-                except Exception as e:
-                    logger.error(f"生成AI段落失败: {section_key}, 错误: {str(e)}")
-                    ai_sections[section_key] = f"[AI生成失败: {section_key}] {str(e)}"
-            
-            return ai_sections
+                if not section_config.get("enabled", True) or section_key in reuse_sections:
+                    continue
+                user_prompt = self._render_user_prompt(
+                    section_key, section_config, enterprise_data, compiled_templates, value_cache
+                )
+                cache_key = self._section_cache_key(
+                    section_key, section_config, section_config.get("system_prompt", ""), user_prompt,
+                    "checked" if enable_compliance_check else "raw"
+                )
+                prompts[section_key] = (user_prompt, cache_key)
+            
+            cached_sections = section_cache.get_many(
+                {section_key: cache_key for section_key, (_, cache_key) in prompts.items()}
+            )
+            if cached_sections:
+                logger.info(f"AI段落命中缓存: {len(cached_sections)}/{len(prompts)}")
+            # 增量生成复用的段落与缓存命中的段落同样不再调用LLM
+            cached_sections.update(
+                (section_key, content) for section_key, content in reuse_sections.items()
+                if section_key in sections_to_process
+            )
+            
+            tasks: Dict[str, Callable[[], str]] = {}
+            for section_key, section_config in sections_to_process.items():
+                # 检查section是否启用
+                if not section_config.get("enabled", True):
+                    tasks[section_key] = lambda: ""
+                    continue
+                
+                # 命中缓存的段落不再调用LLM
+                if section_key in cached_sections:
+                    continue
+                
+                user_prompt, cache_key = prompts[section_key]
+                tasks[section_key] = partial(
+                    self._generate_section_with_compliance,
+                    section_key,
+                    section_config,
+                    enterprise_data,
+                    user_id,
+                    enable_compliance_check,
+                    max_retries,
+                    user_prompt,
+                    cache_key
+                )
+            
+            for section_key in cached_sections:
+                if progress_callback is not None:
+                    try:
+                        progress_callback(section_key, "succeeded")
+                    except Exception as e:
+                        logger.warning(f"段落进度回调失败: {section_key}, 错误: {str(e)}")
+            
+            generated = self._run_sections_concurrently(tasks, max_concurrency, section_timeout, progress_callback)
+            
+            # 按配置顺序合并缓存结果与新生成的结果
+            return {
+                section_key: cached_sections[section_key] if section_key in cached_sections else generated.get(section_key, "")
+                for section_key in sections_to_process
+            }
             
         except Exception as e:
             logger.error(f"构建AI段落失败: {str(e)}")
             return {}
     
-    def generate_all_documents(self, enterprise_data: dict, user_id: Optional[str] = None, use_v2: bool = True) -> dict:
+    def _section_fingerprints(self, sections: Dict[str, Any], variant: str) -> Dict[str, str]:
+        """
+        计算各段落的配置指纹（系统提示词、用户模板、模型、版本任一变化时指纹改变）
+        
+        Args:
+            sections: 段落配置
+            variant: 生成方式（checked / raw）
+            
+        Returns:
+            段落键名到指纹的映射
+        """
+        return {
+            section_key: section_cache.make_key(
+                section_key,
+                section_config.get("model", "xunfei_spark_v4"),
+                section_config.get("system_prompt", ""),
+                section_config.get("user_template", ""),
+                section_config.get("version"),
+                variant
+            )
+            for section_key, section_config in sections.items()
+            if section_config.get("enabled", True)
+        }
+    
+    def generate_all_documents(self, enterprise_data: dict, user_id: Optional[str] = None, use_v2: bool = True, progress_callback: Optional[Callable[[str, str], None]] = None, incremental_key: Optional[str] = None) -> dict:
         """
         生成所有文档（支持V2版本）
         
@@ -1037,6 +1434,9 @@ class DocumentGenerator:
             enterprise_data: 符合 emergency_plan.json 的企业数据
             user_id: 用户ID（用于使用量统计）
             use_v2: 是否使用V2版本模板
+            progress_callback: AI段落结束回调 (section_key, status)，用于后台任务进度
+            incremental_key: 增量生成范围（make_incremental_key 生成）；传入时与该范围上次的企业数据比较，
+                             只重新生成依赖数据发生变化的AI段落
             
         Returns:
             包含所有文档渲染结果的字典
@@ -1051,7 +1451,8 @@ class DocumentGenerator:
             "revision_note": None,
             "success": False,
             "errors": [],
-            "ai_sections_used": []
+            "ai_sections_used": [],
+            "ai_sections_reused": []
         }
         
         try:
@@ -1062,10 +1463,32 @@ class DocumentGenerator:
                 logger.error(f"企业数据验证失败: {errors}")
                 return result
             
+            # 增量生成：依赖数据未变化的段落复用上次结果
+            fingerprints: Dict[str, str] = {}
+            reuse_sections: Dict[str, str] = {}
+            if incremental_key and section_snapshots.enabled:
+                fingerprints = self._section_fingerprints(ai_sections_loader.get_enabled_sections(), "checked")
+                reuse_sections = plan_section_reuse(
+                    section_snapshots.load(incremental_key),
+                    enterprise_data,
+                    fingerprints,
+                    ai_sections_loader.get_section_dependencies()
+                )
+            
             # 生成所有AI段落（启用合规检查）
             logger.info("开始生成AI段落（启用合规检查）...")
-            ai_sections = self.build_ai_sections(enterprise_data, user_id, enable_compliance_check=True)
+            ai_sections = self.build_ai_sections(enterprise_data, user_id, enable_compliance_check=True, progress_callback=progress_callback, reuse_sections=reuse_sections)
             result["ai_sections_used"] = list(ai_sections.keys())
+            result["ai_sections_reused"] = [key for key in ai_sections if key in reuse_sections]
+            
+            if fingerprints:
+                # 保存本次结果供下次比较（生成失败的段落不保存，下次重新生成）
+                section_snapshots.save(
+                    incremental_key,
+                    enterprise_data,
+                    {key: content for key, content in ai_sections.items() if section_cache.is_cacheable(content)},
+                    fingerprints
+                )
             
             # 进行整体合规性检查
             logger.info("进行整体合规性检查...")
@@ -1082,6 +1505,8 @@ class DocumentGenerator:
             template_data = self._prepare_template_data(enterprise_data)
             template_data["ai_sections"] = ai_sections
             
+            # 收集需要渲染的文档：结果键名 -> (模板路径, 文档名称)
+            render_jobs: Dict[str, Tuple[str, str]] = {}
             if use_v2:
                 # 使用V2版本模板
                 document_types = self.get_all_document_types()
@@ -1091,44 +1516,30 @@ class DocumentGenerator:
                     template_path = self.get_template_path(template_id)
                     
                     if template_path:
-                        logger.info(f"渲染{doc_info.get('output_name', doc_type)}...")
-                        content = self.render_jinja(template_path, template_data)
-                        
-                        if content is None:
-                            result["errors"].append(f"{doc_info.get('output_name', doc_type)}生成失败")
-                        else:
-                            # 映射文档类型到结果键名
-                            if doc_type == "risk_assessment":
-                                result["risk_report"] = content
-                            else:
-                                result[doc_type] = content
+                        # 映射文档类型到结果键名
+                        result_key = "risk_report" if doc_type == "risk_assessment" else doc_type
+                        render_jobs[result_key] = (template_path, doc_info.get('output_name', doc_type))
                     else:
                         logger.warning(f"未找到{doc_type}的模板路径")
             else:
                 # 使用V1版本模板（保持向后兼容）
-                # 渲染风险评估报告
-                logger.info("渲染风险评估报告...")
-                risk_report = self.render_jinja("template_risk_plan.jinja2", template_data)
-                if risk_report is None:
-                    result["errors"].append("风险评估报告生成失败")
-                else:
-                    result["risk_report"] = risk_report
-                
-                # 渲染应急预案
-                logger.info("渲染应急预案...")
-                emergency_plan = self.render_jinja("template_emergency_plan.jinja2", template_data)
-                if emergency_plan is None:
-                    result["errors"].append("应急预案生成失败")
-                else:
-                    result["emergency_plan"] = emergency_plan
-                
-                # 渲染应急资源调查报告
-                logger.info("渲染应急资源调查报告...")
-                resource_report = self.render_jinja("template_resource_investigation.jinja2", template_data)
-                if resource_report is None:
-                    result["errors"].append("应急资源调查报告生成失败")
+                render_jobs = {
+                    "risk_report": ("template_risk_plan.jinja2", "风险评估报告"),
+                    "emergency_plan": ("template_emergency_plan.jinja2", "应急预案"),
+                    "resource_report": ("template_resource_investigation.jinja2", "应急资源调查报告")
+                }
+            
+            # 各文档共用同一份模板数据并发渲染，同时统计字数
+            rendered, timings = self.render_documents(render_jobs, template_data)
+            result["word_counts"] = {}
+            result["render_timings"] = timings
+            for result_key, (_, doc_name) in render_jobs.items():
+                content, word_count = rendered.get(result_key, (None, 0))
+                if content is None:
+                    result["errors"].append(f"{doc_name}生成失败")
                 else:
-                    result["resource_report"] = resource_report
+                    result[result_key] = content
+                    result["word_counts"][result_key] = word_count
             
             # 检查是否所有文档都生成成功
             main_docs = [result["risk_report"], result["emergency_plan"], result["resource_report"]]
@@ -1146,6 +1557,94 @@ class DocumentGenerator:
             logger.error(error_msg)
             return result
     
+    def prepare_single_document(self, document_type: str, enterprise_data: dict, user_id: Optional[str] = None, use_v2: bool = True) -> dict:
+        """
+        生成单个文档所需的AI段落并准备模板数据（不渲染）
+        
+        Args:
+            document_type: 文档类型 (risk_assessment/emergency_plan/resource_report/release_order/opinion_adoption/emergency_monitoring_plan/revision_note)
+            enterprise_data: 符合 emergency_plan.json 的企业数据
+            user_id: 用户ID（用于使用量统计）
+            use_v2: 是否使用V2版本模板
+            
+        Returns:
+            {"success", "errors", "ai_sections_used", "template_path", "template_data", "document_name"}
+        """
+        result = {
+            "success": False,
+            "errors": [],
+            "ai_sections_used": [],
+            "template_path": None,
+            "template_data": None,
+            "document_name": document_type
+        }
+        
+        # 验证企业数据
+        is_valid, errors = self.validate_enterprise_data(enterprise_data)
+        if not is_valid:
+            result["errors"] = errors
+            logger.error(f"企业数据验证失败: {errors}")
+            return result
+        
+        if use_v2:
+            # 使用V2版本模板
+            doc_info = self.get_document_type_info(document_type)
+            if not doc_info:
+                result["errors"].append(f"不支持的文档类型: {document_type}")
+                return result
+            
+            template_id = doc_info.get("template_id")
+            template_path = self.get_template_path(template_id)
+            
+            if not template_path:
+                result["errors"].append(f"未找到{document_type}的模板路径")
+                return result
+            
+            # 获取模板所需的AI段落
+            ai_sections_needed = self.get_template_ai_sections(template_id)
+            
+            # 生成特定文档类型的AI段落（启用合规检查）
+            logger.info(f"开始生成{document_type}的AI段落（启用合规检查）...")
+            ai_sections = {}
+            
+            if ai_sections_needed:
+                # 只生成需要的AI段落
+                all_ai_sections = self.build_ai_sections(enterprise_data, user_id, enable_compliance_check=True)
+                for section in ai_sections_needed:
+                    if section in all_ai_sections:
+                        ai_sections[section] = all_ai_sections[section]
+            
+            result["document_name"] = doc_info.get('output_name', document_type)
+            
+        else:
+            # 使用V1版本模板（保持向后兼容）
+            # 根据文档类型选择模板
+            template_map = {
+                "risk_assessment": "template_risk_plan.jinja2",
+                "emergency_plan": "template_emergency_plan.jinja2",
+                "resource_report": "template_resource_investigation.jinja2"
+            }
+            
+            template_path = template_map.get(document_type)
+            if not template_path:
+                result["errors"].append(f"不支持的文档类型: {document_type}")
+                return result
+            
+            # 生成特定文档类型的AI段落
+            logger.info(f"开始生成{document_type}的AI段落...")
+            ai_sections = self.build_ai_sections(enterprise_data, user_id, document_type)
+        
+        result["ai_sections_used"] = list(ai_sections.keys())
+        
+        # 准备模板数据，合并AI段落
+        template_data = self._prepare_template_data(enterprise_data)
+        template_data["ai_sections"] = ai_sections
+        
+        result["template_path"] = template_path
+        result["template_data"] = template_data
+        result["success"] = True
+        return result
+    
     def generate_single_document(self, document_type: str, enterprise_data: dict, user_id: Optional[str] = None, use_v2: bool = True) -> dict:
         """
         生成单个文档（支持V2版本）
@@ -1161,88 +1660,28 @@ class DocumentGenerator:
         """
         result = {
             "content": None,
+            "word_count": 0,
             "success": False,
             "errors": [],
             "ai_sections_used": []
         }
         
         try:
-            # 验证企业数据
-            is_valid, errors = self.validate_enterprise_data(enterprise_data)
-            if not is_valid:
-                result["errors"] = errors
-                logger.error(f"企业数据验证失败: {errors}")
+            prepared = self.prepare_single_document(document_type, enterprise_data, user_id, use_v2)
+            result["ai_sections_used"] = prepared["ai_sections_used"]
+            if not prepared["success"]:
+                result["errors"] = prepared["errors"]
                 return result
             
-            if use_v2:
-                # 使用V2版本模板
-                doc_info = self.get_document_type_info(document_type)
-                if not doc_info:
-                    result["errors"].append(f"不支持的文档类型: {document_type}")
-                    return result
-                
-                template_id = doc_info.get("template_id")
-                template_path = self.get_template_path(template_id)
-                
-                if not template_path:
-                    result["errors"].append(f"未找到{document_type}的模板路径")
-                    return result
-                
-                # 获取模板所需的AI段落
-                ai_sections_needed = self.get_template_ai_sections(template_id)
-                
-                # 生成特定文档类型的AI段落（启用合规检查）
-                logger.info(f"开始生成{document_type}的AI段落（启用合规检查）...")
-                ai_sections = {}
-                
-                if ai_sections_needed:
-                    # 只生成需要的AI段落
-                    all_ai_sections = self.build_ai_sections(enterprise_data, user_id, enable_compliance_check=True)
-                    for section in ai_sections_needed:
-                        if section in all_ai_sections:
-                            ai_sections[section] = all_ai_sections[section]
-                
-                result["ai_sections_used"] = list(ai_sections.keys())
-                
-                # 准备模板数据，合并AI段落
-                template_data = self._prepare_template_data(enterprise_data)
-                template_data["ai_sections"] = ai_sections
-                
-                # 渲染文档
-                logger.info(f"渲染{doc_info.get('output_name', document_type)}文档...")
-                content = self.render_jinja(template_path, template_data)
-                
-            else:
-                # 使用V1版本模板（保持向后兼容）
-                # 根据文档类型选择模板
-                template_map = {
-                    "risk_assessment": "template_risk_plan.jinja2",
-                    "emergency_plan": "template_emergency_plan.jinja2",
-                    "resource_report": "template_resource_investigation.jinja2"
-                }
-                
-                template_name = template_map.get(document_type)
-                if not template_name:
-                    result["errors"].append(f"不支持的文档类型: {document_type}")
-                    return result
-                
-                # 生成特定文档类型的AI段落
-                logger.info(f"开始生成{document_type}的AI段落...")
-                ai_sections = self.build_ai_sections(enterprise_data, user_id, document_type)
-                result["ai_sections_used"] = list(ai_sections.keys())
-                
-                # 准备模板数据，合并AI段落
-                template_data = self._prepare_template_data(enterprise_data)
-                template_data["ai_sections"] = ai_sections
-                
-                # 渲染文档
-                logger.info(f"渲染{document_type}文档...")
-                content = self.render_jinja(template_name, template_data)
+            # 渲染文档并统计字数
+            logger.info(f"渲染{prepared['document_name']}文档...")
+            content, word_count, _ = self._render_and_count(prepared["template_path"], prepared["template_data"])
             
             if content is None:
                 result["errors"].append(f"{document_type}文档生成失败")
             else:
                 result["content"] = content
+                result["word_count"] = word_count
                 result["success"] = True
                 logger.info(f"{document_type}文档生成成功")
             
@@ -1254,6 +1693,39 @@ class DocumentGenerator:
             logger.error(error_msg)
             return result
     
+    def stream_document(self, template_name: str, data: dict) -> Iterator[str]:
+        """
+        流式渲染单个模板
+        
+        基于 Template.generate() 逐段产出渲染结果并合并为不小于 stream_chunk_size 的片段，
+        不在内存中拼接完整文档，首个片段在渲染结束前即可发送。
+        
+        Args:
+            template_name: 模板名称
+            data: 渲染数据
+            
+        Yields:
+            HTML 片段
+            
+        Raises:
+            ValueError: 模板加载失败
+        """
+        template = self.load_template(template_name)
+        if not template:
+            raise ValueError(f"模板加载失败: {template_name}")
+        
+        buffer: List[str] = []
+        buffered = 0
+        for piece in template.generate(data):
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= self.stream_chunk_size:
+                yield "".join(buffer)
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            yield "".join(buffer)
+    
     def generate_single_section(self, section_key: str, enterprise_data: dict, user_id: Optional[str] = None) -> dict:
         """
         生成单个AI段落
@@ -1284,19 +1756,32 @@ class DocumentGenerator:
                 result["errors"].append(f"AI段落已禁用: {section_key}")
                 return result
             
-            # 获取system prompt和user template
+            # 获取system prompt并渲染user template
             system_prompt = section_config.get("system_prompt", "")
-            user_template = section_config.get("user_template", "")
+            user_prompt = self._render_user_prompt(section_key, section_config, enterprise_data)
             
-            # 渲染user template
-            user_prompt = render_user_template(user_template, enterprise_data)
+            # 输入未变化时直接复用缓存结果
+            cache_key = self._section_cache_key(section_key, section_config, system_prompt, user_prompt, "raw")
+            cached_content = section_cache.get(section_key, cache_key)
+            if cached_content is not None:
+                result["content"] = cached_content
+                result["success"] = True
+                result["cached"] = True
+                logger.info(f"AI段落命中缓存: {section_key}")
+                return result
             
             # 调用LLM生成内容
             model = section_config.get("model", "xunfei_spark_v4")
+            started = time.perf_counter()
             generated_content = call_llm(model, system_prompt, user_prompt, user_id)
+            retry_cost_tracker.record(
+                section_key, "generate", latency_ms=(time.perf_counter() - started) * 1000, passed=True,
+                **count_call_tokens(system_prompt, user_prompt, generated_content)
+            )
             
             # 后处理AI输出
             processed_content = postprocess_ai_output(generated_content)
+            section_cache.set(section_key, cache_key, processed_content)
             
             result["content"] = processed_content
             result["success"] = True
@@ -1310,6 +1795,64 @@ class DocumentGenerator:
             logger.error(error_msg)
             return result
 
+    
+    async def astream_single_section(self, section_key: str, enterprise_data: dict, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        流式生成单个AI段落
+        
+        后处理（postprocess_ai_output）在片段到达时增量执行，所有片段拼接后与
+        generate_single_section 的结果一致。
+        
+        Args:
+            section_key: AI段落键名
+            enterprise_data: 符合 emergency_plan.json 的企业数据
+            user_id: 用户ID（用于使用量统计）
+            
+        Yields:
+            已后处理的文本片段
+            
+        Raises:
+            ValueError: 段落不存在或已禁用
+        """
+        # 检查section是否存在
+        section_config = ai_sections_loader.get_section_config(section_key)
+        if section_config is None:
+            raise ValueError(f"AI段落不存在: {section_key}")
+        
+        # 检查section是否启用
+        if not section_config.get("enabled", True):
+            raise ValueError(f"AI段落已禁用: {section_key}")
+        
+        # 获取system prompt并渲染user template
+        system_prompt = section_config.get("system_prompt", "")
+        user_prompt = self._render_user_prompt(section_key, section_config, enterprise_data)
+        model = section_config.get("model", "xunfei_spark_v4")
+        
+        # 输入未变化时直接返回缓存结果（与 generate_single_section 共享缓存）
+        cache_key = self._section_cache_key(section_key, section_config, system_prompt, user_prompt, "raw")
+        cached_content = section_cache.get(section_key, cache_key)
+        if cached_content is not None:
+            logger.info(f"AI段落命中缓存: {section_key}")
+            yield cached_content
+            return
+        
+        processor = IncrementalOutputProcessor([collapse_blank_lines])
+        started = time.perf_counter()
+        async for delta in astream_llm(model, system_prompt, user_prompt, user_id):
+            processed = processor.feed(delta)
+            if processed:
+                yield processed
+        
+        processed = processor.flush()
+        if processed:
+            yield processed
+        section_cache.set(section_key, cache_key, processor.get_text())
+        retry_cost_tracker.record(
+            section_key, "generate", latency_ms=(time.perf_counter() - started) * 1000, passed=True,
+            **count_call_tokens(system_prompt, user_prompt, processor.get_text())
+        )
+        
+        logger.info(f"成功流式生成AI段落: {section_key}")
 
 # 创建全局文档生成器实例
 document_generator = DocumentGenerator()
\ No newline at end of file
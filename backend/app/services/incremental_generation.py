@@ -0,0 +1,212 @@
+"""
+AI段落增量生成
+根据段落 → 数据路径的依赖索引比较前后两次的企业数据，只重新生成输入发生变化的段落，
+其余段落直接复用上次生成的结果
+
+上次生成的结果（企业数据、段落内容、段落配置指纹）按生成范围（如企业ID）保存在缓存服务中，
+配置 Redis 时多个工作进程共享。
+"""
+
+import os
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 快照格式版本（格式变化时旧快照自动失效）
+SNAPSHOT_VERSION = 1
+
+
+def diff_data_paths(old: Any, new: Any, prefix: str = "") -> Set[str]:
+    """
+    比较两份数据，返回发生变化的路径
+
+    字典逐层比较，其他类型（包括列表）整体比较；新增或删除的键同样视为变化。
+
+    Args:
+        old: 旧数据
+        new: 新数据
+        prefix: 当前路径前缀
+
+    Returns:
+        变化的路径集合，如 {"basic_info.company_name"}；根节点整体变化时包含空字符串
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed: Set[str] = set()
+        for key in old.keys() | new.keys():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in old or key not in new:
+                changed.add(path)
+            elif old[key] != new[key]:
+                changed |= diff_data_paths(old[key], new[key], path)
+        return changed
+    return set() if old == new else {prefix}
+
+
+def paths_affected(dependencies: Iterable[str], changed_paths: Set[str]) -> bool:
+    """
+    判断依赖的数据路径是否受变化影响
+
+    依赖路径本身、其上级路径（整体被替换）或其下级路径（引用的字典内部字段）发生变化均视为受影响。
+
+    Args:
+        dependencies: 段落依赖的数据路径
+        changed_paths: diff_data_paths 返回的变化路径
+
+    Returns:
+        是否受影响
+    """
+    if "" in changed_paths:
+        return True
+    for dependency in dependencies:
+        for changed in changed_paths:
+            if (dependency == changed
+                    or dependency.startswith(changed + ".")
+                    or changed.startswith(dependency + ".")):
+                return True
+    return False
+
+
+class SectionSnapshotStore:
+    """上次生成结果的快照存储"""
+
+    def __init__(self, cache: Any = None, ttl: Optional[int] = None):
+        """
+        初始化快照存储
+
+        Args:
+            cache: 缓存服务（CacheService），None 时在首次使用时获取全局缓存服务
+            ttl: 快照保留秒数，None 使用 AI_SECTION_SNAPSHOT_TTL
+        """
+        self.enabled = os.getenv("AI_INCREMENTAL_GENERATION_ENABLED", "true").lower() == "true"
+        self.ttl = ttl or int(os.getenv("AI_SECTION_SNAPSHOT_TTL", str(30 * 24 * 3600)))
+        self._cache = cache
+
+    def _get_cache(self):
+        """获取缓存服务"""
+        if self._cache is None:
+            from .cache_service import get_cache_service
+            self._cache = get_cache_service()
+        return self._cache
+
+    @staticmethod
+    def _key(scope: str) -> str:
+        return f"ai_section_snapshot:{scope}"
+
+    def load(self, scope: str) -> Optional[Dict[str, Any]]:
+        """
+        读取快照
+
+        Args:
+            scope: 生成范围（如 "user:3:enterprise:12"）
+
+        Returns:
+            快照 {"data", "sections", "fingerprints"}，不存在或格式不兼容时返回 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            snapshot = self._get_cache().get(self._key(scope))
+        except Exception as e:
+            logger.warning(f"读取段落快照失败: {scope}, 错误: {str(e)}")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def save(self, scope: str, data: Dict[str, Any], sections: Dict[str, str], fingerprints: Dict[str, str]) -> bool:
+        """
+        保存快照
+
+        Args:
+            scope: 生成范围
+            data: 本次生成使用的企业数据
+            sections: 本次生成的段落内容（只应包含可复用的内容）
+            fingerprints: 各段落的配置指纹
+
+        Returns:
+            是否保存成功
+        """
+        if not self.enabled:
+            return False
+        try:
+            return self._get_cache().set(self._key(scope), {
+                "version": SNAPSHOT_VERSION,
+                "data": data,
+                "sections": sections,
+                "fingerprints": fingerprints
+            }, self.ttl)
+        except Exception as e:
+            logger.warning(f"保存段落快照失败: {scope}, 错误: {str(e)}")
+            return False
+
+    def delete(self, scope: str) -> bool:
+        """删除快照（下次生成全部段落）"""
+        try:
+            return self._get_cache().delete(self._key(scope))
+        except Exception as e:
+            logger.warning(f"删除段落快照失败: {scope}, 错误: {str(e)}")
+            return False
+
+
+def make_incremental_key(user_id: Any, enterprise_id: Any = None) -> str:
+    """
+    构建增量生成范围（同一用户的同一企业共用一个快照）
+
+    Args:
+        user_id: 用户ID
+        enterprise_id: 企业ID，未知时按用户区分
+
+    Returns:
+        生成范围
+    """
+    if enterprise_id is None:
+        return f"user:{user_id}"
+    return f"user:{user_id}:enterprise:{enterprise_id}"
+
+
+def plan_section_reuse(
+    snapshot: Optional[Dict[str, Any]],
+    enterprise_data: Dict[str, Any],
+    fingerprints: Dict[str, str],
+    dependencies: Dict[str, frozenset]
+) -> Dict[str, str]:
+    """
+    计算可复用上次结果的段落
+
+    段落可复用的条件：快照中有该段落的内容、段落配置指纹未变化、依赖的数据路径均未变化。
+
+    Args:
+        snapshot: 上次生成的快照
+        enterprise_data: 本次企业数据
+        fingerprints: 本次各段落的配置指纹
+        dependencies: 段落依赖的数据路径
+
+    Returns:
+        可复用的段落键名到内容的映射
+    """
+    if not snapshot:
+        return {}
+
+    changed_paths = diff_data_paths(snapshot.get("data"), enterprise_data)
+    previous_sections = snapshot.get("sections") or {}
+    previous_fingerprints = snapshot.get("fingerprints") or {}
+
+    reused: Dict[str, str] = {}
+    for section_key, fingerprint in fingerprints.items():
+        content = previous_sections.get(section_key)
+        if not content or previous_fingerprints.get(section_key) != fingerprint:
+            continue
+        if paths_affected(dependencies.get(section_key, ()), changed_paths):
+            continue
+        reused[section_key] = content
+
+    logger.info(
+        f"增量生成：变化的数据路径 {len(changed_paths)} 个，"
+        f"复用段落 {len(reused)}/{len(fingerprints)}"
+    )
+    return reused
+
+
+# 全局快照存储实例
+section_snapshots = SectionSnapshotStore()
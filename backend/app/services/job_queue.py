@@ -0,0 +1,336 @@
+"""
+文档生成后台任务队列
+任务持久化在数据库（SQLite）中，由线程池执行，支持进度查询、结果获取与幂等提交
+"""
+
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Callable, List
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.generation_job import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# 任务处理函数：(payload, progress_callback) -> result
+JobHandler = Callable[[Dict[str, Any], Callable[[str, str], None]], Dict[str, Any]]
+
+
+def compute_data_hash(data: Any) -> str:
+    """
+    计算数据哈希（键排序后的JSON），用于幂等判断
+
+    Args:
+        data: 任意可JSON序列化的数据
+
+    Returns:
+        SHA256 十六进制摘要
+    """
+    serialized = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class GenerationJobQueue:
+    """文档生成后台任务队列"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, max_workers: Optional[int] = None):
+        """
+        初始化任务队列
+
+        Args:
+            session_factory: 数据库会话工厂
+            max_workers: 工作线程数，None 使用 GENERATION_JOB_WORKERS
+        """
+        self.session_factory = session_factory
+        self.max_workers = max_workers or int(os.getenv("GENERATION_JOB_WORKERS", "2"))
+        # 运行中任务超过该时间未更新视为中断（进程退出），启动时重新执行
+        self.stale_seconds = int(os.getenv("GENERATION_JOB_STALE_SECONDS", "900"))
+        self._handlers: Dict[str, JobHandler] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def register_handler(self, job_type: str, handler: JobHandler):
+        """
+        注册任务处理函数
+
+        Args:
+            job_type: 任务类型
+            handler: 处理函数，接收任务输入和进度回调，返回任务结果
+        """
+        self._handlers[job_type] = handler
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取工作线程池（懒加载）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="generation-job")
+            return self._executor
+
+    def submit(self, job_type: str, user_id: int, payload: Dict[str, Any], enterprise_id: Optional[int] = None,
+               data: Any = None, section_keys: Optional[List[str]] = None) -> GenerationJob:
+        """
+        提交任务（幂等）
+
+        同一用户、任务类型、企业ID与数据哈希只对应一个任务：待执行、执行中或已成功的任务
+        直接返回；已失败的任务重置后重新执行。
+
+        Args:
+            job_type: 任务类型
+            user_id: 用户ID
+            payload: 任务输入（持久化，用于执行与恢复）
+            enterprise_id: 企业ID
+            data: 参与幂等哈希的数据，None 时使用 payload
+            section_keys: 需要跟踪进度的AI段落
+
+        Returns:
+            任务对象
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"未注册的任务类型: {job_type}")
+
+        # 统一为可JSON序列化的数据，保证执行时与恢复后的输入一致
+        payload = json.loads(json.dumps(payload, ensure_ascii=False, default=str))
+        data_hash = compute_data_hash(payload if data is None else data)
+        idempotency_key = compute_data_hash([job_type, user_id, enterprise_id, data_hash])
+
+        db = self.session_factory()
+        try:
+            job = db.query(GenerationJob).filter(GenerationJob.idempotency_key == idempotency_key).first()
+
+            if job is None:
+                job = GenerationJob(
+                    id=str(uuid.uuid4()),
+                    user_id=user_id,
+                    enterprise_id=enterprise_id,
+                    job_type=job_type,
+                    idempotency_key=idempotency_key,
+                    data_hash=data_hash,
+                    status=JOB_PENDING,
+                    payload=payload,
+                    progress=self._initial_progress(section_keys),
+                    attempts=0
+                )
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # 并发提交相同任务，返回已存在的任务
+                    db.rollback()
+                    job = db.query(GenerationJob).filter(GenerationJob.idempotency_key == idempotency_key).first()
+                    db.expunge(job)
+                    return job
+                logger.info(f"提交生成任务: {job.id}, 类型: {job_type}, 企业ID: {enterprise_id}")
+            elif job.status == JOB_FAILED:
+                # 失败的任务允许重试
+                job.status = JOB_PENDING
+                job.payload = payload
+                job.progress = self._initial_progress(section_keys)
+                job.result = None
+                job.error = None
+                job.started_at = None
+                job.finished_at = None
+                db.commit()
+                logger.info(f"重新提交失败的生成任务: {job.id}")
+            else:
+                logger.info(f"复用已存在的生成任务: {job.id}, 状态: {job.status}")
+                db.expunge(job)
+                return job
+
+            db.refresh(job)
+            db.expunge(job)
+        finally:
+            db.close()
+
+        self._get_executor().submit(self._run_job, job.id)
+        return job
+
+    def get_job(self, job_id: str, user_id: Optional[int] = None) -> Optional[GenerationJob]:
+        """
+        查询任务
+
+        Args:
+            job_id: 任务ID
+            user_id: 用户ID（指定时只返回该用户的任务）
+
+        Returns:
+            任务对象，不存在时返回 None
+        """
+        db = self.session_factory()
+        try:
+            query = db.query(GenerationJob).filter(GenerationJob.id == job_id)
+            if user_id is not None:
+                query = query.filter(GenerationJob.user_id == user_id)
+            job = query.first()
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def recover(self) -> int:
+        """
+        恢复中断的任务（应用启动时调用）
+
+        重新执行待执行的任务，以及长时间未更新的执行中任务。
+
+        Returns:
+            恢复的任务数
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        db = self.session_factory()
+        try:
+            jobs = db.query(GenerationJob).filter(
+                (GenerationJob.status == JOB_PENDING) |
+                ((GenerationJob.status == JOB_RUNNING) & (GenerationJob.updated_at < stale_before))
+            ).order_by(GenerationJob.created_at).all()
+
+            job_ids = []
+            for job in jobs:
+                if job.job_type not in self._handlers:
+                    continue
+                job.status = JOB_PENDING
+                job_ids.append(job.id)
+            db.commit()
+        finally:
+            db.close()
+
+        for job_id in job_ids:
+            self._get_executor().submit(self._run_job, job_id)
+
+        if job_ids:
+            logger.info(f"恢复 {len(job_ids)} 个中断的生成任务")
+        return len(job_ids)
+
+    def shutdown(self, wait: bool = False):
+        """关闭工作线程池（未开始的任务保持 pending，下次启动时恢复）"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def _initial_progress(self, section_keys: Optional[List[str]]) -> Dict[str, Any]:
+        """构建初始进度"""
+        section_keys = section_keys or []
+        return {
+            "stage": JOB_PENDING,
+            "total": len(section_keys),
+            "completed": 0,
+            "failed": 0,
+            "sections": {key: JOB_PENDING for key in section_keys}
+        }
+
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        原子地将任务从 pending 置为 running，避免多个进程重复执行
+
+        Returns:
+            任务类型、输入与进度，抢占失败返回 None
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            claimed = db.query(GenerationJob).filter(
+                GenerationJob.id == job_id, GenerationJob.status == JOB_PENDING
+            ).update({
+                GenerationJob.status: JOB_RUNNING,
+                GenerationJob.started_at: now,
+                GenerationJob.updated_at: now,
+                GenerationJob.attempts: GenerationJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+
+            job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            return {
+                "job_type": job.job_type,
+                "payload": job.payload or {},
+                "progress": dict(job.progress or self._initial_progress(None))
+            }
+        finally:
+            db.close()
+
+    def _update(self, job_id: str, **fields):
+        """更新任务字段"""
+        db = self.session_factory()
+        try:
+            fields["updated_at"] = datetime.utcnow()
+            db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+                {getattr(GenerationJob, key): value for key, value in fields.items()},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_job(self, job_id: str):
+        """在工作线程中执行任务"""
+        claimed = self._claim(job_id)
+        if claimed is None:
+            logger.info(f"生成任务已被其他工作线程执行或已结束: {job_id}")
+            return
+
+        progress = claimed["progress"]
+        sections = dict(progress.get("sections") or {})
+        progress["stage"] = "generating_sections"
+        self._update(job_id, progress=dict(progress, sections=dict(sections)))
+
+        def on_section_done(section_key: str, section_status: str):
+            sections[section_key] = section_status
+            progress["sections"] = dict(sections)
+            progress["completed"] = sum(1 for s in sections.values() if s in (JOB_SUCCEEDED, JOB_FAILED))
+            progress["failed"] = sum(1 for s in sections.values() if s == JOB_FAILED)
+            progress["total"] = max(progress.get("total", 0), len(sections))
+            self._update(job_id, progress=dict(progress))
+
+        handler = self._handlers.get(claimed["job_type"])
+        try:
+            result = handler(claimed["payload"], on_section_done)
+            succeeded = bool(result.get("success", True))
+            progress["stage"] = "done"
+            self._update(
+                job_id,
+                status=JOB_SUCCEEDED if succeeded else JOB_FAILED,
+                result=result,
+                error=None if succeeded else "; ".join(str(e) for e in result.get("errors") or []) or "文档生成失败",
+                progress=dict(progress),
+                finished_at=datetime.utcnow()
+            )
+            logger.info(f"生成任务完成: {job_id}, 成功: {succeeded}")
+        except Exception as e:
+            logger.error(f"生成任务执行失败: {job_id}, 错误: {str(e)}")
+            progress["stage"] = "done"
+            self._update(
+                job_id,
+                status=JOB_FAILED,
+                error=str(e),
+                progress=dict(progress),
+                finished_at=datetime.utcnow()
+            )
+
+
+# 全局任务队列实例
+_job_queue: Optional[GenerationJobQueue] = None
+
+
+def get_job_queue() -> GenerationJobQueue:
+    """获取任务队列单例"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = GenerationJobQueue()
+    return _job_queue
@@ -0,0 +1,501 @@
+"""
+多供应商 LLM 路由
+AI段落配置的模型名（如 xunfei_spark_v4）通过供应商注册表映射到 OpenAI 兼容的接口地址；
+按健康状态与延迟（EWMA）加权选择供应商，限制每个供应商的并发数，调用失败时自动切换到其他供应商
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..utils.async_clients import LoopBoundClients
+
+logger = logging.getLogger(__name__)
+
+# 匹配任意模型名的供应商
+WILDCARD_MODEL = "*"
+
+
+class LLMRouterError(Exception):
+    """没有可用供应商，或全部供应商调用失败"""
+
+
+class LLMProvider:
+    """
+    LLM 供应商（OpenAI 兼容的 /chat/completions 接口）
+
+    记录延迟 EWMA、并发数与连续失败次数；连续失败达到阈值后在冷却期内不参与选择。
+    """
+
+    def __init__(self, name: str, base_url: str, models: List[str], api_key: Optional[str] = None,
+                 model: Optional[str] = None, max_concurrency: int = 8, weight: float = 1.0,
+                 timeout: float = 60.0, initial_latency_ms: float = 1000.0):
+        """
+        初始化供应商
+
+        Args:
+            name: 供应商名称
+            base_url: 接口地址（不含 /chat/completions）
+            models: 该供应商服务的模型名（AI段落配置中的 model），"*" 表示全部
+            api_key: API 密钥
+            model: 请求时发送的模型名，None 时使用段落配置中的模型名
+            max_concurrency: 最大并发请求数
+            weight: 选择权重（同等延迟下权重越大越容易被选中）
+            timeout: 请求超时（秒）
+            initial_latency_ms: 尚无延迟样本时的估计延迟
+        """
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.models = list(models)
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.weight = float(weight)
+        self.timeout = float(timeout)
+
+        self.ewma_latency_ms = float(initial_latency_ms)
+        self.latency_samples = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.last_error: Optional[str] = None
+
+        self._client = None
+        self._async_clients = LoopBoundClients(self._create_async_client, lambda client: client.aclose())
+
+    def serves(self, model: str) -> bool:
+        """是否服务该模型"""
+        return model in self.models or WILDCARD_MODEL in self.models
+
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        """是否不在冷却期内"""
+        return (now or time.monotonic()) >= self.unhealthy_until
+
+    def build_request(self, model: str, system: str, user: str, stream: bool = False,
+                      temperature: float = 0.7, max_tokens: int = 2000) -> Dict[str, Any]:
+        """构建 chat.completions 请求体"""
+        messages = [{"role": "user", "content": user}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        payload = {
+            "model": self.model or model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def headers(self) -> Dict[str, str]:
+        """请求头"""
+        if self.api_key:
+            return {"Authorization": f"Bearer {self.api_key}"}
+        return {}
+
+    def get_client(self):
+        """长期复用的同步 httpx 客户端（连接数与并发上限一致）"""
+        if self._client is None:
+            import httpx
+            self._client = httpx.Client(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            )
+        return self._client
+
+    def get_async_client(self):
+        """当前事件循环的异步 httpx 客户端（连接池绑定在创建它的事件循环上）"""
+        return self._async_clients.get()
+
+    def _create_async_client(self):
+        """创建异步 httpx 客户端"""
+        import httpx
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        )
+
+    def close(self) -> None:
+        """关闭同步客户端"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        """关闭同步客户端与各事件循环的异步客户端"""
+        self.close()
+        await self._async_clients.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """供应商状态"""
+        return {
+            "models": self.models,
+            "healthy": self.is_healthy(),
+            "ewma_latency_ms": round(self.ewma_latency_ms, 2),
+            "latency_samples": self.latency_samples,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "weight": self.weight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+
+class LLMRouter:
+    """
+    LLM 路由器（线程安全）
+
+    选择：在服务该模型且有空闲并发的健康供应商中按 weight / (EWMA延迟 × (并发数+1)) 的平方加权随机选择；
+    没有健康供应商时按冷却结束时间依次尝试。
+    失败切换：一次调用依次尝试各候选供应商，全部失败时抛出 LLMRouterError，不再降级为模拟内容。
+    """
+
+    def __init__(self, providers: Optional[List[LLMProvider]] = None, ewma_alpha: Optional[float] = None,
+                 failure_threshold: Optional[int] = None, cooldown: Optional[float] = None,
+                 queue_timeout: Optional[float] = None):
+        """
+        初始化路由器
+
+        Args:
+            providers: 供应商列表
+            ewma_alpha: 延迟 EWMA 的平滑系数，None 使用 LLM_ROUTER_EWMA_ALPHA
+            failure_threshold: 连续失败多少次后进入冷却，None 使用 LLM_ROUTER_FAILURE_THRESHOLD
+            cooldown: 冷却秒数，None 使用 LLM_ROUTER_COOLDOWN
+            queue_timeout: 全部供应商并发已满时最长等待秒数，None 使用 LLM_ROUTER_QUEUE_TIMEOUT
+        """
+        self.providers: Dict[str, LLMProvider] = {provider.name: provider for provider in providers or []}
+        self.ewma_alpha = ewma_alpha if ewma_alpha is not None else float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.3"))
+        self.failure_threshold = failure_threshold or int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "3"))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv("LLM_ROUTER_COOLDOWN", "30"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv("LLM_ROUTER_QUEUE_TIMEOUT", "60"))
+        self._condition = threading.Condition()
+
+    def has_provider(self, model: str) -> bool:
+        """是否有供应商服务该模型"""
+        return any(provider.serves(model) for provider in self.providers.values())
+
+    def _score(self, provider: LLMProvider) -> float:
+        return provider.weight / (max(provider.ewma_latency_ms, 1.0) * (provider.in_flight + 1))
+
+    def _rank(self, candidates: List[LLMProvider]) -> List[LLMProvider]:
+        """候选供应商的尝试顺序：尚未调用过的供应商优先（获取延迟样本），否则首位按得分加权随机，其余按得分降序"""
+        if len(candidates) <= 1:
+            return candidates
+        unprobed = [provider for provider in candidates if provider.calls == 0 and provider.in_flight == 0]
+        if unprobed:
+            return unprobed + sorted((provider for provider in candidates if provider not in unprobed),
+                                     key=self._score, reverse=True)
+        weights = [self._score(provider) ** 2 for provider in candidates]
+        first = random.choices(candidates, weights=weights)[0]
+        rest = sorted((provider for provider in candidates if provider is not first), key=self._score, reverse=True)
+        return [first] + rest
+
+    def _try_acquire(self, model: str, exclude: set) -> Optional[LLMProvider]:
+        """在持有锁时选择并占用一个供应商的并发名额，没有空闲名额时返回 None"""
+        now = time.monotonic()
+        candidates = [provider for provider in self.providers.values()
+                      if provider.serves(model) and provider.name not in exclude]
+        healthy = [provider for provider in candidates if provider.is_healthy(now)]
+        if healthy:
+            ordered = self._rank([provider for provider in healthy if provider.in_flight < provider.max_concurrency])
+        else:
+            # 全部在冷却期内时仍然尝试，冷却最早结束的优先
+            ordered = sorted((provider for provider in candidates if provider.in_flight < provider.max_concurrency),
+                             key=lambda provider: provider.unhealthy_until)
+        if not ordered:
+            return None
+        provider = ordered[0]
+        provider.in_flight += 1
+        return provider
+
+    def _remaining(self, model: str, exclude: set) -> bool:
+        return any(provider.serves(model) and provider.name not in exclude for provider in self.providers.values())
+
+    def acquire(self, model: str, exclude: set) -> Optional[LLMProvider]:
+        """
+        选择供应商并占用并发名额；全部已满时等待，超过 queue_timeout 抛出 LLMRouterError
+
+        Returns:
+            供应商，没有未尝试过的供应商时返回 None
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        with self._condition:
+            while True:
+                if not self._remaining(model, exclude):
+                    return None
+                provider = self._try_acquire(model, exclude)
+                if provider is not None:
+                    return provider
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMRouterError(f"等待模型 {model} 的供应商并发名额超时")
+                self._condition.wait(remaining)
+
+    async def aacquire(self, model: str, exclude: set) -> Optional[LLMProvider]:
+        """acquire 的异步版本（等待时不阻塞事件循环）"""
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            with self._condition:
+                if not self._remaining(model, exclude):
+                    return None
+                provider = self._try_acquire(model, exclude)
+            if provider is not None:
+                return provider
+            if time.monotonic() >= deadline:
+                raise LLMRouterError(f"等待模型 {model} 的供应商并发名额超时")
+            await asyncio.sleep(0.01)
+
+    def release(self, provider: LLMProvider, latency_ms: Optional[float], error: Optional[Exception] = None) -> None:
+        """
+        释放并发名额并更新延迟与健康状态
+
+        Args:
+            provider: 供应商
+            latency_ms: 本次调用耗时（失败时至少按超时计，降低再次被选中的概率）；
+                        为 None 时表示调用方中止了调用，只归还名额，不更新延迟与健康状态
+            error: 调用失败时的异常
+        """
+        with self._condition:
+            provider.in_flight -= 1
+            if latency_ms is None:
+                self._condition.notify_all()
+                return
+            provider.calls += 1
+            if error is not None:
+                latency_ms = max(latency_ms, provider.timeout * 1000)
+                provider.failures += 1
+                provider.consecutive_failures += 1
+                provider.last_error = str(error)
+                if provider.consecutive_failures >= self.failure_threshold:
+                    provider.unhealthy_until = time.monotonic() + self.cooldown
+                    logger.warning(f"LLM供应商 {provider.name} 连续失败 {provider.consecutive_failures} 次，冷却 {self.cooldown} 秒")
+            else:
+                provider.consecutive_failures = 0
+                provider.unhealthy_until = 0.0
+            if provider.latency_samples == 0 and error is None:
+                provider.ewma_latency_ms = latency_ms
+            else:
+                provider.ewma_latency_ms += self.ewma_alpha * (latency_ms - provider.ewma_latency_ms)
+            if error is None:
+                provider.latency_samples += 1
+            self._condition.notify_all()
+
+    def complete(self, model: str, system: str, user: str, temperature: float = 0.7, max_tokens: int = 2000) -> str:
+        """
+        调用 LLM 生成内容（失败时切换供应商）
+
+        Args:
+            model: AI段落配置中的模型名
+            system: 系统提示词
+            user: 用户提示词
+            temperature: 采样温度
+            max_tokens: 最大生成 token 数
+
+        Returns:
+            生成的文本
+
+        Raises:
+            LLMRouterError: 没有服务该模型的供应商，或全部供应商调用失败
+        """
+        tried: set = set()
+        errors: List[str] = []
+        while True:
+            provider = self.acquire(model, tried)
+            if provider is None:
+                break
+            tried.add(provider.name)
+            started = time.perf_counter()
+            try:
+                response = provider.get_client().post(
+                    f"{provider.base_url}/chat/completions",
+                    json=provider.build_request(model, system, user, temperature=temperature, max_tokens=max_tokens),
+                    headers=provider.headers()
+                )
+                response.raise_for_status()
+                content = _extract_content(response.json())
+            except Exception as e:
+                self.release(provider, (time.perf_counter() - started) * 1000, e)
+                logger.warning(f"LLM供应商 {provider.name} 调用失败，切换供应商: {e}")
+                errors.append(f"{provider.name}: {e}")
+                continue
+            self.release(provider, (time.perf_counter() - started) * 1000)
+            return content
+        raise LLMRouterError(_failure_message(model, errors))
+
+    async def acomplete(self, model: str, system: str, user: str, temperature: float = 0.7, max_tokens: int = 2000) -> str:
+        """complete 的异步版本"""
+        tried: set = set()
+        errors: List[str] = []
+        while True:
+            provider = await self.aacquire(model, tried)
+            if provider is None:
+                break
+            tried.add(provider.name)
+            started = time.perf_counter()
+            try:
+                response = await provider.get_async_client().post(
+                    f"{provider.base_url}/chat/completions",
+                    json=provider.build_request(model, system, user, temperature=temperature, max_tokens=max_tokens),
+                    headers=provider.headers()
+                )
+                response.raise_for_status()
+                content = _extract_content(response.json())
+            except Exception as e:
+                self.release(provider, (time.perf_counter() - started) * 1000, e)
+                logger.warning(f"LLM供应商 {provider.name} 调用失败，切换供应商: {e}")
+                errors.append(f"{provider.name}: {e}")
+                continue
+            self.release(provider, (time.perf_counter() - started) * 1000)
+            return content
+        raise LLMRouterError(_failure_message(model, errors))
+
+    async def astream(self, model: str, system: str, user: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        """
+        流式调用 LLM（stream=True）
+
+        只在收到第一个片段之前切换供应商；开始输出后发生的错误直接抛出，避免重复内容。
+        延迟按首个片段的到达时间计入 EWMA。
+
+        Yields:
+            生成的文本片段
+        """
+        tried: set = set()
+        errors: List[str] = []
+        while True:
+            provider = await self.aacquire(model, tried)
+            if provider is None:
+                break
+            tried.add(provider.name)
+            started = time.perf_counter()
+            first_chunk_ms: Optional[float] = None
+            try:
+                client = provider.get_async_client()
+                async with client.stream(
+                    "POST", f"{provider.base_url}/chat/completions",
+                    json=provider.build_request(model, system, user, stream=True, temperature=temperature, max_tokens=max_tokens),
+                    headers=provider.headers()
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        delta = _parse_stream_line(line)
+                        if delta:
+                            if first_chunk_ms is None:
+                                first_chunk_ms = (time.perf_counter() - started) * 1000
+                            yield delta
+                if first_chunk_ms is None:
+                    raise ValueError("API 返回空内容")
+            except Exception as e:
+                self.release(provider, (time.perf_counter() - started) * 1000, e)
+                if first_chunk_ms is not None:
+                    logger.error(f"LLM供应商 {provider.name} 流式输出中断: {e}")
+                    raise
+                logger.warning(f"LLM供应商 {provider.name} 流式调用失败，切换供应商: {e}")
+                errors.append(f"{provider.name}: {e}")
+                continue
+            except BaseException:
+                # 消费方提前关闭（客户端断开时的 GeneratorExit、任务取消的 CancelledError）：
+                # 归还并发名额，不计为供应商失败；已收到首个片段时仍记录延迟
+                self.release(provider, first_chunk_ms)
+                raise
+            self.release(provider, first_chunk_ms)
+            return
+        raise LLMRouterError(_failure_message(model, errors))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各供应商的状态"""
+        with self._condition:
+            return {name: provider.get_stats() for name, provider in self.providers.items()}
+
+    def close(self) -> None:
+        """关闭各供应商的同步客户端"""
+        for provider in self.providers.values():
+            provider.close()
+
+    async def aclose(self) -> None:
+        """关闭各供应商的同步与异步客户端（应用关闭时调用）"""
+        for provider in self.providers.values():
+            await provider.aclose()
+
+
+def _extract_content(body: Dict[str, Any]) -> str:
+    """从 chat.completions 响应中提取生成文本"""
+    content = body["choices"][0]["message"]["content"]
+    if not content:
+        raise ValueError("API 返回空内容")
+    return content
+
+
+def _parse_stream_line(line: str) -> str:
+    """解析流式响应中的一行（data: {...}），返回文本片段"""
+    if not line.startswith("data:"):
+        return ""
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return ""
+    choices = json.loads(data).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
+
+
+def _failure_message(model: str, errors: List[str]) -> str:
+    if not errors:
+        return f"没有服务模型 {model} 的LLM供应商"
+    return f"模型 {model} 的全部LLM供应商调用失败: {'; '.join(errors)}"
+
+
+def load_providers() -> List[LLMProvider]:
+    """
+    从配置加载供应商
+
+    LLM_PROVIDERS 为 JSON 数组，每项包含 name、base_url、models，可选 api_key（或从 api_key_env
+    指定的环境变量读取）、model、max_concurrency、weight、timeout；未配置时没有供应商，AI段落使用模拟生成。
+
+    Returns:
+        供应商列表
+    """
+    configured = os.getenv("LLM_PROVIDERS")
+    if not configured:
+        return []
+
+    providers = []
+    for item in json.loads(configured):
+        item = dict(item)
+        api_key_env = item.pop("api_key_env", None)
+        if api_key_env and not item.get("api_key"):
+            item["api_key"] = os.getenv(api_key_env)
+        providers.append(LLMProvider(**item))
+    return providers
+
+
+# 全局路由器（延迟创建）
+_llm_router: Optional[LLMRouter] = None
+_llm_router_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    """获取 LLM 路由器实例（单例模式）"""
+    global _llm_router
+    if _llm_router is None:
+        with _llm_router_lock:
+            if _llm_router is None:
+                providers = load_providers()
+                if providers:
+                    logger.info(f"LLM路由已加载供应商: {', '.join(provider.name for provider in providers)}")
+                _llm_router = LLMRouter(providers)
+    return _llm_router
+
+
+def set_llm_router(router: Optional[LLMRouter]) -> None:
+    """替换全局路由器（None 表示下次使用时按配置重新创建）"""
+    global _llm_router
+    with _llm_router_lock:
+        _llm_router = router
@@ -0,0 +1,455 @@
+"""
+全文检索索引
+为文档（标题、正文）与企业信息（名称、地址、行业、简介等主要字段）建立全文索引：
+- SQLite 使用 FTS5 虚拟表，PostgreSQL 使用 tsvector 列 + GIN 索引，其他数据库不建索引（搜索退回 LIKE）
+- 中文按二元组（bigram）切分：“应急预案” → 应急 急预 预案 案，查询词同样切分后按短语匹配，
+  不依赖分词词典；每段中文末尾额外保留最后一个字，单字查询可按前缀匹配到所有出现位置
+- ORM 的 after_insert / after_update / after_delete 事件在同一事务内更新索引（包括自动保存与级联删除），
+  与数据一起提交或回滚
+"""
+
+import os
+import re
+import html
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, event, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+
+logger = logging.getLogger(__name__)
+
+# 是否启用全文索引（关闭时列表搜索使用 LIKE，/search 接口不可用）
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+# 搜索结果摘要的字符数
+SEARCH_SNIPPET_LENGTH = int(os.getenv("SEARCH_SNIPPET_LENGTH", "80"))
+
+# 标题与正文的排序权重
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+# 连续的中文字符或连续的字母数字
+_TOKEN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff]+|[0-9A-Za-z]+')
+
+
+# ==================== 文本处理 ====================
+
+def html_to_text(content: Optional[str]) -> str:
+    """移除HTML标签与实体，合并空白"""
+    if not content:
+        return ""
+    plain = html.unescape(_TAG_PATTERN.sub(' ', content))
+    return _WHITESPACE_PATTERN.sub(' ', plain).strip()
+
+
+def bigram_tokens(text_value: str) -> List[str]:
+    """
+    切分索引词：中文按二元组并在末尾保留最后一个字，字母数字按单词（小写）
+
+    Examples:
+        "应急预案 v2" → ["应急", "急预", "预案", "案", "v2"]
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text_value or ""):
+        if not run[0].isascii():
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def query_phrases(query: str) -> List[Tuple[List[str], bool]]:
+    """
+    把查询字符串切分为短语（空格分隔的每个查询词为一个短语），返回 [(词列表, 末尾是否前缀匹配)]
+
+    与 bigram_tokens 的切分一致，保证短语中的词在索引中相邻：中文段后面还有字母数字时保留段末单字，
+    查询词末尾的中文段不保留；查询词以字母数字或单个汉字结尾时按前缀匹配（如 “文档1” 匹配 “文档10”）
+    """
+    phrases = []
+    for term in query.split():
+        runs = _TOKEN_PATTERN.findall(term)
+        tokens = []
+        for index, run in enumerate(runs):
+            if run[0].isascii():
+                tokens.append(run.lower())
+            elif len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                if index < len(runs) - 1:
+                    tokens.append(run[-1])
+        if tokens:
+            phrases.append((tokens, runs[-1][0].isascii() or len(runs[-1]) == 1))
+    return phrases
+
+
+def query_terms(query: str) -> List[str]:
+    """查询中的原始词（用于生成摘要高亮）"""
+    return [run for term in query.split() for run in _TOKEN_PATTERN.findall(term)]
+
+
+def make_snippet(content: str, terms: List[str], length: int = None) -> str:
+    """
+    从纯文本中截取包含查询词的摘要，查询词用 <mark> 标记（其余文本经过 HTML 转义）
+
+    Args:
+        content: 纯文本
+        terms: 查询词
+        length: 摘要字符数
+    """
+    length = length or SEARCH_SNIPPET_LENGTH
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - length // 4) if positions else 0
+    end = min(len(content), start + length)
+    window = content[start:end]
+
+    if terms:
+        pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+        parts, last = [], 0
+        for match in pattern.finditer(window):
+            parts.append(html.escape(window[last:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+            last = match.end()
+        parts.append(html.escape(window[last:]))
+        snippet = "".join(parts)
+    else:
+        snippet = html.escape(window)
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(content) else "")
+
+
+# ==================== 索引内容 ====================
+
+# 企业信息中参与检索的字段（名称作为标题，其余拼接为正文）
+ENTERPRISE_BODY_FIELDS = (
+    "industry", "industry_subdivision", "group_company", "park_name",
+    "province", "city", "district", "detailed_address",
+    "unified_social_credit_code", "legal_representative_name", "enterprise_intro",
+)
+
+
+def document_fields(document) -> Tuple[str, str]:
+    """文档的 (标题, 正文纯文本)"""
+    return document.title or "", html_to_text(document.content)
+
+
+def enterprise_fields(enterprise) -> Tuple[str, str]:
+    """企业信息的 (标题, 正文纯文本)"""
+    values = [getattr(enterprise, field, None) for field in ENTERPRISE_BODY_FIELDS]
+    return enterprise.enterprise_name or "", " ".join(str(value) for value in values if value)
+
+
+# 索引类型：名称 → 数据表、参与检索的字段与 (标题, 正文) 提取函数
+INDEX_KINDS: Dict[str, Dict[str, Any]] = {
+    "documents": {
+        "table": "documents",
+        "fields": ("title", "content"),
+        "extract": document_fields,
+    },
+    "enterprise_infos": {
+        "table": "enterprise_info",
+        "fields": ("enterprise_name",) + ENTERPRISE_BODY_FIELDS,
+        "extract": enterprise_fields,
+    },
+}
+
+
+# ==================== 数据库后端 ====================
+
+class SearchBackend(ABC):
+    """全文索引后端"""
+
+    @staticmethod
+    def index_table(kind: str) -> str:
+        return f"search_{kind}"
+
+    @abstractmethod
+    def table_exists(self, conn: Connection, kind: str) -> bool:
+        """索引表是否已存在"""
+
+    @abstractmethod
+    def create(self, conn: Connection, kind: str) -> None:
+        """创建索引表"""
+
+    @abstractmethod
+    def upsert(self, conn: Connection, kind: str, ref_id: int, user_id: int, title: str, body: str) -> None:
+        """写入或替换一条记录的索引"""
+
+    def delete(self, conn: Connection, kind: str, ref_id: int) -> None:
+        """删除一条记录的索引"""
+        conn.execute(text(f"DELETE FROM {self.index_table(kind)} WHERE {self.id_column} = :ref_id"), {"ref_id": ref_id})
+
+    @abstractmethod
+    def match_query(self, phrases: List[Tuple[List[str], bool]]) -> str:
+        """把查询短语转换为数据库的全文检索表达式"""
+
+    @abstractmethod
+    def matching_ids(self, kind: str, match: str) -> TextClause:
+        """匹配记录ID的子查询（用于列表接口的 IN 过滤）"""
+
+    @abstractmethod
+    def ranked(self, kind: str) -> TextClause:
+        """按相关度排序的检索语句（参数 :match / :user_id / :limit / :offset），返回 (id, score)，score 越小越相关"""
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """SQLite FTS5：rowid 即记录ID，user_id 只存储不索引"""
+
+    id_column = "rowid"
+
+    def table_exists(self, conn: Connection, kind: str) -> bool:
+        return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                            {"name": self.index_table(kind)}).first() is not None
+
+    def create(self, conn: Connection, kind: str) -> None:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.index_table(kind)} "
+            f"USING fts5(title, body, user_id UNINDEXED, tokenize='unicode61')"
+        ))
+
+    def upsert(self, conn: Connection, kind: str, ref_id: int, user_id: int, title: str, body: str) -> None:
+        table = self.index_table(kind)
+        conn.execute(text(f"DELETE FROM {table} WHERE rowid = :ref_id"), {"ref_id": ref_id})
+        conn.execute(text(f"INSERT INTO {table} (rowid, title, body, user_id) VALUES (:ref_id, :title, :body, :user_id)"),
+                     {"ref_id": ref_id, "user_id": user_id,
+                      "title": " ".join(bigram_tokens(title)), "body": " ".join(bigram_tokens(body))})
+
+    def match_query(self, phrases: List[Tuple[List[str], bool]]) -> str:
+        # 短语后的 * 表示最后一个词前缀匹配
+        return " AND ".join('"' + " ".join(tokens) + '"' + (" *" if prefix else "") for tokens, prefix in phrases)
+
+    def matching_ids(self, kind: str, match: str) -> TextClause:
+        table = self.index_table(kind)
+        return text(f"SELECT rowid FROM {table} WHERE {table} MATCH :search_match").bindparams(search_match=match)
+
+    def ranked(self, kind: str) -> TextClause:
+        table = self.index_table(kind)
+        return text(
+            f"SELECT rowid AS id, bm25({table}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score FROM {table} "
+            f"WHERE {table} MATCH :match AND user_id = :user_id ORDER BY score LIMIT :limit OFFSET :offset"
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL：切分后的文本按 simple 配置生成 tsvector（标题权重 A，正文权重 B），GIN 索引"""
+
+    id_column = "id"
+
+    def table_exists(self, conn: Connection, kind: str) -> bool:
+        return conn.execute(text("SELECT to_regclass(:name)"), {"name": self.index_table(kind)}).scalar() is not None
+
+    def create(self, conn: Connection, kind: str) -> None:
+        table = self.index_table(kind)
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table} "
+                          f"(id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, tsv tsvector NOT NULL)"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_tsv ON {table} USING GIN (tsv)"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table} (user_id)"))
+
+    def upsert(self, conn: Connection, kind: str, ref_id: int, user_id: int, title: str, body: str) -> None:
+        conn.execute(text(
+            f"INSERT INTO {self.index_table(kind)} (id, user_id, tsv) VALUES (:ref_id, :user_id, "
+            f"setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :body), 'B')) "
+            f"ON CONFLICT (id) DO UPDATE SET user_id = EXCLUDED.user_id, tsv = EXCLUDED.tsv"
+        ), {"ref_id": ref_id, "user_id": user_id,
+            "title": " ".join(bigram_tokens(title)), "body": " ".join(bigram_tokens(body))})
+
+    def match_query(self, phrases: List[Tuple[List[str], bool]]) -> str:
+        # <-> 表示相邻，:* 表示前缀匹配
+        return " & ".join("(" + " <-> ".join(tokens) + (":*" if prefix else "") + ")" for tokens, prefix in phrases)
+
+    def matching_ids(self, kind: str, match: str) -> TextClause:
+        return text(
+            f"SELECT id FROM {self.index_table(kind)} WHERE tsv @@ to_tsquery('simple', :search_match)"
+        ).bindparams(search_match=match)
+
+    def ranked(self, kind: str) -> TextClause:
+        # ts_rank 越大越相关，取负数与 SQLite bm25 的方向一致
+        return text(
+            f"SELECT id, -ts_rank(tsv, query) AS score FROM {self.index_table(kind)}, "
+            f"to_tsquery('simple', :match) AS query "
+            f"WHERE tsv @@ query AND user_id = :user_id ORDER BY score LIMIT :limit OFFSET :offset"
+        )
+
+
+_BACKENDS: Dict[str, SearchBackend] = {
+    "sqlite": SQLiteSearchBackend(),
+    "postgresql": PostgresSearchBackend(),
+}
+
+
+# ==================== 索引服务 ====================
+
+class SearchIndex:
+    """全文索引服务"""
+
+    def __init__(self, enabled: bool = SEARCH_INDEX_ENABLED):
+        self.enabled = enabled
+        # 已确认索引表存在的数据库（按连接URL）
+        self._ready: Dict[str, bool] = {}
+
+    def backend_for(self, conn: Connection) -> Optional[SearchBackend]:
+        """连接对应的索引后端（未启用或数据库不支持时为 None）"""
+        if not self.enabled:
+            return None
+        return _BACKENDS.get(conn.dialect.name)
+
+    def ensure(self, conn: Connection, create: bool = False) -> Optional[SearchBackend]:
+        """
+        检查索引表是否可用
+
+        Args:
+            create: 索引表不存在时是否创建并为已有数据建立索引（只在会提交的事务中使用，
+                    如 create_all 与启动时；读请求与 ORM 事件不创建，索引表不存在时跳过）
+
+        Returns:
+            可用的索引后端；未启用、数据库不支持或索引表不存在时返回 None
+        """
+        backend = self.backend_for(conn)
+        if backend is None:
+            return None
+        key = conn.engine.url.render_as_string(hide_password=True)
+        if self._ready.get(key) and not create:
+            return backend
+        try:
+            missing = [kind for kind in INDEX_KINDS if not backend.table_exists(conn, kind)]
+            if missing and not create:
+                return None
+            for kind in missing:
+                backend.create(conn, kind)
+                self._backfill(conn, backend, kind)
+        except Exception as e:
+            logger.warning(f"全文索引不可用，搜索使用 LIKE 匹配: {e}")
+            return None
+        self._ready[key] = True
+        return backend
+
+    def _backfill(self, conn: Connection, backend: SearchBackend, kind: str) -> None:
+        """为索引表创建前已有的记录建立索引"""
+        from app.database import Base
+
+        spec = INDEX_KINDS[kind]
+        table = Base.metadata.tables[spec["table"]]
+        columns = [table.c.id, table.c.user_id] + [table.c[name] for name in spec["fields"]]
+        count = 0
+        for row in conn.execute(table.select().with_only_columns(*columns)):
+            backend.upsert(conn, kind, row.id, row.user_id, *spec["extract"](row))
+            count += 1
+        logger.info(f"全文索引 {backend.index_table(kind)} 已索引记录 {count} 条")
+
+    def rebuild(self, conn: Connection, kinds: Optional[List[str]] = None) -> bool:
+        """
+        清空并重建索引（批量 insert()/update() 语句不触发 ORM 事件，批量导入后调用）
+
+        Returns:
+            索引是否可用
+        """
+        backend = self.ensure(conn, create=True)
+        if backend is None:
+            return False
+        for kind in kinds or list(INDEX_KINDS):
+            conn.execute(text(f"DELETE FROM {backend.index_table(kind)}"))
+            self._backfill(conn, backend, kind)
+        return True
+
+    def drop(self, conn: Connection) -> None:
+        """删除索引表（随 Base.metadata.drop_all 调用）"""
+        backend = self.backend_for(conn)
+        if backend is not None:
+            for kind in INDEX_KINDS:
+                conn.execute(text(f"DROP TABLE IF EXISTS {backend.index_table(kind)}"))
+        self._ready.pop(conn.engine.url.render_as_string(hide_password=True), None)
+
+    # ---------- ORM 事件 ----------
+
+    def on_insert(self, kind: str, conn: Connection, target) -> None:
+        backend = self.ensure(conn)
+        if backend is not None:
+            backend.upsert(conn, kind, target.id, target.user_id, *INDEX_KINDS[kind]["extract"](target))
+
+    def on_update(self, kind: str, conn: Connection, target) -> None:
+        # 只有检索字段变化时才重建索引（自动保存修改正文，会重建）
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in INDEX_KINDS[kind]["fields"]):
+            self.on_insert(kind, conn, target)
+
+    def on_delete(self, kind: str, conn: Connection, target) -> None:
+        backend = self.ensure(conn)
+        if backend is not None:
+            backend.delete(conn, kind, target.id)
+
+    def register_model_events(self, model, kind: str) -> None:
+        """注册模型的增删改事件，在同一事务内更新索引（包括级联删除）"""
+        event.listen(model, "after_insert", lambda mapper, conn, target: self.on_insert(kind, conn, target))
+        event.listen(model, "after_update", lambda mapper, conn, target: self.on_update(kind, conn, target))
+        event.listen(model, "after_delete", lambda mapper, conn, target: self.on_delete(kind, conn, target))
+
+    # ---------- 查询 ----------
+
+    def matching_ids(self, conn: Connection, kind: str, query: str):
+        """
+        列表接口的全文过滤子查询（SELECT 记录ID）
+
+        Returns:
+            子查询；索引不可用或查询中没有可检索的词时返回 None（调用方使用 LIKE）
+        """
+        backend = self.ensure(conn)
+        phrases = query_phrases(query)
+        if backend is None or not phrases:
+            return None
+        return backend.matching_ids(kind, backend.match_query(phrases)).columns(id=Integer)
+
+    def search(self, conn: Connection, kind: str, user_id: int, query: str,
+               limit: int = 20, offset: int = 0) -> Optional[List[Tuple[int, float]]]:
+        """
+        按相关度检索用户的记录
+
+        Returns:
+            [(记录ID, 分数)]，分数越小越相关（只在同一 kind 内可比较）；索引不可用时返回 None
+        """
+        backend = self.ensure(conn)
+        if backend is None:
+            return None
+        phrases = query_phrases(query)
+        if not phrases:
+            return []
+        rows = conn.execute(backend.ranked(kind), {
+            "match": backend.match_query(phrases), "user_id": user_id, "limit": limit, "offset": offset
+        }).all()
+        return [(row[0], float(row[1])) for row in rows]
+
+    async def amatching_ids(self, db: AsyncSession, kind: str, query: str):
+        """matching_ids 的异步会话版本"""
+        return await db.run_sync(lambda session: self.matching_ids(session.connection(), kind, query))
+
+    async def asearch(self, db: AsyncSession, kind: str, user_id: int, query: str,
+                      limit: int = 20, offset: int = 0) -> Optional[List[Tuple[int, float]]]:
+        """search 的异步会话版本"""
+        return await db.run_sync(
+            lambda session: self.search(session.connection(), kind, user_id, query, limit, offset)
+        )
+
+
+# 全局索引服务实例
+search_index = SearchIndex()
+
+
+def _register_events():
+    from app.database import Base
+    from app.models.document import Document
+    from app.models.enterprise import EnterpriseInfo
+
+    search_index.register_model_events(Document, "documents")
+    search_index.register_model_events(EnterpriseInfo, "enterprise_infos")
+    # create_all 后创建索引表（已有数据时建立索引），drop_all 后删除索引表
+    event.listen(Base.metadata, "after_create", lambda target, conn, **kw: search_index.ensure(conn, create=True))
+    event.listen(Base.metadata, "after_drop", lambda target, conn, **kw: search_index.drop(conn))
+
+
+_register_events()
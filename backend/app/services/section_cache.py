@@ -0,0 +1,283 @@
+"""
+AI段落结果缓存
+以渲染后的 user_prompt、system_prompt、模型与段落配置版本的哈希为键（内容寻址），
+输入未变化的段落直接复用上次生成结果
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 生成失败的占位内容不缓存
+FAILED_CONTENT_PREFIX = "[AI生成失败"
+
+
+class SectionCache:
+    """
+    AI段落结果缓存（进程内 LRU + TTL）
+
+    配置了 Redis 时，结果同时写入共享缓存（CacheService），本进程未命中的段落
+    通过一次 MGET 从共享缓存批量读取，多个工作进程之间可复用生成结果。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None, shared: Any = None):
+        """
+        初始化段落缓存
+
+        Args:
+            max_entries: 最大缓存条目数，None 使用 AI_SECTION_CACHE_MAX_ENTRIES
+            ttl: 过期时间（秒），None 使用 AI_SECTION_CACHE_TTL
+            shared: 共享缓存服务（CacheService），None 时在首次使用时按配置获取
+        """
+        self.enabled = os.getenv("AI_SECTION_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = max_entries or int(os.getenv("AI_SECTION_CACHE_MAX_ENTRIES", "1000"))
+        self.ttl = ttl or int(os.getenv("AI_SECTION_CACHE_TTL", "86400"))
+
+        # key -> (过期时刻（单调时钟）, 段落键名, 内容)，按访问顺序排列
+        self._entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._section_stats: Dict[str, Dict[str, int]] = {}
+        self._evictions = 0
+        self._expirations = 0
+        self._shared_hits = 0
+        self._shared = shared
+        self._shared_resolved = shared is not None
+
+    @staticmethod
+    def make_key(section_key: str, model: str, system_prompt: str, user_prompt: str,
+                 version: Any = None, variant: str = "") -> str:
+        """
+        构建内容寻址的缓存键
+
+        Args:
+            section_key: AI段落键名
+            model: 模型名称
+            system_prompt: 系统提示词
+            user_prompt: 渲染后的用户提示词
+            version: 段落配置版本
+            variant: 生成方式（如是否经过合规检查），不同方式的结果分开缓存
+
+        Returns:
+            缓存键
+        """
+        digest = hashlib.sha256()
+        for part in (model, system_prompt, user_prompt, str(version or ""), variant):
+            encoded = (part or "").encode("utf-8")
+            # 写入长度前缀，避免不同字段拼接后产生相同的字节序列
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+        return f"ai_section:{section_key}:{digest.hexdigest()}"
+
+    def _get_shared(self):
+        """获取共享缓存服务（仅 Redis / 两级缓存时启用，纯内存缓存与本地缓存重复）"""
+        if not self._shared_resolved:
+            self._shared_resolved = True
+            if os.getenv("AI_SECTION_CACHE_SHARED", "true").lower() == "true":
+                from .cache_service import get_cache_service, MemoryCacheBackend
+                service = get_cache_service()
+                if not isinstance(service.backend, MemoryCacheBackend):
+                    self._shared = service
+        return self._shared
+
+    def _stats_for(self, section_key: str) -> Dict[str, int]:
+        """获取段落的统计计数器（调用方需持有锁）"""
+        stats = self._section_stats.get(section_key)
+        if stats is None:
+            stats = self._section_stats[section_key] = {"hits": 0, "misses": 0, "sets": 0}
+        return stats
+
+    def _local_get(self, key: str, now: float) -> Optional[str]:
+        """读取本地条目（调用方需持有锁）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now >= entry[0]:
+            del self._entries[key]
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _local_set(self, section_key: str, key: str, content: str, now: float):
+        """写入本地条目并按容量淘汰（调用方需持有锁）"""
+        self._entries[key] = (now + self.ttl, section_key, content)
+        self._entries.move_to_end(key)
+
+        # 超出容量时淘汰最久未使用的条目
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    @staticmethod
+    def is_cacheable(content: Optional[str]) -> bool:
+        """空内容与生成失败的内容不缓存"""
+        return bool(content) and not content.startswith(FAILED_CONTENT_PREFIX)
+
+    def get(self, section_key: str, key: str) -> Optional[str]:
+        """
+        获取缓存的段落内容
+
+        Args:
+            section_key: AI段落键名（用于统计）
+            key: make_key 生成的缓存键
+
+        Returns:
+            段落内容，未命中返回 None
+        """
+        return self.get_many({section_key: key}).get(section_key)
+
+    def get_many(self, requests: Dict[str, str]) -> Dict[str, str]:
+        """
+        批量获取缓存的段落内容
+
+        本地缓存一次加锁完成，本地未命中的键一次性从共享缓存读取。
+
+        Args:
+            requests: 段落键名到缓存键的映射
+
+        Returns:
+            命中的段落键名到内容的映射
+        """
+        if not self.enabled or not requests:
+            return {}
+
+        now = time.monotonic()
+        result: Dict[str, str] = {}
+        with self._lock:
+            for section_key, key in requests.items():
+                content = self._local_get(key, now)
+                if content is not None:
+                    result[section_key] = content
+
+        missing = {key: section_key for section_key, key in requests.items() if section_key not in result}
+        shared = self._get_shared() if missing else None
+        shared_values: Dict[str, Any] = {}
+        if shared is not None:
+            try:
+                shared_values = shared.get_many(list(missing))
+            except Exception as e:
+                logger.warning(f"读取共享段落缓存失败: {str(e)}")
+
+        with self._lock:
+            for key, value in shared_values.items():
+                content = value.get("content") if isinstance(value, dict) else None
+                if self.is_cacheable(content):
+                    section_key = missing[key]
+                    result[section_key] = content
+                    self._local_set(section_key, key, content, now)
+                    self._shared_hits += 1
+
+            for section_key in requests:
+                self._stats_for(section_key)["hits" if section_key in result else "misses"] += 1
+
+        return result
+
+    def set(self, section_key: str, key: str, content: str) -> bool:
+        """
+        缓存段落内容（空内容与生成失败的内容不缓存）
+
+        Args:
+            section_key: AI段落键名
+            key: make_key 生成的缓存键
+            content: 段落内容
+
+        Returns:
+            是否写入缓存
+        """
+        return self.set_many({section_key: (key, content)}) > 0
+
+    def set_many(self, items: Dict[str, Tuple[str, str]]) -> int:
+        """
+        批量缓存段落内容
+
+        Args:
+            items: 段落键名到（缓存键, 内容）的映射
+
+        Returns:
+            写入的条目数
+        """
+        if not self.enabled:
+            return 0
+
+        cacheable = {
+            section_key: (key, content)
+            for section_key, (key, content) in items.items()
+            if self.is_cacheable(content)
+        }
+        if not cacheable:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            for section_key, (key, content) in cacheable.items():
+                self._local_set(section_key, key, content, now)
+                self._stats_for(section_key)["sets"] += 1
+
+        shared = self._get_shared()
+        if shared is not None:
+            try:
+                shared.set_many(
+                    {key: {"section_key": section_key, "content": content}
+                     for section_key, (key, content) in cacheable.items()},
+                    self.ttl
+                )
+            except Exception as e:
+                logger.warning(f"写入共享段落缓存失败: {str(e)}")
+        return len(cacheable)
+
+    def invalidate(self, section_key: Optional[str] = None) -> int:
+        """
+        使本地缓存失效（共享缓存中的条目按 TTL 过期；段落配置版本变化时键随之改变）
+
+        Args:
+            section_key: AI段落键名，None 清除全部
+
+        Returns:
+            清除的条目数
+        """
+        with self._lock:
+            if section_key is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+
+            keys = [key for key, entry in self._entries.items() if entry[1] == section_key]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息（含各段落命中/未命中次数）"""
+        with self._lock:
+            sections = {key: dict(stats) for key, stats in self._section_stats.items()}
+            entries = len(self._entries)
+
+        hits = sum(stats["hits"] for stats in sections.values())
+        misses = sum(stats["misses"] for stats in sections.values())
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
+
+        return {
+            "enabled": self.enabled,
+            "shared": self._shared is not None,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": hits,
+            "shared_hits": self._shared_hits,
+            "misses": misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "hit_rate": f"{hit_rate:.2f}%",
+            "sections": sections
+        }
+
+
+# 全局段落缓存实例
+section_cache = SectionCache()
@@ -0,0 +1,234 @@
+"""
+请求合并（single-flight）
+相同键的并发调用只执行一次，其余调用等待并共享同一结果，避免重复的大模型调用
+
+- SingleFlight.do / ado：进程内合并（线程与协程）
+- acoalesce_across_workers：多工作进程时通过缓存后端的跨进程锁（Redis SET NX PX）合并，
+  未持有锁的进程轮询共享缓存读取持有者写入的结果
+"""
+
+import os
+import uuid
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_flight_key(*parts: Any) -> str:
+    """
+    构建合并键（各部分带长度前缀后取 SHA-256）
+
+    Args:
+        parts: 决定结果的全部输入
+
+    Returns:
+        合并键
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = str(part if part is not None else "").encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class _Call:
+    """进行中的同步调用"""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """进程内请求合并"""
+
+    def __init__(self, name: str, enabled: Optional[bool] = None):
+        """
+        初始化请求合并器
+
+        Args:
+            name: 名称（用于日志与统计）
+            enabled: 是否启用，None 使用 AI_SINGLE_FLIGHT_ENABLED
+        """
+        if enabled is None:
+            enabled = os.getenv("AI_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+        self.name = name
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, asyncio.Task] = {}
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        执行同步调用；相同键已有调用进行中时等待其结果（异常同样共享）
+
+        Args:
+            key: 合并键
+            fn: 实际调用
+
+        Returns:
+            调用结果
+        """
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            logger.debug(f"[{self.name}] 合并到进行中的调用: {key[:16]}")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def ado(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行异步调用；相同键已有调用进行中时等待其结果
+
+        实际调用在独立任务中执行，发起请求的客户端断开时不会取消其他等待者的生成。
+
+        Args:
+            key: 合并键
+            factory: 返回协程的工厂函数
+
+        Returns:
+            调用结果
+        """
+        if not self.enabled:
+            return await factory()
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._async_calls.get(key)
+            if task is not None and task.get_loop() is loop:
+                self._stats["coalesced"] += 1
+                logger.debug(f"[{self.name}] 合并到进行中的调用: {key[:16]}")
+            else:
+                task = loop.create_task(factory())
+                self._async_calls[key] = task
+                self._stats["executions"] += 1
+                task.add_done_callback(lambda done, key=key: self._forget(key, done))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        """调用完成后移除记录"""
+        with self._lock:
+            if self._async_calls.get(key) is task:
+                del self._async_calls[key]
+        # 标记异常已被读取，避免无人等待时输出 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = len(self._calls) + len(self._async_calls)
+        total = stats["executions"] + stats["coalesced"]
+        saved_rate = (stats["coalesced"] / total * 100) if total > 0 else 0
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            **stats,
+            "in_flight": in_flight,
+            "saved_rate": f"{saved_rate:.2f}%"
+        }
+
+
+async def acoalesce_across_workers(
+    cache: Any,
+    key: str,
+    produce: Callable[[], Awaitable[Any]],
+    fetch: Callable[[], Optional[Any]],
+    lock_ttl: Optional[float] = None,
+    wait_timeout: Optional[float] = None,
+    poll_interval: Optional[float] = None
+) -> Any:
+    """
+    跨工作进程合并：获得锁的进程执行 produce 并写入共享缓存，其余进程轮询 fetch 读取结果
+
+    缓存后端不支持跨进程锁（内存缓存）时直接执行 produce；持有者在锁过期前未写入结果
+    （崩溃或生成失败）或等待超时，则由当前进程自行执行 produce。
+
+    Args:
+        cache: 缓存服务（提供 acquire_lock / release_lock / exists）
+        key: 合并键（同时用作锁键后缀）
+        produce: 执行生成并写入共享缓存的协程工厂
+        fetch: 从共享缓存读取结果，未就绪返回 None
+        lock_ttl: 锁自动过期秒数，None 使用 AI_SINGLE_FLIGHT_LOCK_TTL
+        wait_timeout: 最长等待秒数，None 使用 AI_SINGLE_FLIGHT_WAIT_TIMEOUT
+        poll_interval: 轮询间隔秒数，None 使用 AI_SINGLE_FLIGHT_POLL_INTERVAL
+
+    Returns:
+        生成结果
+    """
+    lock_ttl = lock_ttl or float(os.getenv("AI_SINGLE_FLIGHT_LOCK_TTL", "120"))
+    wait_timeout = wait_timeout or float(os.getenv("AI_SINGLE_FLIGHT_WAIT_TIMEOUT", "120"))
+    poll_interval = poll_interval or float(os.getenv("AI_SINGLE_FLIGHT_POLL_INTERVAL", "0.2"))
+
+    lock_key = f"single_flight:{key}"
+    token = uuid.uuid4().hex
+    acquired = cache.acquire_lock(lock_key, token, int(lock_ttl * 1000))
+
+    if acquired is None:
+        return await produce()
+
+    if acquired:
+        try:
+            return await produce()
+        finally:
+            cache.release_lock(lock_key, token)
+
+    # 其他进程正在生成，等待其写入共享缓存
+    logger.info(f"其他工作进程正在生成，等待结果: {key[:16]}")
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll_interval)
+        value = fetch()
+        if value is not None:
+            return value
+        if not cache.exists(lock_key):
+            # 锁已释放但没有结果（持有者生成失败），最后读取一次后自行生成
+            value = fetch()
+            if value is not None:
+                return value
+            break
+
+    logger.warning(f"等待其他工作进程的生成结果超时或失败，自行生成: {key[:16]}")
+    return await produce()
+
+
+# AIService.generate / agenerate 的合并器
+ai_generation_flight = SingleFlight("ai_generate")
+
+# call_llm（AI段落生成）的合并器
+llm_call_flight = SingleFlight("call_llm")
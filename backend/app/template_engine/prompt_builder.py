@@ -4,10 +4,17 @@ Prompt拼接器模块
 用于根据章节模板类型和企业数据构建不同类型的AI提示词。
 """
 
-import json
-from typing import Dict, List
+from typing import Any, Dict, List
 
 from .models import SectionTemplate
+from ..prompts.prompt_compactor import compact_json
+
+
+def _format_value(value: Any) -> str:
+    """将企业数据的值转换为提示词文本（字典和列表输出紧凑 JSON，长列表只保留前几项）"""
+    if isinstance(value, (dict, list)):
+        return compact_json(value)
+    return str(value)
 
 
 def _format_enterprise_data(section: SectionTemplate, enterprise_data: dict) -> str:
@@ -29,7 +36,7 @@ def _format_enterprise_data(section: SectionTemplate, enterprise_data: dict) ->
         value = enterprise_data.get(var, "未提供")
         # 将下划线转换为中文友好的字段名
         field_name = var.replace("_", " ")
-        formatted_lines.append(f"{field_name}：{value}")
+        formatted_lines.append(f"{field_name}：{_format_value(value)}")
     
     return "\n".join(formatted_lines)
 
@@ -64,7 +71,7 @@ def build_section_prompt(
             for var in section.input_vars:
                 subset_data[var] = enterprise_data.get(var, "未提供")
         
-        return "请根据以下结构化数据渲染固定模板或表格：" + json.dumps(subset_data, ensure_ascii=False)
+        return "请根据以下结构化数据渲染固定模板或表格：" + compact_json(subset_data)
     
     elif section.type in ("ai_written", "hybrid"):
         # AI生成和混合类型需要构建结构化Prompt
@@ -0,0 +1,56 @@
+"""
+按事件循环复用的异步客户端
+httpx 连接池绑定在创建它的事件循环上，不能跨事件循环使用：每个事件循环各用一个长期复用的客户端，
+应用关闭时（aclose）关闭全部客户端，事件循环变化时不会丢下未关闭的连接池
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LoopBoundClients:
+    """每个事件循环一个异步客户端"""
+
+    def __init__(self, factory: Callable[[], Any], close: Callable[[Any], Awaitable[None]]):
+        """
+        Args:
+            factory: 创建客户端（在使用它的事件循环中调用）
+            close: 关闭客户端的协程函数
+        """
+        self._factory = factory
+        self._close = close
+        self._clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """当前事件循环的客户端（不存在时创建）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # 已关闭的事件循环上的连接无法再异步关闭（其传输层随事件循环失效），丢弃引用，连接随对象回收释放
+            for stale in [key for key in self._clients if key.is_closed()]:
+                del self._clients[stale]
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = self._factory()
+        return client
+
+    async def aclose(self) -> None:
+        """关闭全部客户端：当前事件循环的直接关闭，其他线程中运行的事件循环的在其所属事件循环中关闭"""
+        current = asyncio.get_running_loop()
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            try:
+                if loop is current:
+                    await self._close(client)
+                elif loop.is_running():
+                    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close(client), loop))
+            except Exception as e:
+                logger.warning(f"关闭异步客户端失败: {e}")
+
+    def __len__(self) -> int:
+        return len(self._clients)
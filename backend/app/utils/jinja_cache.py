@@ -0,0 +1,119 @@
+"""
+Jinja2 模板字节码缓存
+文档生成器与模板加载器共用同一个文件系统字节码缓存：模板只在首次出现（或源文件修改）时
+解析编译，之后同一进程内的其他环境、其他工作进程以及重启/扩容后的新进程都直接加载编译结果
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from jinja2 import FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+from jinja2.bccache import Bucket
+from jinja2.sandbox import SandboxedEnvironment
+
+logger = logging.getLogger(__name__)
+
+# 两个环境共用的模板选项（选项不同时编译结果不同，缓存文件按选项区分）
+ENVIRONMENT_OPTIONS: Dict[str, Any] = {
+    "trim_blocks": True,
+    "lstrip_blocks": True,
+}
+
+
+class SharedBytecodeCache(FileSystemBytecodeCache):
+    """统计命中情况的文件系统字节码缓存"""
+
+    def __init__(self, directory: str, pattern: str):
+        super().__init__(directory, pattern)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        super().load_bytecode(bucket)
+        with self._stats_lock:
+            if bucket.code is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            # 缓存目录不可写时只影响下次启动的编译耗时，不影响渲染
+            logger.warning(f"写入模板字节码缓存失败: {str(e)}")
+            return
+        with self._stats_lock:
+            self.stores += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._stats_lock:
+            return {
+                "directory": self.directory,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+            }
+
+
+_bytecode_cache: Optional[SharedBytecodeCache] = None
+_bytecode_cache_lock = threading.Lock()
+
+
+def _default_cache_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "yueen_jinja_bytecode")
+
+
+def get_bytecode_cache() -> Optional[SharedBytecodeCache]:
+    """
+    获取进程内共用的字节码缓存
+
+    Returns:
+        字节码缓存，JINJA_BYTECODE_CACHE_ENABLED=false 或缓存目录不可用时返回 None
+    """
+    global _bytecode_cache
+    if os.getenv("JINJA_BYTECODE_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _bytecode_cache is None:
+        with _bytecode_cache_lock:
+            if _bytecode_cache is None:
+                directory = os.getenv("JINJA_BYTECODE_CACHE_DIR") or _default_cache_dir()
+                try:
+                    Path(directory).mkdir(parents=True, exist_ok=True)
+                except OSError as e:
+                    logger.warning(f"模板字节码缓存目录不可用: {directory}, 错误: {str(e)}")
+                    return None
+                # 缓存文件名带上环境选项摘要，选项变化后不会加载到旧的编译结果
+                options_digest = hashlib.sha1(
+                    json.dumps(ENVIRONMENT_OPTIONS, sort_keys=True).encode("utf-8")
+                ).hexdigest()[:8]
+                _bytecode_cache = SharedBytecodeCache(directory, f"__jinja2_{options_digest}_%s.cache")
+                logger.info(f"模板字节码缓存目录: {directory}")
+    return _bytecode_cache
+
+
+def create_template_environment(templates_dir: Path) -> SandboxedEnvironment:
+    """
+    创建使用共享字节码缓存的 Jinja2 沙箱环境
+
+    Args:
+        templates_dir: 模板目录
+
+    Returns:
+        Jinja2 沙箱环境
+    """
+    return SandboxedEnvironment(
+        loader=FileSystemLoader(str(templates_dir)),
+        autoescape=select_autoescape(['html', 'xml']),
+        bytecode_cache=get_bytecode_cache(),
+        **ENVIRONMENT_OPTIONS
+    )
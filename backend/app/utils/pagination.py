@@ -3,11 +3,18 @@
 提供高效的分页查询实现，避免深分页性能问题
 """
 
+import json
 import time
+import base64
 import logging
+from datetime import date, datetime
 from typing import Any, Dict, List, Optional, Tuple, Union, Generic
 from sqlalchemy.orm import Query, Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, func, and_, or_, tuple_, literal
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from sqlalchemy.types import Date, DateTime
 from pydantic import BaseModel
 from app.utils.query_monitor import log_pagination_performance
 
@@ -36,12 +43,14 @@ class CursorPaginationResult:
         items: List[Any],
         next_cursor: Optional[str] = None,
         has_next: bool = False,
-        has_previous: bool = False
+        has_previous: bool = False,
+        total: Optional[int] = None
     ):
         self.items = items
         self.next_cursor = next_cursor
         self.has_next = has_next
         self.has_previous = has_previous
+        self.total = total
 
 class OffsetPaginationResult:
     """偏移分页结果"""
@@ -49,16 +58,22 @@ class OffsetPaginationResult:
     def __init__(
         self,
         items: List[Any],
-        total: int,
+        total: Optional[int],
         page: int,
         page_size: int,
-        total_pages: int
+        total_pages: Optional[int],
+        next_cursor: Optional[str] = None,
+        has_next: Optional[bool] = None
     ):
         self.items = items
+        # 不统计总数时 total / total_pages 为 None，has_next 由多查询的一行判断
         self.total = total
         self.page = page
         self.page_size = page_size
         self.total_pages = total_pages
+        self.has_next = page < total_pages if has_next is None else has_next
+        # 按键集排序时的下一页游标，客户端可从任意偏移页切换到游标分页
+        self.next_cursor = next_cursor
 
 def optimize_offset_pagination(
     query: Query,
@@ -190,6 +205,290 @@ def search_optimized_pagination(
     
     return result
 
+def count_statement(stmt: Select) -> Select:
+    """查询对应的 COUNT 语句（去掉排序与关联加载）"""
+    return stmt.with_only_columns(func.count(), maintain_column_froms=True).order_by(None)
+
+async def acount_query(stmt: Select, db: AsyncSession) -> int:
+    """统计查询结果总数"""
+    return (await db.execute(count_statement(stmt))).scalar()
+
+async def aoptimize_offset_pagination(
+    stmt: Select,
+    pagination: PaginationParams,
+    db: AsyncSession,
+    total: Optional[int] = None,
+    count: bool = True
+) -> OffsetPaginationResult:
+    """
+    优化偏移分页查询（异步会话版本，与 optimize_offset_pagination 相同的深分页优化）
+    
+    stmt 为 select(Model) 语句，可带 where / order_by / 预加载选项
+    
+    Args:
+        total: 已知的总数（如缓存的总数），传入时不再执行 COUNT
+        count: total 为空时是否执行 COUNT；为 False 时不统计总数
+
+    是否有下一页始终由多查询的一行判断，不依赖总数（缓存的总数可能已过期）
+    """
+    start_time = time.time()
+    
+    # 获取总数（不包含排序和关联加载）
+    if total is None and count:
+        total = await acount_query(stmt, db)
+    limit = pagination.page_size + 1
+    
+    if pagination.page > 100:
+        logger.info(f"使用深分页优化 - 页码: {pagination.page}")
+        
+        # 先只查询主键，再按主键取完整行
+        primary_key = stmt.column_descriptions[0]['entity'].__table__.primary_key.columns.values()[0]
+        subquery = stmt.with_only_columns(primary_key).offset(pagination.offset).limit(limit).subquery()
+        page_stmt = stmt.join(subquery, primary_key == subquery.c[primary_key.name])
+    else:
+        page_stmt = stmt.offset(pagination.offset).limit(limit)
+    items = list((await db.execute(page_stmt)).unique().scalars().all())
+    
+    has_next = len(items) > pagination.page_size
+    items = items[:pagination.page_size]
+    # 计算总页数
+    total_pages = (total + pagination.page_size - 1) // pagination.page_size if total is not None else None
+    
+    # 记录性能
+    duration = time.time() - start_time
+    log_pagination_performance(pagination.page, pagination.page_size, total, duration)
+    
+    return OffsetPaginationResult(
+        items=items,
+        total=total,
+        page=pagination.page,
+        page_size=pagination.page_size,
+        total_pages=total_pages,
+        has_next=has_next
+    )
+
+async def asearch_optimized_pagination(
+    stmt: Select,
+    search_term: str,
+    search_fields: List[str],
+    pagination: PaginationParams,
+    db: AsyncSession
+) -> OffsetPaginationResult:
+    """
+    搜索优化的分页查询（异步会话版本）
+    """
+    start_time = time.time()
+    
+    # 应用搜索条件
+    condition = build_search_condition(stmt.column_descriptions[0]['entity'], search_term, search_fields)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    
+    result = await aoptimize_offset_pagination(stmt, pagination, db)
+    
+    # 记录搜索性能
+    duration = time.time() - start_time
+    logger.info(f"搜索分页查询 - 搜索词: '{search_term}', 耗时: {duration:.3f}s, 结果数: {result.total}")
+    
+    return result
+
+def build_search_condition(model, search_term: str, search_fields: List[str]):
+    """构建多字段模糊搜索条件（字段均不存在时返回 None）"""
+    search_conditions = [
+        getattr(model, field).ilike(f"%{search_term}%")
+        for field in search_fields if hasattr(model, field)
+    ]
+    return or_(*search_conditions) if search_conditions else None
+
+# ==================== 键集（游标）分页 ====================
+# 按复合排序键（如 updated_at DESC, id DESC）取下一页：WHERE (updated_at, id) < (上一页最后一行的值)，
+# 配合 (user_id, updated_at) 等索引时每页只扫描 page_size 行，与翻到第几页无关。
+# 游标是排序键名与最后一行键值的 base64 编码，对客户端不透明
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与当前排序键不匹配"""
+
+
+def _sort_key_parts(sort_key) -> Tuple[Any, bool]:
+    """拆分排序键，返回 (列, 是否倒序)"""
+    if isinstance(sort_key, UnaryExpression) and sort_key.modifier in (operators.desc_op, operators.asc_op):
+        return sort_key.element, sort_key.modifier is operators.desc_op
+    return sort_key, False
+
+
+def _sort_key_signature(sort_keys: List[Any]) -> str:
+    """排序键签名，用于拒绝其他接口或其他排序生成的游标"""
+    parts = []
+    for sort_key in sort_keys:
+        column, descending = _sort_key_parts(sort_key)
+        parts.append(f"{column.key}:{'desc' if descending else 'asc'}")
+    return ",".join(parts)
+
+
+def encode_cursor(item: Any, sort_keys: List[Any]) -> str:
+    """根据一行数据的排序键值生成游标"""
+    values = []
+    for sort_key in sort_keys:
+        value = getattr(item, _sort_key_parts(sort_key)[0].key)
+        values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+    payload = json.dumps({"k": _sort_key_signature(sort_keys), "v": values}, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_keys: List[Any]) -> List[Any]:
+    """
+    解析游标，返回排序键值列表（日期时间列还原为 datetime）
+
+    Raises:
+        InvalidCursorError: 游标格式错误或排序键不匹配
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        values = payload["v"]
+        signature = payload["k"]
+    except Exception as e:
+        raise InvalidCursorError(f"无效的游标: {cursor}") from e
+    if signature != _sort_key_signature(sort_keys) or len(values) != len(sort_keys):
+        raise InvalidCursorError("游标与当前排序方式不匹配")
+
+    decoded = []
+    for sort_key, value in zip(sort_keys, values):
+        column_type = getattr(_sort_key_parts(sort_key)[0], "type", None)
+        if value is None:
+            raise InvalidCursorError("游标包含空值")
+        try:
+            if isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Date):
+                value = date.fromisoformat(value)
+        except (TypeError, ValueError) as e:
+            raise InvalidCursorError(f"无效的游标值: {value}") from e
+        decoded.append(value)
+    return decoded
+
+
+def keyset_condition(sort_keys: List[Any], values: List[Any]):
+    """
+    构建“排在游标之后”的条件
+
+    排序方向一致时使用行值比较 (a, b) < (x, y)，数据库可直接在复合索引上定位；
+    方向混合时展开为 a < x OR (a = x AND b > y) ...
+    """
+    parts = [_sort_key_parts(sort_key) for sort_key in sort_keys]
+    directions = {descending for _, descending in parts}
+    if len(directions) == 1:
+        columns = tuple_(*(column for column, _ in parts))
+        # 按列类型绑定参数，与列的存储格式一致（如 SQLite 的日期时间文本）
+        row = tuple_(*(literal(value, column.type) for (column, _), value in zip(parts, values)))
+        return columns < row if directions.pop() else columns > row
+
+    conditions = []
+    for index, (column, descending) in enumerate(parts):
+        equal_prefix = [parts[i][0] == values[i] for i in range(index)]
+        after = column < values[index] if descending else column > values[index]
+        conditions.append(and_(*equal_prefix, after))
+    return or_(*conditions)
+
+
+async def akeyset_pagination(
+    stmt: Select,
+    sort_keys: List[Any],
+    pagination: PaginationParams,
+    db: AsyncSession,
+    total: Optional[int] = None
+) -> CursorPaginationResult:
+    """
+    键集（游标）分页查询（异步会话版本）
+
+    Args:
+        stmt: select(Model) 语句，可带 where / 预加载选项，不带 order_by
+        sort_keys: 排序键，如 [Document.updated_at.desc(), Document.id.desc()]，最后一个应为唯一列
+        pagination: 分页参数，pagination.cursor 为上一页返回的 next_cursor（为空表示第一页）
+        total: 随结果返回的总数（由调用方统计，游标分页本身不执行 COUNT）
+
+    Raises:
+        InvalidCursorError: 游标无效
+    """
+    start_time = time.time()
+
+    page_stmt = stmt.order_by(*sort_keys)
+    if pagination.cursor:
+        page_stmt = page_stmt.where(keyset_condition(sort_keys, decode_cursor(pagination.cursor, sort_keys)))
+
+    # 多取一行判断是否还有下一页
+    items = list((await db.execute(page_stmt.limit(pagination.page_size + 1))).unique().scalars().all())
+    has_next = len(items) > pagination.page_size
+    items = items[:pagination.page_size]
+    next_cursor = encode_cursor(items[-1], sort_keys) if has_next else None
+
+    duration = time.time() - start_time
+    logger.info(f"游标分页查询 - 耗时: {duration:.3f}s, 项目数: {len(items)}, 有下一页: {has_next}")
+
+    return CursorPaginationResult(
+        items=items,
+        next_cursor=next_cursor,
+        has_next=has_next,
+        has_previous=bool(pagination.cursor),
+        total=total
+    )
+
+async def apaginate(
+    stmt: Select,
+    sort_keys: List[Any],
+    pagination: PaginationParams,
+    db: AsyncSession,
+    total_mode: Optional[str] = None,
+    count_scope: Optional[Tuple[str, int]] = None
+) -> Union[OffsetPaginationResult, CursorPaginationResult]:
+    """
+    列表接口分页：传入游标时使用键集分页，否则使用偏移分页并附带下一页游标
+
+    Args:
+        total_mode: exact 每次执行 COUNT；cached 使用 count_service 缓存的总数（可能短暂过期，只用于展示）；
+                    none 不统计总数。为空时偏移分页使用 exact，游标分页使用 none。
+                    是否有下一页与下一页游标始终由多查询的一行判断，不依赖总数
+        count_scope: (列表名, 用户ID)，cached 模式的缓存范围（为空时按 exact 统计）
+
+    Raises:
+        InvalidCursorError: 游标无效
+    """
+    from app.services.count_service import count_service
+
+    if total_mode is None:
+        total_mode = "none" if pagination.cursor else "exact"
+    if total_mode == "cached" and count_scope is not None:
+        total = await count_service.acount(stmt, db, *count_scope)
+    elif total_mode in ("cached", "exact"):
+        total = await acount_query(stmt, db)
+    else:
+        total = None
+
+    if pagination.cursor:
+        return await akeyset_pagination(stmt, sort_keys, pagination, db, total=total)
+
+    result = await aoptimize_offset_pagination(stmt.order_by(*sort_keys), pagination, db, total=total, count=False)
+    if result.has_next and result.items:
+        result.next_cursor = encode_cursor(result.items[-1], sort_keys)
+    return result
+
+
+def pagination_fields(result: Union[OffsetPaginationResult, CursorPaginationResult], page_size: int) -> Dict[str, Any]:
+    """列表响应中的分页字段（total / page / page_size / total_pages / next_cursor / has_next）"""
+    if isinstance(result, OffsetPaginationResult):
+        page, total, total_pages = result.page, result.total, result.total_pages
+    else:
+        page, total = None, result.total
+        total_pages = (total + page_size - 1) // page_size if total is not None else None
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "next_cursor": result.next_cursor,
+        "has_next": result.has_next,
+    }
+
 def get_pagination_recommendations(
     total: int,
     page: int,
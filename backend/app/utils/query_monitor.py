@@ -6,7 +6,7 @@
 import time
 import logging
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
@@ -92,11 +92,11 @@ def setup_sqlalchemy_monitoring(engine: Engine):
         else:
             logger.debug(f"SQL查询 - 耗时: {duration:.3f}s - SQL: {statement[:100]}...")
 
-def log_pagination_performance(page: int, page_size: int, total: int, duration: float):
+def log_pagination_performance(page: int, page_size: int, total: Optional[int], duration: float):
     """
-    记录分页查询性能
+    记录分页查询性能（不统计总数时 total 为 None）
     """
-    total_pages = (total + page_size - 1) // page_size
+    total_pages = (total + page_size - 1) // page_size if total is not None else "?"
     logger.info(
         f"分页查询性能 - 页码: {page}/{total_pages}, "
         f"页大小: {page_size}, 总数: {total}, 耗时: {duration:.3f}s"
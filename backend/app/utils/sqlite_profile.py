@@ -0,0 +1,88 @@
+"""
+SQLite 生产模式配置
+连接建立时设置 WAL 日志模式与 synchronous / busy_timeout / mmap_size / cache_size / temp_store 等 PRAGMA；
+写连接关闭驱动的隐式事务，改为 BEGIN IMMEDIATE，开始事务时即获取写锁（等待时受 busy_timeout 控制），
+避免读事务升级为写事务时直接返回 "database is locked"
+"""
+
+import os
+import logging
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 默认配置，可通过环境变量覆盖
+DEFAULT_SQLITE_PRAGMAS: Dict[str, str] = {
+    # 读写互不阻塞：读取走 WAL 快照，写入追加到 WAL 文件
+    "journal_mode": "WAL",
+    # WAL 模式下 NORMAL 只在检查点时 fsync，掉电最多丢失最近提交，数据库不会损坏
+    "synchronous": "NORMAL",
+    # 获取锁时最长等待毫秒数
+    "busy_timeout": "5000",
+    # 内存映射读取的最大字节数
+    "mmap_size": "268435456",
+    # 页缓存大小（负数表示 KiB）
+    "cache_size": "-65536",
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+# PRAGMA 与对应的环境变量
+PRAGMA_ENV_VARS: Dict[str, str] = {
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "busy_timeout": "SQLITE_BUSY_TIMEOUT",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+    "cache_size": "SQLITE_CACHE_SIZE",
+    "temp_store": "SQLITE_TEMP_STORE",
+    "foreign_keys": "SQLITE_FOREIGN_KEYS",
+}
+
+
+def is_sqlite_profile_enabled() -> bool:
+    """是否启用 SQLite 生产模式配置（SQLITE_PROFILE_ENABLED，默认启用）"""
+    return os.getenv("SQLITE_PROFILE_ENABLED", "true").lower() == "true"
+
+
+def get_sqlite_pragmas() -> Dict[str, str]:
+    """读取 PRAGMA 配置（环境变量覆盖默认值）"""
+    return {name: os.getenv(PRAGMA_ENV_VARS[name], value) for name, value in DEFAULT_SQLITE_PRAGMAS.items()}
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: Dict[str, str]) -> None:
+    """在数据库连接上执行 PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def setup_sqlite_profile(engine: Engine, writer: bool = False) -> None:
+    """
+    为 SQLite 引擎注册连接配置
+
+    Args:
+        engine: 同步引擎（异步引擎传入 async_engine.sync_engine）
+        writer: 是否为写连接（写事务使用 BEGIN IMMEDIATE）
+    """
+    pragmas = get_sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+        if writer:
+            # 关闭驱动的隐式 BEGIN，由 begin 事件发出 BEGIN IMMEDIATE
+            dbapi_connection.isolation_level = None
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    logger.info(f"SQLite 连接配置已启用{'（写连接）' if writer else ''}: "
+                f"{', '.join(f'{name}={value}' for name, value in pragmas.items())}")
@@ -0,0 +1,44 @@
+"""
+Server-Sent Events 工具
+提供 SSE 事件格式化和流式响应构建
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi.responses import StreamingResponse
+
+# SSE 响应头：禁用缓存和反向代理缓冲，保证 token 立即到达客户端
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    格式化单个 SSE 事件
+
+    Args:
+        event: 事件名称（如 token、done、error）
+        data: 事件数据，序列化为单行 JSON
+
+    Returns:
+        SSE 事件文本
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    构建 SSE 流式响应
+
+    Args:
+        events: 已格式化的 SSE 事件异步迭代器
+
+    Returns:
+        StreamingResponse
+    """
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,104 @@
+"""
+文本统计工具
+提供生成文档的字数统计
+"""
+
+import re
+
+# HTML 标签
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+# 连续的中文字符（按段匹配后累加长度，避免为每个汉字创建一个匹配结果）
+_CHINESE_RUN_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+# 英文单词
+_ENGLISH_WORD_PATTERN = re.compile(r'\b[a-zA-Z]+\b')
+# 末尾连续的单词字符（英文单词可能被片段边界截断，留到下一个片段再统计）
+_TRAILING_WORD_PATTERN = re.compile(r'\w*\Z')
+
+
+def _count_plain_text(text: str) -> int:
+    """统计已移除标签的文本字数"""
+    chinese_chars = sum(map(len, _CHINESE_RUN_PATTERN.findall(text)))
+    return chinese_chars + len(_ENGLISH_WORD_PATTERN.findall(text))
+
+
+def count_words(html_content: str) -> int:
+    """
+    统计HTML内容的字数（中文字符数 + 英文单词数）
+
+    Args:
+        html_content: HTML字符串
+
+    Returns:
+        字数统计
+    """
+    # 移除HTML标签（标签两侧的文字直接相连，与原实现一致）
+    return _count_plain_text(_TAG_PATTERN.sub('', html_content))
+
+
+class StreamingWordCounter:
+    """
+    增量字数统计
+
+    逐段输入HTML片段，结果与对拼接后的完整内容调用 count_words 一致：
+    未闭合的标签和末尾未结束的单词暂存到下一个片段，只保留很短的尾部而不保存完整内容。
+    """
+
+    def __init__(self):
+        self._pending_markup = ""
+        self._pending_text = ""
+        self.count = 0
+
+    def feed(self, chunk: str) -> None:
+        """
+        输入一个HTML片段
+
+        Args:
+            chunk: HTML片段
+        """
+        raw = self._pending_markup + chunk
+        # 最后一个 '>' 之后的 '<' 可能是尚未闭合的标签
+        open_at = raw.find('<', raw.rfind('>') + 1)
+        if open_at == -1:
+            self._pending_markup = ""
+        else:
+            raw, self._pending_markup = raw[:open_at], raw[open_at:]
+        self._feed_text(_TAG_PATTERN.sub('', raw))
+
+    def _feed_text(self, text: str) -> None:
+        text = self._pending_text + text
+        split_at = _TRAILING_WORD_PATTERN.search(text).start()
+        self._pending_text = text[split_at:]
+        self.count += _count_plain_text(text[:split_at])
+
+    def finish(self) -> int:
+        """
+        结束输入并返回总字数
+
+        Returns:
+            字数统计
+        """
+        # 始终未闭合的 '<' 按普通文本处理（与 count_words 一致）
+        text = self._pending_text + _TAG_PATTERN.sub('', self._pending_markup)
+        self._pending_markup = ""
+        self._pending_text = ""
+        self.count += _count_plain_text(text)
+        return self.count
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数（中文等非 ASCII 字符约每字 1 个 token，ASCII 字符约每 4 个 1 个 token）
+
+    用于统计提示词与生成内容的开销，不依赖具体模型的分词器。中文字符与全角标点的
+    UTF-8 编码为 3 字节，由编码后的长度推算非 ASCII 字符数，不逐字符扫描。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    wide = (len(text.encode('utf-8')) - len(text)) // 2
+    return wide + (len(text) - wide + 3) // 4
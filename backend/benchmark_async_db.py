@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+异步数据库层负载测试
+用 SQLite 自定义函数 slow_query(秒) 模拟慢查询，比较 async 路由中直接使用同步会话（阻塞事件循环）
+与使用 aget_db 异步会话时，同一工作进程内并发请求的总耗时与吞吐量
+
+同步会话方式的并发请求数超过连接池上限（pool_size + max_overflow）时，阻塞在取连接上的请求
+会让事件循环无法执行其他请求的会话清理，直到 pool_timeout 超时，因此请求数应小于连接池上限
+
+用法：python benchmark_async_db.py [--requests 20] [--delay 0.1]
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("SECRET_KEY", "benchmark-async-db-secret-key-0123456789")
+
+from app.database import get_pool_options
+from testing_utils import build_load_test_app, run_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description="异步数据库层负载测试")
+    parser.add_argument("--requests", type=int, default=20, help="并发请求数")
+    parser.add_argument("--delay", type=float, default=0.1, help="模拟慢查询耗时（秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, async_engine = build_load_test_app(os.path.join(tmp, "load.db"), args.delay)
+        pool = get_pool_options(f"sqlite:///{tmp}/load.db")
+        print(f"并发请求: {args.requests}, 慢查询: {args.delay}s, 连接池: {pool['pool_size']} + {pool['max_overflow']}")
+
+        sync_elapsed = asyncio.run(run_load(app, "/sync", args.requests))
+        async_elapsed = asyncio.run(run_load(app, "/async", args.requests))
+        asyncio.run(async_engine.dispose())
+
+    print(f"\n{'方式':<16}{'总耗时':>10}{'吞吐量':>14}")
+    print(f"{'同步会话':<14}{sync_elapsed:>10.2f}s{args.requests / sync_elapsed:>12.1f}/s")
+    print(f"{'异步会话':<14}{async_elapsed:>10.2f}s{args.requests / async_elapsed:>12.1f}/s")
+    print(f"\n加速比: {sync_elapsed / async_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+缓存编解码器基准测试
+使用 template_emergency_plan.jinja2 的真实渲染结果，比较各序列化/压缩组合的
+编码、解码吞吐量与存储字节数
+
+用法：python benchmark_cache_codec.py [--iterations 200]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.services.cache_codec import CacheCodec, orjson, msgpack, zstandard
+from app.services.document_generator import document_generator
+from app.prompts.ai_section_processor import generate_mock_content
+
+
+def render_payloads() -> dict:
+    """渲染应急预案，构造与 /api/ai/generate 和文档缓存相同结构的缓存值"""
+    with open(project_root / "sample_enterprise.json", "r", encoding="utf-8") as f:
+        enterprise_data = json.load(f)
+
+    # 使用模拟内容生成AI段落（不计入基准耗时）
+    with patch("app.services.document_generator.call_llm",
+               side_effect=lambda model, system, user, user_id=None: generate_mock_content(system, user)):
+        ai_sections = document_generator.build_ai_sections(enterprise_data, enable_compliance_check=False)
+
+    template_data = document_generator._prepare_template_data(enterprise_data)
+    template_data["ai_sections"] = ai_sections
+    html = document_generator.render_jinja("template_emergency_plan.jinja2", template_data)
+    if html is None:
+        raise RuntimeError("应急预案渲染失败")
+
+    section_key = next(iter(ai_sections))
+    return {
+        "document": {"content": html, "word_count": len(html), "title": "突发环境事件应急预案"},
+        "section": {"section_key": section_key, "content": ai_sections[section_key]},
+    }
+
+
+def bench(codec: CacheCodec, value, iterations: int) -> dict:
+    """测量单个编解码器的吞吐量与字节数"""
+    encoded = codec.encode(value)
+    assert codec.decode(encoded) == value
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(value)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(encoded)
+    decode_time = time.perf_counter() - start
+
+    return {
+        "bytes": len(encoded),
+        "encode_ops": iterations / encode_time,
+        "decode_ops": iterations / decode_time,
+    }
+
+
+def legacy_bench(value, iterations: int) -> dict:
+    """原实现：json.dumps(ensure_ascii=False) 文本，写入/读取 Redis 时按 UTF-8 编解码"""
+    data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.dumps(value, ensure_ascii=False).encode("utf-8")
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.loads(data.decode("utf-8"))
+    decode_time = time.perf_counter() - start
+
+    return {
+        "bytes": len(data),
+        "encode_ops": iterations / encode_time,
+        "decode_ops": iterations / decode_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存编解码器基准测试")
+    parser.add_argument("--iterations", type=int, default=200, help="每种组合的编解码次数")
+    args = parser.parse_args()
+
+    payloads = render_payloads()
+
+    serializers = ["json"] + (["orjson"] if orjson else []) + (["msgpack"] if msgpack else [])
+    # (压缩方式, 压缩级别)
+    compressions = [("none", None), ("zlib", 1), ("zlib", 6)] + ([("zstd", 3)] if zstandard else [])
+
+    for name, value in payloads.items():
+        print(f"\n=== {name}（HTML {len(value['content'])} 字符）===")
+        print(f"{'编解码器':<22}{'字节数':>10}{'压缩比':>8}{'编码 ops/s':>14}{'解码 ops/s':>14}")
+
+        baseline = legacy_bench(value, args.iterations)
+        rows = [("json 文本（原实现）", baseline)]
+        for serializer in serializers:
+            for compression, level in compressions:
+                codec = CacheCodec(serializer=serializer, compression=compression,
+                                   compress_threshold=4096, compress_level=level)
+                label = f"{serializer}+{compression}" + (f"-{level}" if level is not None else "")
+                rows.append((label, bench(codec, value, args.iterations)))
+
+        for label, result in rows:
+            ratio = baseline["bytes"] / result["bytes"]
+            print(f"{label:<22}{result['bytes']:>10}{ratio:>8.2f}{result['encode_ops']:>14.0f}{result['decode_ops']:>14.0f}")
+
+    if not msgpack or not zstandard:
+        print("\n提示：安装 msgpack / zstandard 后可比较更多组合")
+
+
+if __name__ == "__main__":
+    main()
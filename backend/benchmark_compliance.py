@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+AI段落合规检查基准测试
+比较原实现（每个关键词重新 lower() 全文并逐项查找、if/elif 特殊要求链）与
+按段落编译的组合正则一次扫描，覆盖 compliance_matrix.json 中的全部段落，并校验两者结果一致
+
+用法：python benchmark_compliance.py [--iterations 200] [--scales 1 8]
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.services.ai_compliance_checker import AIComplianceChecker, ai_compliance_checker
+from app.services.document_generator import document_generator
+from app.prompts.ai_section_processor import generate_mock_content
+
+
+class LegacyComplianceChecker(AIComplianceChecker):
+    """原实现"""
+
+    def check_ai_output(self, section_key: str, text: str) -> Dict[str, Any]:
+        """
+        检查AI输出是否符合合规要求
+
+        Args:
+            section_key: AI段落键名
+            text: AI生成的文本内容
+
+        Returns:
+            包含检查结果的字典
+        """
+        result = {
+            "section": section_key,
+            "passed": True,
+            "issues": [],
+            "warnings": [],
+            "compliance_score": 100  # 满分100分
+        }
+
+        # 如果该段落没有合规规则，直接返回通过
+        if section_key not in self.compliance_matrix:
+            result["warnings"].append(f"段落 {section_key} 没有对应的合规规则")
+            return result
+
+        rules = self.compliance_matrix[section_key]
+
+        # 检查必须覆盖的内容
+        if "must_cover" in rules:
+            self._check_must_cover(text, rules["must_cover"], result)
+
+        # 检查必须避免的内容
+        if "avoid" in rules:
+            self._check_avoid(text, rules["avoid"], result)
+
+        # 检查特殊要求
+        if "requirements" in rules:
+            self._check_requirements(section_key, text, rules["requirements"], result)
+
+        # 通用检查
+        self._check_general_compliance(text, result)
+
+        # 计算合规分数
+        if result["issues"]:
+            result["passed"] = False
+            result["compliance_score"] = max(0, 100 - len(result["issues"]) * 10)
+
+        return result
+
+    def _check_must_cover(self, text: str, must_cover_items: List[str], result: Dict):
+        """检查必须覆盖的内容"""
+        for item in must_cover_items:
+            # 将规则项转换为检查关键词
+            keywords = self._get_check_keywords(item)
+
+            # 检查是否包含至少一个关键词
+            found = False
+            for keyword in keywords:
+                if keyword.lower() in text.lower():
+                    found = True
+                    break
+
+            if not found:
+                result["issues"].append(f"缺少必须覆盖的内容: {item}")
+
+    def _check_avoid(self, text: str, avoid_items: List[str], result: Dict):
+        """检查必须避免的内容"""
+        for item in avoid_items:
+            # 将规则项转换为检查关键词
+            keywords = self._get_check_keywords(item)
+
+            # 检查是否包含关键词
+            for keyword in keywords:
+                if keyword.lower() in text.lower():
+                    result["issues"].append(f"包含应避免的内容: {item}")
+                    break
+
+    def _check_requirements(self, section_key: str, text: str, requirements: List[str], result: Dict):
+        """检查特殊要求"""
+        for requirement in requirements:
+            if section_key == "risk_management_conclusion" and requirement == "reference_hj941_2018":
+                if "HJ941-2018" not in text and "HJ941" not in text:
+                    result["issues"].append("风险管理结论必须引用HJ941-2018标准")
+
+            elif section_key == "hydrology_description" and requirement == "if_river_mentioned_upstream_downstream":
+                if "河" in text and ("上游" not in text and "下游" not in text):
+                    result["issues"].append("水文描述中提到河流时必须说明上下游方向")
+
+            elif section_key == "incident_response_card" and requirement == "scenario_liquid_leak":
+                if "泄漏" not in text and "液体" not in text:
+                    result["issues"].append("应急处置卡必须包含液体泄漏场景")
+
+            elif section_key == "incident_response_card" and requirement == "scenario_gas_leak":
+                if "气体" not in text and "挥发" not in text:
+                    result["issues"].append("应急处置卡必须包含气体泄漏场景")
+
+            elif section_key == "incident_response_card" and requirement == "scenario_fire":
+                if "火灾" not in text and "燃烧" not in text:
+                    result["issues"].append("应急处置卡必须包含火灾场景")
+
+            elif section_key == "water_environment_impact" and requirement == "reference_hydrology_field":
+                # 检查是否引用了水文字段相关内容
+                if "水体" not in text and "河流" not in text and "地表水" not in text:
+                    result["warnings"].append("建议在水环境影响分析中引用水文信息")
+
+            elif section_key == "air_environment_impact" and requirement == "mention_dominant_wind":
+                if "风向" not in text and "主导风向" not in text:
+                    result["issues"].append("大气环境影响分析必须提到主导风向")
+
+            elif section_key == "solid_waste_impact" and requirement == "reference_hazardous_waste_field":
+                if "危废" not in text and "危险废物" not in text:
+                    result["issues"].append("固体废物影响分析必须引用危险废物信息")
+
+            elif section_key == "risk_prevention_measures" and requirement == "mention_equipment_materials":
+                if "物资" not in text and "设备" not in text and "装备" not in text:
+                    result["issues"].append("风险防范措施必须提到应急物资或设备")
+
+            elif section_key == "emergency_response_measures" and requirement == "follow_flow_structure":
+                # 检查是否有流程化结构
+                flow_indicators = ["报警", "研判", "处置", "报告", "疏散", "警戒"]
+                found_flow = any(indicator in text for indicator in flow_indicators)
+                if not found_flow:
+                    result["warnings"].append("建议应急响应措施按照流程化结构编写")
+
+            elif section_key == "investigation_process" and requirement == "data_review":
+                if "资料" not in text and "审核" not in text:
+                    result["issues"].append("调查过程必须体现资料审核")
+
+            elif section_key == "investigation_process" and requirement == "site_verification":
+                if "现场" not in text and "核查" not in text and "查看" not in text:
+                    result["issues"].append("调查过程必须体现现场查验")
+
+            elif section_key == "short_term_plan" and requirement == "can_write_inspection_system_update":
+                if "巡检" not in text and "制度" not in text and "更新" not in text:
+                    result["warnings"].append("短期计划可包含巡检、制度更新等内容")
+
+    def _check_general_compliance(self, text: str, result: Dict):
+        """通用合规性检查"""
+        # 检查绝对化词语
+        absolute_words = ["绝对不会", "完全不会", "绝对安全", "完全满足", "绝对不会造成影响"]
+        for word in absolute_words:
+            if word in text:
+                result["issues"].append(f"使用了绝对化词语: {word}")
+
+        # 检查是否过于简短
+        if len(text) < 50:
+            result["warnings"].append("内容过于简短，可能不够详细")
+
+        # 检查是否只有标题没有内容
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        if len(lines) < 3:
+            result["warnings"].append("内容结构过于简单，建议增加更多细节")
+
+
+def build_sections(enterprise_data: dict) -> dict:
+    """使用模拟内容生成全部AI段落，并补充合规矩阵中其余段落的文本"""
+    with patch("app.services.document_generator.call_llm",
+               side_effect=lambda model, system, user, user_id=None: generate_mock_content(system, user)):
+        sections = document_generator.build_ai_sections(enterprise_data, enable_compliance_check=False)
+    filler = next(iter(sections.values()))
+    for section_key in ai_compliance_checker.compliance_matrix:
+        sections.setdefault(section_key, filler)
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI段落合规检查基准测试")
+    parser.add_argument("--iterations", type=int, default=200, help="全部段落的检查轮数")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 8], help="模拟段落文本的重复倍数")
+    args = parser.parse_args()
+
+    with open(project_root / "sample_enterprise.json", "r", encoding="utf-8") as f:
+        enterprise_data = json.load(f)
+    sections = build_sections(enterprise_data)
+
+    legacy = LegacyComplianceChecker()
+    for scale in args.scales:
+        # 模拟内容较短，按倍数重复以接近真实模型输出的长度
+        scaled = {section_key: "\n".join([text] * scale) for section_key, text in sections.items()}
+        total_chars = sum(len(text) for text in scaled.values())
+
+        # 校验结果一致
+        for section_key, text in scaled.items():
+            assert ai_compliance_checker.check_ai_output(section_key, text) == legacy.check_ai_output(section_key, text), section_key
+
+        results = []
+        for name, checker in (("原实现", legacy), ("编译规则", ai_compliance_checker)):
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                checker.check_multiple_sections(scaled)
+            results.append((name, (time.perf_counter() - start) / args.iterations))
+
+        print(f"\n=== 合规检查（{len(scaled)} 个段落，平均每段 {total_chars // len(scaled)} 字符）===")
+        print(f"{'实现':<12}{'每轮耗时(ms)':>14}{'每段落(μs)':>14}")
+        for name, per_round in results:
+            print(f"{name:<12}{per_round * 1000:>14.3f}{per_round / len(scaled) * 1e6:>14.1f}")
+        print(f"加速比: {results[0][1] / results[1][1]:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+文档列表分页基准测试
+同一用户有 count 个文档时，比较 GET /documents/ 在不同深度下：
+- 偏移分页：page=N（每页都执行 COUNT，OFFSET 越深扫描越多）
+- 游标分页：cursor=上一页的 next_cursor（WHERE (updated_at, id) < (...)，在 idx_user_updated 上直接定位）
+
+用法：python benchmark_keyset_pagination.py [--documents 50000] [--page-size 20] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("SECRET_KEY", "benchmark-keyset-pagination-secret-key-0123")
+
+import httpx
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.document import Document
+from app.routes import documents
+from app.utils.pagination import encode_cursor
+from testing_utils import DOCUMENT_SORT_KEYS, build_app, create_documents, explain_keyset_query
+
+
+def cursor_at(db_path: str, user_id: int, offset: int) -> str:
+    """第 offset 行之前一行的游标（即从第 offset 行开始的游标分页请求参数）"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    with sessionmaker(bind=engine)() as session:
+        item = session.execute(
+            select(Document).where(Document.user_id == user_id)
+            .order_by(*DOCUMENT_SORT_KEYS).offset(offset - 1).limit(1)
+        ).scalars().first()
+        cursor = encode_cursor(item, DOCUMENT_SORT_KEYS)
+    engine.dispose()
+    return cursor
+
+
+async def time_request(app, params: dict, repeat: int) -> float:
+    """重复请求文档列表 repeat 次，返回平均耗时（毫秒）"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = await client.get("/api/documents/", params=params)
+            assert response.status_code == 200, response.text
+        return (time.perf_counter() - start) / repeat * 1000
+
+
+async def run_depths(db_path: str, user_id: int, page_size: int, depths, repeat: int):
+    """返回 [(深度, 偏移分页毫秒, 游标分页毫秒)]"""
+    app, engine = build_app(db_path, user_id, [documents])
+    results = []
+    try:
+        for depth in depths:
+            page = depth // page_size + 1
+            offset_ms = await time_request(app, {"page": page, "page_size": page_size}, repeat)
+            cursor = cursor_at(db_path, user_id, (page - 1) * page_size) if page > 1 else None
+            params = {"page_size": page_size, **({"cursor": cursor} if cursor else {})}
+            keyset_ms = await time_request(app, params, repeat)
+            results.append((depth, offset_ms, keyset_ms))
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档列表偏移分页与游标分页对比")
+    parser.add_argument("--documents", type=int, default=50000, help="文档数量")
+    parser.add_argument("--page-size", type=int, default=20, help="每页数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每个深度的请求次数")
+    args = parser.parse_args()
+
+    depths = [d for d in (0, 1000, 10000, args.documents // 2, args.documents - args.page_size) if d < args.documents]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "keyset.db")
+        user_id = create_documents(db_path, args.documents)
+        print(f"文档数: {args.documents}, 每页: {args.page_size}, 每个深度请求 {args.repeat} 次")
+        print(f"游标查询计划: {explain_keyset_query(db_path, user_id)}")
+
+        results = asyncio.run(run_depths(db_path, user_id, args.page_size, depths, args.repeat))
+
+    print(f"\n{'起始行':>10}{'偏移分页':>12}{'游标分页':>12}{'加速比':>10}")
+    for depth, offset_ms, keyset_ms in results:
+        print(f"{depth:>12}{offset_ms:>12.1f}ms{keyset_ms:>10.1f}ms{offset_ms / keyset_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+文档列表总数统计基准测试
+用户文档数不同时，比较 GET /documents/ 第一页在三种 total_mode 下的平均耗时：
+- exact：每次请求执行 COUNT（原实现，耗时随文档数增长）
+- cached：使用 count_service 缓存的总数（新增/删除文档时失效）
+- none：不统计总数
+
+用法：python benchmark_list_counts.py [--documents 1000,10000,100000] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("SECRET_KEY", "benchmark-list-counts-secret-key-0123456789")
+
+import httpx
+
+from app.routes import documents
+from testing_utils import build_app, create_documents
+
+TOTAL_MODES = ("exact", "cached", "none")
+
+
+async def time_total_mode(app, total_mode: str, repeat: int) -> float:
+    """请求文档列表第一页 repeat 次（先预热一次），返回平均耗时（毫秒）"""
+    transport = httpx.ASGITransport(app=app)
+    params = {"page_size": 20, "total_mode": total_mode}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/api/documents/", params=params)).status_code == 200
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = await client.get("/api/documents/", params=params)
+            assert response.status_code == 200, response.text
+        return (time.perf_counter() - start) / repeat * 1000
+
+
+async def run_size(db_path: str, user_id: int, repeat: int):
+    """返回 {total_mode: 平均毫秒}"""
+    app, engine = build_app(db_path, user_id, [documents])
+    try:
+        return {mode: await time_total_mode(app, mode, repeat) for mode in TOTAL_MODES}
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档列表总数统计方式对比")
+    parser.add_argument("--documents", default="1000,10000,100000", help="用户文档数（逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=20, help="每种方式的请求次数")
+    args = parser.parse_args()
+
+    print(f"每种方式请求 {args.repeat} 次，每页 20 条")
+    print(f"\n{'文档数':>10}" + "".join(f"{mode:>12}" for mode in TOTAL_MODES))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(value) for value in args.documents.split(",")):
+            db_path = os.path.join(tmp, f"counts_{size}.db")
+            user_id = create_documents(db_path, size)
+            results = asyncio.run(run_size(db_path, user_id, args.repeat))
+            print(f"{size:>12}" + "".join(f"{results[mode]:>10.1f}ms" for mode in TOTAL_MODES))
+
+
+if __name__ == "__main__":
+    main()
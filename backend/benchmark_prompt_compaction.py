@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+提示词压缩基准测试
+将示例企业数据中的列表放大 scale 倍模拟大型企业，比较原实现（字典输出带空格的 JSON、
+章节提示词嵌入 indent=2 的完整数据块）与压缩后的提示词 token 数和渲染耗时
+
+用法：python benchmark_prompt_compaction.py [--scale 20] [--iterations 50]
+"""
+
+import sys
+import json
+import time
+import copy
+import argparse
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.prompts.ai_sections_loader import ai_sections_loader
+from app.prompts.ai_section_processor import get_value_by_path, MISSING_VALUE_TEXT, PLACEHOLDER_PATTERN
+from app.prompts.prompt_compactor import prompt_budget_stats
+from app.services.document_generator import document_generator, SECTION_PROMPT_DATA_ROOTS
+from app.utils.text_stats import estimate_tokens
+
+
+def legacy_summarize_list(value: list) -> str:
+    """原实现：列出前 3 项，没有 name/product_name/chemical_name 的字典项输出完整的 str(item)"""
+    if not value:
+        return "无"
+    items = []
+    for item in value[:3]:
+        if isinstance(item, dict):
+            items.append(item.get('name', '') or item.get('product_name', '') or item.get('chemical_name', '') or str(item))
+        else:
+            items.append(str(item))
+    return "、".join(items) if len(value) <= 3 else f"{'、'.join(items)}等{len(value)}项"
+
+
+def legacy_render_user_template(template_str: str, enterprise_data: dict) -> str:
+    """原实现：字典输出 json.dumps 默认格式（含全部列表项与空值）"""
+    def replace(match):
+        value = get_value_by_path(enterprise_data, match.group(1))
+        if value is None:
+            return MISSING_VALUE_TEXT
+        if isinstance(value, list):
+            return legacy_summarize_list(value)
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+    return PLACEHOLDER_PATTERN.sub(replace, template_str)
+
+
+def legacy_data_block(enterprise_data: dict, root: str) -> str:
+    """原实现：章节提示词嵌入 indent=2 的完整数据块"""
+    data = enterprise_data
+    for key in root.split("."):
+        data = data.get(key, {})
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def scale_enterprise(enterprise_data: dict, scale: int) -> dict:
+    """将各层级的列表放大 scale 倍（模拟原辅料、危险化学品、受体清单很长的企业）"""
+    def grow(value):
+        if isinstance(value, dict):
+            return {key: grow(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [grow(item) for item in value] * scale
+        return value
+    return grow(copy.deepcopy(enterprise_data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提示词压缩基准测试")
+    parser.add_argument("--scale", type=int, default=20, help="列表放大倍数")
+    parser.add_argument("--iterations", type=int, default=50, help="渲染轮数")
+    args = parser.parse_args()
+
+    with open(project_root / "sample_enterprise.json", "r", encoding="utf-8") as f:
+        enterprise_data = scale_enterprise(json.load(f), args.scale)
+
+    sections = ai_sections_loader.get_enabled_sections()
+    print(f"段落数: {len(sections)}, 列表放大倍数: {args.scale}")
+
+    print("\n=== AI段落用户提示词 ===")
+    print(f"{'段落':<32}{'原 tokens':>10}{'压缩后 tokens':>14}")
+    legacy_total = compact_total = 0
+    for key, config in sections.items():
+        legacy_tokens = estimate_tokens(legacy_render_user_template(config["user_template"], enterprise_data))
+        compact_tokens = estimate_tokens(document_generator._render_user_prompt(key, config, enterprise_data))
+        legacy_total += legacy_tokens
+        compact_total += compact_tokens
+        print(f"{key:<32}{legacy_tokens:>10}{compact_tokens:>14}")
+    print(f"{'合计':<32}{legacy_total:>10}{compact_total:>14}  （减少 {1 - compact_total / legacy_total:.1%}）")
+
+    print("\n=== 章节提示词数据块（_build_section_prompt） ===")
+    legacy_blocks = compact_blocks = 0
+    for key in sections:
+        for root in SECTION_PROMPT_DATA_ROOTS:
+            legacy_blocks += estimate_tokens(legacy_data_block(enterprise_data, root))
+            compact_blocks += estimate_tokens(document_generator._section_data_block(key, enterprise_data, root))
+    print(f"原实现: {legacy_blocks} tokens, 投影+压缩后: {compact_blocks} tokens（减少 {1 - compact_blocks / legacy_blocks:.1%}）")
+
+    print("\n=== 渲染耗时（全部段落） ===")
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for config in sections.values():
+            legacy_render_user_template(config["user_template"], enterprise_data)
+    legacy_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        value_cache = {}
+        for key, config in sections.items():
+            document_generator._render_user_prompt(key, config, enterprise_data, value_cache=value_cache)
+    compact_ms = (time.perf_counter() - start) * 1000 / args.iterations
+    print(f"原实现: {legacy_ms:.3f}ms/轮, 压缩（含预算检查）: {compact_ms:.3f}ms/轮")
+
+    compacted = {key: stats for key, stats in prompt_budget_stats.get_stats().items() if stats["compacted"]}
+    print(f"超出预算后提高压缩级别的段落: {sorted(compacted) or '无'}")
+
+
+if __name__ == "__main__":
+    main()
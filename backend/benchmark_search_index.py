@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+文档全文检索基准测试
+用户文档数不同时，比较按标题与正文检索的平均耗时：
+- like：title/content LIKE '%词%'（全表扫描，原实现只匹配标题）
+- fts：search_index 全文索引（SQLite FTS5，中文二元组）过滤出的文档ID
+
+用法：python benchmark_search_index.py [--documents 1000,10000,50000] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("SECRET_KEY", "benchmark-search-index-secret-key-0123456789")
+
+from sqlalchemy import create_engine
+
+from testing_utils import QUERIES, create_search_documents, fts_query, like_query
+
+
+def time_queries(db_path: str, user_id: int, repeat: int):
+    """返回 {方式: 平均毫秒}，以及两种方式的命中数是否一致"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    results, counts = {}, {}
+    with engine.connect() as conn:
+        for name, build in (("like", lambda q: like_query(user_id, q)), ("fts", lambda q: fts_query(conn, user_id, q))):
+            counts[name] = [conn.execute(build(q)).scalar() for q in QUERIES]
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for q in QUERIES:
+                    conn.execute(build(q)).scalar()
+            results[name] = (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1000
+    engine.dispose()
+    return results, counts["like"] == counts["fts"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档全文检索与 LIKE 匹配对比")
+    parser.add_argument("--documents", default="1000,10000,50000", help="用户文档数（逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询词的执行次数")
+    args = parser.parse_args()
+
+    print(f"查询词: {' / '.join(QUERIES)}，每个执行 {args.repeat} 次")
+    print(f"\n{'文档数':>10}{'like':>12}{'fts':>12}{'结果一致':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(value) for value in args.documents.split(",")):
+            db_path = os.path.join(tmp, f"search_{size}.db")
+            user_id = create_search_documents(db_path, size)
+            results, same = time_queries(db_path, user_id, args.repeat)
+            print(f"{size:>12}{results['like']:>10.2f}ms{results['fts']:>10.2f}ms{'是' if same else '否':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+SQLite 并发自动保存基准测试
+writers 个客户端同时对各自的文档连续调用 /documents/{id}/autosave，比较：
+- 原配置：默认 PRAGMA（回滚日志）、每个请求单独的连接、驱动默认的延迟事务
+- 生产模式：WAL 等 PRAGMA、读连接池 + 单连接写引擎（写请求排队执行，BEGIN IMMEDIATE）
+
+用法：python benchmark_sqlite_writer.py [--writers 50] [--saves 10]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("SECRET_KEY", "benchmark-sqlite-writer-secret-key-0123456789")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, aget_db, aget_write_db, create_async_db_engine
+from app.models.document import Document
+from app.models.enterprise import EnterpriseInfo  # noqa: F401  注册 User 关联的模型
+from app.models.user import User
+from app.routes import documents
+from app.utils.auth import get_current_user
+
+
+def create_documents(db_path: str, count: int):
+    """创建测试用户与 count 个文档，返回 (用户ID, 文档ID列表)"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        user = User(name="基准测试", email="writer@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        docs = [Document(title=f"文档{i}", content="<p>初稿</p>", user_id=user.id) for i in range(count)]
+        session.add_all(docs)
+        session.commit()
+        result = user.id, [doc.id for doc in docs]
+    engine.dispose()
+    return result
+
+
+def build_autosave_app(db_path: str, user_id: int, tuned: bool):
+    """
+    构建只包含文档路由的应用
+
+    Args:
+        tuned: True 使用生产模式（PRAGMA + 读连接池 + 单连接写引擎），False 使用原配置
+
+    Returns:
+        (app, 需要关闭的引擎列表)
+    """
+    url = f"sqlite+aiosqlite:///{db_path}"
+    if tuned:
+        read_engine = create_async_db_engine(url)
+        write_engine = create_async_db_engine(url, writer=True)
+    else:
+        read_engine = write_engine = create_async_engine(url)
+    read_factory = async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+    write_factory = async_sessionmaker(bind=write_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_aget_db():
+        async with read_factory() as db:
+            yield db
+
+    async def override_aget_write_db():
+        async with write_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(documents.router, prefix="/api")
+    app.dependency_overrides[aget_db] = override_aget_db
+    app.dependency_overrides[aget_write_db] = override_aget_write_db
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": user_id})()
+    return app, list({id(engine): engine for engine in (read_engine, write_engine)}.values())
+
+
+async def run_autosaves(app, document_ids, saves: int):
+    """
+    每个文档一个客户端，并发连续自动保存 saves 次（成功后递增版本号）
+
+    Returns:
+        {"elapsed", "ok", "errors", "reads_ok"}
+    """
+    transport = httpx.ASGITransport(app=app)
+    stats = {"ok": 0, "errors": 0, "reads_ok": 0}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+        async def writer(document_id):
+            version = 1
+            for i in range(saves):
+                response = await client.post(f"/api/documents/{document_id}/autosave",
+                                             json={"content": f"<p>第{i}次保存</p>" * 20, "version": version})
+                if response.status_code == 200:
+                    stats["ok"] += 1
+                    version += 1
+                else:
+                    stats["errors"] += 1
+                # 编辑器保存后读取文档
+                if (await client.get(f"/api/documents/{document_id}")).status_code == 200:
+                    stats["reads_ok"] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(writer(document_id) for document_id in document_ids))
+        stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+async def run_mode(db_path: str, writers: int, saves: int, tuned: bool):
+    user_id, document_ids = create_documents(db_path, writers)
+    app, engines = build_autosave_app(db_path, user_id, tuned)
+    try:
+        return await run_autosaves(app, document_ids, saves)
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 并发自动保存基准测试")
+    parser.add_argument("--writers", type=int, default=50, help="并发写入的客户端数")
+    parser.add_argument("--saves", type=int, default=10, help="每个客户端的自动保存次数")
+    args = parser.parse_args()
+
+    total = args.writers * args.saves
+    print(f"并发客户端: {args.writers}, 每个客户端保存: {args.saves} 次（共 {total} 次）")
+    print(f"\n{'配置':<14}{'耗时':>9}{'成功':>8}{'失败':>8}{'保存吞吐量':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (("原配置", False), ("生产模式", True)):
+            stats = asyncio.run(run_mode(os.path.join(tmp, f"{tuned}.db"), args.writers, args.saves, tuned))
+            print(f"{label:<12}{stats['elapsed']:>8.2f}s{stats['ok']:>8}{stats['errors']:>8}"
+                  f"{stats['ok'] / stats['elapsed']:>12.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
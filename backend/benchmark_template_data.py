@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+模板数据准备（_prepare_template_data）基准测试
+比较原实现（复制企业数据、每次调用重建约150项默认值字典并逐项合并）与
+模块级只读默认值 + ChainMap 分层查找的实现，报告每次调用耗时与内存分配，并校验两者结果一致
+
+用法：python benchmark_template_data.py [--iterations 20000]
+"""
+
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.services.document_generator import document_generator
+
+
+def legacy_prepare_template_data(enterprise_data: dict) -> dict:
+    """
+    原实现：复制企业数据，每次调用重新构建默认值字典并逐项合并
+
+    Args:
+        enterprise_data: 企业原始数据
+
+    Returns:
+        处理后的模板数据
+    """
+    # 创建数据副本，避免修改原始数据
+    data = enterprise_data.copy()
+
+    # 设置默认值
+    defaults = {
+        "plan_version": "1",
+        "assessment_date": "2023年1月",
+        "investigation_date": "2023年1月",
+        "publish_date": "2023年1月1日",
+        "implement_date": "2023年1月1日",
+        "compile_unit": data.get("basic_info", {}).get("company_name", ""),
+        "record_number": "",
+        "record_date": "",
+        "organization_code": "",
+        "legal_representative": "",
+        "legal_phone": "",
+        "contact_person": "",
+        "contact_phone": "",
+        "fax": "/",
+        "email": "",
+        "address": "",
+        "risk_level": "L",
+        "plan_signer": "",
+        "submit_time": "",
+        "commander_name": "",
+        "emergency_phone": "",
+        "regional_plan_name": "XX区突发环境事件应急预案",
+        "longitude": "xxx",
+        "latitude": "xxx",
+        "terrain_description": "",
+        "weather_description": "",
+        "hydrology_description": "",
+        "location_description": "",
+        "enterprise_overview": "",
+        "environmental_work": "",
+        "construction_layout": "",
+        "production_process_description": "",
+        "safety_management_description": "",
+        "water_environment_impact": "",
+        "air_environment_impact": "",
+        "noise_environment_impact": "",
+        "solid_waste_impact": "",
+        "risk_management_conclusion": "",
+        "long_term_plan": "",
+        "medium_term_plan": "",
+        "short_term_plan": "",
+        "final_risk_level": "",
+        "q_value": "",
+        "water_q_value": "",
+        "has_violations": False,
+        "investigation_baseline_date": "2023年",
+        "investigation_start_date": "2023年1月1日",
+        "investigation_end_date": "2023年1月31日",
+        "investigation_leader": "",
+        "investigation_contact": "",
+        "investigation_process": "",
+        "resource_types": "",
+        "has_external_support": False,
+        "external_support_count": 0,
+        "investigation_reviewed": False,
+        "investigation_archived": False,
+        "update_mechanism": False,
+        "resource_match": "满足",
+        "gap_analysis_1": "",
+        "gap_analysis_2": "",
+        "gap_analysis_3": "",
+        "gap_analysis_4": "",
+        "conclusion": "",
+        "main_responsible_person": "",
+        "env_responsible_person": "",
+        "incident_type": "",
+        "incident_description": "",
+        "incident_consequence_analysis": "",
+        "emergency_materials_for_incident": "",
+        "incident_response_measures": "",
+        "incident_response_precautions": "",
+        "internal_emergency_contacts": "",
+        "fire_police": "119",
+        "env_bureau": "",
+        "surrounding_units": "",
+        "incident_name": "",
+        "incident_time": "",
+        "incident_unit": "",
+        "incident_category": "",
+        "incident_location": "",
+        "incident_reporter": "",
+        "incident_briefing": "",
+        "incident_receiver": "",
+        "incident_info_transfer_method": "",
+        "incident_preliminary_cause": "",
+        "incident_taken_measures": "",
+        "has_casualties": "",
+        "casualties_details": "",
+        "info_report_leader": "",
+        "report_time": "",
+        "report_method": "",
+        "report_content": "",
+        "leader_instructions": "",
+        "is_plan_activated": "",
+        "response_level": "",
+        "is_external_help_requested": "",
+        "rescue_departments": "",
+        "used_emergency_materials": "",
+        "main_emergency_measures": "",
+        "emergency_result": "",
+        "form_filler": "",
+        "start_order_signer": "",
+        "start_order_time": "",
+        "start_order_messenger": "",
+        "start_order_transmit_time": "",
+        "end_order_signer": "",
+        "end_order_time": "",
+        "end_order_messenger": "",
+        "end_order_transmit_time": "",
+        "drill_time": "",
+        "drill_participants": "",
+        "drill_content": "",
+        "drill_preparation": "",
+        "drill_other": "",
+        "drill_planner": "",
+        "drill_approver": "",
+        "drill_plan_date": "",
+        "drill_recorder": "",
+        "drill_record_date": "",
+        "drill_reviewer": "",
+        "drill_review_date": "",
+        "change_reason": "",
+        "change_applying_unit": "",
+        "emergency_response_card_content": ""
+    }
+
+    # 合并默认值
+    for key, value in defaults.items():
+        if key not in data:
+            data[key] = value
+
+    # 处理企业名称
+    if "basic_info" in data and "company_name" in data["basic_info"]:
+        data["enterprise_name"] = data["basic_info"]["company_name"]
+    else:
+        data["enterprise_name"] = "企业名称"
+
+    # 处理地址
+    if "basic_info" in data and "address" in data["basic_info"]:
+        address = data["basic_info"]["address"]
+        if isinstance(address, dict):
+            # 组合地址各部分
+            address_parts = []
+            if "province" in address and address["province"]:
+                address_parts.append(address["province"])
+            if "city" in address and address["city"]:
+                address_parts.append(address["city"])
+            if "district" in address and address["district"]:
+                address_parts.append(address["district"])
+            if "detail" in address and address["detail"]:
+                address_parts.append(address["detail"])
+            data["address"] = "".join(address_parts)
+
+            # 提取经纬度
+            if "longitude" in address:
+                data["longitude"] = address["longitude"]
+            if "latitude" in address:
+                data["latitude"] = address["latitude"]
+
+    # 处理联系人信息
+    if "basic_info" in data and "contacts" in data["basic_info"]:
+        contacts = data["basic_info"]["contacts"]
+        if isinstance(contacts, dict):
+            # 法定代表人
+            if "legal_person" in contacts and isinstance(contacts["legal_person"], dict):
+                legal_person = contacts["legal_person"]
+                if "name" in legal_person:
+                    data["legal_representative"] = legal_person["name"]
+                if "mobile" in legal_person:
+                    data["legal_phone"] = legal_person["mobile"]
+
+            # 环保负责人
+            if "environmental_manager" in contacts and isinstance(contacts["environmental_manager"], dict):
+                env_manager = contacts["environmental_manager"]
+                if "name" in env_manager:
+                    data["env_responsible_person"] = env_manager["name"]
+
+            # 应急联系人
+            if "emergency_contact" in contacts and isinstance(contacts["emergency_contact"], dict):
+                emergency_contact = contacts["emergency_contact"]
+                if "name" in emergency_contact:
+                    data["contact_person"] = emergency_contact["name"]
+                if "mobile" in emergency_contact:
+                    data["contact_phone"] = emergency_contact["mobile"]
+
+            # 办公电话和邮箱
+            if "office_phone" in contacts:
+                data["emergency_phone"] = contacts["office_phone"]
+            if "email" in contacts:
+                data["email"] = contacts["email"]
+
+    # 处理风险等级
+    if "basic_info" in data and "risk_level" in data["basic_info"]:
+        risk_level = data["basic_info"]["risk_level"]
+        if risk_level == "一般":
+            data["risk_level"] = "L"
+        elif risk_level == "较大":
+            data["risk_level"] = "M"
+        elif risk_level == "重大":
+            data["risk_level"] = "H"
+        else:
+            data["risk_level"] = "L"
+
+    # 处理内部联系人列表
+    if "emergency_resources" in data and "contact_list_internal" in data["emergency_resources"]:
+        data["internal_contacts"] = data["emergency_resources"]["contact_list_internal"]
+    else:
+        data["internal_contacts"] = []
+
+    # 处理外部联系人列表
+    if "emergency_resources" in data and "contact_list_external" in data["emergency_resources"]:
+        data["external_contacts"] = data["emergency_resources"]["contact_list_external"]
+    else:
+        data["external_contacts"] = []
+
+    # 处理应急物资
+    if "emergency_resources" in data and "emergency_materials" in data["emergency_resources"]:
+        data["emergency_materials"] = data["emergency_resources"]["emergency_materials"]
+    else:
+        data["emergency_materials"] = []
+
+    # 处理应急队伍
+    if "emergency_resources" in data and "emergency_team" in data["emergency_resources"]:
+        emergency_team = data["emergency_resources"]["emergency_team"]
+
+        # 构建应急队伍列表
+        emergency_teams = []
+
+        # 总指挥
+        if "basic_info" in data and "contacts" in data["basic_info"] and "legal_person" in data["basic_info"]["contacts"]:
+            legal_person = data["basic_info"]["contacts"]["legal_person"]
+            if isinstance(legal_person, dict):
+                emergency_teams.append({
+                    "organization": "应急指挥部",
+                    "department": "总指挥",
+                    "leader": legal_person.get("name", ""),
+                    "contact": legal_person.get("mobile", "")
+                })
+
+        # 副总指挥
+        if "basic_info" in data and "contacts" in data["basic_info"] and "environmental_manager" in data["basic_info"]["contacts"]:
+            env_manager = data["basic_info"]["contacts"]["environmental_manager"]
+            if isinstance(env_manager, dict):
+                emergency_teams.append({
+                    "organization": "应急指挥部",
+                    "department": "副总指挥",
+                    "leader": env_manager.get("name", ""),
+                    "contact": env_manager.get("mobile", "")
+                })
+
+        # 添加其他内部联系人到应急队伍
+        if "internal_contacts" in data and isinstance(data["internal_contacts"], list):
+            for contact in data["internal_contacts"]:
+                if isinstance(contact, dict):
+                    emergency_teams.append({
+                        "organization": contact.get("department", ""),
+                        "department": contact.get("role", ""),
+                        "leader": contact.get("name", ""),
+                        "contact": contact.get("mobile", "")
+                    })
+
+        data["emergency_teams"] = emergency_teams
+
+    # 处理产品信息
+    if "production_process" in data and "products" in data["production_process"]:
+        data["products"] = data["production_process"]["products"]
+    else:
+        data["products"] = []
+
+    # 处理原材料信息
+    if "production_process" in data and "raw_materials" in data["production_process"]:
+        data["raw_materials"] = data["production_process"]["raw_materials"]
+    else:
+        data["raw_materials"] = []
+
+    # 处理危险化学品信息
+    if "production_process" in data and "hazardous_chemicals" in data["production_process"]:
+        data["hazardous_chemicals"] = data["production_process"]["hazardous_chemicals"]
+    else:
+        data["hazardous_chemicals"] = []
+
+    # 处理危险废物信息
+    if "production_process" in data and "hazardous_waste" in data["production_process"]:
+        data["hazardous_waste"] = data["production_process"]["hazardous_waste"]
+    else:
+        data["hazardous_waste"] = []
+
+    # 处理环境受体信息
+    if "environment_info" in data and "nearby_receivers" in data["environment_info"]:
+        nearby_receivers = data["environment_info"]["nearby_receivers"]
+
+        # 分离水环境和大气环境受体
+        water_receptors = []
+        air_receptors = []
+
+        for receptor in nearby_receivers:
+            if isinstance(receptor, dict):
+                receptor_type = receptor.get("receiver_type", "")
+                if "水" in receptor_type:
+                    water_receptors.append(receptor)
+                else:
+                    air_receptors.append(receptor)
+
+        data["water_receptors"] = water_receptors
+        data["air_receptors"] = air_receptors
+    else:
+        data["water_receptors"] = []
+        data["air_receptors"] = []
+
+    # 处理能源消耗信息
+    if "production_process" in data and "energy" in data["production_process"]:
+        energy = data["production_process"]["energy"]
+        if isinstance(energy, dict):
+            energy_consumption = []
+
+            if "water_consumption" in energy:
+                energy_consumption.append({
+                    "type": "水",
+                    "unit": "吨/年",
+                    "annual_consumption": energy["water_consumption"]
+                })
+
+            if "electricity_consumption" in energy:
+                energy_consumption.append({
+                    "type": "电",
+                    "unit": "千瓦时/年",
+                    "annual_consumption": energy["electricity_consumption"]
+                })
+
+            if "natural_gas" in energy:
+                energy_consumption.append({
+                    "type": "天然气",
+                    "unit": "立方米/年",
+                    "annual_consumption": energy["natural_gas"]
+                })
+
+            if "other_energy" in energy:
+                energy_consumption.append({
+                    "type": "其他能源",
+                    "unit": "",
+                    "annual_consumption": energy["other_energy"]
+                })
+
+            data["energy_consumption"] = energy_consumption
+    else:
+        data["energy_consumption"] = []
+
+    # 处理应急演练信息
+    if "emergency_resources" in data and "emergency_drills" in data["emergency_resources"]:
+        data["emergency_drills"] = data["emergency_resources"]["emergency_drills"]
+    else:
+        data["emergency_drills"] = []
+
+    return data
+
+def measure_allocations(func, enterprise_data: dict) -> dict:
+    """测量单次调用的内存分配：峰值字节数、结果保留的字节数与内存块数"""
+    func(enterprise_data)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = func(enterprise_data)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    retained = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    del result
+    return {"peak": peak, "retained": retained, "blocks": blocks}
+
+
+def bench(func, enterprise_data: dict, iterations: int) -> float:
+    """测量每次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(enterprise_data)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模板数据准备基准测试")
+    parser.add_argument("--iterations", type=int, default=20000, help="每种实现的调用次数")
+    args = parser.parse_args()
+
+    with open(project_root / "sample_enterprise.json", "r", encoding="utf-8") as f:
+        enterprise_data = json.load(f)
+
+    # 校验结果一致
+    assert dict(document_generator._prepare_template_data(enterprise_data)) == legacy_prepare_template_data(enterprise_data)
+
+    implementations = [
+        ("原实现", legacy_prepare_template_data),
+        ("ChainMap", document_generator._prepare_template_data),
+    ]
+    results = []
+    for name, func in implementations:
+        results.append((name, bench(func, enterprise_data, args.iterations), measure_allocations(func, enterprise_data)))
+
+    print(f"\n=== 模板数据准备（{args.iterations} 次调用）===")
+    print(f"{'实现':<12}{'每次耗时(μs)':>14}{'峰值分配(KB)':>14}{'结果保留(KB)':>14}{'保留内存块':>12}")
+    for name, per_call, allocations in results:
+        print(f"{name:<12}{per_call:>14.2f}{allocations['peak'] / 1024:>14.2f}"
+              f"{allocations['retained'] / 1024:>14.2f}{allocations['blocks']:>12}")
+
+    legacy_time, current_time = results[0][1], results[1][1]
+    print(f"\n加速比: {legacy_time / current_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+AI段落 user_template 渲染基准测试
+比较原实现（每次正则查找 + 逐个 str.replace）与预编译片段列表渲染，
+覆盖 ai_sections.json 中的全部段落，并校验两者输出一致
+
+用法：python benchmark_user_template.py [--iterations 2000]
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# 添加项目路径到sys.path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.prompts.ai_sections_loader import ai_sections_loader
+from app.prompts.ai_section_processor import (
+    get_value_by_path, summarize_list, render_compiled_template, MISSING_VALUE_TEXT
+)
+from app.prompts.prompt_compactor import compact_json
+
+
+def legacy_render_user_template(template_str: str, enterprise_data: dict) -> str:
+    """原实现：每次渲染执行 re.findall，并对每个占位符整串 str.replace"""
+    placeholders = re.findall(r'\{([^}]+)\}', template_str)
+    rendered_str = template_str
+    for placeholder in placeholders:
+        value = get_value_by_path(enterprise_data, placeholder)
+        if value is not None:
+            if isinstance(value, list):
+                value_str = summarize_list(value)
+            elif isinstance(value, dict):
+                # 字典按当前的提示词格式（紧凑 JSON）输出，只比较占位符替换方式
+                value_str = compact_json(value)
+            else:
+                value_str = str(value)
+            rendered_str = rendered_str.replace(f'{{{placeholder}}}', value_str)
+        else:
+            rendered_str = rendered_str.replace(f'{{{placeholder}}}', MISSING_VALUE_TEXT)
+    return rendered_str
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI段落 user_template 渲染基准测试")
+    parser.add_argument("--iterations", type=int, default=2000, help="全部段落的渲染轮数")
+    args = parser.parse_args()
+
+    with open(project_root / "sample_enterprise.json", "r", encoding="utf-8") as f:
+        enterprise_data = json.load(f)
+
+    sections = ai_sections_loader.get_sections_config()
+    compiled_templates = ai_sections_loader.get_compiled_templates()
+    templates = [(key, config["user_template"], compiled_templates[key]) for key, config in sections.items()]
+    placeholders = sum(len(re.findall(r'\{([^}]+)\}', template)) for _, template, _ in templates)
+    template_chars = sum(len(template) for _, template, _ in templates)
+
+    # 校验输出一致
+    for key, template, compiled in templates:
+        assert render_compiled_template(compiled, enterprise_data) == legacy_render_user_template(template, enterprise_data), key
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for _, template, _ in templates:
+            legacy_render_user_template(template, enterprise_data)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for _, _, compiled in templates:
+            render_compiled_template(compiled, enterprise_data)
+    compiled_time = time.perf_counter() - start
+
+    # build_ai_sections 的用法：一轮渲染全部段落时共用已格式化的占位符值
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        value_cache = {}
+        for _, _, compiled in templates:
+            render_compiled_template(compiled, enterprise_data, value_cache)
+    shared_time = time.perf_counter() - start
+
+    # 配置加载（含预编译）的一次性开销
+    start = time.perf_counter()
+    ai_sections_loader.load_config(force_reload=True)
+    load_time = time.perf_counter() - start
+
+    per_round = 1000 / args.iterations
+    print(f"\n=== user_template 渲染（{len(templates)} 个段落，{placeholders} 个占位符，模板共 {template_chars} 字符）===")
+    print(f"{'实现':<20}{'每轮耗时(ms)':>14}{'段落/秒':>14}")
+    print(f"{'原实现':<20}{legacy_time * per_round:>14.3f}{len(templates) * args.iterations / legacy_time:>14.0f}")
+    print(f"{'预编译':<20}{compiled_time * per_round:>14.3f}{len(templates) * args.iterations / compiled_time:>14.0f}")
+    print(f"{'预编译+共用取值':<20}{shared_time * per_round:>14.3f}{len(templates) * args.iterations / shared_time:>14.0f}")
+    print(f"\n加速比: 预编译 {legacy_time / compiled_time:.2f}x，预编译+共用取值 {legacy_time / shared_time:.2f}x")
+    print(f"配置加载与预编译（一次性）: {load_time * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
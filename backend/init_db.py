@@ -9,6 +9,9 @@ from app.models.project import Project
 from app.models.document import Document
 from app.models.comment import Comment
 from app.models.enterprise import EnterpriseInfo
+from app.models.generation_job import GenerationJob
+# 注册全文索引（create_all 时创建索引表，已有数据建立索引）
+import app.services.search_index  # noqa: F401
 
 def init_database():
     """初始化数据库，创建所有表"""
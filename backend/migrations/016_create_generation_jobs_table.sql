@@ -0,0 +1,30 @@
+-- 创建文档生成后台任务表
+-- 执行时间: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    enterprise_id INTEGER,
+    job_type VARCHAR(50) NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL UNIQUE,
+    data_hash VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    payload JSON,
+    progress JSON,
+    result JSON,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- 创建索引以提高查询性能
+CREATE INDEX IF NOT EXISTS ix_generation_jobs_user_id ON generation_jobs(user_id);
+CREATE INDEX IF NOT EXISTS ix_generation_jobs_enterprise_id ON generation_jobs(enterprise_id);
+CREATE INDEX IF NOT EXISTS ix_generation_jobs_status ON generation_jobs(status);
+CREATE INDEX IF NOT EXISTS ix_generation_jobs_created_at ON generation_jobs(created_at);
+CREATE INDEX IF NOT EXISTS idx_job_user_created ON generation_jobs(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_job_status_updated ON generation_jobs(status, updated_at);
@@ -5,8 +5,12 @@ AI 服务测试脚本
 
 import os
 import sys
+import time
+import asyncio
 import logging
+import threading
 from datetime import date
+from types import SimpleNamespace
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -117,5 +121,120 @@ def test_ai_service():
     print("=" * 60)
 
 
+class _FakeCompletions:
+    """模拟 AsyncOpenAI 的 chat.completions，首次调用触发速率限制"""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise Exception("rate_limit exceeded")
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"生成内容 {kwargs['model']}"))]
+        )
+
+
+def test_agenerate_non_blocking():
+    """测试异步生成：复用客户端、非阻塞退避、并发调用"""
+    print("\n7. 测试异步生成:")
+    ai_service = AIService()
+    ai_service.api_key = "sk-" + "x" * 40
+    ai_service.max_backoff = 0.1
+
+    completions = _FakeCompletions()
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    ai_service._get_async_client = lambda: fake_client
+
+    async def run():
+        # 事件循环心跳：如果退避使用阻塞 sleep，心跳会被冻结
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        start = time.monotonic()
+        results = await asyncio.gather(*[
+            ai_service.agenerate("测试", {"model": "gpt-4"}, user_id="async_user")
+            for _ in range(5)
+        ])
+        elapsed = time.monotonic() - start
+        beat.cancel()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = asyncio.run(run())
+    print(f"   5 个并发请求耗时: {elapsed:.2f}s, 事件循环心跳: {ticks}")
+
+    assert all(r == "生成内容 gpt-4" for r in results)
+    assert elapsed < 1.0, "并发请求未同时进行"
+    assert ticks > 10, "重试等待阻塞了事件循环"
+
+
+def test_retry_delay_jitter():
+    """测试退避时间带抖动且不超过上限"""
+    print("\n8. 测试退避抖动:")
+    ai_service = AIService()
+    ai_service.max_backoff = 8
+
+    delays = [ai_service._get_retry_delay(Exception("connection reset"), 2, 3) for _ in range(20)]
+    print(f"   第3次重试等待时间范围: {min(delays):.2f}s - {max(delays):.2f}s")
+    assert all(2.0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1, "退避时间没有抖动"
+
+    try:
+        ai_service._get_retry_delay(Exception("authentication failed"), 0, 3)
+        assert False, "认证错误不应重试"
+    except ValueError:
+        pass
+
+
+def test_async_clients_per_loop():
+    """测试每个事件循环一个异步客户端：同一事件循环复用，事件循环关闭后丢弃，aclose 关闭全部客户端"""
+    print("\n9. 测试异步客户端生命周期:")
+    ai_service = AIService()
+    ai_service.api_key = "sk-" + "x" * 40
+
+    async def get_client():
+        client = ai_service._get_async_client()
+        assert ai_service._get_async_client() is client
+        return client
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+    assert second is not first and len(ai_service._async_clients) == 1
+
+    # 其他线程中仍在运行的事件循环：保留其客户端，关闭时在该事件循环中关闭
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        other = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result(5)
+
+        async def close_all():
+            current = await get_client()
+            assert len(ai_service._async_clients) == 2
+            await ai_service.aclose()
+            return current
+
+        current = asyncio.run(close_all())
+        assert current.is_closed() and other.is_closed()
+        assert len(ai_service._async_clients) == 0
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
+    print("   ✓ 客户端按事件循环复用并在关闭时释放")
+
+
 if __name__ == "__main__":
-    test_ai_service()
\ No newline at end of file
+    test_ai_service()
+    test_agenerate_non_blocking()
+    test_retry_delay_jitter()
+    test_async_clients_per_loop()
\ No newline at end of file
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试异步数据库层：连接池配置、aget_db 会话、迁移到异步会话的文档/项目/评论/企业信息路由、慢查询下的并发
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "async-db-secret-key-0123456789abcdefgh")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_async_db_engine, get_async_database_url, get_pool_options
+from app.models.enterprise import EnterpriseInfo
+from app.routes import comments, documents, enterprise, projects
+from testing_utils import build_app, build_load_test_app, create_users, run_load
+
+
+def test_async_url_and_pool_options():
+    """测试异步驱动URL推导与连接池配置"""
+    print("\n=== 测试连接池配置 ===")
+    assert get_async_database_url("sqlite:////tmp/a.db") == "sqlite+aiosqlite:////tmp/a.db"
+    assert get_async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert get_async_database_url("mysql+pymysql://u:p@db/app") == "mysql+aiomysql://u:p@db/app"
+    assert get_async_database_url("postgresql+psycopg://u:p@db/app") == "postgresql+psycopg://u:p@db/app"
+
+    options = get_pool_options("postgresql://u:p@db/app")
+    assert options["pool_size"] == 10 and options["max_overflow"] == 20
+    assert options["pool_pre_ping"] is True and options["pool_recycle"] == 1800
+    assert get_pool_options("sqlite://") == {}
+
+    engine = create_async_db_engine("sqlite+aiosqlite:///:memory:")
+    assert engine.sync_engine.pool.__class__.__name__ == "StaticPool"
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp}/pool.db")
+        assert engine.sync_engine.pool.size() == 10
+        asyncio.run(engine.dispose())
+
+
+def test_routes_with_async_session():
+    """测试文档、项目、评论与企业信息路由使用异步会话完成增删改查"""
+    print("\n=== 测试异步会话路由 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "routes.db")
+        user_id, = create_users(db_path, "async")
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        with sessionmaker(bind=sync_engine)() as session:
+            session.add(EnterpriseInfo(user_id=user_id, enterprise_name="甲化工有限公司", industry="化工"))
+            session.commit()
+        sync_engine.dispose()
+
+        app, async_engine = build_app(db_path, user_id, [documents, projects, comments, enterprise], writer=True)
+
+        with TestClient(app) as client:
+            project = client.post("/api/projects/", json={"title": "应急预案项目"}).json()
+            document = client.post("/api/documents/", json={"title": "应急预案", "content": "<p>初稿</p>",
+                                                             "project_id": project["id"]}).json()
+            assert document["version"] == 1
+
+            listed = client.get("/api/documents/", params={"search": "预案"}).json()
+            assert listed["total"] == 1 and listed["documents"][0]["id"] == document["id"]
+            assert client.get("/api/documents/", params={"project_id": project["id"]}).json()["total"] == 1
+            assert client.get("/api/projects/").json()["projects"][0]["title"] == "应急预案项目"
+
+            updated = client.patch(f"/api/documents/{document['id']}", json={"content": "<p>二稿</p>"}).json()
+            assert updated["version"] == 2
+            saved = client.post(f"/api/documents/{document['id']}/autosave", json={"content": "<p>三稿</p>", "version": 2})
+            assert saved.status_code == 200
+            assert client.post(f"/api/documents/{document['id']}/autosave",
+                               json={"content": "<p>旧版</p>", "version": 2}).status_code == 409
+
+            comment = client.post(f"/api/documents/{document['id']}/comments", json={"content": "请补充"}).json()
+            client.post(f"/api/documents/{document['id']}/comments", json={"content": "已补充", "parent_id": comment["id"]})
+            tree = client.get(f"/api/documents/{document['id']}/comments").json()
+            assert tree["total"] == 1 and tree["comments"][0]["replies"][0]["content"] == "已补充"
+            assert client.delete(f"/api/documents/comments/{comment['id']}").status_code == 200
+            assert client.get(f"/api/documents/{document['id']}/comments").json()["total"] == 0
+
+            infos = client.get("/api/enterprise/info", params={"search": "化工"}).json()
+            assert infos["total"] == 1 and infos["enterprise_infos"][0]["enterprise_identity"]["enterprise_name"] == "甲化工有限公司"
+            info_id = infos["enterprise_infos"][0]["id"]
+            assert client.get(f"/api/enterprise/info/{info_id}").status_code == 200
+            assert client.delete(f"/api/enterprise/info/{info_id}").status_code == 204
+            assert client.get(f"/api/enterprise/info/{info_id}").status_code == 404
+
+            # 删除项目时级联删除文档
+            assert client.delete(f"/api/projects/{project['id']}").status_code == 200
+            assert client.get(f"/api/documents/{document['id']}").status_code == 404
+
+        asyncio.run(async_engine.dispose())
+
+
+def test_concurrency_under_slow_queries():
+    """测试慢查询下异步会话的并发请求不互相阻塞"""
+    print("\n=== 测试慢查询并发 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        app, async_engine = build_load_test_app(os.path.join(tmp, "load.db"), 0.1)
+        sync_elapsed = asyncio.run(run_load(app, "/sync", 10))
+        async_elapsed = asyncio.run(run_load(app, "/async", 10))
+        asyncio.run(async_engine.dispose())
+    print(f"同步会话: {sync_elapsed:.2f}s, 异步会话: {async_elapsed:.2f}s")
+    assert sync_elapsed >= 1.0
+    assert async_elapsed < sync_elapsed / 3
+
+
+if __name__ == "__main__":
+    test_async_url_and_pool_options()
+    test_routes_with_async_session()
+    test_concurrency_under_slow_queries()
+    print("\n✅ 所有测试完成!")
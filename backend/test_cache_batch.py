@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+测试缓存批量接口：get_many / set_many（内存、Redis MGET/pipeline、两级缓存与段落缓存）
+"""
+
+import os
+import sys
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.cache_service import (
+    MemoryCacheBackend, RedisCacheBackend, TieredCacheBackend, CacheService
+)
+from app.services.section_cache import SectionCache
+
+
+class FakePipeline:
+    """记录命令的 pipeline 替身"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    def execute(self):
+        self.client.round_trips += 1
+        for key, ttl, value in self.commands:
+            self.client.data[key] = value
+        return [True] * len(self.commands)
+
+
+class FakeRedisClient:
+    """统计网络往返次数的 redis 客户端替身"""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def get(self, key):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.round_trips += 1
+        self.data[key] = value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def _redis_backend() -> RedisCacheBackend:
+    """构造使用假客户端的 Redis 后端（跳过连接）"""
+    backend = RedisCacheBackend.__new__(RedisCacheBackend)
+    backend.client = FakeRedisClient()
+    return backend
+
+
+def test_memory_batch():
+    """测试内存缓存批量读写"""
+    print("\n=== 测试内存批量读写 ===")
+    service = CacheService(MemoryCacheBackend())
+    assert service.set_many({"a": {"v": 1}, "b": [1, 2], "c": "文本"}, ttl=60)
+    result = service.get_many(["a", "b", "c", "missing"])
+    print(f"结果: {result}")
+    assert result == {"a": {"v": 1}, "b": [1, 2], "c": "文本"}
+
+    stats = service.get_stats()
+    assert stats["sets"] == 3 and stats["hits"] == 3 and stats["misses"] == 1
+    assert service.get_many([]) == {}
+
+
+def test_redis_batch_single_round_trip():
+    """测试 Redis 批量读写各只需一次网络往返"""
+    print("\n=== 测试 Redis MGET/pipeline ===")
+    backend = _redis_backend()
+    service = CacheService(backend)
+    items = {f"section_{i}": {"content": f"内容{i}"} for i in range(20)}
+
+    assert service.set_many(items, ttl=60)
+    assert backend.client.round_trips == 1
+
+    result = service.get_many(list(items) + ["missing"])
+    print(f"往返次数: {backend.client.round_trips}")
+    assert backend.client.round_trips == 2
+    assert result == items
+
+
+def test_tiered_batch():
+    """测试两级缓存批量读取：L1 未命中的键一次性读取 L2"""
+    print("\n=== 测试两级批量读取 ===")
+    l2 = _redis_backend()
+    tiered = TieredCacheBackend(MemoryCacheBackend(), l2)
+    l2.client.data.update({"a": '"A"', "b": '"B"'})
+    tiered.set("c", '"C"')
+    l2.client.round_trips = 0
+
+    service = CacheService(tiered)
+    assert service.get_many(["a", "b", "c", "d"]) == {"a": "A", "b": "B", "c": "C"}
+    assert l2.client.round_trips == 1
+    assert service.get_many(["a", "b", "c"]) == {"a": "A", "b": "B", "c": "C"}
+    assert l2.client.round_trips == 1, "回填后应全部由 L1 命中"
+
+    stats = tiered.get_stats()
+    print(f"统计: {stats}")
+    assert stats["l1_hits"] == 4 and stats["l2_hits"] == 2 and stats["misses"] == 1
+
+
+def test_section_cache_shared_batch():
+    """测试段落缓存从共享缓存批量读取并回填本地"""
+    print("\n=== 测试段落缓存共享批量读取 ===")
+    shared_backend = _redis_backend()
+    shared = CacheService(shared_backend)
+
+    writer = SectionCache(shared=shared)
+    writer.set_many({f"s{i}": (f"key{i}", f"内容{i}") for i in range(5)})
+    assert shared_backend.client.round_trips == 1
+
+    # 另一个工作进程：本地为空，一次 MGET 取回全部段落
+    reader = SectionCache(shared=shared)
+    shared_backend.client.round_trips = 0
+    requests = {f"s{i}": f"key{i}" for i in range(6)}
+    result = reader.get_many(requests)
+    assert result == {f"s{i}": f"内容{i}" for i in range(5)}
+    assert shared_backend.client.round_trips == 1
+
+    reader.get_many({f"s{i}": f"key{i}" for i in range(5)})
+    assert shared_backend.client.round_trips == 1, "回填后应由本地缓存命中"
+
+    stats = reader.get_stats()
+    print(f"统计: {stats}")
+    assert stats["shared_hits"] == 5 and stats["hits"] == 10 and stats["misses"] == 1
+
+
+if __name__ == "__main__":
+    test_memory_batch()
+    test_redis_batch_single_round_trip()
+    test_tiered_batch()
+    test_section_cache_shared_batch()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+测试缓存编解码器：序列化方式、阈值压缩、版本字节与旧数据兼容
+"""
+
+import os
+import sys
+import json
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.cache_codec import (
+    CacheCodec, CODEC_VERSION, FLAG_COMPRESSED, SERIALIZER_JSON, SERIALIZER_ORJSON
+)
+from app.services.cache_service import CacheService, MemoryCacheBackend
+
+DOCUMENT = {
+    "content": "<h1>突发环境事件应急预案</h1>" + "<p>企业环境风险等级为一般，依据HJ941-2018标准。</p>\n" * 300,
+    "word_count": 12345,
+    "title": "突发环境事件应急预案"
+}
+
+
+def test_roundtrip_and_threshold():
+    """测试各序列化方式往返一致，且只压缩超过阈值的数据"""
+    print("\n=== 测试往返与压缩阈值 ===")
+    small = {"content": "短段落", "n": 1}
+    for serializer in ("json", "orjson"):
+        codec = CacheCodec(serializer=serializer, compression="zlib", compress_threshold=1024)
+        big = codec.encode(DOCUMENT)
+        tiny = codec.encode(small)
+
+        assert big[0] == CODEC_VERSION and tiny[0] == CODEC_VERSION
+        assert big[1] & FLAG_COMPRESSED, "超过阈值的数据应压缩"
+        assert not tiny[1] & FLAG_COMPRESSED, "小数据不应压缩"
+        assert codec.decode(big) == DOCUMENT and codec.decode(tiny) == small
+
+        plain_size = len(json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8"))
+        print(f"{serializer}: {plain_size} -> {len(big)} 字节")
+        assert len(big) < plain_size / 2
+
+
+def test_cross_codec_and_legacy_decode():
+    """测试按数据中的标志解码（更换编解码器配置后旧数据仍可读取）"""
+    print("\n=== 测试跨配置与旧数据解码 ===")
+    encoded = CacheCodec(serializer="json", compression="none").encode(DOCUMENT)
+    assert encoded[1] == SERIALIZER_JSON
+    assert CacheCodec(serializer="orjson", compression="zlib").decode(encoded) == DOCUMENT
+
+    # 旧版本直接存储的 JSON 文本
+    legacy_text = json.dumps(DOCUMENT, ensure_ascii=False)
+    codec = CacheCodec()
+    assert codec.decode(legacy_text) == DOCUMENT
+    assert codec.decode(legacy_text.encode("utf-8")) == DOCUMENT
+
+
+def test_orjson_fallback():
+    """测试 orjson 不支持的值回退为标准库 json"""
+    print("\n=== 测试 orjson 回退 ===")
+    codec = CacheCodec(serializer="orjson", compression="none")
+    value = {"big": 2 ** 70, 1: "非字符串键"}
+    encoded = codec.encode(value)
+    assert codec.decode(encoded) == {"big": 2 ** 70, "1": "非字符串键"}
+
+    normal = codec.encode({"a": 1})
+    assert normal[1] == SERIALIZER_ORJSON
+
+
+def test_cache_service_uses_codec():
+    """测试 CacheService 存储编码后的字节并正确读取"""
+    print("\n=== 测试 CacheService 编解码 ===")
+    backend = MemoryCacheBackend()
+    service = CacheService(backend, CacheCodec(serializer="orjson", compression="zlib", compress_threshold=1024))
+    service.set("doc", DOCUMENT)
+    stored = backend.get("doc")
+    assert isinstance(stored, bytes) and stored[1] & FLAG_COMPRESSED
+    assert service.get("doc") == DOCUMENT
+    assert service.get_many(["doc"]) == {"doc": DOCUMENT}
+
+    stats = service.get_stats()
+    print(f"编解码配置: {stats['codec']}, 存储字节: {stats['backend']['bytes']}")
+    assert stats["codec"]["serializer"] == "orjson"
+
+
+if __name__ == "__main__":
+    test_roundtrip_and_threshold()
+    test_cross_codec_and_legacy_decode()
+    test_orjson_fallback()
+    test_cache_service_uses_codec()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+测试合规定向修复：补丁提示词只含问题内容、补丁合并回原文、提前结束重试、重试开销统计
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "compliance-repair-secret-key-0123456789")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.document_generator import document_generator
+from app.services.ai_compliance_checker import ai_compliance_checker
+from app.services.compliance_repair import (
+    build_repair_plan, build_patch_prompt, merge_patch, retry_cost_tracker
+)
+from app.services.section_cache import section_cache
+from app.prompts.ai_section_processor import generate_mock_content
+from app.utils.auth import get_current_user
+from app.utils.text_stats import estimate_tokens
+from app.routes import docs
+
+SECTION_CONFIG = {"model": "xunfei_spark_v4", "system_prompt": "你是环境应急预案编制专家，请撰写风险管理结论。" * 20}
+ORIGINAL = "企业环境风险管理制度健全，应急资源配备充足。企业绝对不会发生环境污染事故。建议定期开展应急演练。"
+
+
+def _generate(section_key, responses, **kwargs):
+    """按顺序返回 responses 中的内容，记录每次调用的提示词"""
+    calls = []
+
+    def fake_llm(model, system, user, user_id=None):
+        calls.append((system, user))
+        return responses[len(calls) - 1]
+
+    section_cache.invalidate()
+    retry_cost_tracker.reset()
+    with patch("app.services.document_generator.call_llm", side_effect=fake_llm):
+        content = document_generator._generate_section_with_compliance(
+            section_key, SECTION_CONFIG, {}, user_prompt="企业数据" * 50, **kwargs
+        )
+    return content, calls
+
+
+def test_plan_and_merge():
+    """测试修复计划只列出问题句子与缺少的内容，改写句替换原句、未改写的问题句删除"""
+    print("\n=== 测试修复计划与合并 ===")
+    plan = build_repair_plan("risk_management_conclusion", ORIGINAL)
+    assert [sentence["text"] for sentence in plan["sentences"]] == ["企业绝对不会发生环境污染事故。"]
+    assert plan["sentences"][0]["phrases"] == ["绝对不会"]
+    assert any("HJ941" in item["keywords"] for item in plan["missing"])
+
+    prompt = build_patch_prompt(plan)
+    assert "[1] 企业绝对不会发生环境污染事故。" in prompt["user"]
+    assert "建议定期开展应急演练" not in prompt["user"]
+    print(f"补丁提示词: {estimate_tokens(prompt['system'] + prompt['user'])} tokens")
+
+    merged = merge_patch(ORIGINAL, plan, "[1] 企业能够有效防范环境污染事故。\n[补充] 评估依据HJ941-2018标准。")
+    assert merged == "企业环境风险管理制度健全，应急资源配备充足。企业能够有效防范环境污染事故。建议定期开展应急演练。\n\n评估依据HJ941-2018标准。"
+    assert ai_compliance_checker.check_ai_output("risk_management_conclusion", merged)["passed"]
+
+    dropped = merge_patch(ORIGINAL, plan, "")
+    assert dropped == "企业环境风险管理制度健全，应急资源配备充足。建议定期开展应急演练。"
+
+
+def test_patch_exits_early_with_fewer_tokens():
+    """测试补丁修复通过后提前结束，开销低于整段重新生成"""
+    print("\n=== 测试补丁修复 ===")
+    patched, calls = _generate("risk_management_conclusion", [ORIGINAL, "[补充] 评估依据HJ941-2018标准。"], max_retries=3)
+    assert len(calls) == 2
+    assert ORIGINAL not in calls[1][1] and "绝对不会" in calls[1][1]
+    assert ai_compliance_checker.check_ai_output("risk_management_conclusion", patched)["passed"]
+    patch_stats = retry_cost_tracker.get_section_stats("risk_management_conclusion")
+    assert set(patch_stats) == {"generate", "patch"} and patch_stats["patch"]["passed"] == 1
+
+    fixed = "企业环境风险管理制度健全，依据HJ941-2018标准评估，风险等级为一般。"
+    with patch.dict(os.environ, {"AI_COMPLIANCE_REPAIR_MODE": "regenerate"}):
+        regenerated, calls = _generate("risk_management_conclusion", [ORIGINAL, fixed], max_retries=3)
+    assert regenerated == fixed
+    assert calls[1][0].startswith(SECTION_CONFIG["system_prompt"])
+    regenerate_stats = retry_cost_tracker.get_section_stats("risk_management_conclusion")
+
+    patch_tokens = patch_stats["patch"]["avg_tokens"]
+    regenerate_tokens = regenerate_stats["regenerate"]["avg_tokens"]
+    print(f"补丁修复: {patch_tokens} tokens, 整段重新生成: {regenerate_tokens} tokens")
+    assert patch_tokens < regenerate_tokens / 2
+
+
+def test_falls_back_to_regeneration():
+    """测试补丁未通过时整段重新生成，调用次数不超过 max_retries"""
+    print("\n=== 测试回退到整段重新生成 ===")
+    fixed = "依据HJ941-2018标准，企业环境风险等级为一般。"
+    content, calls = _generate("risk_management_conclusion", [ORIGINAL, "[1] 企业绝对不会污染。", fixed], max_retries=3)
+    assert content == fixed
+    assert len(calls) == 3
+    assert "合规问题" in calls[2][0]
+    assert set(retry_cost_tracker.get_section_stats("risk_management_conclusion")) == {"generate", "patch", "regenerate"}
+
+    # 达到 max_retries 仍未通过时返回问题最少的内容，且不写入缓存
+    content, calls = _generate("risk_management_conclusion", [ORIGINAL, "[1] 企业绝对不会污染。"], max_retries=2)
+    assert content == ORIGINAL and len(calls) == 2
+
+
+def test_failed_generation_is_not_patched():
+    """测试生成失败的占位内容直接整段重新生成，补丁调用失败时不把错误提示合并进段落"""
+    print("\n=== 测试生成失败时不做补丁 ===")
+    failed = "[AI生成失败] All providers failed"
+    fixed = "依据HJ941-2018标准，企业环境风险等级为一般。"
+    content, calls = _generate("risk_management_conclusion", [failed, fixed], max_retries=3)
+    assert content == fixed and len(calls) == 2
+    assert "合规问题" in calls[1][0]
+    assert set(retry_cost_tracker.get_section_stats("risk_management_conclusion")) == {"generate", "regenerate"}
+
+    content, calls = _generate("risk_management_conclusion", [ORIGINAL, failed], max_retries=2)
+    assert content == ORIGINAL and len(calls) == 2
+
+
+def test_mock_patch_and_stats_endpoint():
+    """测试模拟补丁能补齐缺少的内容，统计端点返回各调用方式的开销"""
+    print("\n=== 测试模拟补丁与统计端点 ===")
+    plan = build_repair_plan("risk_management_conclusion", ORIGINAL)
+    prompt = build_patch_prompt(plan)
+    merged = merge_patch(ORIGINAL, plan, generate_mock_content(prompt["system"], prompt["user"]))
+    assert ai_compliance_checker.check_ai_output("risk_management_conclusion", merged)["passed"]
+
+    _generate("risk_management_conclusion", [ORIGINAL, "[补充] 评估依据HJ941-2018标准。"])
+    app = FastAPI()
+    app.include_router(docs.router)
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    stats = TestClient(app).get("/api/docs/compliance/retry_stats").json()["stats"]
+    print(f"重试 token: {stats['retry_tokens']}")
+    assert stats["totals"]["patch"]["calls"] == 1
+    assert stats["retry_tokens"] == stats["totals"]["patch"]["prompt_tokens"] + stats["totals"]["patch"]["completion_tokens"]
+
+
+if __name__ == "__main__":
+    test_plan_and_merge()
+    test_patch_exits_early_with_fewer_tokens()
+    test_falls_back_to_regeneration()
+    test_failed_generation_is_not_patched()
+    test_mock_patch_and_stats_endpoint()
+    print("\n✅ 所有测试完成!")
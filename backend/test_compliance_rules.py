@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+测试编译后的合规规则：与原实现结果一致、规则只编译一次、大小写规则不变
+"""
+
+import os
+import sys
+import random
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.ai_compliance_checker import (
+    ai_compliance_checker, CHECK_KEYWORDS, REQUIREMENT_RULES, ABSOLUTE_WORDS
+)
+from benchmark_compliance import LegacyComplianceChecker
+
+legacy = LegacyComplianceChecker()
+
+
+def _vocabulary():
+    """全部规则关键词及其大小写变体，外加普通文字与换行"""
+    words = set(ABSOLUTE_WORDS)
+    for keywords in CHECK_KEYWORDS.values():
+        words.update(keywords)
+    for rule in REQUIREMENT_RULES.values():
+        words.update(rule.any_of + rule.when)
+    words.update(word.lower() for word in list(words))
+    words.update(word.upper() for word in list(words))
+    return sorted(words) + ["企业", "，", "。", "\n", " ", "河", "general_description", "GENERAL_DESCRIPTION"]
+
+
+def test_matches_legacy_on_random_texts():
+    """测试随机组合关键词的文本在全部段落上的检查结果与原实现一致"""
+    print("\n=== 测试检查结果一致 ===")
+    random.seed(17)
+    vocabulary = _vocabulary()
+    section_keys = list(ai_compliance_checker.compliance_matrix) + ["not_in_matrix"]
+    checked = 0
+    for _ in range(300):
+        text = "".join(random.choice(vocabulary) for _ in range(random.randint(0, 40)))
+        for section_key in section_keys:
+            assert ai_compliance_checker.check_ai_output(section_key, text) == \
+                legacy.check_ai_output(section_key, text), (section_key, text)
+            checked += 1
+    print(f"✓ 校验 {checked} 次检查")
+
+
+def test_case_rules_preserved():
+    """测试 must_cover 不区分大小写、特殊要求区分大小写"""
+    print("\n=== 测试大小写规则 ===")
+    upper = ai_compliance_checker.check_ai_output("risk_management_conclusion", "依据HJ941-2018标准评估。")
+    lower = ai_compliance_checker.check_ai_output("risk_management_conclusion", "依据hj941-2018评估。")
+    assert "风险管理结论必须引用HJ941-2018标准" not in upper["issues"]
+    # must_cover 的 hj941 不区分大小写，特殊要求只认大写的 HJ941
+    assert "缺少必须覆盖的内容: reference_hj941_2018" not in lower["issues"]
+    assert lower == legacy.check_ai_output("risk_management_conclusion", "依据hj941-2018评估。")
+
+    noise = ai_compliance_checker.check_ai_output("noise_environment_impact", "厂界噪声约55DB。")
+    assert "包含应避免的内容: provide_decibel_values" in noise["issues"]
+
+
+def test_rules_compiled_once():
+    """测试段落规则只编译一次，没有规则的段落直接通过"""
+    print("\n=== 测试规则编译 ===")
+    first = ai_compliance_checker.get_compiled_rules("incident_response_card")
+    assert ai_compliance_checker.get_compiled_rules("incident_response_card") is first
+    assert ai_compliance_checker.get_compiled_rules("not_in_matrix") is None
+
+    result = ai_compliance_checker.check_ai_output("not_in_matrix", "绝对安全")
+    assert result["passed"] and result["warnings"] == ["段落 not_in_matrix 没有对应的合规规则"]
+
+    batch = ai_compliance_checker.check_multiple_sections({
+        "risk_management_conclusion": "依据HJ941-2018标准，企业环境风险等级为一般。",
+        "enterprise_overview": "企业绝对不会造成环境污染。"
+    })
+    assert batch == legacy.check_multiple_sections({
+        "risk_management_conclusion": "依据HJ941-2018标准，企业环境风险等级为一般。",
+        "enterprise_overview": "企业绝对不会造成环境污染。"
+    })
+    assert not batch["overall_passed"]
+
+
+if __name__ == "__main__":
+    test_matches_legacy_on_random_texts()
+    test_case_rules_preserved()
+    test_rules_compiled_once()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+测试AI段落并发生成：并发度、单段落超时与结果顺序
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.document_generator import document_generator
+
+
+def _slow_section(content: str, delay: float):
+    """构造一个耗时的段落生成函数"""
+    def task():
+        time.sleep(delay)
+        return content
+    return task
+
+
+def test_concurrent_faster_than_serial():
+    """测试并发生成总耗时约等于最慢段落"""
+    print("\n=== 测试并发生成耗时 ===")
+    tasks = {f"section_{i}": _slow_section(f"内容{i}", 0.3) for i in range(6)}
+
+    start = time.monotonic()
+    results = document_generator._run_sections_concurrently(tasks, max_concurrency=6, section_timeout=5)
+    elapsed = time.monotonic() - start
+
+    print(f"6个段落并发生成耗时: {elapsed:.2f}s")
+    assert elapsed < 1.0, f"并发生成耗时过长: {elapsed:.2f}s"
+    assert results == {f"section_{i}": f"内容{i}" for i in range(6)}
+
+
+def test_stable_merge_order():
+    """测试结果顺序与配置顺序一致（与完成顺序无关）"""
+    print("\n=== 测试结果合并顺序 ===")
+    tasks = {
+        "first": _slow_section("A", 0.3),
+        "second": _slow_section("B", 0.1),
+        "third": _slow_section("C", 0.2),
+    }
+
+    results = document_generator._run_sections_concurrently(tasks, max_concurrency=3, section_timeout=5)
+    print(f"结果顺序: {list(results.keys())}")
+    assert list(results.keys()) == ["first", "second", "third"]
+
+
+def test_section_timeout_and_failure():
+    """测试单段落超时与异常不影响其他段落"""
+    print("\n=== 测试段落超时与失败隔离 ===")
+
+    def failing():
+        raise RuntimeError("模型不可用")
+
+    tasks = {
+        "fast": _slow_section("正常内容", 0.05),
+        "slow": _slow_section("不会返回", 2.0),
+        "broken": failing,
+    }
+
+    start = time.monotonic()
+    results = document_generator._run_sections_concurrently(tasks, max_concurrency=3, section_timeout=0.5)
+    elapsed = time.monotonic() - start
+
+    print(f"结果: {results}, 耗时: {elapsed:.2f}s")
+    assert results["fast"] == "正常内容"
+    assert results["slow"].startswith("[AI生成失败: slow]")
+    assert results["broken"].startswith("[AI生成失败: broken]")
+    assert elapsed < 1.5, "超时段落阻塞了整体生成"
+
+
+def test_build_ai_sections_uses_pool():
+    """测试 build_ai_sections 在并发模式下的整体耗时"""
+    print("\n=== 测试 build_ai_sections 并发 ===")
+
+    def fake_llm(model, system, user, user_id=None):
+        time.sleep(0.2)
+        return "依据HJ941-2018标准，企业环境风险等级为一般。" * 5
+
+    with patch("app.services.document_generator.call_llm", side_effect=fake_llm):
+        start = time.monotonic()
+        sections = document_generator.build_ai_sections(
+            {"basic_info": {"company_name": "测试企业"}},
+            enable_compliance_check=False,
+            max_concurrency=32
+        )
+        elapsed = time.monotonic() - start
+
+    print(f"生成 {len(sections)} 个段落，耗时: {elapsed:.2f}s")
+    assert sections, "未生成任何段落"
+    assert elapsed < 0.2 * len(sections), "段落生成未并发执行"
+
+
+if __name__ == "__main__":
+    test_concurrent_faster_than_serial()
+    test_stable_merge_order()
+    test_section_timeout_and_failure()
+    test_build_ai_sections_uses_pool()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+测试列表总数服务：按用户与过滤条件缓存总数、新增/删除后失效、total_mode=exact|cached|none、
+管理员用户统计只执行一条聚合查询
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "count-service-secret-key-0123456789abcd")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_async_db_engine
+from app.models.document import Document
+from app.models.enterprise import EnterpriseInfo  # noqa: F401  注册 User 关联的模型
+from app.models.user import User
+from app.routes import documents, projects
+from app.routes.admin import get_user_stats
+from app.services.cache_service import CacheService, MemoryCacheBackend
+from app.services.count_service import CountService, count_service
+from testing_utils import build_app, count_statements, create_documents
+
+
+def test_cached_totals_and_invalidation():
+    """测试缓存的总数在翻页时复用，新增/删除文档后重新统计，自动保存不影响缓存"""
+    print("\n=== 测试总数缓存与失效 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "counts.db")
+        user_id = create_documents(db_path, 30)
+        # 其他测试可能缓存过相同用户ID的总数
+        count_service.invalidate("documents", user_id)
+        app, engine = build_app(db_path, user_id, [documents, projects])
+        cached = {"total_mode": "cached"}
+
+        with TestClient(app) as client:
+            with count_statements(engine) as counts:
+                first = client.get("/api/documents/", params={"page_size": 10, **cached}).json()
+                second = client.get("/api/documents/", params={"page": 2, "page_size": 10, **cached}).json()
+            assert first["total"] == second["total"] == 30 and second["total_pages"] == 3
+            assert len(counts) == 1
+
+            # 不同过滤条件分别缓存
+            with count_statements(engine) as counts:
+                assert client.get("/api/documents/", params={"search": "文档1", **cached}).json()["total"] == 11
+                assert client.get("/api/documents/", params={"search": "文档1", **cached}).json()["total"] == 11
+            assert len(counts) == 1
+
+            # 新增文档后总数失效
+            created = client.post("/api/documents/", json={"title": "新文档", "content": "<p>内容</p>"}).json()
+            with count_statements(engine) as counts:
+                assert client.get("/api/documents/", params=cached).json()["total"] == 31
+            assert len(counts) == 1
+
+            # 自动保存只修改内容，总数仍使用缓存
+            client.post(f"/api/documents/{created['id']}/autosave", json={"content": "<p>二稿</p>", "version": 1})
+            with count_statements(engine) as counts:
+                assert client.get("/api/documents/", params=cached).json()["total"] == 31
+            assert len(counts) == 0
+
+            assert client.delete(f"/api/documents/{created['id']}").status_code == 200
+            assert client.get("/api/documents/", params=cached).json()["total"] == 30
+
+        asyncio.run(engine.dispose())
+
+
+def test_stale_cached_total_keeps_next_page():
+    """测试缓存的总数过期（其他工作进程新增了文档）时仍能翻到新增的文档：has_next 由多查询的一行判断"""
+    print("\n=== 测试过期总数不影响翻页 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stale.db")
+        user_id = create_documents(db_path, 20)
+        count_service.invalidate("documents", user_id)
+        app, engine = build_app(db_path, user_id, [documents, projects])
+
+        with TestClient(app) as client:
+            params = {"page": 2, "page_size": 10, "total_mode": "cached"}
+            page = client.get("/api/documents/", params=params).json()
+            assert page["total"] == 20 and not page["has_next"]
+
+            # 模拟另一个工作进程新增文档：本进程的缓存总数没有失效
+            sync_engine = create_engine(f"sqlite:///{db_path}")
+            with sessionmaker(bind=sync_engine)() as session:
+                session.add_all([Document(title=f"新文档{i}", user_id=user_id) for i in range(5)])
+                session.commit()
+            sync_engine.dispose()
+            page = client.get("/api/documents/", params=params).json()
+            assert page["total"] == 20 and page["has_next"] and page["next_cursor"]
+            third = client.get("/api/documents/", params={**params, "page": 3}).json()
+            assert len(third["documents"]) == 5
+
+            # 默认（exact）每次统计
+            assert client.get("/api/documents/").json()["total"] == 25
+
+        asyncio.run(engine.dispose())
+
+
+def test_total_modes():
+    """测试 exact 每次统计、none 不统计且仍能判断是否有下一页、无效值返回 422"""
+    print("\n=== 测试 total_mode ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "modes.db")
+        user_id = create_documents(db_path, 25)
+        count_service.invalidate("documents", user_id)
+        count_service.invalidate("projects", user_id)
+        app, engine = build_app(db_path, user_id, [documents, projects])
+
+        with TestClient(app) as client:
+            with count_statements(engine) as counts:
+                for _ in range(3):
+                    assert client.get("/api/documents/", params={"total_mode": "exact"}).json()["total"] == 25
+            assert len(counts) == 3
+
+            with count_statements(engine) as counts:
+                page = client.get("/api/documents/", params={"page": 2, "page_size": 10, "total_mode": "none"}).json()
+                last = client.get("/api/documents/", params={"page": 3, "page_size": 10, "total_mode": "none"}).json()
+            assert len(counts) == 0
+            assert page["total"] is None and page["total_pages"] is None
+            assert len(page["documents"]) == 10 and page["has_next"] and page["next_cursor"]
+            assert len(last["documents"]) == 5 and not last["has_next"]
+
+            assert client.get("/api/documents/", params={"total_mode": "approx"}).status_code == 422
+
+            # 删除项目时级联删除的文档同样使总数失效
+            project = client.post("/api/projects/", json={"title": "项目"}).json()
+            assert client.get("/api/projects/").json()["total"] == 1
+            client.post("/api/documents/", json={"title": "项目文档", "project_id": project["id"]})
+            assert client.get("/api/documents/").json()["total"] == 26
+            assert client.delete(f"/api/projects/{project['id']}").status_code == 200
+            assert client.get("/api/projects/").json()["total"] == 0
+            assert client.get("/api/documents/").json()["total"] == 25
+
+        asyncio.run(engine.dispose())
+
+
+class RecordingBackend(MemoryCacheBackend):
+    """记录每次缓存操作及其执行线程的内存缓存"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append(("get", threading.get_ident()))
+        return super().get(key)
+
+    def get_many(self, keys):
+        self.calls.append(("get_many", threading.get_ident()))
+        return super().get_many(keys)
+
+    def set(self, key, value, ttl=3600):
+        self.calls.append(("set", threading.get_ident()))
+        return super().set(key, value, ttl)
+
+    def set_many(self, items, ttl=3600):
+        self.calls.append(("set_many", threading.get_ident()))
+        return super().set_many(items, ttl)
+
+
+def test_cache_round_trips_off_event_loop():
+    """测试命中时只有一次批量读取，缓存读写都不在事件循环线程中执行"""
+    print("\n=== 测试总数缓存的读写次数 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "round_trips.db")
+        user_id = create_documents(db_path, 12)
+        backend = RecordingBackend()
+        service = CountService(cache=CacheService(backend))
+        engine = create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+        stmt = select(Document).where(Document.user_id == user_id)
+
+        async def run():
+            loop_thread = threading.get_ident()
+            async with async_sessionmaker(bind=engine, class_=AsyncSession)() as db:
+                results = []
+                for step in ("miss", "hit", "invalidate", "miss", "hit"):
+                    backend.calls.clear()
+                    if step == "invalidate":
+                        await service.ainvalidate(("documents", "projects"), user_id)
+                    else:
+                        assert await service.acount(stmt, db, "documents", user_id) == 12
+                    results.append([name for name, _ in backend.calls])
+                    assert all(thread != loop_thread for _, thread in backend.calls)
+            await engine.dispose()
+            return results
+
+        miss, hit, invalidate, miss_again, hit_again = asyncio.run(run())
+        assert miss == miss_again == ["get_many", "set"]
+        assert hit == hit_again == ["get_many"]
+        assert invalidate == ["set_many"]
+        assert service.get_stats() == {"hits": 2, "misses": 2, "invalidations": 2}
+
+
+def test_admin_stats_single_query():
+    """测试管理员用户统计只执行一条聚合查询"""
+    print("\n=== 测试管理员用户统计 ===")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    last_month = datetime.utcnow().replace(day=1) - timedelta(days=1)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            User(name="甲", email="a@example.com", hashed_password="x", is_active=True, is_verified=True),
+            User(name="乙", email="b@example.com", hashed_password="x", is_active=True, is_verified=False),
+            User(name="丙", email="c@example.com", hashed_password="x", is_active=False, is_verified=True,
+                 created_at=last_month),
+        ])
+        session.commit()
+
+        with count_statements(engine) as counts:
+            stats = asyncio.run(get_user_stats(current_user=type("U", (), {"id": 1})(), db=session))
+    assert len(counts) == 1
+    assert stats.total_users == 3 and stats.active_users == 2 and stats.verified_users == 2
+    assert stats.new_users_this_month == 2 and stats.regular_users == 3 and stats.admin_users == 0
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    test_cached_totals_and_invalidation()
+    test_stale_cached_total_keeps_next_page()
+    test_total_modes()
+    test_cache_round_trips_off_event_loop()
+    test_admin_stats_single_query()
+    print("\n✅ 所有测试完成!")
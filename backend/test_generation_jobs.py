@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+测试文档生成后台任务：提交、进度、结果、幂等与中断恢复
+"""
+
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "generation-job-test-secret-key-0123456789")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import init_db  # noqa: F401  注册所有数据模型
+from app.models.generation_job import GenerationJob
+from app.services import job_queue as job_queue_module
+from app.services.job_queue import GenerationJobQueue
+from app.utils.auth import get_current_user
+from app.routes import docs, jobs
+
+
+def _make_queue(max_workers: int = 2) -> GenerationJobQueue:
+    """创建使用临时SQLite数据库的任务队列"""
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[GenerationJob.__table__])
+    return GenerationJobQueue(sessionmaker(autocommit=False, autoflush=False, bind=engine), max_workers=max_workers)
+
+
+def _wait_finished(queue: GenerationJobQueue, job_id: str, timeout: float = 10.0) -> GenerationJob:
+    """轮询直到任务结束"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get_job(job_id)
+        if job.status in ("succeeded", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"任务未在 {timeout} 秒内结束")
+
+
+def _fake_handler(payload, progress_callback):
+    """模拟逐段生成的任务"""
+    for key in payload["sections"]:
+        time.sleep(0.05)
+        progress_callback(key, "failed" if key == "broken" else "succeeded")
+    if payload.get("fail"):
+        raise RuntimeError("模型不可用")
+    return {"success": True, "data": {"echo": payload["value"]}}
+
+
+def test_submit_progress_and_result():
+    """测试任务执行过程中的进度与最终结果"""
+    print("\n=== 测试任务进度与结果 ===")
+    queue = _make_queue()
+    queue.register_handler("fake", _fake_handler)
+
+    sections = ["overview", "risk", "broken"]
+    job = queue.submit("fake", 1, {"sections": sections, "value": 42}, enterprise_id=7, section_keys=sections)
+    assert job.status == "pending"
+    assert job.progress["total"] == 3
+
+    job = _wait_finished(queue, job.id)
+    print(f"任务状态: {job.status}, 进度: {job.progress}")
+    assert job.status == "succeeded"
+    assert job.result == {"success": True, "data": {"echo": 42}}
+    assert job.progress["completed"] == 3
+    assert job.progress["failed"] == 1
+    assert job.progress["sections"]["broken"] == "failed"
+    assert job.attempts == 1
+    assert queue.get_job(job.id, user_id=2) is None, "不应返回其他用户的任务"
+    queue.shutdown(wait=True)
+
+
+def test_idempotent_submit():
+    """测试相同企业与数据重复提交返回同一任务，失败任务可重新执行"""
+    print("\n=== 测试幂等提交 ===")
+    queue = _make_queue()
+    queue.register_handler("fake", _fake_handler)
+
+    payload = {"sections": ["overview"], "value": 1}
+    first = queue.submit("fake", 1, payload, enterprise_id=7)
+    second = queue.submit("fake", 1, {"value": 1, "sections": ["overview"]}, enterprise_id=7)
+    assert first.id == second.id, "键顺序不同的相同数据应命中同一任务"
+
+    other_enterprise = queue.submit("fake", 1, payload, enterprise_id=8)
+    other_data = queue.submit("fake", 1, dict(payload, value=2), enterprise_id=7)
+    assert len({first.id, other_enterprise.id, other_data.id}) == 3
+
+    assert _wait_finished(queue, first.id).status == "succeeded"
+    assert queue.submit("fake", 1, payload, enterprise_id=7).id == first.id
+    assert _wait_finished(queue, first.id).attempts == 1, "已成功的任务不应重复执行"
+
+    failing = {"sections": ["overview"], "value": 3, "fail": True}
+    failed = _wait_finished(queue, queue.submit("fake", 1, failing, enterprise_id=7).id)
+    assert failed.status == "failed" and "模型不可用" in failed.error
+
+    retried = queue.submit("fake", 1, failing, enterprise_id=7)
+    assert retried.id == failed.id
+    retried = _wait_finished(queue, retried.id)
+    print(f"失败任务重试次数: {retried.attempts}")
+    assert retried.attempts == 2
+    queue.shutdown(wait=True)
+
+
+def test_recover_interrupted_jobs():
+    """测试重启后恢复未执行与中断的任务"""
+    print("\n=== 测试中断恢复 ===")
+    queue = _make_queue()
+    queue.register_handler("fake", _fake_handler)
+    # 线程池已关闭时提交的任务保持 pending，模拟进程在执行前退出
+    queue._executor = type("Stopped", (), {"submit": lambda *args, **kwargs: None})()
+    job = queue.submit("fake", 1, {"sections": ["overview"], "value": 5}, enterprise_id=9)
+    queue._executor = None
+
+    restarted = GenerationJobQueue(queue.session_factory, max_workers=1)
+    restarted.register_handler("fake", _fake_handler)
+    assert restarted.recover() == 1
+
+    job = _wait_finished(restarted, job.id)
+    assert job.status == "succeeded"
+    assert restarted.recover() == 0
+    restarted.shutdown(wait=True)
+
+
+def test_generate_all_job_endpoints():
+    """测试提交、轮询与结果端点"""
+    print("\n=== 测试任务端点 ===")
+    queue = _make_queue()
+    queue._handlers = dict(job_queue_module.get_job_queue()._handlers)
+
+    app = FastAPI()
+    app.include_router(docs.router)
+    app.include_router(jobs.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    client = TestClient(app)
+
+    def fake_llm(model, system, user, user_id=None):
+        return "依据HJ941-2018标准，企业环境风险等级为一般。" * 5
+
+    enterprise_data = {
+        "basic_info": {"company_name": "测试化工有限公司"},
+        "production_process": {},
+        "environment_info": {},
+        "compliance_info": {},
+        "emergency_resources": {}
+    }
+    with patch.object(job_queue_module, "_job_queue", queue), \
+            patch("app.services.document_generator.call_llm", side_effect=fake_llm):
+        response = client.post("/api/docs/generate_all/jobs", json={"enterprise_data": enterprise_data})
+        assert response.status_code == 202, response.text
+        job_id = response.json()["id"]
+
+        again = client.post("/api/docs/generate_all/jobs", json={"enterprise_data": enterprise_data})
+        assert again.json()["id"] == job_id
+
+        _wait_finished(queue, job_id, timeout=30)
+        status_response = client.get(f"/api/jobs/{job_id}")
+        progress = status_response.json()["progress"]
+        print(f"任务进度: {progress['completed']}/{progress['total']}")
+        assert progress["total"] > 0 and progress["completed"] == progress["total"]
+
+        result = client.get(f"/api/jobs/{job_id}/result").json()
+        assert result["status"] in ("succeeded", "failed")
+        assert result["result"]["success"] == (result["status"] == "succeeded")
+
+        assert client.get("/api/jobs/not-exists").status_code == 404
+    queue.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    test_submit_progress_and_result()
+    test_idempotent_submit()
+    test_recover_interrupted_jobs()
+    test_generate_all_job_endpoints()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+测试AI段落增量生成：数据差异、依赖索引与复用上次生成结果
+"""
+
+import os
+import sys
+import copy
+import json
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import document_generator as generator_module
+from app.services.document_generator import document_generator
+from app.services.cache_service import CacheService, MemoryCacheBackend
+from app.services.section_cache import section_cache
+from app.services.incremental_generation import (
+    SectionSnapshotStore, diff_data_paths, paths_affected, plan_section_reuse
+)
+from app.prompts.ai_sections_loader import ai_sections_loader
+from app.services.compliance_repair import PATCH_SYSTEM_PROMPT
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_enterprise.json"), "r", encoding="utf-8") as f:
+    SAMPLE_DATA = json.load(f)
+
+
+def _counting_llm(calls):
+    """构造记录调用的LLM替身（合规修复的补丁调用不记录，只统计整段生成）"""
+    def fake_llm(model, system, user, user_id=None):
+        if system != PATCH_SYSTEM_PROMPT:
+            calls.append(user)
+        return "依据HJ941-2018标准，企业环境风险等级为一般。" * 5
+    return fake_llm
+
+
+def test_diff_data_paths():
+    """测试数据差异路径与依赖判断"""
+    print("\n=== 测试数据差异 ===")
+    old = {"basic_info": {"company_name": "甲", "address": {"city": "A"}}, "list": [1, 2]}
+    new = {"basic_info": {"company_name": "甲", "address": {"city": "B"}}, "list": [1, 2, 3], "extra": 1}
+    changed = diff_data_paths(old, new)
+    print(f"变化路径: {changed}")
+    assert changed == {"basic_info.address.city", "list", "extra"}
+    assert diff_data_paths(old, copy.deepcopy(old)) == set()
+    assert diff_data_paths(None, new) == {""}
+
+    # 依赖路径本身、上级与下级变化均视为受影响
+    assert paths_affected({"basic_info.address"}, changed)
+    assert paths_affected({"basic_info.address.city.code"}, {"basic_info.address"})
+    assert not paths_affected({"basic_info.company_name"}, changed)
+    assert not paths_affected(set(), changed)
+    assert paths_affected({"basic_info.company_name"}, {""})
+
+
+def test_dependency_index():
+    """测试依赖索引包含模板占位符与 fields 声明的字段"""
+    print("\n=== 测试依赖索引 ===")
+    dependencies = ai_sections_loader.get_section_dependencies()
+    for key, config in ai_sections_loader.get_sections_config().items():
+        expected = set(ai_sections_loader.extract_template_variables(config["user_template"])) | set(config.get("fields", []))
+        assert dependencies[key] == expected, key
+
+
+def test_one_field_change_regenerates_few_sections():
+    """测试修改一个字段后只重新生成依赖该字段的段落"""
+    print("\n=== 测试单字段修改 ===")
+    store = SectionSnapshotStore(cache=CacheService(MemoryCacheBackend()))
+    edited = copy.deepcopy(SAMPLE_DATA)
+    edited["production_process"]["process_description"] = "新的工艺流程说明"
+
+    dependencies = ai_sections_loader.get_section_dependencies()
+    affected = {
+        key for key in ai_sections_loader.get_enabled_sections()
+        if paths_affected(dependencies[key], {"production_process.process_description"})
+    }
+    print(f"受影响段落: {sorted(affected)}")
+    assert 1 <= len(affected) <= 2
+
+    calls = []
+    with patch.object(generator_module, "section_snapshots", store), \
+            patch("app.services.document_generator.call_llm", side_effect=_counting_llm(calls)):
+        section_cache.invalidate()
+        first = document_generator.generate_all_documents(SAMPLE_DATA, incremental_key="user:1:enterprise:1")
+        first_calls = len(calls)
+        assert first["success"] and first["ai_sections_reused"] == []
+
+        # 清空段落缓存，确认复用来自增量快照
+        section_cache.invalidate()
+        calls.clear()
+        second = document_generator.generate_all_documents(edited, incremental_key="user:1:enterprise:1")
+
+    print(f"首次调用: {first_calls} 次，修改后调用: {len(calls)} 次，复用: {len(second['ai_sections_reused'])} 个段落")
+    assert second["success"]
+    assert set(second["ai_sections_used"]) - set(second["ai_sections_reused"]) == affected
+    # 合规检查未通过时同一段落会重试，调用次数按段落去重后比较
+    assert len(set(calls)) == len(affected) and len(calls) <= 2
+    assert "新的工艺流程说明" in "".join(calls)
+
+    # 未修改时全部复用
+    calls.clear()
+    section_cache.invalidate()
+    with patch.object(generator_module, "section_snapshots", store), \
+            patch("app.services.document_generator.call_llm", side_effect=_counting_llm(calls)):
+        third = document_generator.generate_all_documents(edited, incremental_key="user:1:enterprise:1")
+    assert calls == [] and len(third["ai_sections_reused"]) == len(third["ai_sections_used"])
+
+
+def test_config_change_and_failures_not_reused():
+    """测试段落配置变化或上次生成失败的段落不复用"""
+    print("\n=== 测试不可复用的段落 ===")
+    snapshot = {
+        "data": SAMPLE_DATA,
+        "sections": {"a": "内容A", "b": "内容B"},
+        "fingerprints": {"a": "fp-a", "b": "fp-b-old", "c": "fp-c"}
+    }
+    fingerprints = {"a": "fp-a", "b": "fp-b-new", "c": "fp-c"}
+    reused = plan_section_reuse(snapshot, SAMPLE_DATA, fingerprints, {"a": frozenset(), "b": frozenset(), "c": frozenset()})
+    assert reused == {"a": "内容A"}
+    assert plan_section_reuse(None, SAMPLE_DATA, fingerprints, {}) == {}
+
+
+if __name__ == "__main__":
+    test_diff_data_paths()
+    test_dependency_index()
+    test_one_field_change_regenerates_few_sections()
+    test_config_change_and_failures_not_reused()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试模板字节码缓存与启动预热：新进程直接加载编译结果、各环境共用缓存、渲染结果不变
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+# 添加项目路径到sys.path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.document_generator import document_generator, DocumentGenerator, LEGACY_TEMPLATES
+from app.prompts.template_loader import TemplateLoader
+from app.utils.jinja_cache import get_bytecode_cache
+
+WARM_UP_SCRIPT = (
+    "import json, sys\n"
+    f"sys.path.insert(0, {BACKEND_DIR!r})\n"
+    "from app.services.document_generator import document_generator\n"
+    "print(json.dumps(document_generator.warm_up_templates()))\n"
+)
+
+
+def _warm_up_in_new_process(cache_dir):
+    """在新进程中预热模板（模拟部署或扩容后启动的工作进程）"""
+    env = dict(os.environ, JINJA_BYTECODE_CACHE_DIR=cache_dir, JINJA_BYTECODE_CACHE_ENABLED="true")
+    output = subprocess.run(
+        [sys.executable, "-c", WARM_UP_SCRIPT], env=env, cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_warm_up_covers_registry():
+    """测试预热加载注册表中的全部模板及V1模板"""
+    print("\n=== 测试预热范围 ===")
+    report = document_generator.warm_up_templates()
+    print(f"预热耗时: {report['total_ms']}ms, 加载: {report['loaded']}")
+
+    registry_paths = {
+        info["template_path"] for info in document_generator.template_registry["templates"].values()
+        if info.get("enabled", True)
+    }
+    assert registry_paths <= set(report["templates"])
+    assert set(LEGACY_TEMPLATES) <= set(report["templates"])
+    assert report["failed"] == 0
+    assert report["loaded"] == len(report["templates"])
+    assert document_generator.warm_up_report is report
+
+    # 再次预热时全部来自进程内缓存
+    again = document_generator.warm_up_templates()
+    assert {info["source"] for info in again["templates"].values()} == {"memory"}
+
+
+def test_new_process_loads_bytecode():
+    """测试首个进程编译后，新进程直接加载字节码缓存"""
+    print("\n=== 测试跨进程字节码缓存 ===")
+    cache_dir = tempfile.mkdtemp()
+    try:
+        first = _warm_up_in_new_process(cache_dir)
+        second = _warm_up_in_new_process(cache_dir)
+        print(f"首次启动: {first['total_ms']}ms（编译 {first['compiled']} 个）, "
+              f"再次启动: {second['total_ms']}ms（字节码 {second['from_bytecode']} 个）")
+
+        assert first["failed"] == 0 and first["from_bytecode"] == 0
+        assert first["compiled"] == first["loaded"]
+        assert os.listdir(cache_dir), "应写入字节码缓存文件"
+
+        assert second["compiled"] == 0
+        assert second["from_bytecode"] == second["loaded"] == first["loaded"]
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_environments_share_cache():
+    """测试模板加载器与文档生成器共用字节码缓存"""
+    print("\n=== 测试环境共用缓存 ===")
+    bytecode_cache = get_bytecode_cache()
+    assert bytecode_cache is not None
+    assert document_generator.jinja_env.bytecode_cache is bytecode_cache
+
+    document_generator.warm_up_templates()
+    loader = TemplateLoader()
+    assert loader.jinja_env.bytecode_cache is bytecode_cache
+
+    hits_before = bytecode_cache.hits
+    loader.jinja_env.get_template(LEGACY_TEMPLATES[0])
+    assert bytecode_cache.hits == hits_before + 1
+
+
+def test_render_output_unchanged():
+    """测试从字节码加载的模板渲染结果与直接编译一致"""
+    print("\n=== 测试渲染结果一致 ===")
+    data = document_generator._prepare_template_data({"basic_info": {"company_name": "测试企业"}})
+    data["ai_sections"] = {}
+
+    os.environ["JINJA_BYTECODE_CACHE_ENABLED"] = "false"
+    try:
+        uncached = DocumentGenerator()
+    finally:
+        os.environ.pop("JINJA_BYTECODE_CACHE_ENABLED")
+    assert uncached.jinja_env.bytecode_cache is None
+
+    for template_path in LEGACY_TEMPLATES:
+        expected = uncached.render_jinja(template_path, data)
+        assert expected and "测试企业" in expected
+        assert DocumentGenerator().render_jinja(template_path, data) == expected
+
+
+if __name__ == "__main__":
+    test_warm_up_covers_registry()
+    test_new_process_loads_bytecode()
+    test_environments_share_cache()
+    test_render_output_unchanged()
+    print("\n✅ 所有测试完成!")
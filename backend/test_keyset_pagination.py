@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+测试键集（游标）分页：游标编解码、排序键相等时翻页不重复不遗漏、文档/项目/企业信息列表的 cursor 参数、
+缓存的总数、游标查询使用 idx_user_updated 索引
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "keyset-pagination-secret-key-0123456789")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models.document import Document
+from app.models.enterprise import EnterpriseInfo
+from app.models.project import Project
+from app.routes import documents, enterprise, projects
+from app.services.count_service import count_service
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from testing_utils import DOCUMENT_SORT_KEYS, build_app, create_documents, explain_keyset_query
+
+
+def test_cursor_encoding():
+    """测试游标编解码与无效游标"""
+    print("\n=== 测试游标编解码 ===")
+    document = Document(id=42, updated_at=datetime(2026, 3, 1, 8, 30, 0, 123456))
+    cursor = encode_cursor(document, DOCUMENT_SORT_KEYS)
+    assert "updated_at" not in cursor
+    assert decode_cursor(cursor, DOCUMENT_SORT_KEYS) == [datetime(2026, 3, 1, 8, 30, 0, 123456), 42]
+
+    # 其他排序生成的游标与乱码均视为无效
+    for bad in (encode_cursor(document, [Document.id.desc()]), "not-a-cursor", ""):
+        try:
+            decode_cursor(bad, DOCUMENT_SORT_KEYS)
+        except InvalidCursorError:
+            continue
+        raise AssertionError(f"应拒绝游标: {bad!r}")
+
+
+def walk(client, path: str, key: str, page_size: int, **params):
+    """从第一页开始按 next_cursor 翻到最后一页，返回全部ID"""
+    ids = []
+    response = client.get(path, params={"page_size": page_size, **params}).json()
+    while True:
+        ids.extend(item["id"] for item in response[key])
+        if not response["has_next"]:
+            return ids
+        assert response["next_cursor"]
+        response = client.get(path, params={"page_size": page_size, "cursor": response["next_cursor"], **params}).json()
+        assert response["page"] is None
+
+
+def test_list_endpoints_with_cursor():
+    """测试文档、项目、企业信息列表按游标翻页的结果与偏移分页一致"""
+    print("\n=== 测试列表接口游标分页 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "keyset.db")
+        # 每 3 个文档的更新时间相同
+        user_id = create_documents(db_path, 25)
+
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        with sessionmaker(bind=sync_engine)() as session:
+            base_time = datetime(2026, 1, 1)
+            session.execute(insert(Project), [
+                {"title": f"项目{i}", "user_id": user_id, "created_at": base_time + timedelta(minutes=i // 2)}
+                for i in range(7)
+            ])
+            session.add_all([EnterpriseInfo(user_id=user_id, enterprise_name=f"企业{i}") for i in range(5)])
+            session.commit()
+        sync_engine.dispose()
+        # 数据直接写入数据库，未经过接口，需要使缓存的总数失效
+        for scope in ("documents", "projects", "enterprise_infos"):
+            count_service.invalidate(scope, user_id)
+
+        app, engine = build_app(db_path, user_id, [documents, projects, enterprise])
+        with TestClient(app) as client:
+            offset_ids = [d["id"] for d in client.get("/api/documents/", params={"page_size": 100}).json()["documents"]]
+            assert len(offset_ids) == 25
+            assert walk(client, "/api/documents/", "documents", 4) == offset_ids
+            assert walk(client, "/api/documents/", "documents", 4, search="文档1") == \
+                [d["id"] for d in client.get("/api/documents/", params={"search": "文档1", "page_size": 100}).json()["documents"]]
+
+            # 偏移分页也返回下一页游标，可从任意页切换到游标分页
+            page2 = client.get("/api/documents/", params={"page": 2, "page_size": 10}).json()
+            assert page2["total"] == 25 and page2["has_next"]
+            page3 = client.get("/api/documents/", params={"cursor": page2["next_cursor"], "page_size": 10}).json()
+            assert [d["id"] for d in page3["documents"]] == offset_ids[20:]
+            assert page3["total"] is None and not page3["has_next"] and page3["next_cursor"] is None
+
+            # 游标分页默认不统计总数，total_mode=cached 时返回缓存的总数
+            with_total = client.get("/api/documents/", params={"cursor": page2["next_cursor"], "total_mode": "cached"}).json()
+            assert with_total["total"] == 25 and with_total["total_pages"] == 3
+
+            assert client.get("/api/documents/", params={"cursor": "bad"}).status_code == 400
+            assert client.get("/api/projects/", params={"cursor": page2["next_cursor"]}).status_code == 400
+
+            project_ids = [p["id"] for p in client.get("/api/projects/", params={"page_size": 100}).json()["projects"]]
+            assert len(project_ids) == 7 and walk(client, "/api/projects/", "projects", 2) == project_ids
+
+            infos = client.get("/api/enterprise/info", params={"page_size": 100}).json()["enterprise_infos"]
+            assert walk(client, "/api/enterprise/info", "enterprise_infos", 2) == [info["id"] for info in infos]
+            assert client.get("/api/enterprise/info", params={"cursor": "bad"}).status_code == 400
+
+        asyncio.run(engine.dispose())
+
+
+def test_keyset_query_uses_index():
+    """测试游标查询直接在 idx_user_updated 上定位，不需要额外排序"""
+    print("\n=== 测试游标查询计划 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plan.db")
+        user_id = create_documents(db_path, 10)
+        plan = explain_keyset_query(db_path, user_id)
+    print(f"查询计划: {plan}")
+    assert "idx_user_updated" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+if __name__ == "__main__":
+    test_cursor_encoding()
+    test_list_endpoints_with_cursor()
+    test_keyset_query_uses_index()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+测试多供应商 LLM 路由：模型映射、按延迟选择、失败切换（不降级为模拟内容）、并发上限、流式输出
+使用本地 HTTP 服务模拟 OpenAI 兼容接口
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.llm_router import LLMProvider, LLMRouter, LLMRouterError, set_llm_router, load_providers
+from app.prompts import ai_section_processor
+
+
+class StubLLMServer:
+    """本地 OpenAI 兼容接口：可配置延迟、失败状态码，记录请求与最大并发数"""
+
+    def __init__(self, name: str, delay: float = 0.0, status: int = 200):
+        self.name = name
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests.append(body)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                # 模拟处理耗时结束即视为请求完成（响应写出前客户端可能已发起下一个请求）
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.in_flight -= 1
+                if stub.status != 200:
+                    self.send_response(stub.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                content = f"{stub.name}:{body['messages'][-1]['content']}"
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for i in range(0, len(content), 4):
+                        chunk = {"choices": [{"delta": {"content": content[i:i + 4]}}]}
+                        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                data = json.dumps({"choices": [{"message": {"content": content}}]}, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_router(*providers, **kwargs) -> LLMRouter:
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("cooldown", 30)
+    kwargs.setdefault("queue_timeout", 5)
+    return LLMRouter(list(providers), **kwargs)
+
+
+def test_model_mapping():
+    """测试按段落模型名选择供应商，请求中发送供应商的模型名"""
+    print("\n=== 测试模型映射 ===")
+    spark, gpt = StubLLMServer("spark"), StubLLMServer("gpt")
+    try:
+        router = make_router(
+            LLMProvider("spark", spark.base_url, ["xunfei_spark_v4"], api_key="k", model="4.0Ultra"),
+            LLMProvider("gpt", gpt.base_url, ["gpt-4"])
+        )
+        assert router.has_provider("xunfei_spark_v4") and not router.has_provider("claude")
+        assert router.complete("xunfei_spark_v4", "系统", "企业概况") == "spark:企业概况"
+        assert router.complete("gpt-4", "", "结论") == "gpt:结论"
+        assert spark.requests[0]["model"] == "4.0Ultra" and spark.requests[0]["messages"][0]["role"] == "system"
+        assert gpt.requests[0]["model"] == "gpt-4" and len(gpt.requests[0]["messages"]) == 1
+        try:
+            router.complete("claude", "", "x")
+            assert False, "未配置的模型应抛出 LLMRouterError"
+        except LLMRouterError:
+            pass
+        router.close()
+    finally:
+        spark.close()
+        gpt.close()
+
+    os.environ["LLM_PROVIDERS"] = json.dumps([{"name": "a", "base_url": "http://x/v1", "models": ["*"], "api_key_env": "TEST_LLM_KEY"}])
+    os.environ["TEST_LLM_KEY"] = "secret"
+    try:
+        providers = load_providers()
+        assert providers[0].api_key == "secret" and providers[0].serves("anything")
+    finally:
+        del os.environ["LLM_PROVIDERS"], os.environ["TEST_LLM_KEY"]
+
+
+def test_latency_based_selection():
+    """测试延迟 EWMA：多数请求发往较快的供应商"""
+    print("\n=== 测试按延迟选择 ===")
+    fast, slow = StubLLMServer("fast", delay=0.005), StubLLMServer("slow", delay=0.08)
+    try:
+        router = make_router(LLMProvider("fast", fast.base_url, ["*"]), LLMProvider("slow", slow.base_url, ["*"]))
+        for i in range(40):
+            router.complete("m", "", str(i))
+        stats = router.get_stats()
+        print(f"fast: {stats['fast']['calls']} 次 ({stats['fast']['ewma_latency_ms']}ms), "
+              f"slow: {stats['slow']['calls']} 次 ({stats['slow']['ewma_latency_ms']}ms)")
+        assert stats["fast"]["ewma_latency_ms"] < stats["slow"]["ewma_latency_ms"]
+        assert stats["fast"]["calls"] > 30
+        router.close()
+    finally:
+        fast.close()
+        slow.close()
+
+
+def test_failover_without_mock():
+    """测试失败切换：故障供应商连续失败后冷却，全部失败时返回失败标记而不是模拟内容"""
+    print("\n=== 测试失败切换 ===")
+    broken, healthy = StubLLMServer("broken", status=500), StubLLMServer("healthy")
+    try:
+        router = make_router(LLMProvider("broken", broken.base_url, ["*"], weight=100),
+                             LLMProvider("healthy", healthy.base_url, ["*"]), failure_threshold=1)
+        results = [router.complete("m", "", str(i)) for i in range(10)]
+        assert results == [f"healthy:{i}" for i in range(10)]
+        stats = router.get_stats()
+        assert stats["broken"]["failures"] == 1 and not stats["broken"]["healthy"]
+        assert stats["healthy"]["calls"] == 10
+
+        # 所有供应商都失败
+        healthy.status = 503
+        set_llm_router(make_router(LLMProvider("broken", broken.base_url, ["xunfei_spark_v4"]),
+                                   LLMProvider("healthy", healthy.base_url, ["xunfei_spark_v4"])))
+        try:
+            result = ai_section_processor.call_llm("xunfei_spark_v4", "系统", "用户")
+            assert result.startswith("[AI生成失败]") and "broken" in result and "healthy" in result
+            # 未配置供应商的模型仍使用模拟生成
+            assert not ai_section_processor.call_llm("other_model", "系统", "企业名称：甲").startswith("[AI生成失败]")
+        finally:
+            set_llm_router(None)
+        router.close()
+    finally:
+        broken.close()
+        healthy.close()
+
+
+def test_concurrency_limit():
+    """测试每个供应商的并发上限：超出上限的请求分流到其他供应商或排队等待"""
+    print("\n=== 测试并发上限 ===")
+    first, second = StubLLMServer("first", delay=0.1), StubLLMServer("second", delay=0.1)
+    try:
+        router = make_router(LLMProvider("first", first.base_url, ["*"], max_concurrency=2),
+                             LLMProvider("second", second.base_url, ["*"], max_concurrency=1))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: router.complete("m", "", str(i)), range(9)))
+        assert sorted(int(result.split(":")[1]) for result in results) == list(range(9))
+        print(f"最大并发: first={first.max_in_flight}, second={second.max_in_flight}")
+        assert first.max_in_flight <= 2 and second.max_in_flight <= 1
+        assert len(first.requests) + len(second.requests) == 9 and second.requests
+
+        # 排队超时
+        blocked = make_router(LLMProvider("first", first.base_url, ["*"], max_concurrency=1), queue_timeout=0.05)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(blocked.complete, "m", "", str(i)) for i in range(2)]
+            errors = [future.exception() for future in futures]
+        assert sum(isinstance(error, LLMRouterError) for error in errors) == 1
+        router.close()
+        blocked.close()
+    finally:
+        first.close()
+        second.close()
+
+
+def test_streaming_failover():
+    """测试流式调用：首个片段之前失败时切换供应商，astream_llm 输出真实内容"""
+    print("\n=== 测试流式调用 ===")
+    broken, healthy = StubLLMServer("broken", status=502), StubLLMServer("healthy")
+    set_llm_router(make_router(LLMProvider("broken", broken.base_url, ["xunfei_spark_v4"], weight=100),
+                               LLMProvider("healthy", healthy.base_url, ["xunfei_spark_v4"])))
+    try:
+        async def collect():
+            chunks = [chunk async for chunk in ai_section_processor.astream_llm("xunfei_spark_v4", "系统", "应急组织机构")]
+            content = await ai_section_processor.get_llm_router().acomplete("xunfei_spark_v4", "", "结论")
+            return chunks, content
+
+        chunks, content = asyncio.run(collect())
+        assert "".join(chunks) == "healthy:应急组织机构" and len(chunks) > 1
+        assert content == "healthy:结论"
+        stats = ai_section_processor.get_llm_router().get_stats()
+        assert stats["broken"]["failures"] >= 1 and stats["healthy"]["calls"] == 2
+    finally:
+        set_llm_router(None)
+        broken.close()
+        healthy.close()
+
+
+def test_stream_closed_early_releases_slot():
+    """测试消费方提前关闭流（客户端断开）或取消任务后归还并发名额，不计为供应商失败"""
+    print("\n=== 测试流式调用提前关闭 ===")
+    stub = StubLLMServer("stub", delay=0.05)
+    router = make_router(LLMProvider("stub", stub.base_url, ["m"], max_concurrency=1), queue_timeout=1)
+    try:
+        async def close_after_first_chunk():
+            stream = router.astream("m", "", "应急组织机构")
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        async def cancel_before_first_chunk():
+            async def consume():
+                return [chunk async for chunk in router.astream("m", "", "取消")]
+
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        async def run():
+            assert await close_after_first_chunk() == "stub"
+            assert router.get_stats()["stub"]["in_flight"] == 0
+            await cancel_before_first_chunk()
+            assert router.get_stats()["stub"]["in_flight"] == 0
+            # 名额已归还，下一次调用不需要等待
+            return "".join([chunk async for chunk in router.astream("m", "", "结论")])
+
+        assert asyncio.run(run()) == "stub:结论"
+        stats = router.get_stats()["stub"]
+        assert stats["in_flight"] == 0 and stats["failures"] == 0
+    finally:
+        stub.close()
+
+
+def test_async_clients_closed():
+    """测试事件循环变化时按事件循环保留异步客户端，aclose 关闭全部连接"""
+    print("\n=== 测试异步客户端关闭 ===")
+    stub = StubLLMServer("stub")
+    provider = LLMProvider("stub", stub.base_url, ["m"])
+    router = make_router(provider)
+    try:
+        async def complete():
+            assert await router.acomplete("m", "", "结论") == "stub:结论"
+            return provider.get_async_client()
+
+        first = asyncio.run(complete())
+        second = asyncio.run(complete())
+        assert second is not first and len(provider._async_clients) == 1
+
+        async def close():
+            client = await complete()
+            await router.aclose()
+            return client
+
+        assert asyncio.run(close()).is_closed and len(provider._async_clients) == 0
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    test_model_mapping()
+    test_latency_based_selection()
+    test_failover_without_mock()
+    test_concurrency_limit()
+    test_streaming_failover()
+    test_stream_closed_early_releases_slot()
+    test_async_clients_closed()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试内存缓存后端：有界LRU、字节上限、过期堆清理与统计信息
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.cache_service import MemoryCacheBackend, CacheService
+
+
+class _Clock:
+    """可手动推进的单调时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_by_entries():
+    """测试超过最大条目数时淘汰最久未使用的键"""
+    print("\n=== 测试条目数上限 ===")
+    backend = MemoryCacheBackend(max_entries=3)
+    for key in ("a", "b", "c"):
+        backend.set(key, key.upper())
+
+    assert backend.get("a") == "A"  # a 变为最近使用
+    backend.set("d", "D")
+
+    assert backend.get("b") is None, "最久未使用的 b 应被淘汰"
+    assert [backend.get(key) for key in ("a", "c", "d")] == ["A", "C", "D"]
+    assert backend.get_stats()["evictions"] == 1
+
+
+def test_lru_eviction_by_bytes():
+    """测试超过最大字节数时淘汰，且覆盖写入不重复计算字节"""
+    print("\n=== 测试字节上限 ===")
+    backend = MemoryCacheBackend(max_entries=100, max_bytes=30)
+    backend.set("a", "中" * 5)  # 15 字节
+    backend.set("a", "中" * 5)
+    assert backend.get_stats()["bytes"] == 15
+
+    backend.set("b", "x" * 10)
+    backend.set("c", "y" * 10)  # 合计 35 字节，淘汰 a
+    stats = backend.get_stats()
+    print(f"统计: {stats}")
+    assert backend.get("a") is None
+    assert stats["bytes"] == 20 and stats["entries"] == 2
+
+    assert backend.set("big", "z" * 31) is False, "超过总容量的值不应写入"
+    assert backend.get_stats()["rejected"] == 1
+
+
+def test_expiry_sweep_without_reads():
+    """测试过期键在写入时被批量清理，无需逐个读取"""
+    print("\n=== 测试过期堆清理 ===")
+    clock = _Clock()
+    with patch("app.services.cache_service.time.monotonic", clock):
+        backend = MemoryCacheBackend(max_entries=1000)
+        for i in range(100):
+            backend.set(f"short_{i}", "v", ttl=10)
+        backend.set("long", "v", ttl=100)
+        assert backend.exists("short_0")
+
+        clock.now += 11
+        backend.set("trigger", "v", ttl=100)
+        stats = backend.get_stats()
+        print(f"统计: {stats}")
+        assert stats["entries"] == 2
+        assert stats["expirations"] == 100
+        assert backend.get("long") == "v"
+
+        # 反复覆盖同一个键，堆中残留记录保持有界
+        for _ in range(1000):
+            backend.set("hot", "v", ttl=100)
+        assert len(backend._expiry_heap) <= 2 * len(backend._cache) + 64
+
+
+def test_overwritten_key_not_expired_early():
+    """测试覆盖写入延长过期时间后，旧的堆记录不会删除新值"""
+    print("\n=== 测试覆盖写入的过期时间 ===")
+    clock = _Clock()
+    with patch("app.services.cache_service.time.monotonic", clock):
+        backend = MemoryCacheBackend()
+        backend.set("k", "old", ttl=10)
+        backend.set("k", "new", ttl=100)
+        clock.now += 11
+        backend.set("other", "v")
+        assert backend.get("k") == "new"
+
+
+def test_stats_exposed_through_service():
+    """测试淘汰与过期统计通过 CacheService.get_stats 暴露"""
+    print("\n=== 测试统计信息 ===")
+    service = CacheService(MemoryCacheBackend(max_entries=1))
+    service.set("a", {"v": 1})
+    service.set("b", {"v": 2})
+    assert service.get("a") is None
+    assert service.get("b") == {"v": 2}
+
+    stats = service.get_stats()
+    print(f"统计: {stats}")
+    assert stats["backend"]["backend"] == "memory"
+    assert stats["backend"]["evictions"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+if __name__ == "__main__":
+    test_lru_eviction_by_entries()
+    test_lru_eviction_by_bytes()
+    test_expiry_sweep_without_reads()
+    test_overwritten_key_not_expired_early()
+    test_stats_exposed_through_service()
+    print("\n✅ 所有测试完成!")
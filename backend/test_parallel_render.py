@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试文档并发渲染：结果与串行一致、字数统计与各文档耗时
+"""
+
+import os
+import re
+import sys
+import json
+import time
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "test-secret-key-for-parallel-render-tests")
+
+from app.services.document_generator import document_generator
+from app.services.section_cache import section_cache
+from app.utils.text_stats import count_words
+from app.routes import enterprise as enterprise_routes
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_enterprise.json"), "r", encoding="utf-8") as f:
+    SAMPLE_DATA = json.load(f)
+
+V1_JOBS = {
+    "risk_report": ("template_risk_plan.jinja2", "风险评估报告"),
+    "emergency_plan": ("template_emergency_plan.jinja2", "应急预案"),
+    "resource_report": ("template_resource_investigation.jinja2", "应急资源调查报告")
+}
+
+
+def _fake_llm(model, system, user, user_id=None):
+    return "依据HJ941-2018标准，企业环境风险等级为一般。" * 5
+
+
+def _legacy_count_words(html_content: str) -> int:
+    """原实现：移除标签与多余空白后逐字匹配中文字符"""
+    text = re.sub(r'<[^>]+>', '', html_content)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return len(re.findall(r'[一-鿿]', text)) + len(re.findall(r'\b[a-zA-Z]+\b', text))
+
+
+def _template_data():
+    with patch("app.services.document_generator.call_llm", side_effect=_fake_llm):
+        ai_sections = document_generator.build_ai_sections(SAMPLE_DATA, enable_compliance_check=False)
+    data = document_generator._prepare_template_data(SAMPLE_DATA)
+    data["ai_sections"] = ai_sections
+    return data
+
+
+def test_count_words_matches_legacy():
+    """测试字数统计与原实现一致"""
+    print("\n=== 测试字数统计 ===")
+    samples = [
+        "", "<p>应急预案</p>", "<b>abc</b>def 中文English混合 test123 <i>x</i>",
+        "HJ941-2018 标准\n\n  环境 风险", "<div class=\"a\">危险化学品：硫酸、盐酸</div>"
+    ]
+    template_data = _template_data()
+    samples += [document_generator.render_jinja(path, template_data) for path, _ in V1_JOBS.values()]
+    for sample in samples:
+        assert count_words(sample) == _legacy_count_words(sample), sample[:50]
+    print(f"应急预案字数: {count_words(samples[-2])}")
+
+
+def test_render_documents_matches_serial():
+    """测试并发渲染结果与逐个渲染一致，并返回各文档耗时"""
+    print("\n=== 测试并发渲染结果 ===")
+    template_data = _template_data()
+    rendered, timings = document_generator.render_documents(V1_JOBS, template_data)
+    print(f"耗时: {timings}")
+    for key, (path, _) in V1_JOBS.items():
+        content, word_count = rendered[key]
+        assert content == document_generator.render_jinja(path, template_data)
+        assert word_count == count_words(content)
+        assert set(timings["documents"][key]) == {"render_ms", "word_count_ms", "total_ms"}
+    assert timings["wall_ms"] >= 0
+
+
+def test_renders_run_concurrently():
+    """测试三个文档并发渲染，总耗时约等于最慢的文档"""
+    print("\n=== 测试并发执行 ===")
+    original = document_generator.render_jinja
+
+    def slow_render(template_name, data):
+        time.sleep(0.2)
+        return original(template_name, data)
+
+    template_data = _template_data()
+    with patch.object(document_generator, "render_jinja", side_effect=slow_render):
+        start = time.perf_counter()
+        rendered, timings = document_generator.render_documents(V1_JOBS, template_data)
+        elapsed = time.perf_counter() - start
+    print(f"总耗时: {elapsed:.2f}秒")
+    assert all(content for content, _ in rendered.values())
+    assert elapsed < 0.45, "三个文档应并发渲染"
+
+
+def test_generation_response_uses_precomputed_counts():
+    """测试生成结果包含字数与耗时，构建响应时不再重复统计字数"""
+    print("\n=== 测试生成响应 ===")
+    section_cache.invalidate()
+    with patch("app.services.document_generator.call_llm", side_effect=_fake_llm):
+        result = document_generator.generate_all_documents(SAMPLE_DATA, use_v2=False)
+    assert result["success"]
+    assert set(result["word_counts"]) == set(V1_JOBS)
+    assert set(result["render_timings"]["documents"]) == set(V1_JOBS)
+
+    with patch.object(enterprise_routes, "count_words", side_effect=AssertionError("不应重复统计字数")):
+        response = enterprise_routes.build_generation_response(result, {"id": 1, "name": "测试企业"})
+    tabs = {tab["id"]: tab for tab in response.data["tabs"]}
+    assert tabs["emergency_plan"]["word_count"] == result["word_counts"]["emergency_plan"]
+    assert response.data["render_timings"] == result["render_timings"]
+
+    # V2 模板同样并发渲染全部文档
+    with patch("app.services.document_generator.call_llm", side_effect=_fake_llm):
+        result_v2 = document_generator.generate_all_documents(SAMPLE_DATA)
+    assert result_v2["success"]
+    assert len(result_v2["render_timings"]["documents"]) == len(document_generator.get_all_document_types())
+
+
+if __name__ == "__main__":
+    test_count_words_matches_legacy()
+    test_render_documents_matches_serial()
+    test_renders_run_concurrently()
+    test_generation_response_uses_precomputed_counts()
+    print("\n✅ 所有测试完成!")
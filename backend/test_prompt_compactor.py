@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+测试提示词压缩：紧凑 JSON 与列表摘要、按声明字段投影、模型 token 预算、每次调用的 token 统计
+"""
+
+import os
+import sys
+import copy
+import json
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "prompt-compactor-secret-key-0123456789")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.prompts.prompt_compactor import (
+    compact_json, project_fields, fit_prompt, truncate_to_tokens, get_token_budget, prompt_budget_stats
+)
+from app.prompts.ai_sections_loader import ai_sections_loader
+from app.services.document_generator import document_generator
+from app.services.compliance_repair import retry_cost_tracker
+from app.services.section_cache import section_cache
+from app.utils.auth import get_current_user
+from app.utils.text_stats import estimate_tokens
+from app.routes import docs
+from benchmark_prompt_compaction import scale_enterprise, legacy_render_user_template
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_enterprise.json"), "r", encoding="utf-8") as f:
+    SAMPLE_DATA = json.load(f)
+
+
+def test_compact_json_and_projection():
+    """测试紧凑 JSON 去掉空值与空格、长列表摘要，投影只保留声明的字段且不修改原数据"""
+    print("\n=== 测试紧凑 JSON 与投影 ===")
+    data = {"name": "甲", "empty": "", "none": None, "zero": 0, "flag": False,
+            "items": [{"n": i, "note": ""} for i in range(12)], "nested": {"list": []}}
+    assert compact_json(data) == ('{"name":"甲","zero":0,"flag":false,"items":[{"n":0},{"n":1},{"n":2},{"n":3},'
+                                  '{"n":4},{"n":5},{"n":6},{"n":7},{"n":8},{"n":9},"等12项"]}')
+    assert '"items":[{"n":0},"等12项"]' in compact_json(data, 3)
+
+    original = copy.deepcopy(SAMPLE_DATA)
+    projected = project_fields(SAMPLE_DATA, ["basic_info.address.city", "basic_info.address", "basic_info.company_name", "x.y"])
+    assert projected == {"basic_info": {"address": SAMPLE_DATA["basic_info"]["address"],
+                                        "company_name": SAMPLE_DATA["basic_info"]["company_name"]}}
+    assert SAMPLE_DATA == original
+
+
+def test_section_prompt_projection():
+    """测试章节提示词只嵌入段落声明的字段，输出紧凑 JSON"""
+    print("\n=== 测试章节提示词投影 ===")
+    prompt = document_generator._build_section_prompt("enterprise_overview", SAMPLE_DATA)
+    assert SAMPLE_DATA["basic_info"]["company_name"] in prompt
+    assert SAMPLE_DATA["basic_info"]["credit_code"] not in prompt
+    assert '{\n  "' not in prompt
+
+    # 没有声明字段的章节保留完整数据块
+    unknown = document_generator._section_data_block("not_in_config", SAMPLE_DATA, "basic_info.address")
+    assert json.loads(unknown) == {key: value for key, value in SAMPLE_DATA["basic_info"]["address"].items() if value not in ("", None)}
+    print(f"企业概况提示词: {estimate_tokens(prompt)} tokens")
+
+
+def test_user_prompt_within_budget():
+    """测试大型企业数据的提示词不超过模型预算：逐级压缩，仍超出时截断"""
+    print("\n=== 测试 token 预算 ===")
+    large = scale_enterprise(SAMPLE_DATA, 30)
+    config = ai_sections_loader.get_section_config("risk_prevention_measures")
+    system_tokens = estimate_tokens(config["system_prompt"])
+    legacy_tokens = estimate_tokens(legacy_render_user_template(config["user_template"], large))
+    default = document_generator._render_user_prompt("risk_prevention_measures", config, large)
+    print(f"原实现: {legacy_tokens} tokens, 默认压缩: {estimate_tokens(default)} tokens")
+    assert estimate_tokens(default) < legacy_tokens / 2
+    assert get_token_budget(config["model"]) == 6000
+
+    prompt_budget_stats.reset()
+    budget = system_tokens + estimate_tokens(default) // 2
+    with patch.dict(os.environ, {"AI_PROMPT_TOKEN_BUDGET": str(budget)}):
+        compacted = document_generator._render_user_prompt("risk_prevention_measures", config, large)
+    stats = prompt_budget_stats.get_stats()["risk_prevention_measures"]
+    assert system_tokens + estimate_tokens(compacted) <= budget
+    assert stats["compacted"] == 1 and stats["truncated"] == 0
+    assert "等" in compacted and "（企业数据过长" not in compacted
+
+    with patch.dict(os.environ, {"AI_PROMPT_TOKEN_BUDGET": str(system_tokens + 40)}):
+        truncated = document_generator._render_user_prompt("risk_prevention_measures", config, large)
+    assert estimate_tokens(truncated) <= 40 and truncated.endswith("（企业数据过长，以下内容已省略）")
+    assert prompt_budget_stats.get_stats()["risk_prevention_measures"]["truncated"] == 1
+
+    assert truncate_to_tokens("短文本", 100) == "短文本"
+    assert fit_prompt(lambda level: "甲" * (40 - level * 10), 25)["level"] == 2
+
+
+def test_tokens_recorded_per_call():
+    """测试每次 LLM 调用记录 token 数与耗时，统计端点返回提示词与调用统计"""
+    print("\n=== 测试调用 token 统计 ===")
+    section_cache.invalidate()
+    retry_cost_tracker.reset()
+    prompt_budget_stats.reset()
+    with patch("app.services.document_generator.call_llm",
+               side_effect=lambda model, system, user, user_id=None: "依据HJ941-2018标准，企业环境风险等级为一般。"):
+        document_generator.build_ai_sections(SAMPLE_DATA, enable_compliance_check=False)
+        document_generator.generate_single_section("conclusion", scale_enterprise(SAMPLE_DATA, 2))
+
+    sections = ai_sections_loader.get_enabled_sections()
+    stats = retry_cost_tracker.get_stats()
+    assert set(stats["sections"]) == set(sections)
+    assert stats["totals"]["generate"]["calls"] == len(sections) + 1
+    conclusion = stats["sections"]["conclusion"]["generate"]
+    assert conclusion["calls"] == 2 and conclusion["completion_tokens"] == 2 * estimate_tokens("依据HJ941-2018标准，企业环境风险等级为一般。")
+
+    app = FastAPI()
+    app.include_router(docs.router)
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    body = TestClient(app).get("/api/docs/prompts/token_stats").json()
+    assert body["prompts"]["conclusion"]["renders"] == 2
+    assert body["calls"]["totals"]["generate"]["prompt_tokens"] > 0
+    print(f"提示词总 token: {body['calls']['totals']['generate']['prompt_tokens']}")
+
+
+if __name__ == "__main__":
+    test_compact_json_and_projection()
+    test_section_prompt_projection()
+    test_user_prompt_within_budget()
+    test_tokens_recorded_per_call()
+    print("\n✅ 所有测试完成!")
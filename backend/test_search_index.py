@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+测试全文检索：中文二元组分词与摘要、创建/修改/自动保存/删除（含项目级联删除）时同步索引、
+/search 相关度排序与摘要、列表接口检索正文与企业简介、索引关闭时回退 LIKE
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "search-index-secret-key-0123456789abcdef")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.document import Document
+from app.models.enterprise import EnterpriseInfo
+from app.routes import documents, enterprise, projects, search
+from app.services.count_service import count_service
+from app.services.search_index import (
+    SQLiteSearchBackend, bigram_tokens, make_snippet, query_phrases, search_index
+)
+from testing_utils import QUERIES, build_app, create_search_documents, create_users, fts_query, like_query
+
+ROUTERS = [documents, projects, enterprise, search]
+
+
+def list_titles(client, term: str):
+    response = client.get("/api/documents/", params={"search": term, "total_mode": "exact"})
+    assert response.status_code == 200, response.text
+    return sorted(document["title"] for document in response.json()["documents"])
+
+
+def test_tokenize_and_snippet():
+    """测试中文二元组分词、查询短语与摘要"""
+    print("\n=== 测试分词与摘要 ===")
+    assert bigram_tokens("应急预案 V2") == ["应急", "急预", "预案", "案", "v2"]
+    assert bigram_tokens("<水>") == ["水"]
+
+    backend = SQLiteSearchBackend()
+    assert backend.match_query(query_phrases("应急预案")) == '"应急 急预 预案"'
+    assert backend.match_query(query_phrases("文档1")) == '"文档 档 1" *'
+    assert backend.match_query(query_phrases("水 储罐")) == '"水" * AND "储罐"'
+    assert query_phrases("，。！") == []
+
+    content = "一" * 100 + "储罐区应设置围堰<及>导流设施" + "二" * 100
+    snippet = make_snippet(content, ["围堰"], length=40)
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "<mark>围堰</mark>" in snippet and "&lt;及&gt;" in snippet
+
+
+def test_index_sync_with_documents():
+    """测试创建、修改、自动保存、删除与项目级联删除后列表检索结果同步"""
+    print("\n=== 测试索引同步 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "search.db")
+        user_id, _ = create_users(db_path, "search", "other")
+        app, engine = build_app(db_path, user_id, ROUTERS)
+
+        with TestClient(app) as client:
+            created = client.post("/api/documents/", json={
+                "title": "突发环境事件应急预案", "content": "<p>储罐区应设置<b>围堰</b></p>"
+            }).json()
+            # 正文中的词可以检索到（原实现只匹配标题）
+            assert list_titles(client, "围堰") == ["突发环境事件应急预案"]
+            assert list_titles(client, "应急 围堰") == ["突发环境事件应急预案"]
+            assert list_titles(client, "应急 消防") == []
+
+            assert client.patch(f"/api/documents/{created['id']}", json={"title": "风险评估报告"}).status_code == 200
+            assert list_titles(client, "应急预案") == []
+            assert list_titles(client, "风险评估") == ["风险评估报告"]
+
+            # 自动保存修改正文后重建索引
+            saved = client.post(f"/api/documents/{created['id']}/autosave", json={
+                "content": "<p>配备消防沙与应急物资</p>", "version": created["version"]
+            })
+            assert saved.status_code == 200, saved.text
+            assert list_titles(client, "围堰") == []
+            assert list_titles(client, "消防沙") == ["风险评估报告"]
+
+            assert client.delete(f"/api/documents/{created['id']}").status_code == 200
+            assert list_titles(client, "消防沙") == []
+
+            project = client.post("/api/projects/", json={"title": "项目"}).json()
+            client.post("/api/documents/", json={"title": "项目文档", "content": "<p>废气排放</p>",
+                                                 "project_id": project["id"]})
+            assert list_titles(client, "废气") == ["项目文档"]
+            assert client.delete(f"/api/projects/{project['id']}").status_code == 200
+            assert list_titles(client, "废气") == []
+
+        with create_engine(f"sqlite:///{db_path}").connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM search_documents")).scalar() == 0
+        asyncio.run(engine.dispose())
+
+
+def test_ranked_search_api():
+    """测试 /search 按相关度排序、摘要、范围与分页，只返回当前用户的记录"""
+    print("\n=== 测试检索接口 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "ranked.db")
+        user_id, other_id = create_users(db_path, "search", "other")
+        with sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))() as session:
+            session.add_all([
+                Document(user_id=user_id, title="年度总结", content="<p>" + "其他内容。" * 30 + "开展了一次应急演练。</p>"),
+                Document(user_id=user_id, title="应急演练方案", content="<p>演练目的</p>"),
+                Document(user_id=other_id, title="应急演练记录", content="<p>应急演练</p>"),
+                EnterpriseInfo(user_id=user_id, enterprise_name="某化工有限公司",
+                               enterprise_intro="公司每年组织应急演练两次"),
+            ])
+            session.commit()
+        app, engine = build_app(db_path, user_id, ROUTERS)
+
+        with TestClient(app) as client:
+            result = client.get("/api/search/", params={"q": "应急演练"}).json()
+            hits = result["results"]
+            # 不同类型的分数不可比较，按类型内名次合并：各类型第一名在前
+            assert [(hit["kind"], hit["title"], hit["rank"]) for hit in hits] == [
+                ("documents", "应急演练方案", 1), ("enterprise_infos", "某化工有限公司", 1), ("documents", "年度总结", 2)
+            ]
+            document_scores = [hit["score"] for hit in hits if hit["kind"] == "documents"]
+            assert document_scores == sorted(document_scores)
+            summary = next(hit for hit in hits if hit["title"] == "年度总结")
+            assert summary["snippet"].startswith("…") and "<mark>应急演练</mark>" in summary["snippet"]
+            assert not result["has_next"]
+
+            scoped = client.get("/api/search/", params={"q": "应急演练", "scope": "enterprise_infos"}).json()
+            assert [hit["title"] for hit in scoped["results"]] == ["某化工有限公司"]
+
+            first = client.get("/api/search/", params={"q": "应急演练", "limit": 2}).json()
+            rest = client.get("/api/search/", params={"q": "应急演练", "limit": 2, "offset": 2}).json()
+            assert first["has_next"] and not rest["has_next"]
+            assert [hit["id"] for hit in first["results"] + rest["results"]] == [hit["id"] for hit in hits]
+
+            assert client.get("/api/search/", params={"q": "，"}).json()["results"] == []
+            assert client.get("/api/search/", params={"q": "应急", "scope": "projects"}).status_code == 422
+
+        asyncio.run(engine.dispose())
+
+
+def test_enterprise_list_search():
+    """测试企业信息列表检索简介与法人等字段"""
+    print("\n=== 测试企业信息检索 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "enterprise.db")
+        user_id, _ = create_users(db_path, "search", "other")
+        with sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))() as session:
+            first = EnterpriseInfo(user_id=user_id, enterprise_name="甲公司", industry="化工",
+                                   enterprise_intro="主要从事污水处理")
+            second = EnterpriseInfo(user_id=user_id, enterprise_name="乙公司", legal_representative_name="张三")
+            session.add_all([first, second])
+            session.commit()
+            first_id, second_id = first.id, second.id
+        app, engine = build_app(db_path, user_id, ROUTERS)
+
+        with TestClient(app) as client:
+            def ids(term):
+                infos = client.get("/api/enterprise/info", params={"search": term, "total_mode": "exact"}).json()
+                return sorted(info["id"] for info in infos["enterprise_infos"])
+
+            assert ids("污水") == [first_id]
+            assert ids("张三") == [second_id]
+            assert ids("公司") == [first_id, second_id]
+
+        asyncio.run(engine.dispose())
+
+
+def test_rebuild_and_disabled_fallback():
+    """测试批量插入后重建索引、与 LIKE 结果一致；关闭索引时列表按标题 LIKE 匹配、/search 返回 503"""
+    print("\n=== 测试重建索引与回退 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "rebuild.db")
+        user_id = create_search_documents(db_path, 200)
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        with sync_engine.connect() as conn:
+            for query in QUERIES:
+                assert conn.execute(fts_query(conn, user_id, query)).scalar() == \
+                    conn.execute(like_query(user_id, query)).scalar()
+        count_service.invalidate("documents", user_id)
+
+        with sessionmaker(bind=sync_engine)() as session:
+            session.execute(insert(Document), [{"title": "批量导入", "content": "<p>导入正文</p>", "user_id": user_id}])
+            assert search_index.rebuild(session.connection(), ["documents"])
+            session.commit()
+        sync_engine.dispose()
+
+        app, engine = build_app(db_path, user_id, ROUTERS)
+        with TestClient(app) as client:
+            assert list_titles(client, "导入正文") == ["批量导入"]
+
+            search_index.enabled = False
+            try:
+                # 回退为标题模糊匹配，不检索正文
+                assert list_titles(client, "导入正文") == []
+                assert list_titles(client, "批量") == ["批量导入"]
+                assert client.get("/api/search/", params={"q": "批量"}).status_code == 503
+            finally:
+                search_index.enabled = True
+
+        asyncio.run(engine.dispose())
+
+
+if __name__ == "__main__":
+    test_tokenize_and_snippet()
+    test_index_sync_with_documents()
+    test_ranked_search_api()
+    test_enterprise_list_search()
+    test_rebuild_and_disabled_fallback()
+    print("\n✅ 所有测试完成!")
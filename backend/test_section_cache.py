@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+测试AI段落结果缓存：内容寻址、LRU淘汰、TTL过期与按段落统计
+"""
+
+import os
+import sys
+import copy
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.section_cache import SectionCache, section_cache
+from app.services.document_generator import document_generator
+from app.prompts.ai_sections_loader import ai_sections_loader
+from app.prompts.ai_section_processor import render_user_template
+
+ENTERPRISE_DATA = {
+    "basic_info": {"company_name": "测试化工有限公司", "address": "XX工业园区"},
+    "production_process": {"hazardous_chemicals": [{"name": "硫酸", "amount": "10t"}]},
+    "environment_info": {"noise": {"sources": "风机", "measures": "隔声罩"}},
+    "compliance_info": {},
+    "emergency_resources": {}
+}
+
+
+def _counting_llm(calls):
+    """构造记录调用段落的LLM替身"""
+    def fake_llm(model, system, user, user_id=None):
+        calls.append(user)
+        return "依据HJ941-2018标准，企业环境风险等级为一般。" * 5
+    return fake_llm
+
+
+def test_key_is_content_addressed():
+    """测试缓存键只由提示词、模型、版本与生成方式决定"""
+    print("\n=== 测试缓存键 ===")
+    key = SectionCache.make_key("s", "m", "sys", "user", 1, "raw")
+    assert key == SectionCache.make_key("s", "m", "sys", "user", 1, "raw")
+    assert key != SectionCache.make_key("s", "m2", "sys", "user", 1, "raw")
+    assert key != SectionCache.make_key("s", "m", "sys", "user", 2, "raw")
+    assert key != SectionCache.make_key("s", "m", "sys", "user", 1, "checked")
+    assert SectionCache.make_key("s", "m", "ab", "c") != SectionCache.make_key("s", "m", "a", "bc")
+    print("✓ 缓存键区分各项输入")
+
+
+def test_lru_and_ttl():
+    """测试LRU淘汰与TTL过期"""
+    print("\n=== 测试LRU与TTL ===")
+    cache = SectionCache(max_entries=2, ttl=10)
+    now = [1000.0]
+    with patch("app.services.section_cache.time.monotonic", side_effect=lambda: now[0]):
+        cache.set("a", "k1", "内容1")
+        cache.set("b", "k2", "内容2")
+        assert cache.get("a", "k1") == "内容1"  # k1 变为最近使用
+        cache.set("c", "k3", "内容3")  # 淘汰最久未使用的 k2
+        assert cache.get("b", "k2") is None
+        assert cache.get("a", "k1") == "内容1"
+
+        now[0] += 11
+        assert cache.get("c", "k3") is None
+
+    assert not cache.set("a", "k4", "[AI生成失败: a] 超时"), "失败内容不应缓存"
+    stats = cache.get_stats()
+    print(f"统计: {stats}")
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+    assert stats["sections"]["a"] == {"hits": 2, "misses": 0, "sets": 1}
+    assert stats["sections"]["b"]["misses"] == 1
+
+
+def test_regenerate_only_changed_sections():
+    """测试表单小改动后只重新生成输入变化的段落"""
+    print("\n=== 测试增量重新生成 ===")
+    section_cache.invalidate()
+    calls = []
+    with patch("app.services.document_generator.call_llm", side_effect=_counting_llm(calls)):
+        first = document_generator.build_ai_sections(ENTERPRISE_DATA, enable_compliance_check=False)
+        first_calls = len(calls)
+
+        calls.clear()
+        again = document_generator.build_ai_sections(ENTERPRISE_DATA, enable_compliance_check=False)
+        assert calls == [], "输入未变化时不应调用LLM"
+        assert again == first
+
+        edited = copy.deepcopy(ENTERPRISE_DATA)
+        edited["environment_info"]["noise"]["measures"] = "隔声罩、减振基础"
+        document_generator.build_ai_sections(edited, enable_compliance_check=False)
+
+    changed = [
+        key for key, config in ai_sections_loader.get_enabled_sections().items()
+        if render_user_template(config["user_template"], ENTERPRISE_DATA) != render_user_template(config["user_template"], edited)
+    ]
+    print(f"首次调用: {first_calls}, 修改后调用: {len(calls)}, 输入变化的段落: {changed}")
+    assert first_calls == len(first)
+    assert 0 < len(calls) == len(changed) < first_calls
+
+
+def test_single_section_cache():
+    """测试单段落生成复用缓存"""
+    print("\n=== 测试单段落缓存 ===")
+    section_cache.invalidate()
+    calls = []
+    with patch("app.services.document_generator.call_llm", side_effect=_counting_llm(calls)):
+        first = document_generator.generate_single_section("enterprise_overview", ENTERPRISE_DATA)
+        second = document_generator.generate_single_section("enterprise_overview", ENTERPRISE_DATA)
+
+    assert len(calls) == 1
+    assert second["cached"] and second["content"] == first["content"]
+    assert section_cache.get_stats()["sections"]["enterprise_overview"]["hits"] >= 1
+
+
+if __name__ == "__main__":
+    test_key_is_content_addressed()
+    test_lru_and_ttl()
+    test_regenerate_only_changed_sections()
+    test_single_section_cache()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+测试请求合并（single-flight）：进程内合并、AI 服务与 call_llm 合并、跨工作进程锁
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.single_flight import SingleFlight, acoalesce_across_workers, llm_call_flight
+from app.services.cache_service import CacheService, MemoryCacheBackend, RedisCacheBackend
+from app.services.ai_service import AIService
+from app.prompts import ai_section_processor
+
+
+class FakeRedisClient:
+    """支持 SET NX PX 与释放锁脚本的 redis 客户端替身（忽略过期时间）"""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def set(self, key, value, nx=False, px=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def eval(self, script, numkeys, key, token):
+        with self._lock:
+            if self.data.get(key) == token:
+                del self.data[key]
+                return 1
+            return 0
+
+    def exists(self, key):
+        return 1 if key in self.data else 0
+
+
+def _redis_service() -> CacheService:
+    """构造使用假客户端的 Redis 缓存服务（跳过连接）"""
+    backend = RedisCacheBackend.__new__(RedisCacheBackend)
+    backend.client = FakeRedisClient()
+    return CacheService(backend)
+
+
+def test_do_coalesces_threads():
+    """测试并发线程只执行一次调用，结果与异常均共享"""
+    print("\n=== 测试线程合并 ===")
+    flight = SingleFlight("test", enabled=True)
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return "结果"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flight.do("k", work), range(5)))
+
+    stats = flight.get_stats()
+    print(f"统计: {stats}")
+    assert results == ["结果"] * 5
+    assert len(calls) == 1
+    assert stats["executions"] == 1 and stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+    # 调用完成后相同键重新执行
+    assert flight.do("k", lambda: "新结果") == "新结果"
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("生成失败")
+
+    def call_fail(_):
+        try:
+            flight.do("err", fail)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(pool.map(call_fail, range(3))) == ["生成失败"] * 3
+
+
+def test_ado_coalesces_coroutines():
+    """测试并发协程只执行一次调用，发起者取消不影响其他等待者"""
+    print("\n=== 测试协程合并 ===")
+    flight = SingleFlight("test_async", enabled=True)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "结果"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0)
+        others = [flight.ado("k", work) for _ in range(3)]
+        first.cancel()
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(main()) == ["结果"] * 3
+    assert len(calls) == 1
+    print(f"统计: {flight.get_stats()}")
+
+
+def test_call_llm_coalesced():
+    """测试相同提示词的并发 call_llm 只调用一次模型"""
+    print("\n=== 测试 call_llm 合并 ===")
+    calls = []
+    original = ai_section_processor.generate_mock_content
+
+    def counting(system, user):
+        calls.append(user)
+        return original(system, user)
+
+    with patch.object(ai_section_processor, "generate_mock_content", side_effect=counting):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(
+                lambda _: ai_section_processor.call_llm("gpt-4", "系统", "相同的用户提示词"), range(4)
+            ))
+        elapsed = time.perf_counter() - start
+
+    print(f"耗时: {elapsed:.2f}秒, 模型调用次数: {len(calls)}")
+    assert len(calls) == 1
+    assert len(set(results)) == 1
+    assert elapsed < 1.5, "合并后的调用不应串行等待"
+    assert llm_call_flight.get_stats()["coalesced"] >= 3
+
+
+def test_agenerate_coalesced_across_users():
+    """测试不同用户的相同请求只调用一次 API、只记录一次使用量"""
+    print("\n=== 测试 AI 服务合并 ===")
+    service = AIService()
+    service.api_key = "test-key"
+    calls = []
+
+    async def fake_call(prompt, config):
+        calls.append(prompt)
+        await asyncio.sleep(0.1)
+        return "生成内容"
+
+    async def main():
+        return await asyncio.gather(*[
+            service.agenerate("相同的 Prompt", {"model": "gpt-4"}, user_id=f"user_{i}", use_mock=False)
+            for i in range(3)
+        ])
+
+    with patch.object(service, "_acall_openai_with_retry", side_effect=fake_call):
+        results = asyncio.run(main())
+
+    usage = service.get_usage_stats()
+    print(f"结果: {results}, 使用量: {usage}")
+    assert results == ["生成内容"] * 3
+    assert len(calls) == 1
+
+    # 同步接口同样合并
+    sync_calls = []
+
+    def fake_sync_call(prompt, config):
+        sync_calls.append(prompt)
+        time.sleep(0.1)
+        return "同步内容"
+
+    with patch.object(service, "_call_openai_with_retry", side_effect=fake_sync_call):
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(
+                lambda i: service.generate("同步 Prompt", {"model": "gpt-4"}, user_id=f"u{i}", use_mock=False),
+                range(3)
+            ))
+    assert results == ["同步内容"] * 3 and len(sync_calls) == 1
+
+
+def test_cross_worker_lock():
+    """测试多个工作进程只有获得锁的一方生成，其余读取共享缓存"""
+    print("\n=== 测试跨进程锁 ===")
+    cache = _redis_service()
+    produced = []
+
+    def worker(name):
+        async def produce():
+            produced.append(name)
+            await asyncio.sleep(0.2)
+            cache.set("result", {"content": f"{name} 的结果"})
+            return f"{name} 的结果"
+
+        return acoalesce_across_workers(
+            cache, "same-key", produce,
+            lambda: (cache.get("result") or {}).get("content"),
+            poll_interval=0.02
+        )
+
+    async def main():
+        return await asyncio.gather(worker("A"), worker("B"), worker("C"))
+
+    results = asyncio.run(main())
+    print(f"结果: {results}, 生成方: {produced}")
+    assert produced == ["A"]
+    assert results == ["A 的结果"] * 3
+    assert not cache.exists("single_flight:same-key"), "生成完成后应释放锁"
+
+
+def test_cross_worker_leader_failure():
+    """测试锁持有者生成失败后，等待方自行生成"""
+    print("\n=== 测试持有者失败 ===")
+    cache = _redis_service()
+    produced = []
+
+    async def failing():
+        produced.append("A")
+        await asyncio.sleep(0.1)
+        raise RuntimeError("API 不可用")
+
+    async def succeeding():
+        produced.append("B")
+        return "B 的结果"
+
+    async def main():
+        leader = acoalesce_across_workers(cache, "k", failing, lambda: None, poll_interval=0.02)
+        follower = acoalesce_across_workers(cache, "k", succeeding, lambda: None, poll_interval=0.02)
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader_result, follower_result = asyncio.run(main())
+    assert isinstance(leader_result, RuntimeError)
+    assert follower_result == "B 的结果"
+    assert produced == ["A", "B"]
+
+    # 内存缓存不支持跨进程锁，直接生成
+    async def direct():
+        return "直接生成"
+
+    memory = CacheService(MemoryCacheBackend())
+    assert asyncio.run(acoalesce_across_workers(memory, "k", direct, lambda: None)) == "直接生成"
+
+
+if __name__ == "__main__":
+    test_do_coalesces_threads()
+    test_ado_coalesces_coroutines()
+    test_call_llm_coalesced()
+    test_agenerate_coalesced_across_users()
+    test_cross_worker_lock()
+    test_cross_worker_leader_failure()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+测试 SQLite 生产模式：连接 PRAGMA、单连接写引擎（BEGIN IMMEDIATE）、并发自动保存不再出现锁冲突
+"""
+
+import os
+import sys
+import asyncio
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "sqlite-profile-secret-key-0123456789abcd")
+
+from sqlalchemy import create_engine, text
+
+from app.database import create_async_db_engine, is_sqlite_file
+from app.utils.sqlite_profile import get_sqlite_pragmas, setup_sqlite_profile
+from benchmark_sqlite_writer import run_mode
+
+
+def test_pragmas_applied_on_connect():
+    """测试同步与异步引擎的连接都应用了 PRAGMA 配置"""
+    print("\n=== 测试连接 PRAGMA ===")
+    assert is_sqlite_file("sqlite:///./yueen.db") and not is_sqlite_file("sqlite://")
+    with patch.dict(os.environ, {"SQLITE_BUSY_TIMEOUT": "1234"}):
+        assert get_sqlite_pragmas()["busy_timeout"] == "1234"
+
+    expected = {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "temp_store": 2,
+                "cache_size": -65536, "mmap_size": 268435456, "foreign_keys": 1}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/sync.db")
+        setup_sqlite_profile(engine)
+        with engine.connect() as conn:
+            values = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in expected}
+        assert values == expected
+        engine.dispose()
+
+        async def read_async_pragmas():
+            async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp}/async.db")
+            async with async_engine.connect() as conn:
+                result = {name: (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar() for name in expected}
+            await async_engine.dispose()
+            return result
+
+        assert asyncio.run(read_async_pragmas()) == expected
+
+
+def test_writer_engine_takes_write_lock_immediately():
+    """测试写引擎只有一个连接，事务开始即获取写锁，其他连接的写事务需等待"""
+    print("\n=== 测试写引擎 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "writer.db")
+        sqlite3.connect(path).execute("CREATE TABLE t (v INTEGER)")
+
+        async def check():
+            writer = create_async_db_engine(f"sqlite+aiosqlite:///{path}", writer=True)
+            assert writer.sync_engine.pool.size() == 1 and writer.sync_engine.pool._max_overflow == 0
+            async with writer.connect() as conn:
+                # 只执行读取，事务已持有写锁
+                await conn.execute(text("SELECT count(*) FROM t"))
+                other = sqlite3.connect(path, timeout=0)
+                try:
+                    other.execute("BEGIN IMMEDIATE")
+                    assert False, "写引擎事务未持有写锁"
+                except sqlite3.OperationalError as e:
+                    assert "locked" in str(e)
+                finally:
+                    other.close()
+                await conn.execute(text("INSERT INTO t VALUES (1)"))
+                await conn.commit()
+            await writer.dispose()
+
+        asyncio.run(check())
+        assert sqlite3.connect(path).execute("SELECT count(*) FROM t").fetchone()[0] == 1
+
+
+def test_concurrent_autosaves_without_lock_errors():
+    """测试并发自动保存：生产模式下全部成功，保存后读取正常"""
+    print("\n=== 测试并发自动保存 ===")
+    writers, saves = 30, 4
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = asyncio.run(run_mode(os.path.join(tmp, "autosave.db"), writers, saves, tuned=True))
+    print(f"耗时: {stats['elapsed']:.2f}s, 成功: {stats['ok']}, 失败: {stats['errors']}")
+    assert stats["ok"] == writers * saves and stats["errors"] == 0
+    assert stats["reads_ok"] == writers * saves
+
+
+if __name__ == "__main__":
+    test_pragmas_applied_on_connect()
+    test_writer_engine_takes_write_lock_immediately()
+    test_concurrent_autosaves_without_lock_errors()
+    print("\n✅ 所有测试完成!")
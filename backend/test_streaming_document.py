@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+测试文档流式渲染：增量字数统计、分段渲染结果与 SSE 文档端点
+"""
+
+import os
+import sys
+import json
+import random
+import tracemalloc
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "streaming-document-secret-key-0123456789")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.document_generator import document_generator
+from app.utils.auth import get_current_user
+from app.utils.text_stats import StreamingWordCounter, count_words
+from app.routes import docs
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_enterprise.json"), "r", encoding="utf-8") as f:
+    SAMPLE_DATA = json.load(f)
+
+
+def _fake_llm(model, system, user, user_id=None):
+    return "依据HJ941-2018标准，企业环境风险等级为一般。" * 5
+
+
+def _prepare(document_type="emergency_plan"):
+    with patch("app.services.document_generator.call_llm", side_effect=_fake_llm):
+        prepared = document_generator.prepare_single_document(document_type, SAMPLE_DATA)
+    assert prepared["success"], prepared["errors"]
+    return prepared
+
+
+def _count_streamed(text, max_size):
+    counter = StreamingWordCounter()
+    i = 0
+    while i < len(text):
+        size = random.randint(1, max_size)
+        counter.feed(text[i:i + size])
+        i += size
+    return counter.finish()
+
+
+def test_streaming_word_counter():
+    """测试增量字数统计与 count_words 一致（片段边界落在标签、单词中间）"""
+    print("\n=== 测试增量字数统计 ===")
+    random.seed(3)
+    samples = [
+        "", "<p>应急预案</p>", "<b>abc</b>def 中文English混合 test123 <i>x</i>",
+        "a < b 且 c > d", "未闭合 <span 标签", "<<p>>HJ941-2018 标准<br/>环境 risk"
+    ]
+    prepared = _prepare()
+    samples.append(document_generator.render_jinja(prepared["template_path"], prepared["template_data"]))
+    for text in samples:
+        for max_size in (1, 3, 17, 500):
+            assert _count_streamed(text, max_size) == count_words(text), (text[:40], max_size)
+    print(f"✓ 文档字数: {count_words(samples[-1])}")
+
+
+def test_stream_document_matches_render():
+    """测试分段渲染拼接后与整体渲染一致，片段按配置大小合并"""
+    print("\n=== 测试分段渲染 ===")
+    prepared = _prepare()
+    expected = document_generator.render_jinja(prepared["template_path"], prepared["template_data"])
+
+    with patch.object(document_generator, "stream_chunk_size", 256):
+        chunks = list(document_generator.stream_document(prepared["template_path"], prepared["template_data"]))
+    print(f"片段数: {len(chunks)}")
+    assert len(chunks) > 1
+    assert "".join(chunks) == expected
+    assert all(len(chunk) >= 256 for chunk in chunks[:-1])
+
+    # 首个片段在渲染完成前产出，且流式渲染不在内存中保留完整文档
+    big_data = dict(prepared["template_data"])
+    big_data["ai_sections"] = {key: value * 50 for key, value in prepared["template_data"]["ai_sections"].items()}
+    tracemalloc.start()
+    document_generator.render_jinja(prepared["template_path"], big_data)
+    _, full_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    stream = document_generator.stream_document(prepared["template_path"], big_data)
+    first = next(stream)
+    assert len(first) < len(expected) * 50
+    for _ in stream:
+        pass
+    _, stream_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"整体渲染峰值: {full_peak // 1024}KB, 流式渲染峰值: {stream_peak // 1024}KB")
+    assert stream_peak < full_peak
+
+
+def test_single_document_uses_rendered_word_count():
+    """测试单个文档生成返回 count_words 字数"""
+    print("\n=== 测试单个文档字数 ===")
+    with patch("app.services.document_generator.call_llm", side_effect=_fake_llm):
+        result = document_generator.generate_single_document("emergency_plan", SAMPLE_DATA)
+    assert result["success"]
+    assert result["word_count"] == count_words(result["content"])
+
+
+def test_document_stream_endpoint():
+    """测试 SSE 文档端点：meta、chunk、done 事件"""
+    print("\n=== 测试文档 SSE 端点 ===")
+    app = FastAPI()
+    app.include_router(docs.router)
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    client = TestClient(app)
+
+    with patch("app.services.document_generator.call_llm", side_effect=_fake_llm), \
+            patch.object(document_generator, "stream_chunk_size", 512):
+        response = client.post(
+            "/api/docs/generate_document/stream",
+            json={"document_type": "emergency_plan", "enterprise_data": SAMPLE_DATA}
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = block.split("\n")
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+
+    assert events[0][0] == "meta" and events[0][1]["title"] == "突发环境事件应急预案"
+    assert events[-1][0] == "done"
+    chunks = [data["content"] for event, data in events if event == "chunk"]
+    content = "".join(chunks)
+    print(f"✓ 收到 {len(chunks)} 个片段，字数 {events[-1][1]['word_count']}")
+    assert len(chunks) > 1
+    assert events[-1][1]["word_count"] == count_words(content)
+
+    response = client.post(
+        "/api/docs/generate_document/stream",
+        json={"document_type": "not_exists", "enterprise_data": SAMPLE_DATA}
+    )
+    assert "event: error" in response.text
+
+
+if __name__ == "__main__":
+    test_streaming_word_counter()
+    test_stream_document_matches_render()
+    test_single_document_uses_rendered_word_count()
+    test_document_stream_endpoint()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+测试AI段落流式生成：增量后处理、SSE 输出与缓存写入
+"""
+
+import os
+import sys
+import json
+import random
+import asyncio
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "streaming-test-secret-key-0123456789abcdef")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.prompts.ai_section_processor import (
+    IncrementalOutputProcessor, collapse_blank_lines, postprocess_ai_output
+)
+from app.prompts.template_validator import TemplateValidator
+from app.services.document_generator import document_generator
+from app.services.section_cache import section_cache
+from app.utils.auth import get_current_user
+from app.routes import ai_generate, docs
+
+validator = TemplateValidator()
+
+SAMPLE_OUTPUTS = [
+    "  \n\n企业位于XX工业园区。\n\n\n\n<p onclick='steal()'>主导风向为东南风</p>\n  \n\n结论如下。\n\n",
+    "<script>alert(1)</script>  企业概况\n\n\n\n<iframe src=x>内容</iframe>结尾  ",
+    "正文 ONLOAD = \"bad()\" 继续<b>加粗</b>\n\n\n\n\n最后一段",
+]
+
+
+def _stream_through(processor: IncrementalOutputProcessor, text: str) -> str:
+    """以随机片段长度模拟 token 流"""
+    parts = []
+    i = 0
+    while i < len(text):
+        size = random.randint(1, 8)
+        parts.append(processor.feed(text[i:i + size]))
+        i += size
+    parts.append(processor.flush())
+    return "".join(parts)
+
+
+def test_incremental_sanitize_matches_batch():
+    """测试增量清理结果与整段 sanitize_output 一致"""
+    print("\n=== 测试增量清理 ===")
+    random.seed(42)
+    for text in SAMPLE_OUTPUTS:
+        for _ in range(50):
+            processor = IncrementalOutputProcessor([validator.sanitize_fragment])
+            streamed = _stream_through(processor, text)
+            assert streamed == validator.sanitize_output(text), repr(streamed)
+            assert processor.get_text() == streamed
+    print("✓ 增量清理与整段清理结果一致")
+
+
+def test_incremental_postprocess_matches_batch():
+    """测试增量后处理结果与整段 postprocess_ai_output 一致"""
+    print("\n=== 测试增量后处理 ===")
+    random.seed(7)
+    for text in SAMPLE_OUTPUTS:
+        for _ in range(50):
+            processor = IncrementalOutputProcessor([collapse_blank_lines])
+            assert _stream_through(processor, text) == postprocess_ai_output(text)
+    print("✓ 增量后处理与整段后处理结果一致")
+
+
+def test_stream_single_section_matches_batch():
+    """测试流式段落生成与普通段落生成内容一致"""
+    print("\n=== 测试流式段落生成 ===")
+    enterprise_data = {"basic_info": {"company_name": "测试化工有限公司"}}
+    section_cache.invalidate()
+
+    async def collect():
+        chunks = []
+        async for chunk in document_generator.astream_single_section("enterprise_overview", enterprise_data):
+            chunks.append(chunk)
+        return chunks
+
+    chunks = asyncio.run(collect())
+    batch = document_generator.generate_single_section("enterprise_overview", enterprise_data)
+
+    print(f"片段数: {len(chunks)}")
+    assert len(chunks) > 1, "内容未分段返回"
+    assert "".join(chunks) == batch["content"]
+
+
+def test_section_stream_endpoint():
+    """测试 SSE 端点的事件格式"""
+    print("\n=== 测试 SSE 端点 ===")
+    app = FastAPI()
+    app.include_router(docs.router)
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/docs/generate_section/stream",
+        json={"section_key": "enterprise_overview", "enterprise_data": {"basic_info": {"company_name": "测试企业"}}}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = block.split("\n")
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+
+    tokens = [data["content"] for event, data in events if event == "token"]
+    assert events[-1][0] == "done"
+    assert "".join(tokens) == events[-1][1]["content"]
+    print(f"✓ 收到 {len(tokens)} 个 token 事件")
+
+    response = client.post(
+        "/api/docs/generate_section/stream",
+        json={"section_key": "not_exists", "enterprise_data": {}}
+    )
+    assert "event: error" in response.text
+
+
+def test_generate_stream_prepare_error():
+    """测试 /ai/generate/stream 加载模板出错时返回 SSE error 事件而不是 500"""
+    print("\n=== 测试流式生成准备阶段出错 ===")
+    app = FastAPI()
+    app.include_router(ai_generate.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    client = TestClient(app)
+
+    with patch.object(ai_generate.template_loader, "get_template_info", side_effect=OSError("模板目录不可读")):
+        response = client.post(
+            "/api/ai/generate/stream",
+            json={"template_id": "risk_assessment", "section_id": "overview", "data": {}}
+        )
+    assert response.status_code == 200
+    assert response.text.startswith("event: error")
+    assert "模板目录不可读" in response.text
+
+
+if __name__ == "__main__":
+    test_incremental_sanitize_matches_batch()
+    test_incremental_postprocess_matches_batch()
+    test_stream_single_section_matches_batch()
+    test_section_stream_endpoint()
+    test_generate_stream_prepare_error()
+    print("\n✅ 所有测试完成!")
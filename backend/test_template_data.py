@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试模板数据准备：与原实现结果一致、不复制也不修改企业数据、每次请求只准备一次
+"""
+
+import os
+import sys
+import copy
+import json
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.document_generator import document_generator, TEMPLATE_DEFAULTS
+from app.services.section_cache import section_cache
+from benchmark_template_data import legacy_prepare_template_data
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_enterprise.json"), "r", encoding="utf-8") as f:
+    SAMPLE_DATA = json.load(f)
+
+EDGE_CASES = [
+    {},
+    {"basic_info": {}},
+    {"basic_info": {"company_name": "测试企业", "risk_level": "重大", "address": "字符串地址"}},
+    {"basic_info": {"risk_level": "未知", "address": {"city": "杭州", "detail": "", "longitude": 120.1}},
+     "address": "顶层地址", "compile_unit": "编制单位"},
+    {"basic_info": {"contacts": {"legal_person": "非字典", "email": "a@b.c"}},
+     "emergency_resources": {"emergency_team": {}, "contact_list_internal": [{"name": "张三"}, "x"]}},
+    {"production_process": {"energy": "非字典", "products": [{"name": "产品"}]},
+     "environment_info": {"nearby_receivers": [{"receiver_type": "地表水"}, {"receiver_type": "居民区"}, "x"]}},
+    {"production_process": {"energy": {"natural_gas": 100, "water_consumption": 5}}, "products": "被覆盖"},
+]
+
+
+def test_matches_legacy():
+    """测试与原实现的结果一致"""
+    print("\n=== 测试结果一致 ===")
+    for enterprise_data in [SAMPLE_DATA] + EDGE_CASES:
+        prepared = document_generator._prepare_template_data(enterprise_data)
+        assert dict(prepared) == legacy_prepare_template_data(enterprise_data), enterprise_data
+    print(f"✓ 校验 {len(EDGE_CASES) + 1} 份企业数据")
+
+
+def test_zero_copy_and_immutable_defaults():
+    """测试不复制企业数据、写入不影响企业数据和默认值"""
+    print("\n=== 测试分层数据 ===")
+    enterprise_data = copy.deepcopy(SAMPLE_DATA)
+    original = copy.deepcopy(enterprise_data)
+
+    prepared = document_generator._prepare_template_data(enterprise_data)
+    assert prepared.maps[1] is enterprise_data
+    assert prepared["basic_info"] is enterprise_data["basic_info"]
+    assert prepared["products"] is enterprise_data["production_process"]["products"]
+
+    prepared["ai_sections"] = {"enterprise_overview": "内容"}
+    prepared["fax"] = "0571"
+    assert enterprise_data == original
+    assert TEMPLATE_DEFAULTS["fax"] == "/"
+
+    try:
+        TEMPLATE_DEFAULTS["fax"] = "0571"
+        raise AssertionError("默认值应为只读映射")
+    except TypeError:
+        pass
+
+
+def test_prepared_once_per_request():
+    """测试生成全部文档时只准备一次模板数据，各文档共用"""
+    print("\n=== 测试每次请求只准备一次 ===")
+    section_cache.invalidate()
+    original = document_generator._prepare_template_data
+    with patch("app.services.document_generator.call_llm",
+               side_effect=lambda model, system, user, user_id=None: "依据HJ941-2018标准，企业环境风险等级为一般。"), \
+            patch.object(document_generator, "_prepare_template_data", side_effect=original) as prepare:
+        result = document_generator.generate_all_documents(SAMPLE_DATA)
+    assert result["success"]
+    assert prepare.call_count == 1
+    print(f"✓ 渲染 {len(result['render_timings']['documents'])} 个文档")
+
+
+if __name__ == "__main__":
+    test_matches_legacy()
+    test_zero_copy_and_immutable_defaults()
+    test_prepared_once_per_request()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试两级缓存：L1 回填、失效与按层统计
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import cache_service as cache_module
+from app.services.cache_service import (
+    CacheBackend, MemoryCacheBackend, TieredCacheBackend, CacheService
+)
+
+
+class FakeRedisBackend(CacheBackend):
+    """记录调用次数的 Redis 后端替身"""
+
+    def __init__(self, redis_url: str = "redis://fake"):
+        self.data = {}
+        self.calls = {"get": 0, "set": 0, "delete": 0, "clear": 0}
+
+    def get(self, key):
+        self.calls["get"] += 1
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=3600):
+        self.calls["set"] += 1
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.calls["delete"] += 1
+        self.data.pop(key, None)
+        return True
+
+    def clear(self):
+        self.calls["clear"] += 1
+        self.data.clear()
+        return True
+
+    def exists(self, key):
+        return key in self.data
+
+    def get_stats(self):
+        return {"backend": "redis"}
+
+
+def _make_service():
+    l2 = FakeRedisBackend()
+    return CacheService(TieredCacheBackend(MemoryCacheBackend(max_entries=10), l2)), l2
+
+
+def test_read_through_populates_l1():
+    """测试 L1 未命中时读取 L2 并回填，之后的读取不再访问 L2"""
+    print("\n=== 测试L1回填 ===")
+    service, l2 = _make_service()
+    l2.data["section"] = '{"content": "段落"}'  # 其他实例写入的值
+
+    for _ in range(5):
+        assert service.get("section") == {"content": "段落"}
+    assert service.get("missing") is None
+
+    stats = service.get_stats()["backend"]
+    print(f"统计: {stats}")
+    assert l2.calls["get"] == 2, "热点键只应访问一次 L2"
+    assert stats["l1_hits"] == 4 and stats["l2_hits"] == 1 and stats["misses"] == 1
+
+
+def test_write_and_invalidate_both_tiers():
+    """测试写入两级、删除与清空同时失效 L1"""
+    print("\n=== 测试两级失效 ===")
+    service, l2 = _make_service()
+    service.set("doc", {"v": 1})
+    assert service.codec.decode(l2.data["doc"]) == {"v": 1}
+    assert service.get("doc") == {"v": 1}
+    assert l2.calls["get"] == 0, "刚写入的键应由 L1 命中"
+
+    service.delete("doc")
+    assert service.get("doc") is None and not service.exists("doc")
+
+    service.set("a", {"v": 1})
+    service.clear()
+    assert service.get("a") is None
+    assert l2.calls["clear"] == 1
+
+
+def test_get_cache_service_uses_tiers():
+    """测试配置 REDIS_URL 时默认启用两级缓存"""
+    print("\n=== 测试两级缓存选择 ===")
+    with patch.dict(os.environ, {"REDIS_URL": "redis://fake"}), \
+            patch.object(cache_module, "RedisCacheBackend", FakeRedisBackend), \
+            patch.object(cache_module, "_cache_service", None):
+        service = cache_module.get_cache_service()
+        assert isinstance(service.backend, TieredCacheBackend)
+
+    with patch.dict(os.environ, {"REDIS_URL": "redis://fake", "CACHE_L1_ENABLED": "false"}), \
+            patch.object(cache_module, "RedisCacheBackend", FakeRedisBackend), \
+            patch.object(cache_module, "_cache_service", None):
+        assert isinstance(cache_module.get_cache_service().backend, FakeRedisBackend)
+
+
+if __name__ == "__main__":
+    test_read_through_populates_l1()
+    test_write_and_invalidate_both_tiers()
+    test_get_cache_service_uses_tiers()
+    print("\n✅ 所有测试完成!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+测试 user_template 预编译渲染：与原实现输出一致、随配置文件 mtime 重新编译
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.prompts.ai_sections_loader import AISectionsLoader, ai_sections_loader
+from app.prompts.ai_section_processor import (
+    compile_user_template, render_compiled_template, render_user_template, MISSING_VALUE_TEXT
+)
+from app.services.document_generator import document_generator
+from benchmark_user_template import legacy_render_user_template
+
+SAMPLE_PATH = Path(__file__).parent / "sample_enterprise.json"
+
+
+def test_matches_legacy_renderer():
+    """测试全部段落的渲染结果与原实现一致"""
+    print("\n=== 测试渲染结果一致 ===")
+    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+        enterprise_data = json.load(f)
+
+    sections = ai_sections_loader.get_sections_config()
+    compiled_templates = ai_sections_loader.get_compiled_templates()
+    assert set(compiled_templates) == set(sections)
+
+    value_cache = {}
+    for key, config in sections.items():
+        expected = legacy_render_user_template(config["user_template"], enterprise_data)
+        assert render_compiled_template(compiled_templates[key], enterprise_data) == expected, key
+        assert render_compiled_template(compiled_templates[key], enterprise_data, value_cache) == expected, key
+        assert render_user_template(config["user_template"], {}) == legacy_render_user_template(config["user_template"], {})
+    print(f"共用取值缓存条目: {len(value_cache)}")
+
+    # 重复占位符、缺失值、列表与字典
+    template = "{a.b}/{a.c}/{missing}/{a.b}/{a.d}"
+    data = {"a": {"b": "值", "c": ["甲", "乙", "丙", "丁"], "d": {"k": 1}}}
+    assert render_user_template(template, data) == legacy_render_user_template(template, data)
+    assert render_user_template(template, data) == f'值/甲、乙、丙等4项/{MISSING_VALUE_TEXT}/值/{{"k":1}}'
+    assert render_user_template("没有占位符", data) == "没有占位符"
+
+
+def test_compiled_variables():
+    """测试编译结果记录的变量与 extract_template_variables 一致"""
+    print("\n=== 测试模板变量 ===")
+    for config in ai_sections_loader.get_sections_config().values():
+        template = config["user_template"]
+        expected = set(re.findall(r'\{([^}]+)\}', template))
+        assert set(ai_sections_loader.extract_template_variables(template)) == expected
+        assert set(compile_user_template(template).variables) == expected
+
+
+def test_recompiled_on_config_change():
+    """测试配置文件修改后重新编译"""
+    print("\n=== 测试配置变更重新编译 ===")
+    temp_dir = tempfile.mkdtemp()
+    try:
+        config_path = Path(temp_dir) / "ai_sections.json"
+        shutil.copy(ai_sections_loader.config_path, config_path)
+        loader = AISectionsLoader(str(config_path))
+
+        section_key = next(iter(loader.get_sections_config()))
+        first = loader.get_compiled_template(section_key)
+        assert loader.get_compiled_template(section_key) is first, "未修改时应复用编译结果"
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        config["sections"][section_key]["user_template"] = "企业：{basic_info.company_name}"
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False)
+        stat = config_path.stat()
+        os.utime(config_path, (stat.st_atime, stat.st_mtime + 10))
+
+        second = loader.get_compiled_template(section_key)
+        assert second is not first
+        assert second.render({"basic_info": {"company_name": "测试公司"}}) == "企业：测试公司"
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_generator_uses_compiled_templates():
+    """测试文档生成器使用预编译模板，传入自定义段落配置时按配置渲染"""
+    print("\n=== 测试文档生成器渲染 ===")
+    data = {"basic_info": {"company_name": "测试公司"}}
+    section_key = next(iter(ai_sections_loader.get_sections_config()))
+    config = ai_sections_loader.get_section_config(section_key)
+    assert document_generator._render_user_prompt(section_key, config, data) == \
+        render_user_template(config["user_template"], data)
+
+    custom = dict(config, user_template="自定义：{basic_info.company_name}")
+    assert document_generator._render_user_prompt(section_key, custom, data) == "自定义：测试公司"
+
+
+if __name__ == "__main__":
+    test_matches_legacy_renderer()
+    test_compiled_variables()
+    test_recompiled_on_config_change()
+    test_generator_uses_compiled_templates()
+    print("\n✅ 所有测试完成!")
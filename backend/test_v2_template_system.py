@@ -10,6 +10,7 @@ import sys
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
+from unittest.mock import patch
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent
@@ -110,6 +111,15 @@ def mock_postprocess_ai_output(content: str) -> str:
     """Mock后处理函数"""
     return content
 
+# 测试期间将AI相关函数替换为Mock版本，结束后恢复，避免影响其他测试
+mock_ai_functions = patch.multiple(
+    "app.prompts.ai_section_processor",
+    call_llm=mock_call_llm,
+    render_user_template=mock_render_user_template,
+    postprocess_ai_output=mock_postprocess_ai_output
+)
+
+@mock_ai_functions
 def test_v2_template_system():
     """测试V2模板系统"""
     print("=" * 60)
@@ -138,12 +148,6 @@ def test_v2_template_system():
         print(f"错误：文档生成器初始化失败 - {str(e)}")
         return False
     
-    # 替换AI相关函数为Mock版本
-    import app.prompts.ai_section_processor as processor
-    processor.call_llm = mock_call_llm
-    processor.render_user_template = mock_render_user_template
-    processor.postprocess_ai_output = mock_postprocess_ai_output
-    
     # 测试模板注册表加载
     print("\n测试模板注册表加载...")
     try:
@@ -203,6 +207,7 @@ def test_v2_template_system():
         print(f"错误：文档生成过程中发生异常 - {str(e)}")
         return False
 
+@mock_ai_functions
 def test_single_document_generation():
     """测试单个文档生成"""
     print("\n" + "=" * 60)
@@ -225,12 +230,6 @@ def test_single_document_generation():
         print(f"错误：文档生成器初始化失败 - {str(e)}")
         return False
     
-    # 替换AI相关函数为Mock版本
-    import app.prompts.ai_section_processor as processor
-    processor.call_llm = mock_call_llm
-    processor.render_user_template = mock_render_user_template
-    processor.postprocess_ai_output = mock_postprocess_ai_output
-    
     # 测试生成每种类型的文档
     document_types = generator.get_all_document_types()
     
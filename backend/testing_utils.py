@@ -0,0 +1,262 @@
+"""
+测试与基准测试共用的脚手架
+- build_app：挂载指定路由、覆盖数据库会话与当前用户依赖的应用
+- create_users / create_documents / create_search_documents：在 SQLite 文件数据库中准备数据
+- count_statements：统计引擎执行的 COUNT 语句
+- build_load_test_app / run_load：慢查询下同步会话与异步会话的并发对比
+
+文件名不以 test_ 开头，避免被 pytest 当作测试模块收集
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SECRET_KEY", "testing-utils-secret-key-0123456789abcdef")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, func, insert, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import Base, aget_db, aget_write_db, create_async_db_engine, get_pool_options
+from app.models.comment import Comment  # noqa: F401  注册关联的模型
+from app.models.document import Document
+from app.models.enterprise import EnterpriseInfo  # noqa: F401
+from app.models.project import Project  # noqa: F401
+from app.models.user import User
+from app.services.count_service import count_service
+from app.services.search_index import search_index
+from app.utils.auth import get_current_user
+from app.utils.pagination import keyset_condition
+
+# 文档列表的排序键（与 GET /documents/ 一致）
+DOCUMENT_SORT_KEYS = [Document.updated_at.desc(), Document.id.desc()]
+
+# 生成检索正文使用的词
+WORDS = [
+    "突发环境事件", "应急预案", "风险评估", "危险化学品", "污水处理", "废气排放", "应急物资",
+    "环境监测", "应急演练", "事故报告", "生产车间", "储罐区", "消防设施", "疏散路线", "培训记录",
+]
+# 常见词、多个词与选择性高的词
+QUERIES = ["应急预案", "储罐区 消防设施", "文档123"]
+
+
+def build_app(db_path: str, user_id: int, routers: Iterable, writer: bool = False):
+    """
+    构建挂载 routers 中各路由模块（前缀 /api）的应用，读写会话都使用 db_path 上的异步引擎
+
+    Args:
+        db_path: SQLite 数据库文件路径
+        user_id: 当前用户ID
+        routers: 路由模块（含 router 属性）
+        writer: 写会话是否使用单独的 SQLite 写引擎（应用关闭时释放）
+
+    Returns:
+        (app, async_engine)
+    """
+    engine = create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    write_factory = factory
+
+    app = FastAPI()
+    if writer:
+        write_engine = create_async_db_engine(f"sqlite+aiosqlite:///{db_path}", writer=True)
+        write_factory = async_sessionmaker(bind=write_engine, class_=AsyncSession, expire_on_commit=False)
+        app.router.on_shutdown.append(write_engine.dispose)
+
+    async def override_aget_db():
+        async with factory() as db:
+            yield db
+
+    async def override_aget_write_db():
+        async with write_factory() as db:
+            yield db
+
+    for module in routers:
+        app.include_router(module.router, prefix="/api")
+    app.dependency_overrides[aget_db] = override_aget_db
+    app.dependency_overrides[aget_write_db] = override_aget_write_db
+    app.dependency_overrides[get_current_user] = lambda: type(
+        "U", (), {"id": user_id, "email": f"user{user_id}@example.com"}
+    )()
+    return app, engine
+
+
+def create_users(db_path: str, *names: str) -> List[int]:
+    """创建数据库（含全文索引表）与名为 names 的用户，清除这些用户ID缓存的总数，返回用户ID列表"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        users = [User(name=name, email=f"{name}@example.com", hashed_password="x") for name in names]
+        session.add_all(users)
+        session.commit()
+        user_ids = [user.id for user in users]
+    engine.dispose()
+    # 其他测试可能缓存过相同用户ID的总数
+    for user_id in user_ids:
+        for scope in ("documents", "projects", "enterprise_infos"):
+            count_service.invalidate(scope, user_id)
+    return user_ids
+
+
+def create_documents(db_path: str, count: int) -> int:
+    """创建测试用户与 count 个文档（每 3 个文档的更新时间相同，覆盖排序键相等的情况），返回用户ID"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    base_time = datetime(2026, 1, 1)
+    with sessionmaker(bind=engine)() as session:
+        user = User(name="基准测试", email="keyset@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        session.execute(insert(Document), [
+            {"title": f"文档{i}", "content": "<p>内容</p>", "user_id": user.id,
+             "updated_at": base_time + timedelta(seconds=i // 3)}
+            for i in range(count)
+        ])
+        # 批量插入不触发 ORM 事件，重建全文索引
+        search_index.rebuild(session.connection(), ["documents"])
+        session.commit()
+        user_id = user.id
+    engine.dispose()
+    return user_id
+
+
+def create_search_documents(db_path: str, count: int, seed: int = 0) -> int:
+    """创建测试用户与 count 个正文随机的文档并建立全文索引，返回用户ID"""
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        user = User(name="基准测试", email="search@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        session.execute(insert(Document), [
+            {"title": f"{rng.choice(WORDS)}文档{i}",
+             "content": "".join(f"<p>{'，'.join(rng.sample(WORDS, 6))}。</p>" for _ in range(5)),
+             "user_id": user.id}
+            for i in range(count)
+        ])
+        # 批量插入不触发 ORM 事件，重建全文索引
+        search_index.rebuild(session.connection(), ["documents"])
+        session.commit()
+        user_id = user.id
+    engine.dispose()
+    return user_id
+
+
+def like_query(user_id: int, query: str):
+    """标题或正文包含每个查询词的文档数"""
+    conditions = [or_(Document.title.contains(term), Document.content.contains(term)) for term in query.split()]
+    return select(func.count()).select_from(Document).where(Document.user_id == user_id, *conditions)
+
+
+def fts_query(conn, user_id: int, query: str):
+    """全文索引过滤出的文档数"""
+    matching_ids = search_index.matching_ids(conn, "documents", query)
+    return select(func.count()).select_from(Document).where(
+        Document.user_id == user_id, Document.id.in_(matching_ids)
+    )
+
+
+def explain_keyset_query(db_path: str, user_id: int) -> str:
+    """游标分页查询的 SQLite 查询计划"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    stmt = (select(Document).where(Document.user_id == user_id)
+            .where(keyset_condition(DOCUMENT_SORT_KEYS, [datetime(2026, 1, 1), 1]))
+            .order_by(*DOCUMENT_SORT_KEYS).limit(21))
+    compiled = stmt.compile(engine)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}",
+                                    tuple(str(compiled.params[name]) for name in compiled.positiontup)).all()
+    engine.dispose()
+    return "; ".join(row[-1] for row in rows)
+
+
+@contextmanager
+def count_statements(engine):
+    """
+    统计引擎执行的 COUNT 语句数
+
+    Yields:
+        列表，退出上下文后包含期间执行的 COUNT 语句
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "count(" in statement.lower():
+            statements.append(statement)
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _register_slow_query(dbapi_connection, connection_record):
+    """注册 slow_query(秒)：在数据库连接中休眠指定秒数后返回 1"""
+    dbapi_connection.create_function("slow_query", 1, lambda seconds: time.sleep(seconds) or 1)
+
+
+def build_load_test_app(db_path: str, delay: float):
+    """
+    构建负载测试应用
+
+    /sync：async 路由中使用同步会话执行慢查询（原实现方式）
+    /async：使用异步会话执行慢查询
+
+    Returns:
+        (app, async_engine)
+    """
+    sync_url = f"sqlite:///{db_path}"
+    sync_engine = create_engine(sync_url, connect_args={"check_same_thread": False}, **get_pool_options(sync_url))
+    event.listen(sync_engine, "connect", _register_slow_query)
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+
+    async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+    event.listen(async_engine.sync_engine, "connect", _register_slow_query)
+    AsyncSessionFactory = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionFactory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_route(db: Session = Depends(get_sync_db)):
+        return {"value": db.execute(text("SELECT slow_query(:delay)"), {"delay": delay}).scalar()}
+
+    @app.get("/async")
+    async def async_route(db: AsyncSession = Depends(get_async_db)):
+        return {"value": (await db.execute(text("SELECT slow_query(:delay)"), {"delay": delay})).scalar()}
+
+    return app, async_engine
+
+
+async def run_load(app, path: str, requests: int) -> float:
+    """并发发送 requests 个请求，返回总耗时（秒）"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 and response.json()["value"] == 1 for response in responses)
+    return elapsed